@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+量子化モデルの精度評価スクリプト
+
+基準モデル（FP32）と評価対象モデル（INT8など）で同じ画像セットを処理し、
+針の角度・先端位置のずれ、推論速度、メモリ使用量を比較します。
+結果は評価対象モデルと同じ場所に <モデルパス>.eval.json として保存され、
+Lambda関数は MODEL_PRECISION=int8 のときにこのレポートで精度ゲートを確認します。
+
+ラベル（--labels）を指定した場合は、各モデルの正解とのずれも出力します。
+ラベルファイルの形式:
+    {"0001.png": {"tip": [x, y], "angle": 123.4}, ...}
+
+使用例:
+    python evaluate_model.py best.onnx best_int8.onnx --image-dir ../../sample_images
+"""
+import argparse
+import json
+import math
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from inference_backends import EVALUATION_REPORT_SUFFIX
+from needle_geometry import angle_difference
+
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg")
+
+
+def infer_backend(model_path: Path) -> str:
+    """
+    モデルファイルの形式からバックエンド名を推定
+
+    Args:
+        model_path: モデルファイルパス
+
+    Returns:
+        バックエンド名 ("torch", "onnx", "openvino")
+    """
+    if model_path.is_dir() or model_path.suffix == ".xml":
+        return "openvino"
+    if model_path.suffix == ".onnx":
+        return "onnx"
+    return "torch"
+
+
+def run_worker(model_path: Path, image_dir: Path, repeat: int) -> Dict[str, Any]:
+    """
+    1つのモデルで画像セットを処理し、針の検出結果と計測値を返す
+
+    Args:
+        model_path: モデルファイルパス
+        image_dir: 画像ディレクトリ
+        repeat: 速度計測の周回数
+
+    Returns:
+        {"predictions": {...}, "latency_ms": [...], "load_s": ..., "max_rss_mb": ...}
+    """
+    import cv2
+    from yolo_processor import YOLOProcessor
+
+    image_paths = sorted(p for p in image_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    images = {p.name: cv2.imread(str(p), cv2.IMREAD_COLOR) for p in image_paths}
+
+    start = time.perf_counter()
+    processor = YOLOProcessor(model_path=str(model_path), backend=infer_backend(model_path))
+    processor.load_model()
+    load_time = time.perf_counter() - start
+
+    predictions = {}
+    for name, image in images.items():
+        result = processor.analyze_image(image)
+        if result.needles:
+            needle = max(result.needles, key=lambda n: n.score or 0.0)
+            predictions[name] = {"tip": [needle.tip_x, needle.tip_y], "angle": needle.angle}
+        else:
+            predictions[name] = None
+
+    latencies = []
+    for _ in range(repeat):
+        for image in images.values():
+            start = time.perf_counter()
+            processor.process_image(image)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "predictions": predictions,
+        "latency_ms": latencies,
+        "load_s": load_time,
+        # Linuxでは ru_maxrss の単位はKB
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def evaluate_in_subprocess(model_path: Path, image_dir: Path, repeat: int) -> Dict[str, Any]:
+    """メモリ使用量を分けて計測するため、モデルごとに別プロセスで run_worker を実行"""
+    command = [
+        sys.executable, str(Path(__file__).resolve()), '--worker',
+        str(model_path), '--image-dir', str(image_dir), '--repeat', str(repeat),
+    ]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare_predictions(
+    reference: Dict[str, Optional[Dict[str, Any]]],
+    candidate: Dict[str, Optional[Dict[str, Any]]],
+) -> Dict[str, float]:
+    """
+    2つの検出結果の角度・先端位置のずれを集計
+
+    Args:
+        reference: 基準の検出結果（またはラベル）
+        candidate: 比較対象の検出結果
+
+    Returns:
+        ずれの統計（角度は度、先端はピクセル）
+    """
+    angle_errors, tip_errors, misses = [], [], 0
+    for name, ref in reference.items():
+        cand = candidate.get(name)
+        if ref is None and cand is None:
+            continue
+        if ref is None or cand is None:
+            misses += 1
+            continue
+        if ref.get("angle") is not None:
+            angle_errors.append(angle_difference(ref["angle"], cand["angle"]))
+        if ref.get("tip") is not None:
+            tip_errors.append(math.dist(ref["tip"], cand["tip"]))
+
+    def stats(values: List[float], prefix: str) -> Dict[str, float]:
+        if not values:
+            return {f"{prefix}_mean": 0.0, f"{prefix}_p95": 0.0, f"{prefix}_max": 0.0}
+        return {
+            f"{prefix}_mean": float(np.mean(values)),
+            f"{prefix}_p95": float(np.percentile(values, 95)),
+            f"{prefix}_max": float(np.max(values)),
+        }
+
+    return {
+        **stats(angle_errors, "angle_error"),
+        **stats(tip_errors, "tip_error"),
+        "miss_rate": misses / max(1, len(reference)),
+    }
+
+
+def _model_size_mb(model_path: Path) -> float:
+    """モデルファイル（ディレクトリの場合は合計）のサイズ (MB)"""
+    if model_path.is_dir():
+        return sum(p.stat().st_size for p in model_path.rglob('*') if p.is_file()) / 1024 / 1024
+    return model_path.stat().st_size / 1024 / 1024
+
+
+def main() -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='量子化モデルの精度評価スクリプト')
+    parser.add_argument('reference', type=Path, help='基準モデル（FP32: best.pt / best.onnx）')
+    parser.add_argument('candidate', type=Path, nargs='?', help='評価対象モデル（INT8: best_int8.onnx）')
+    parser.add_argument('--image-dir', type=Path, required=True, help='評価画像のディレクトリ')
+    parser.add_argument('--labels', type=Path, default=None, help='正解ラベル（JSON）')
+    parser.add_argument('--repeat', type=int, default=3, help='速度計測の周回数（デフォルト: 3）')
+    parser.add_argument('--max-angle-error', type=float, default=2.0,
+                        help='許容する角度のずれ p95（度, デフォルト: 2.0）')
+    parser.add_argument('--max-tip-error', type=float, default=5.0,
+                        help='許容する先端位置のずれ p95（ピクセル, デフォルト: 5.0）')
+    parser.add_argument('--max-miss-rate', type=float, default=0.0,
+                        help='許容する検出結果の不一致率（デフォルト: 0.0）')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.reference, args.image_dir, args.repeat)))
+        return 0
+
+    if args.candidate is None:
+        parser.error('評価対象モデル（candidate）を指定してください')
+
+    print(f"[INFO] 基準モデル: {args.reference}")
+    reference = evaluate_in_subprocess(args.reference, args.image_dir, args.repeat)
+    print(f"[INFO] 評価対象モデル: {args.candidate}")
+    candidate = evaluate_in_subprocess(args.candidate, args.image_dir, args.repeat)
+
+    drift = compare_predictions(reference["predictions"], candidate["predictions"])
+    report = {
+        "reference": str(args.reference),
+        "candidate": str(args.candidate),
+        "images": len(reference["predictions"]),
+        "drift": drift,
+        "reference_latency_ms": float(np.mean(reference["latency_ms"])),
+        "candidate_latency_ms": float(np.mean(candidate["latency_ms"])),
+        "speedup": float(np.mean(reference["latency_ms"]) / np.mean(candidate["latency_ms"])),
+        "reference_rss_mb": reference["max_rss_mb"],
+        "candidate_rss_mb": candidate["max_rss_mb"],
+        "reference_model_mb": _model_size_mb(args.reference),
+        "candidate_model_mb": _model_size_mb(args.candidate),
+        "thresholds": {
+            "max_angle_error": args.max_angle_error,
+            "max_tip_error": args.max_tip_error,
+            "max_miss_rate": args.max_miss_rate,
+        },
+    }
+
+    if args.labels is not None:
+        with open(args.labels, 'r', encoding='utf-8') as f:
+            labels = json.load(f)
+        report["reference_vs_labels"] = compare_predictions(labels, reference["predictions"])
+        report["candidate_vs_labels"] = compare_predictions(labels, candidate["predictions"])
+
+    report["passed"] = (
+        drift["angle_error_p95"] <= args.max_angle_error
+        and drift["tip_error_p95"] <= args.max_tip_error
+        and drift["miss_rate"] <= args.max_miss_rate
+    )
+
+    report_path = Path(str(args.candidate) + EVALUATION_REPORT_SUFFIX)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print()
+    print(f"[RESULT] 角度のずれ   mean={drift['angle_error_mean']:.2f}° p95={drift['angle_error_p95']:.2f}°")
+    print(f"[RESULT] 先端のずれ   mean={drift['tip_error_mean']:.2f}px p95={drift['tip_error_p95']:.2f}px")
+    print(f"[RESULT] 検出不一致率 {drift['miss_rate']:.3f}")
+    print(f"[RESULT] 推論時間     {report['reference_latency_ms']:.1f}ms → "
+          f"{report['candidate_latency_ms']:.1f}ms ({report['speedup']:.2f}x)")
+    print(f"[RESULT] RSS          {report['reference_rss_mb']:.0f}MB → {report['candidate_rss_mb']:.0f}MB")
+    print(f"[RESULT] モデルサイズ {report['reference_model_mb']:.1f}MB → {report['candidate_model_mb']:.1f}MB")
+    print(f"[INFO] レポート: {report_path}")
+
+    if not report["passed"]:
+        print("[ERROR] 精度ゲートを満たしていません。このモデルは使用できません。", file=sys.stderr)
+        return 1
+
+    print("[SUCCESS] 精度ゲートを満たしています")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
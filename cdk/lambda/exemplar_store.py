@@ -0,0 +1,184 @@
+"""
+ゲージ種別ごとの参考画像（few-shot）のストアモジュール
+読み取りの難しいゲージで、同じ型式の読み取り値付きの参考画像をBedrockの
+リクエストに含めるために使う
+
+参考画像はゲージ種別ごとに初回の要求時に一度だけ読み込み、文字盤の周囲に
+切り抜き・縮小してからエンコードした状態で保持する。呼び出しごとに
+デコード・再エンコードしない。
+
+ディレクトリ構成:
+    <directory>/<gaugeType>.json: {"examples": [{"image": "type-a/0001.png", "text": "0.52 MPa"}, ...]}
+                                  image はJSONファイルからの相対パス、text は読み取り値
+
+保持するBase64文字列と説明の合計サイズが max_bytes を超える場合は、最も長く
+使われていないゲージ種別から破棄する（次の要求時に読み込み直す）。
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from gauge_detector import detect_dial
+from image_codec import decode_image
+from llm_image import LLMImageOptions, prepare_llm_image
+from prompt_registry import PromptExample
+
+logger = logging.getLogger(__name__)
+
+# 参考画像の後に付ける説明
+EXEMPLAR_TEXT = "上の画像は同じ型式の圧力計の参考画像です。読み取り値: {label}"
+
+
+def exemplar_size(example: PromptExample) -> int:
+    """参考画像が保持するメモリの目安（Base64文字列と説明のバイト数）"""
+    return len(example.image_base64) + len(example.text.encode("utf-8"))
+
+
+@dataclass
+class ExemplarStoreStats:
+    """ストアの利用状況"""
+
+    # 保持しているゲージ種別数と参考画像数
+    gauge_types: int = 0
+    exemplars: int = 0
+    # 保持している参考画像の合計サイズ（バイト）
+    bytes: int = 0
+    # ディスクから読み込んだ回数と、上限を超えて破棄した回数
+    loads: int = 0
+    evictions: int = 0
+    # 1種別で上限を超えるため保持せずに返した回数
+    oversized: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """ログ用の辞書に変換"""
+        return {
+            "gaugeTypes": self.gauge_types,
+            "exemplars": self.exemplars,
+            "bytes": self.bytes,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "oversized": self.oversized,
+        }
+
+
+class ExemplarStore:
+    """ゲージ種別をキーとした、エンコード済みの参考画像のLRUストア"""
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 8 * 1024 * 1024,
+        max_per_type: int = 2,
+        options: Optional[LLMImageOptions] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            directory: 参考画像の定義ファイル（<gaugeType>.json）のディレクトリ
+            max_bytes: 保持する参考画像の合計サイズの上限（バイト）
+            max_per_type: ゲージ種別ごとに使う参考画像の最大枚数
+            options: 参考画像の切り抜き・縮小設定（省略時は環境変数から作成）
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_per_type = max_per_type
+        self.options = options if options is not None else LLMImageOptions.from_env()
+        self._entries: "OrderedDict[str, List[PromptExample]]" = OrderedDict()
+        self._size = 0
+        self._stats = ExemplarStoreStats()
+        # 上限を超えることを警告済みのゲージ種別（毎回読み込み直すため、警告は1回のみ）
+        self._oversized: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def gauge_types(self) -> List[str]:
+        """参考画像が定義されているゲージ種別の一覧"""
+        if not self.directory.is_dir():
+            return []
+        return sorted(path.stem for path in self.directory.glob("*.json"))
+
+    def _load(self, gauge_type: str) -> List[PromptExample]:
+        """定義ファイルから参考画像を読み込み、切り抜き・縮小してエンコード"""
+        path = self.directory / f"{gauge_type}.json"
+        if not path.is_file():
+            return []
+        data = json.loads(path.read_text(encoding="utf-8"))
+
+        examples = []
+        for entry in data.get("examples", [])[:self.max_per_type]:
+            image = decode_image((path.parent / entry["image"]).read_bytes())
+            dial = detect_dial(image) if self.options.crop else None
+            prepared = prepare_llm_image(image, dial, self.options)
+            examples.append(PromptExample(
+                image_base64=prepared.data_base64,
+                media_type=prepared.media_type,
+                text=EXEMPLAR_TEXT.format(label=entry.get("text", "")),
+            ))
+        return examples
+
+    def get(self, gauge_type: str) -> List[PromptExample]:
+        """
+        ゲージ種別の参考画像を取得（初回のみ読み込む）
+
+        Args:
+            gauge_type: ゲージ種別
+
+        Returns:
+            参考画像のリスト（定義が無い場合は空のリスト）
+        """
+        # ディレクトリ外のファイルを読まないよう、パスを含む名前は受け付けない
+        if not gauge_type or Path(gauge_type).name != gauge_type:
+            return []
+
+        with self._lock:
+            if gauge_type in self._entries:
+                self._entries.move_to_end(gauge_type)
+                return self._entries[gauge_type]
+
+        examples = self._load(gauge_type)
+        # 定義の無い種別は保持しない（サイズ0のため上限で削除されず、呼び出し側が
+        # 指定した任意の種別名でエントリが増え続けるため。定義ファイルの有無の確認のみ毎回行う）
+        if not examples:
+            return examples
+        size = sum(exemplar_size(example) for example in examples)
+        with self._lock:
+            self._stats.loads += 1
+            # 上限を超える種別は保持せずに返す（毎回読み込み直す）
+            if size > self.max_bytes:
+                self._stats.oversized += 1
+                if gauge_type not in self._oversized:
+                    self._oversized.add(gauge_type)
+                    logger.warning(
+                        "Exemplars for '%s' (%d bytes) exceed the store limit (%d bytes)",
+                        gauge_type, size, self.max_bytes,
+                    )
+                return examples
+            if gauge_type not in self._entries:
+                self._entries[gauge_type] = examples
+                self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= sum(exemplar_size(example) for example in evicted)
+                self._stats.evictions += 1
+            return self._entries.get(gauge_type, examples)
+
+    def preload(self) -> None:
+        """定義されているすべてのゲージ種別を読み込む（ウォームアップ用）"""
+        for gauge_type in self.gauge_types():
+            self.get(gauge_type)
+
+    def stats(self) -> ExemplarStoreStats:
+        """現在の利用状況"""
+        with self._lock:
+            return ExemplarStoreStats(
+                gauge_types=len(self._entries),
+                exemplars=sum(len(examples) for examples in self._entries.values()),
+                bytes=self._size,
+                loads=self._stats.loads,
+                evictions=self._stats.evictions,
+                oversized=self._stats.oversized,
+            )
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+YOLOモデルのエクスポートスクリプト
+
+学習済みの best.pt を ONNX または OpenVINO 形式に変換します。
+変換後のモデルは環境変数 MODEL_BACKEND / MODEL_PATH で指定して
+YOLOProcessor から読み込めます（実行時に ultralytics / torch は不要）。
+
+使用例:
+    python export_model.py best.pt --format onnx --imgsz 640
+    python export_model.py best.pt --format openvino --dynamic --output /opt/ml/model/best_openvino_model
+"""
+import argparse
+import shutil
+import sys
+from pathlib import Path
+
+
+def export_model(
+    weights: Path,
+    format: str,
+    imgsz: int = 640,
+    dynamic: bool = False,
+    output: Path = None,
+) -> Path:
+    """
+    YOLOモデルをエクスポート
+
+    Args:
+        weights: 学習済みモデル (.pt) のパス
+        format: 出力形式 ("onnx" or "openvino")
+        imgsz: 入力サイズ
+        dynamic: 入力形状（バッチ・画像サイズ）を動的にするかどうか
+        output: 出力先パス（省略時は ultralytics の既定の出力先）
+
+    Returns:
+        エクスポートしたモデルのパス
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(str(weights))
+    export_kwargs = {"format": format, "imgsz": imgsz, "dynamic": dynamic}
+    if format == "onnx":
+        export_kwargs["simplify"] = True
+
+    exported = Path(model.export(**export_kwargs))
+
+    if output is not None and exported.resolve() != output.resolve():
+        if output.exists():
+            if output.is_dir():
+                shutil.rmtree(output)
+            else:
+                output.unlink()
+        output.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(exported), str(output))
+        exported = output
+
+    return exported
+
+
+def main() -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='YOLOモデルのエクスポートスクリプト')
+    parser.add_argument('weights', type=Path, help='学習済みモデル (.pt) のパス')
+    parser.add_argument(
+        '--format',
+        choices=['onnx', 'openvino'],
+        default='onnx',
+        help='出力形式（デフォルト: onnx）'
+    )
+    parser.add_argument('--imgsz', type=int, default=640, help='入力サイズ（デフォルト: 640）')
+    parser.add_argument(
+        '--dynamic',
+        action='store_true',
+        help='入力形状を動的にする（デフォルト: 固定形状）'
+    )
+    parser.add_argument('--output', type=Path, default=None, help='出力先パス')
+
+    args = parser.parse_args()
+
+    if not args.weights.exists():
+        print(f"[ERROR] モデルファイルが見つかりません: {args.weights}", file=sys.stderr)
+        return 1
+
+    exported = export_model(
+        weights=args.weights,
+        format=args.format,
+        imgsz=args.imgsz,
+        dynamic=args.dynamic,
+        output=args.output,
+    )
+    print(f"[INFO] エクスポート完了: {exported}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+圧力計の文字盤検出モジュール
+縮小画像のハフ変換で文字盤の中心と半径を求め、オプションで目盛りの
+円弧の両端の角度を推定する
+
+固定カメラでは文字盤の位置が変わらないため、カメラIDごとに検出結果を
+キャッシュして2回目以降の検出を省略できる。
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 目盛りを探す円環の範囲（文字盤の半径に対する比率）
+TICK_RING = (0.6, 0.85)
+
+
+@dataclass
+class DialGeometry:
+    """文字盤のジオメトリ（画像座標）"""
+
+    center_x: float
+    center_y: float
+    radius: float
+    # 目盛りの円弧の両端の角度（度、12時方向を0として時計回り）
+    # min_angle から時計回りに max_angle まで目盛りがある
+    min_angle: Optional[float] = None
+    max_angle: Optional[float] = None
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        """中心座標（整数）"""
+        return int(round(self.center_x)), int(round(self.center_y))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """ログ・レスポンス用の辞書に変換"""
+        return {
+            "center": [round(self.center_x, 1), round(self.center_y, 1)],
+            "radius": round(self.radius, 1),
+            "minAngle": self.min_angle,
+            "maxAngle": self.max_angle,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DialGeometry":
+        """to_dict() の辞書から復元"""
+        return cls(
+            center_x=data["center"][0],
+            center_y=data["center"][1],
+            radius=data["radius"],
+            min_angle=data.get("minAngle"),
+            max_angle=data.get("maxAngle"),
+        )
+
+
+def detect_scale_arc(
+    gray: np.ndarray,
+    center_x: float,
+    center_y: float,
+    radius: float,
+    tick_threshold: float = 0.3,
+) -> Optional[Tuple[float, float]]:
+    """
+    目盛りの円弧の両端の角度を推定
+
+    文字盤の円環上を1度ごとに半径方向へサンプリングし、暗い画素が多い
+    （放射状の目盛り線がある）角度を目盛りとみなす。目盛りの無い最大の
+    角度範囲の両端を円弧の端とする。
+
+    Args:
+        gray: グレースケール画像
+        center_x: 文字盤中心のx座標
+        center_y: 文字盤中心のy座標
+        radius: 文字盤の半径
+        tick_threshold: 目盛りとみなす暗い画素の割合
+
+    Returns:
+        (min_angle, max_angle)。目盛りが見つからない場合はNone
+    """
+    angles = np.radians(np.arange(360))
+    radii = np.linspace(TICK_RING[0], TICK_RING[1], 24) * radius
+    map_x = (center_x + np.outer(np.sin(angles), radii)).astype(np.float32)
+    map_y = (center_y - np.outer(np.cos(angles), radii)).astype(np.float32)
+    samples = cv2.remap(gray, map_x, map_y, cv2.INTER_LINEAR, borderValue=255)
+
+    # 文字盤内の明るさから暗い画素の閾値を決める
+    h, w = gray.shape[:2]
+    r = int(radius * TICK_RING[1])
+    x0, y0 = max(0, int(center_x) - r), max(0, int(center_y) - r)
+    x1, y1 = min(w, int(center_x) + r), min(h, int(center_y) + r)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    threshold, _ = cv2.threshold(gray[y0:y1, x0:x1], 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    ticks = np.flatnonzero((samples < threshold).mean(axis=1) > tick_threshold)
+    if len(ticks) < 2:
+        return None
+
+    # 目盛りの無い最大の角度範囲（一周をまたぐ場合も含む）
+    gaps = np.diff(np.append(ticks, ticks[0] + 360))
+    k = int(np.argmax(gaps))
+    return float(ticks[(k + 1) % len(ticks)]), float(ticks[k])
+
+
+def detect_dial(
+    image: np.ndarray,
+    max_side: int = 320,
+    detect_arc: bool = False,
+) -> Optional[DialGeometry]:
+    """
+    文字盤の中心と半径を検出
+
+    Args:
+        image: 入力画像 (BGR)
+        max_side: ハフ変換を行う縮小画像の長辺
+        detect_arc: 目盛りの円弧の両端も推定するかどうか
+
+    Returns:
+        文字盤のジオメトリ。検出できない場合はNone
+    """
+    h, w = image.shape[:2]
+    scale = min(1.0, max_side / max(h, w))
+    small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    gray = cv2.medianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), 5)
+    sh, sw = gray.shape
+
+    # 最も確からしい円のみを残す（minDistを画像サイズにする）
+    search = {
+        "minDist": max(sh, sw),
+        "minRadius": int(min(sh, sw) * 0.2),
+        "maxRadius": int(max(sh, sw) * 0.6),
+    }
+    circles = cv2.HoughCircles(
+        gray, cv2.HOUGH_GRADIENT_ALT, dp=1.5, param1=300, param2=0.8, **search
+    )
+    if circles is None:
+        # 輪郭が途切れた文字盤など、真円度の高い円が見つからない場合
+        circles = cv2.HoughCircles(
+            gray, cv2.HOUGH_GRADIENT, dp=1, param1=100, param2=40, **search
+        )
+    if circles is None:
+        return None
+
+    cx, cy, radius = (float(v) / scale for v in circles[0, 0])
+    if not (0 <= cx < w and 0 <= cy < h):
+        return None
+
+    dial = DialGeometry(center_x=cx, center_y=cy, radius=radius)
+    if detect_arc:
+        arc = detect_scale_arc(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), cx, cy, radius)
+        if arc is not None:
+            dial.min_angle, dial.max_angle = arc
+    return dial
+
+
+class DialDetector:
+    """カメラIDごとに検出結果をキャッシュする文字盤検出器"""
+
+    def __init__(self, max_side: int = 320, detect_arc: bool = False, max_cameras: int = 256):
+        """
+        初期化
+
+        Args:
+            max_side: ハフ変換を行う縮小画像の長辺
+            detect_arc: 目盛りの円弧の両端も推定するかどうか
+            max_cameras: 検出結果を保持するカメラ数の上限
+        """
+        self.max_side = max_side
+        self.detect_arc = detect_arc
+        self.max_cameras = max_cameras
+        self._cache: "OrderedDict[Tuple[str, Tuple[int, ...]], DialGeometry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def detect(self, image: np.ndarray, camera_id: Optional[str] = None) -> Optional[DialGeometry]:
+        """
+        文字盤を検出（camera_idを指定した場合は同じ画像サイズの検出結果を再利用）
+
+        Args:
+            image: 入力画像 (BGR)
+            camera_id: カメラID（オプション）
+
+        Returns:
+            文字盤のジオメトリ。検出できない場合はNone
+        """
+        if camera_id is None:
+            return detect_dial(image, self.max_side, self.detect_arc)
+
+        key = (camera_id, image.shape[:2])
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        dial = detect_dial(image, self.max_side, self.detect_arc)
+        # 検出できなかった場合は次のフレームで再検出する
+        if dial is not None:
+            with self._lock:
+                self._cache[key] = dial
+                while len(self._cache) > self.max_cameras:
+                    self._cache.popitem(last=False)
+        return dial
+
+    def forget(self, camera_id: str) -> None:
+        """カメラの検出結果を破棄（カメラの向きを変えた場合など）"""
+        with self._lock:
+            for key in [key for key in self._cache if key[0] == camera_id]:
+                del self._cache[key]
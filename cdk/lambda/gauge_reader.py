@@ -0,0 +1,271 @@
+"""
+圧力計の読み取りモジュール
+針のジオメトリ（角度）とゲージごとの校正値から、LLMを使わずに
+圧力値と信頼度を求める
+
+角度は needle_geometry と同じく12時方向を0とした時計回りの角度（度）。
+目盛りは最小値の角度から時計回りに最大値の角度まで振れるものとする。
+"""
+import json
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from needle_geometry import NeedleGeometry, angle_difference, vector_to_angle
+
+# 読み取りモード
+#   llm:   常にBedrock LLMで読み取る（従来どおり）
+#   local: 針の角度と校正値から読み取り、Bedrockを呼び出さない
+#   auto:  ローカルの読み取りの信頼度が低い場合のみBedrockで読み取る
+READING_MODES = ("llm", "local", "auto")
+
+# この細長さ（主成分の標準偏差比）以上のマスクを針らしい形状とみなす
+ELONGATION_FOR_FULL_CONFIDENCE = 4.0
+
+
+def _number(data: Dict[str, Any], key: str, default: Optional[float] = None) -> float:
+    """
+    校正値の数値の項目を取得（内部ヘルパー関数）
+
+    Raises:
+        ValueError: 項目が無い、または有限の数値でない場合
+    """
+    if key not in data:
+        if default is not None:
+            return default
+        raise ValueError(f"校正値に '{key}' がありません")
+    value = data[key]
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"校正値の '{key}' には数値を指定してください: {value!r}")
+    return float(value)
+
+
+@dataclass
+class GaugeCalibration:
+    """ゲージごとの目盛りの校正値"""
+
+    # 最小値・最大値の目盛りの角度（度）
+    min_angle: float
+    max_angle: float
+    # 最小値・最大値
+    min_value: float
+    max_value: float
+    # 単位
+    unit: str = ""
+    # 非線形な目盛りの対応表 [(角度, 値), ...]（最小値側から順に。省略時は線形）
+    scale: Optional[List[Tuple[float, float]]] = None
+    # 目盛りの範囲外でも端の値として扱う角度の幅（度）
+    tolerance: float = 5.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GaugeCalibration":
+        """
+        イベント・設定ファイルの辞書から作成
+
+        Args:
+            data: {"minAngle": 225, "maxAngle": 135, "minValue": 0, "maxValue": 1,
+                   "unit": "MPa", "scale": [[225, 0], [270, 0.1], ...], "tolerance": 5}
+
+        Returns:
+            校正値
+
+        Raises:
+            ValueError: 項目が無い・数値でない、または scale が単調でない場合
+        """
+        if not isinstance(data, dict):
+            raise ValueError("校正値はオブジェクトで指定してください")
+        unit = data.get("unit", "")
+        if not isinstance(unit, str):
+            raise ValueError(f"校正値の 'unit' には文字列を指定してください: {unit!r}")
+        tolerance = _number(data, "tolerance", 5.0)
+        if tolerance < 0:
+            raise ValueError(f"校正値の 'tolerance' には0以上を指定してください: {tolerance}")
+
+        calibration = cls(
+            min_angle=_number(data, "minAngle"),
+            max_angle=_number(data, "maxAngle"),
+            min_value=_number(data, "minValue"),
+            max_value=_number(data, "maxValue"),
+            unit=unit,
+            tolerance=tolerance,
+        )
+
+        scale = data.get("scale")
+        if scale:
+            if not isinstance(scale, list) or len(scale) < 2:
+                raise ValueError("校正値の 'scale' には [角度, 値] の組を2つ以上指定してください")
+            points = []
+            for point in scale:
+                if not isinstance(point, (list, tuple)) or len(point) != 2:
+                    raise ValueError(f"校正値の 'scale' の要素は [角度, 値] で指定してください: {point!r}")
+                points.append((
+                    _number({"scale": point[0]}, "scale"),
+                    _number({"scale": point[1]}, "scale"),
+                ))
+            calibration.scale = points
+            calibration.validate_scale()
+        return calibration
+
+    def validate_scale(self) -> None:
+        """
+        非線形な目盛りの対応表が、最小値の角度から時計回りに並んでいるかを検証
+
+        np.interp は角度が増加順でない場合に誤った値を返すため、角度（最小値の
+        角度からの時計回りの角度）が目盛りの範囲内で増加し、値が単調であることを確認する。
+
+        Raises:
+            ValueError: 角度が増加順でない、目盛りの範囲外、または値が単調でない場合
+        """
+        if not self.scale:
+            return
+        offsets = [(a - self.min_angle) % 360.0 for a, _ in self.scale]
+        values = [v for _, v in self.scale]
+        if any(o > self.sweep for o in offsets):
+            raise ValueError(
+                f"校正値の 'scale' の角度が目盛りの範囲（{self.min_angle}°から時計回りに"
+                f"{self.max_angle}°まで）の外にあります"
+            )
+        if any(b <= a for a, b in zip(offsets, offsets[1:])):
+            raise ValueError("校正値の 'scale' は最小値の角度から時計回りの順に指定してください")
+        diffs = np.diff(values)
+        if not (np.all(diffs >= 0) or np.all(diffs <= 0)):
+            raise ValueError("校正値の 'scale' の値は単調に増加（または減少）するよう指定してください")
+
+    @property
+    def sweep(self) -> float:
+        """最小値から最大値までの時計回りの角度（度）"""
+        return (self.max_angle - self.min_angle) % 360.0 or 360.0
+
+    def angle_to_value(self, angle: float) -> Tuple[float, bool]:
+        """
+        針の角度を値に変換
+
+        Args:
+            angle: 針の角度（度）
+
+        Returns:
+            (値, 目盛りの範囲内かどうか)。範囲外の場合は近い方の端の値
+        """
+        offset = (angle - self.min_angle) % 360.0
+        in_range = True
+        if offset > self.sweep:
+            # 目盛りの無い領域: 近い方の端に寄せる
+            below_min = 360.0 - offset
+            above_max = offset - self.sweep
+            in_range = min(below_min, above_max) <= self.tolerance
+            offset = 0.0 if below_min < above_max else self.sweep
+
+        if self.scale:
+            offsets = [(a - self.min_angle) % 360.0 for a, _ in self.scale]
+            values = [v for _, v in self.scale]
+            return float(np.interp(offset, offsets, values)), in_range
+
+        ratio = offset / self.sweep
+        return self.min_value + ratio * (self.max_value - self.min_value), in_range
+
+
+@dataclass
+class GaugeReading:
+    """圧力計の読み取り結果"""
+
+    # 読み取った値
+    value: float
+    # 単位
+    unit: str
+    # 針の角度（度）。針を検出できずLLMで読み取った場合はNone
+    angle: Optional[float]
+    # 信頼度 [0, 1]
+    confidence: float
+    # 読み取り方法 ("local" or "llm")
+    source: str = "local"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """レスポンス用の辞書に変換"""
+        return {
+            "value": self.value,
+            "unit": self.unit,
+            "angle": round(self.angle, 2) if self.angle is not None else None,
+            "confidence": round(self.confidence, 3),
+            "source": self.source,
+        }
+
+
+def reading_confidence(
+    needle: NeedleGeometry,
+    center_x: float,
+    center_y: float,
+    needle_count: int = 1,
+) -> float:
+    """
+    マスクの品質から読み取りの信頼度を求める
+
+    YOLOの検出信頼度、マスクの細長さ、主成分の向きとゲージ中心→先端の
+    向きの一致度の積を、検出した針の数で割ったものとする。
+
+    Args:
+        needle: 読み取りに使う針のジオメトリ
+        center_x: ゲージ中心のx座標
+        center_y: ゲージ中心のy座標
+        needle_count: 検出した針の数（複数ある場合はどれが針か曖昧）
+
+    Returns:
+        信頼度 [0, 1]
+    """
+    score = needle.score if needle.score is not None else 1.0
+    shape = (needle.elongation - 1.0) / (ELONGATION_FOR_FULL_CONFIDENCE - 1.0)
+    shape = min(1.0, max(0.0, shape))
+
+    radial_angle = vector_to_angle(needle.tip_x - center_x, needle.tip_y - center_y)
+    agreement = max(0.0, math.cos(math.radians(angle_difference(needle.angle, radial_angle))))
+
+    return score * shape * agreement / max(1, needle_count)
+
+
+def read_gauge(
+    needles: Sequence[NeedleGeometry],
+    center: Tuple[float, float],
+    calibration: GaugeCalibration,
+) -> Optional[GaugeReading]:
+    """
+    検出した針から圧力計を読み取る
+
+    Args:
+        needles: 検出した針のジオメトリ
+        center: ゲージ中心 (x, y)
+        calibration: ゲージの校正値
+
+    Returns:
+        読み取り結果。針が無い場合はNone
+    """
+    if not needles:
+        return None
+
+    needle = max(needles, key=lambda n: n.score if n.score is not None else 0.0)
+    value, in_range = calibration.angle_to_value(needle.angle)
+    confidence = reading_confidence(needle, center[0], center[1], len(needles))
+    if not in_range:
+        confidence = 0.0
+
+    return GaugeReading(
+        value=value,
+        unit=calibration.unit,
+        angle=needle.angle,
+        confidence=confidence,
+    )
+
+
+def load_calibrations(path: str) -> Dict[str, GaugeCalibration]:
+    """
+    ゲージ種別ごとの校正値をJSONファイルから読み込む
+
+    Args:
+        path: {"<gaugeType>": {"minAngle": ..., ...}, ...} 形式のJSONファイル
+
+    Returns:
+        ゲージ種別をキーとした校正値
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {gauge_type: GaugeCalibration.from_dict(entry) for gauge_type, entry in data.items()}
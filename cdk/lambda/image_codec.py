@@ -0,0 +1,246 @@
+"""
+画像のエンコード・デコードモジュール
+OpenCVで直接エンコード・デコードし、PILを経由した色変換や配列のコピーを省く
+
+出力形式と圧縮設定は環境変数で変更できる。
+    IMAGE_FORMAT:     png / jpeg / webp（デフォルト: png）
+    PNG_COMPRESSION:  PNGの圧縮レベル 0〜9（デフォルト: 3）
+    JPEG_QUALITY:     JPEGの品質 0〜100（デフォルト: 90）
+    WEBP_QUALITY:     WebPの品質 1〜100（デフォルト: 90）
+"""
+import base64
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 出力形式とメディアタイプ
+MEDIA_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+
+@dataclass
+class EncodeOptions:
+    """画像のエンコード設定"""
+
+    # 出力形式 ("png", "jpeg", "webp")
+    format: str = "png"
+    # PNGの圧縮レベル（0: 無圧縮 〜 9: 最大圧縮）
+    png_compression: int = 3
+    # JPEGの品質
+    jpeg_quality: int = 90
+    # WebPの品質
+    webp_quality: int = 90
+
+    @classmethod
+    def from_env(cls) -> "EncodeOptions":
+        """環境変数からエンコード設定を作成"""
+        return cls(
+            format=os.environ.get("IMAGE_FORMAT", "png"),
+            png_compression=int(os.environ.get("PNG_COMPRESSION", "3")),
+            jpeg_quality=int(os.environ.get("JPEG_QUALITY", "90")),
+            webp_quality=int(os.environ.get("WEBP_QUALITY", "90")),
+        )
+
+    @property
+    def media_type(self) -> str:
+        """出力形式のメディアタイプ"""
+        return MEDIA_TYPES[normalize_format(self.format)]
+
+
+def normalize_format(format: str) -> str:
+    """
+    出力形式名を正規化（"PNG", "jpg" なども受け付ける）
+
+    Args:
+        format: 出力形式名
+
+    Returns:
+        "png", "jpeg", "webp" のいずれか
+    """
+    name = format.lower()
+    if name == "jpg":
+        name = "jpeg"
+    if name not in MEDIA_TYPES:
+        raise ValueError(f"画像の出力形式は{tuple(MEDIA_TYPES)}のいずれかを指定してください: {format}")
+    return name
+
+
+def detect_media_type(data: bytes) -> Optional[str]:
+    """
+    画像ファイルのバイト列の先頭からメディアタイプを判定
+
+    Args:
+        data: 画像ファイルのバイト列
+
+    Returns:
+        "image/png", "image/jpeg", "image/webp" のいずれか。それ以外の形式はNone
+    """
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return MEDIA_TYPES["png"]
+    if data.startswith(b"\xff\xd8\xff"):
+        return MEDIA_TYPES["jpeg"]
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return MEDIA_TYPES["webp"]
+    return None
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """
+    画像ファイルのバイト列をBGR画像にデコード
+
+    グレースケールは3チャネルに変換し、アルファチャネルは破棄する。
+    16bit画像は上位8bitを使う。
+
+    Args:
+        data: 画像ファイル（PNG, JPEG など）のバイト列
+
+    Returns:
+        OpenCV形式の画像 (BGR, uint8)
+    """
+    # コピーせずにバッファを参照してデコード
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError("画像をデコードできませんでした")
+
+    if image.dtype == np.uint16:
+        image = (image >> 8).astype(np.uint8)
+
+    if image.ndim == 2:  # グレースケール
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    if image.shape[2] == 4:  # BGRA
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+    return image
+
+
+def encode_image(image: np.ndarray, options: EncodeOptions = None) -> Tuple[bytes, str]:
+    """
+    BGR画像を画像ファイルのバイト列にエンコード
+
+    Args:
+        image: OpenCV形式の画像 (BGR)
+        options: エンコード設定（省略時は環境変数から作成）
+
+    Returns:
+        (バイト列, メディアタイプ)
+    """
+    if options is None:
+        options = EncodeOptions.from_env()
+
+    format = normalize_format(options.format)
+    if format == "png":
+        ext, params = ".png", [cv2.IMWRITE_PNG_COMPRESSION, options.png_compression]
+    elif format == "jpeg":
+        ext, params = ".jpg", [cv2.IMWRITE_JPEG_QUALITY, options.jpeg_quality]
+    else:
+        ext, params = ".webp", [cv2.IMWRITE_WEBP_QUALITY, options.webp_quality]
+
+    ok, buffer = cv2.imencode(ext, image, params)
+    if not ok:
+        raise ValueError(f"画像をエンコードできませんでした: {format}")
+    return buffer.tobytes(), MEDIA_TYPES[format]
+
+
+def decode_base64_image(base64_string: str) -> np.ndarray:
+    """
+    Base64文字列を画像(numpy配列)にデコード
+
+    Args:
+        base64_string: Base64エンコードされた画像文字列
+
+    Returns:
+        OpenCV形式の画像 (BGR, numpy.ndarray)
+    """
+    return decode_image(base64.b64decode(base64_string))
+
+
+def encode_image_to_base64(image: np.ndarray, options: EncodeOptions = None) -> Tuple[str, str]:
+    """
+    画像(numpy配列)をBase64文字列にエンコード
+
+    Args:
+        image: OpenCV形式の画像 (BGR)
+        options: エンコード設定（省略時は環境変数から作成）
+
+    Returns:
+        (Base64エンコードされた画像文字列, メディアタイプ)
+    """
+    data, media_type = encode_image(image, options)
+    return base64.b64encode(data).decode("utf-8"), media_type
+
+
+def encode_thumbnail(image: np.ndarray, max_edge: int = 256, quality: int = 80) -> Tuple[str, str]:
+    """
+    長辺を max_edge 以下に縮小したJPEGのサムネイルを作成
+
+    Args:
+        image: OpenCV形式の画像 (BGR)
+        max_edge: 長辺の最大サイズ
+        quality: JPEGの品質
+
+    Returns:
+        (Base64エンコードされた画像文字列, メディアタイプ)
+    """
+    h, w = image.shape[:2]
+    if max(h, w) > max_edge:
+        scale = max_edge / max(h, w)
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return encode_image_to_base64(image, EncodeOptions(format="jpeg", jpeg_quality=quality))
+
+
+class EncodedImage:
+    """
+    画像と、必要になった時点で一度だけ作るBase64エンコード結果
+
+    エンコード済みのデータ（前処理しない場合の入力画像のバイト列など）を
+    渡した場合は再エンコードせずにそのまま使う。
+    """
+
+    def __init__(
+        self,
+        image: Optional[np.ndarray],
+        options: EncodeOptions = None,
+        encoded: Optional[Tuple[str, str]] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            image: OpenCV形式の画像 (BGR)。encoded のみの場合はNone（必要な時にデコード）
+            options: エンコード設定（省略時は環境変数から作成）
+            encoded: エンコード済みの (Base64文字列, メディアタイプ)（オプション）
+        """
+        if image is None and encoded is None:
+            raise ValueError("画像またはエンコード済みのデータが必要です")
+        self._image = image
+        self.options = options
+        self._encoded = encoded
+
+    @property
+    def is_encoded(self) -> bool:
+        """エンコード済みかどうか"""
+        return self._encoded is not None
+
+    @property
+    def image(self) -> np.ndarray:
+        """画像 (BGR)"""
+        if self._image is None:
+            self._image = decode_base64_image(self._encoded[0])
+        return self._image
+
+    def get(self) -> Tuple[str, str]:
+        """
+        エンコード結果を取得（初回のみエンコード）
+
+        Returns:
+            (Base64エンコードされた画像文字列, メディアタイプ)
+        """
+        if self._encoded is None:
+            self._encoded = encode_image_to_base64(self._image, self.options)
+        return self._encoded
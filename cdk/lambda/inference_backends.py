@@ -0,0 +1,400 @@
+"""
+YOLOセグメンテーションモデルの推論バックエンド
+PyTorch (ultralytics) / ONNX Runtime / OpenVINO を同じインターフェースで扱う
+
+ONNX Runtime と OpenVINO ではレターボックス・NMS・マスクプロトタイプの
+デコードを自前で行うため、実行時に ultralytics / torch を必要としない。
+"""
+import json
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+# 選択可能なバックエンド名
+BACKENDS = ("torch", "onnx", "openvino")
+
+# 量子化モデルの評価レポートのファイル名サフィックス（evaluate_model.py が出力）
+EVALUATION_REPORT_SUFFIX = ".eval.json"
+
+
+class QuantizationGateError(RuntimeError):
+    """量子化モデルの精度ゲートを満たさない場合のエラー"""
+
+
+@dataclass
+class Detections:
+    """1枚分の検出結果"""
+
+    # セグメンテーションマスク (N, マスク高さ, マスク幅)。マスク座標はレターボックス済みの
+    # モデル入力を縦横等倍に縮小した空間。検出が無い場合はNone
+    masks: Optional[np.ndarray]
+    # 検出信頼度 (N,)
+    scores: np.ndarray
+
+
+class InferenceBackend:
+    """推論バックエンドの基底クラス"""
+
+    name = ""
+
+    def __init__(self, model_path: str):
+        """
+        初期化
+
+        Args:
+            model_path: モデルファイルパス
+        """
+        self.model_path = model_path
+
+    def load(self) -> None:
+        """モデルをロード"""
+        raise NotImplementedError
+
+    def predict(
+        self, images: List[np.ndarray], conf: float, iou: float
+    ) -> List[Detections]:
+        """
+        セグメンテーションを実行
+
+        Args:
+            images: 入力画像 (BGR) のリスト
+            conf: 信頼度閾値
+            iou: NMSのIOU閾値
+
+        Returns:
+            入力順の検出結果リスト
+        """
+        raise NotImplementedError
+
+
+class TorchBackend(InferenceBackend):
+    """ultralytics (PyTorch) バックエンド"""
+
+    name = "torch"
+
+    def load(self) -> None:
+        """YOLOモデルをロード"""
+        from ultralytics import YOLO
+
+        self.model = YOLO(self.model_path)
+
+    def predict(
+        self, images: List[np.ndarray], conf: float, iou: float
+    ) -> List[Detections]:
+        """ultralyticsで推論し、結果をDetectionsに変換"""
+        results = self.model(images, conf=conf, iou=iou)
+
+        detections = []
+        for result in results:
+            if result.masks is None:
+                detections.append(Detections(masks=None, scores=np.zeros(0, np.float32)))
+            else:
+                detections.append(
+                    Detections(
+                        masks=result.masks.data.cpu().numpy(),
+                        scores=result.boxes.conf.cpu().numpy(),
+                    )
+                )
+        return detections
+
+
+class ExportedModelBackend(InferenceBackend):
+    """
+    エクスポート済みモデル（ONNX / OpenVINO）の共通処理
+
+    前処理（レターボックス）と後処理（NMS・マスクデコード）をNumPy/OpenCVで行う。
+    """
+
+    # レターボックスのパディング色（ultralyticsと同じ）
+    pad_value = 114
+    # 1枚あたりの最大検出数
+    max_det = 300
+
+    def __init__(self, model_path: str, imgsz: int = 640):
+        """
+        初期化
+
+        Args:
+            model_path: モデルファイルパス
+            imgsz: 入力サイズ（モデルの入力形状が動的な場合に使用）
+        """
+        super().__init__(model_path)
+        self.input_size = (imgsz, imgsz)
+        # 固定バッチサイズ（動的バッチの場合はNone）
+        self.batch_size: Optional[int] = 1
+
+    def _run(self, blob: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        推論を実行
+
+        Args:
+            blob: 入力テンソル (B, 3, H, W) float32
+
+        Returns:
+            (予測 (B, 4+クラス数+マスク係数, アンカー数), プロトタイプ (B, マスク係数, ph, pw))
+        """
+        raise NotImplementedError
+
+    def _set_input_shape(self, shape) -> None:
+        """モデルの入力形状から固定サイズ・固定バッチを設定"""
+        batch, _, height, width = shape
+        if isinstance(height, int) and isinstance(width, int) and height > 0 and width > 0:
+            self.input_size = (height, width)
+        self.batch_size = batch if isinstance(batch, int) and batch > 0 else None
+
+    def letterbox(self, image: np.ndarray) -> np.ndarray:
+        """
+        アスペクト比を保って入力サイズに縮小し、余白をパディング
+
+        Args:
+            image: 入力画像 (BGR)
+
+        Returns:
+            レターボックス済み画像 (BGR, 入力サイズ)
+        """
+        h, w = image.shape[:2]
+        in_h, in_w = self.input_size
+        gain = min(in_h / h, in_w / w)
+        new_w, new_h = int(round(w * gain)), int(round(h * gain))
+
+        if (new_w, new_h) != (w, h):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+        dw, dh = (in_w - new_w) / 2, (in_h - new_h) / 2
+        top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+        left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+        return cv2.copyMakeBorder(
+            image, top, bottom, left, right, cv2.BORDER_CONSTANT,
+            value=(self.pad_value,) * 3,
+        )
+
+    def preprocess(self, images: List[np.ndarray]) -> np.ndarray:
+        """
+        画像リストを入力テンソルに変換
+
+        Args:
+            images: 入力画像 (BGR) のリスト
+
+        Returns:
+            入力テンソル (B, 3, H, W) float32, RGB, 0〜1
+        """
+        return cv2.dnn.blobFromImages(
+            [self.letterbox(image) for image in images],
+            scalefactor=1 / 255.0,
+            swapRB=True,
+        )
+
+    def postprocess(
+        self, pred: np.ndarray, proto: np.ndarray, conf: float, iou: float
+    ) -> Detections:
+        """
+        1枚分の出力をNMSとマスクデコードでDetectionsに変換
+
+        Args:
+            pred: 予測 (4+クラス数+マスク係数, アンカー数)
+            proto: マスクプロトタイプ (マスク係数, ph, pw)
+            conf: 信頼度閾値
+            iou: NMSのIOU閾値
+
+        Returns:
+            検出結果（マスクはプロトタイプの解像度）
+        """
+        num_masks, proto_h, proto_w = proto.shape
+        pred = pred.T
+        class_scores = pred[:, 4:-num_masks]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(pred)), class_ids]
+
+        keep = scores > conf
+        if not keep.any():
+            return Detections(masks=None, scores=np.zeros(0, np.float32))
+
+        pred, class_ids, scores = pred[keep], class_ids[keep], scores[keep]
+
+        # 中心xywh → 左上xywh（NMS用）と xyxy（マスク切り出し用）
+        boxes_xywh = pred[:, :4].copy()
+        boxes_xywh[:, 0] -= boxes_xywh[:, 2] / 2
+        boxes_xywh[:, 1] -= boxes_xywh[:, 3] / 2
+
+        indices = cv2.dnn.NMSBoxesBatched(
+            boxes_xywh.tolist(), scores.tolist(), class_ids.tolist(), conf, iou
+        )
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:self.max_det]
+        if len(indices) == 0:
+            return Detections(masks=None, scores=np.zeros(0, np.float32))
+
+        boxes_xywh, scores = boxes_xywh[indices], scores[indices]
+        coefficients = pred[indices, -num_masks:]
+
+        # マスク係数 × プロトタイプ → シグモイド
+        masks = coefficients @ proto.reshape(num_masks, -1)
+        masks = 1 / (1 + np.exp(-masks))
+        masks = masks.reshape(-1, proto_h, proto_w)
+
+        # 検出ボックスの外側を0にする（プロトタイプ解像度で切り出し）
+        in_h, in_w = self.input_size
+        scale_x, scale_y = proto_w / in_w, proto_h / in_h
+        xs = np.arange(proto_w)[None, None, :]
+        ys = np.arange(proto_h)[None, :, None]
+        x1 = (boxes_xywh[:, 0] * scale_x)[:, None, None]
+        y1 = (boxes_xywh[:, 1] * scale_y)[:, None, None]
+        x2 = ((boxes_xywh[:, 0] + boxes_xywh[:, 2]) * scale_x)[:, None, None]
+        y2 = ((boxes_xywh[:, 1] + boxes_xywh[:, 3]) * scale_y)[:, None, None]
+        inside = (xs >= x1) & (xs < x2) & (ys >= y1) & (ys < y2)
+
+        masks = ((masks > 0.5) & inside).astype(np.float32)
+        return Detections(masks=masks, scores=scores.astype(np.float32))
+
+    def predict(
+        self, images: List[np.ndarray], conf: float, iou: float
+    ) -> List[Detections]:
+        """レターボックス → 推論 → NMS・マスクデコード"""
+        if not images:
+            return []
+
+        # 固定バッチのモデルはバッチサイズごとに分割して推論
+        step = self.batch_size or len(images)
+        detections = []
+        for start in range(0, len(images), step):
+            chunk = images[start:start + step]
+            blob = self.preprocess(chunk)
+            if self.batch_size and len(chunk) < self.batch_size:
+                padding = np.zeros((self.batch_size - len(chunk),) + blob.shape[1:], blob.dtype)
+                blob = np.concatenate([blob, padding])
+
+            preds, protos = self._run(blob)
+            for i in range(len(chunk)):
+                detections.append(self.postprocess(preds[i], protos[i], conf, iou))
+
+        return detections
+
+
+class OnnxRuntimeBackend(ExportedModelBackend):
+    """ONNX Runtime (CPU) バックエンド"""
+
+    name = "onnx"
+
+    def load(self) -> None:
+        """ONNXモデルをロード"""
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            self.model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self._set_input_shape(model_input.shape)
+
+    def _run(self, blob: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ONNX Runtimeで推論"""
+        preds, protos = self.session.run(None, {self.input_name: blob})[:2]
+        return preds, protos
+
+
+class OpenVINOBackend(ExportedModelBackend):
+    """OpenVINO (CPU) バックエンド"""
+
+    name = "openvino"
+
+    def load(self) -> None:
+        """OpenVINOモデル（.xml またはエクスポートディレクトリ）をロード"""
+        import openvino as ov
+
+        model_path = self.model_path
+        if os.path.isdir(model_path):
+            xml_files = sorted(f for f in os.listdir(model_path) if f.endswith(".xml"))
+            if not xml_files:
+                raise FileNotFoundError(f"OpenVINOモデル(.xml)が見つかりません: {model_path}")
+            model_path = os.path.join(model_path, xml_files[0])
+
+        core = ov.Core()
+        model = core.read_model(model_path)
+        self.compiled_model = core.compile_model(
+            model, "CPU", {"PERFORMANCE_HINT": "LATENCY"}
+        )
+
+        partial_shape = model.input(0).get_partial_shape()
+        self._set_input_shape(
+            [dim.get_length() if dim.is_static else None for dim in partial_shape]
+        )
+
+    def _run(self, blob: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """OpenVINOで推論"""
+        outputs = self.compiled_model(blob)
+        return (
+            outputs[self.compiled_model.output(0)],
+            outputs[self.compiled_model.output(1)],
+        )
+
+
+def create_backend(backend: str, model_path: str, imgsz: int = 640) -> InferenceBackend:
+    """
+    バックエンド名から推論バックエンドを作成
+
+    Args:
+        backend: バックエンド名 ("torch", "onnx", "openvino")
+        model_path: モデルファイルパス
+        imgsz: 入力サイズ（エクスポート済みモデルの入力形状が動的な場合に使用）
+
+    Returns:
+        推論バックエンド（未ロード）
+    """
+    if backend == "torch":
+        return TorchBackend(model_path)
+    if backend == "onnx":
+        return OnnxRuntimeBackend(model_path, imgsz)
+    if backend == "openvino":
+        return OpenVINOBackend(model_path, imgsz)
+    raise ValueError(f"backendは{BACKENDS}のいずれかを指定してください: {backend}")
+
+
+def check_quantization_report(
+    model_path: str,
+    max_angle_error: float,
+    max_tip_error: float,
+    max_miss_rate: float = 0.0,
+) -> dict:
+    """
+    量子化モデルの評価レポートを読み込み、精度ゲートを確認
+
+    評価レポートは evaluate_model.py がモデルと同じ場所に
+    <モデルパス>.eval.json として出力する。
+
+    Args:
+        model_path: 量子化モデルのパス
+        max_angle_error: 許容する針角度のずれ（度, p95）
+        max_tip_error: 許容する針先端のずれ（ピクセル, p95）
+        max_miss_rate: 許容する検出結果の不一致率
+
+    Returns:
+        評価レポート
+
+    Raises:
+        QuantizationGateError: レポートが無い、または許容範囲を超えている場合
+    """
+    report_path = model_path + EVALUATION_REPORT_SUFFIX
+    if not os.path.exists(report_path):
+        raise QuantizationGateError(f"評価レポートがありません: {report_path}")
+
+    with open(report_path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+
+    drift = report["drift"]
+    violations = []
+    if drift["angle_error_p95"] > max_angle_error:
+        violations.append(f"angle_error_p95={drift['angle_error_p95']:.2f} > {max_angle_error}")
+    if drift["tip_error_p95"] > max_tip_error:
+        violations.append(f"tip_error_p95={drift['tip_error_p95']:.2f} > {max_tip_error}")
+    if drift["miss_rate"] > max_miss_rate:
+        violations.append(f"miss_rate={drift['miss_rate']:.3f} > {max_miss_rate}")
+
+    if violations:
+        raise QuantizationGateError("精度ゲートを満たしません: " + ", ".join(violations))
+
+    return report
@@ -1,28 +1,123 @@
 """
 AWS Lambda関数ハンドラー（Bedrock直接呼び出し版）
 圧力計メーター針セグメンテーション処理 + Bedrock LLM解析
+
+コールドスタート短縮のため、boto3・YOLO関連モジュールは使用する
+処理の中で初めてインポートする（preprocessImage: false の場合はYOLO関連を
+読み込まない）。
 """
-import json
 import base64
+import json
 import os
-import sys
-from io import BytesIO
-from typing import Dict, Any, List
+import queue
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Callable, Dict, Any, Iterator, List, Optional, Tuple
 
-import boto3
-import cv2
 import numpy as np
-from PIL import Image
 
-from yolo_processor import YOLOProcessor
+from exemplar_store import ExemplarStore
+from gauge_detector import DialDetector, DialGeometry
+from gauge_reader import READING_MODES, GaugeCalibration, GaugeReading, load_calibrations, read_gauge
+from image_codec import (
+    MEDIA_TYPES, EncodedImage, EncodeOptions, decode_image,
+    detect_media_type, encode_image_to_base64, encode_thumbnail
+)
+from llm_image import LLMImageOptions, prepare_llm_image
+from llm_output import (
+    OUTPUT_FORMATS,
+    build_prompt,
+    build_repair_prompt,
+    parse_structured_reading,
+)
+from llm_stream import READING_PATTERN, StreamedResponse, compile_stop_pattern, read_stream
+from metrics import NULL_METRICS, Metrics, create_metrics
+from needle_geometry import NeedleGeometry
+from prompt_registry import PromptExample, PromptRegistry
+from result_cache import CacheStats, content_hash, create_cache, make_key, perceptual_hash
+from roi_tracker import RoiTracker
+from storage import (
+    LOCAL_STORAGE_BACKENDS,
+    STORAGE_BACKENDS,
+    StorageRegistry,
+    derive_output_uri,
+    parse_uri,
+)
+from video_stream import MotionGate, StreamStats, iter_readings, iter_video_frames
+
+if TYPE_CHECKING:
+    # YOLO関連は初回の呼び出しで読み込む（型チェック時のみインポート）
+    from yolo_processor import YOLOProcessor
 
 
 # グローバル変数（コールドスタート対策）
 processor = None
 bedrock_client = None
+result_cache = None
+gauge_calibrations = None
+dial_detector = None
+roi_tracker = None
+prompt_registry = None
+exemplar_store = None
+object_storage = None
+
+# Bedrockで使用するモデルID
+DEFAULT_MODEL_ID = "us.anthropic.claude-sonnet-4-5-20250929-v1:0"
+
+# 出力トークン数の上限（自由形式の回答 / JSONでの回答）
+DEFAULT_MAX_TOKENS = 2000
+DEFAULT_JSON_MAX_TOKENS = 100
+
+# レスポンスに含める前処理済み画像
+#   none:      含めない（読み取り結果のみ）
+#   thumbnail: 縮小したJPEG（RESPONSE_THUMBNAIL_MAX_EDGE）
+#   full:      前処理済み画像（IMAGE_FORMATの形式）
+RESPONSE_IMAGES = ("none", "thumbnail", "full")
+
+# プロンプトテンプレートのディレクトリ（デフォルト）
+DEFAULT_PROMPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+
+# ウォームアップ推論に使うダミー画像のサイズ (高さ, 幅)
+WARMUP_IMAGE_SHAPE = (640, 640)
+
+# リトライ対象とするBedrockのエラーコード（スロットリング・一時的な過負荷）
+RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
 
 
-def initialize_processor() -> YOLOProcessor:
+def processor_settings() -> Dict[str, Any]:
+    """
+    環境変数からYOLO前処理の設定を取得
+
+    処理結果を変える設定はキャッシュキーにも含める。
+
+    Returns:
+        YOLO前処理の設定
+    """
+    return {
+        "model_path": os.environ.get("MODEL_PATH", "/opt/ml/model/best.pt"),
+        "backend": os.environ.get("MODEL_BACKEND", "torch"),
+        "precision": os.environ.get("MODEL_PRECISION", "fp32"),
+        "quantized_model_path": os.environ.get(
+            "QUANTIZED_MODEL_PATH", "/opt/ml/model/best_int8.onnx"
+        ),
+        "conf_threshold": float(os.environ.get("CONF_THRESHOLD", "0.65")),
+        "iou_threshold": float(os.environ.get("IOU_THRESHOLD", "0.5")),
+        "mask_resolution": os.environ.get("MASK_RESOLUTION", "full"),
+        "dial_detection": os.environ.get("DIAL_DETECTION", "hough"),
+        "roi_tracking": os.environ.get("ROI_TRACKING", "true"),
+    }
+
+
+def initialize_processor() -> "YOLOProcessor":
     """
     YOLOプロセッサーを初期化（初回のみ実行）
 
@@ -32,17 +127,40 @@ def initialize_processor() -> YOLOProcessor:
     global processor
 
     if processor is None:
+        from inference_backends import QuantizationGateError, check_quantization_report
+        from yolo_processor import YOLOProcessor
+
         # 環境変数から設定を取得
-        model_path = os.environ.get("MODEL_PATH", "/opt/ml/model/best.pt")
-        conf_threshold = float(os.environ.get("CONF_THRESHOLD", "0.65"))
-        iou_threshold = float(os.environ.get("IOU_THRESHOLD", "0.5"))
+        settings = processor_settings()
+        model_path = settings["model_path"]
+        backend = settings["backend"]
+        conf_threshold = settings["conf_threshold"]
+        iou_threshold = settings["iou_threshold"]
+        max_batch_size = int(os.environ.get("MAX_BATCH_SIZE", "16"))
+        mask_resolution = settings["mask_resolution"]
+
+        # INT8量子化モデルは評価レポートの精度ゲートを満たす場合のみ使用
+        if settings["precision"] == "int8":
+            quantized_model_path = settings["quantized_model_path"]
+            try:
+                check_quantization_report(
+                    quantized_model_path,
+                    max_angle_error=float(os.environ.get("QUANT_MAX_ANGLE_ERROR", "2.0")),
+                    max_tip_error=float(os.environ.get("QUANT_MAX_TIP_ERROR", "5.0")),
+                )
+                model_path, backend = quantized_model_path, "onnx"
+            except QuantizationGateError as e:
+                print(f"INT8 model rejected, falling back to {backend} model: {e}")
 
-        print(f"Initializing YOLO processor with model: {model_path}")
+        print(f"Initializing YOLO processor with model: {model_path} (backend: {backend})")
 
         processor = YOLOProcessor(
             model_path=model_path,
+            backend=backend,
             conf_threshold=conf_threshold,
             iou_threshold=iou_threshold,
+            max_batch_size=max_batch_size,
+            mask_resolution=mask_resolution,
         )
 
         # モデルをロード
@@ -62,122 +180,391 @@ def initialize_bedrock_client():
     global bedrock_client
 
     if bedrock_client is None:
+        import boto3
+        from botocore.config import Config
+
         region = os.environ.get("BEDROCK_REGION", "us-east-1")
+        max_concurrency = int(os.environ.get("BEDROCK_MAX_CONCURRENCY", "4"))
         print(f"Initializing Bedrock Runtime client in region: {region}")
-        bedrock_client = boto3.client("bedrock-runtime", region_name=region)
+        # 並列呼び出し数に合わせて接続プールを確保し、リトライは
+        # invoke_bedrock_with_retry()で上限付きで行う
+        bedrock_client = boto3.client(
+            "bedrock-runtime",
+            region_name=region,
+            config=Config(
+                max_pool_connections=max(10, max_concurrency),
+                retries={"mode": "standard", "max_attempts": 1},
+            ),
+        )
         print("Bedrock Runtime client initialized successfully")
 
     return bedrock_client
 
 
-def decode_base64_image(base64_string: str) -> np.ndarray:
+def initialize_cache():
+    """
+    処理結果キャッシュを初期化（初回のみ実行）
+
+    Returns:
+        キャッシュ（CACHE_BACKEND=none の場合はNone）
+    """
+    global result_cache
+
+    if result_cache is None:
+        backend = os.environ.get("CACHE_BACKEND", "memory")
+        if backend == "none":
+            return None
+        max_bytes = int(os.environ.get("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+        directory = os.environ.get("CACHE_DIR", "/tmp/gauge-cache")
+        print(f"Initializing result cache: {backend} (max {max_bytes} bytes)")
+        result_cache = create_cache(backend, max_bytes, directory)
+
+    return result_cache
+
+
+def initialize_dial_detector() -> Optional[DialDetector]:
+    """
+    文字盤検出器を初期化（初回のみ実行）
+
+    Returns:
+        文字盤検出器（DIAL_DETECTION=none の場合はNone）
+    """
+    global dial_detector
+
+    if dial_detector is None:
+        if os.environ.get("DIAL_DETECTION", "hough") == "none":
+            return None
+        dial_detector = DialDetector(
+            max_side=int(os.environ.get("DIAL_DETECTION_MAX_SIDE", "320"))
+        )
+
+    return dial_detector
+
+
+def initialize_roi_tracker() -> Optional[RoiTracker]:
     """
-    Base64文字列を画像(numpy配列)にデコード
+    ゲージ領域の追跡を初期化（初回のみ実行）
+
+    Returns:
+        ゲージ領域の追跡（ROI_TRACKING=false の場合はNone）
+    """
+    global roi_tracker
+
+    if roi_tracker is None:
+        if os.environ.get("ROI_TRACKING", "true").lower() != "true":
+            return None
+        roi_tracker = RoiTracker(
+            padding=float(os.environ.get("ROI_PADDING", "0.25")),
+            min_size=int(os.environ.get("ROI_MIN_SIZE", "640")),
+        )
+
+    return roi_tracker
+
+
+def initialize_prompt_registry() -> PromptRegistry:
+    """
+    プロンプトテンプレートのレジストリを初期化（初回のみ実行）
+
+    Returns:
+        環境変数 PROMPT_DIR のテンプレートを読み込んだレジストリ
+    """
+    global prompt_registry
+
+    if prompt_registry is None:
+        directory = os.environ.get("PROMPT_DIR", DEFAULT_PROMPT_DIR)
+        prompt_registry = PromptRegistry.from_directory(directory)
+        print(f"Loaded prompt templates from {directory}: {prompt_registry.names()}")
+
+    return prompt_registry
+
+
+def initialize_exemplar_store() -> Optional[ExemplarStore]:
+    """
+    ゲージ種別ごとの参考画像のストアを初期化（初回のみ実行）
+
+    Returns:
+        ストア。環境変数 EXEMPLAR_DIR のディレクトリが無い場合はNone
+    """
+    global exemplar_store
+
+    if exemplar_store is None:
+        directory = os.environ.get("EXEMPLAR_DIR", "/opt/ml/model/exemplars")
+        if not os.path.isdir(directory):
+            return None
+        exemplar_store = ExemplarStore(
+            directory,
+            max_bytes=int(os.environ.get("EXEMPLAR_MAX_BYTES", str(8 * 1024 * 1024))),
+            max_per_type=int(os.environ.get("EXEMPLAR_MAX_PER_TYPE", "2")),
+        )
+        print(f"Exemplar store: {directory} ({exemplar_store.gauge_types()})")
+
+    return exemplar_store
+
+
+def initialize_storage() -> StorageRegistry:
+    """
+    画像オブジェクトの保存先を初期化（初回のみ実行）
+
+    Returns:
+        スキームごとの保存先（S3のみ。LOCAL_STORAGE=true の場合はローカルファイルも）
+    """
+    global object_storage
+
+    if object_storage is None:
+        backends = dict(STORAGE_BACKENDS)
+        # ローカルファイル（/tmp）はローカル実行で明示的に有効にした場合のみ読み書きできる
+        if os.environ.get("LOCAL_STORAGE", "false").lower() == "true":
+            backends.update(LOCAL_STORAGE_BACKENDS)
+        object_storage = StorageRegistry(backends)
+
+    return object_storage
+
+
+def write_processed_images(
+    results: List[Dict[str, Any]],
+    image_uris: List[str],
+    output_prefix: Optional[str] = None,
+) -> None:
+    """
+    前処理済み画像をオブジェクトとして書き込み、結果の "processedImage" を
+    "processedImageUri" に置き換える
 
     Args:
-        base64_string: Base64エンコードされた画像文字列
+        results: process_gauge_images() の結果（書き換える）
+        image_uris: 入力画像のURI（結果と同じ順）
+        output_prefix: 保存先のURIプレフィックス（省略時は入力画像と同じ場所）
+    """
+    storage = initialize_storage()
+    extensions = {media_type: format for format, media_type in MEDIA_TYPES.items()}
+    for result, image_uri in zip(results, image_uris):
+        processed_image = result.pop("processedImage", None)
+        if processed_image is None:
+            continue
+        media_type = result["processedImageMediaType"]
+        uri = derive_output_uri(image_uri, extensions[media_type], output_prefix)
+        storage.write(uri, base64.b64decode(processed_image), media_type)
+        result["processedImageUri"] = uri
+
+
+def get_calibration(event: Dict[str, Any]) -> Optional[GaugeCalibration]:
+    """
+    イベントからゲージの校正値を取得
+
+    "calibration" で直接指定された校正値を優先し、無い場合は "gaugeType" で
+    校正値ファイル（環境変数 GAUGE_CALIBRATION_FILE）から選ぶ。
+
+    Args:
+        event: Lambdaイベント
 
     Returns:
-        OpenCV形式の画像 (BGR, numpy.ndarray)
+        校正値。指定が無い場合はNone
+
+    Raises:
+        ValueError: "calibration" の校正値が不正な場合
     """
-    # Base64デコード
-    image_bytes = base64.b64decode(base64_string)
+    global gauge_calibrations
 
-    # PILで画像を開く
-    image_pil = Image.open(BytesIO(image_bytes))
+    if event.get("calibration"):
+        return GaugeCalibration.from_dict(event["calibration"])
 
-    # RGB -> BGR変換（OpenCV形式）
-    image_rgb = np.array(image_pil)
-    if len(image_rgb.shape) == 2:  # グレースケール
-        image_bgr = cv2.cvtColor(image_rgb, cv2.COLOR_GRAY2BGR)
-    elif image_rgb.shape[2] == 4:  # RGBA
-        image_bgr = cv2.cvtColor(image_rgb, cv2.COLOR_RGBA2BGR)
-    else:  # RGB
-        image_bgr = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
+    gauge_type = event.get("gaugeType")
+    if gauge_type is None:
+        return None
 
-    return image_bgr
+    if gauge_calibrations is None:
+        path = os.environ.get("GAUGE_CALIBRATION_FILE", "/opt/ml/model/gauge_calibrations.json")
+        gauge_calibrations = load_calibrations(path) if os.path.exists(path) else {}
+    return gauge_calibrations.get(gauge_type)
 
 
-def encode_image_to_base64(image: np.ndarray, format: str = "PNG") -> str:
+def image_cache_key(image: np.ndarray) -> str:
     """
-    画像(numpy配列)をBase64文字列にエンコード
+    画像内容のキャッシュキー要素を作成
+
+    CACHE_PERCEPTUAL_HASH=true の場合は知覚ハッシュを使い、ほぼ同じ画像
+    （圧縮ノイズ程度の違い）も同じ画像として扱う。
 
     Args:
-        image: OpenCV形式の画像 (BGR, numpy.ndarray)
-        format: 出力フォーマット ("PNG" or "JPEG")
+        image: 入力画像 (BGR)
 
     Returns:
-        Base64エンコードされた画像文字列
+        画像内容のハッシュ
     """
-    # BGR -> RGB変換
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    if os.environ.get("CACHE_PERCEPTUAL_HASH", "false").lower() == "true":
+        return perceptual_hash(image, int(os.environ.get("CACHE_PERCEPTUAL_HASH_SIZE", "16")))
+    return content_hash(image)
 
-    # PIL Imageに変換
-    image_pil = Image.fromarray(image_rgb)
 
-    # バイトストリームに書き込み
-    buffer = BytesIO()
-    image_pil.save(buffer, format=format)
-    buffer.seek(0)
+def warm_up() -> None:
+    """
+    モデルのロードとダミー画像での推論を行い、初回リクエストの遅延を減らす
 
-    # Base64エンコード
-    image_base64 = base64.b64encode(buffer.read()).decode("utf-8")
+    初回推論時に行われるメモリ確保やカーネル選択もここで済ませる。
+    環境変数 WARMUP_ON_INIT=true の場合は初期化フェーズで、
+    {"warmup": true} イベントでは呼び出し時に実行する。
+    """
+    start = time.perf_counter()
 
-    return image_base64
+    proc = initialize_processor()
+    dummy_image = np.zeros((*WARMUP_IMAGE_SHAPE, 3), dtype=np.uint8)
+    proc.analyze_image(dummy_image)
+    encode_image_to_base64(dummy_image)
+    initialize_bedrock_client()
+    initialize_prompt_registry()
+    store = initialize_exemplar_store()
+    if store is not None:
+        store.preload()
+        print(f"Exemplar store: {store.stats().to_dict()}")
 
+    print(f"Warm-up completed in {time.perf_counter() - start:.2f}s")
 
-def invoke_bedrock_model(
-    client,
-    processed_image_base64: str,
+
+def build_request_body(
+    processed_image_base64: Optional[str],
     user_prompt: str,
     system_prompt: str = None,
-    model_id: str = "us.anthropic.claude-sonnet-4-5-20250929-v1:0"
-) -> str:
+    media_type: str = "image/png",
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    examples: Optional[List[PromptExample]] = None,
+    cache_prompt: bool = False
+) -> Dict[str, Any]:
     """
-    Bedrock LLMを呼び出して画像を解析
+    Bedrock (Anthropic Messages API) のリクエストボディを構築
+
+    cache_prompt が有効な場合は、システムプロンプトと参考画像（呼び出しごとに
+    変わらない先頭部分）にキャッシュポイント（cache_control）を付ける。
 
     Args:
-        client: Bedrock Runtimeクライアント
-        processed_image_base64: 前処理済み画像のBase64文字列
+        processed_image_base64: 前処理済み画像のBase64文字列（Noneの場合はテキストのみ）
         user_prompt: ユーザープロンプト
         system_prompt: システムプロンプト（オプション）
-        model_id: 使用するモデルID
+        media_type: 画像のメディアタイプ（"image/png", "image/jpeg", "image/webp"）
+        max_tokens: 出力トークン数の上限
+        examples: 対象画像の前に送る参考画像（オプション）
+        cache_prompt: 先頭部分をプロンプトキャッシュの対象にするかどうか
 
     Returns:
-        LLMからのレスポンステキスト
+        リクエストボディ
     """
+    content = []
+    for example in examples or []:
+        content.append({
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": example.media_type,
+                "data": example.image_base64
+            }
+        })
+        if example.text:
+            content.append({
+                "type": "text",
+                "text": example.text
+            })
+    if content and cache_prompt:
+        content[-1]["cache_control"] = {"type": "ephemeral"}
+
+    if processed_image_base64 is not None:
+        content.append({
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": media_type,
+                "data": processed_image_base64
+            }
+        })
+    content.append({
+        "type": "text",
+        "text": user_prompt
+    })
+
     # Claude 3.5 Sonnet用のリクエストボディを構築
     request_body = {
         "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 2000,
+        "max_tokens": max_tokens,
         "messages": [
             {
                 "role": "user",
-                "content": [
-                    {
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": "image/png",
-                            "data": processed_image_base64
-                        }
-                    },
-                    {
-                        "type": "text",
-                        "text": user_prompt
-                    }
-                ]
+                "content": content
             }
         ]
     }
 
     # システムプロンプトが指定されている場合は追加
-    if system_prompt:
+    if system_prompt and cache_prompt:
+        request_body["system"] = [{
+            "type": "text",
+            "text": system_prompt,
+            "cache_control": {"type": "ephemeral"}
+        }]
+    elif system_prompt:
         request_body["system"] = system_prompt
 
+    return request_body
+
+
+def parse_usage(usage: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Bedrockの応答の usage をログ・レスポンス用の形式に変換
+
+    プロンプトキャッシュの読み込み・書き込みトークン数がある場合はログに出力する。
+
+    Args:
+        usage: 応答の "usage"（input_tokens, output_tokens, cache_read_input_tokens,
+            cache_creation_input_tokens）
+
+    Returns:
+        {"inputTokens": ..., "outputTokens": ..., "cacheReadInputTokens": ...,
+         "cacheWriteInputTokens": ...}
+    """
+    parsed = {
+        "inputTokens": usage.get("input_tokens"),
+        "outputTokens": usage.get("output_tokens"),
+        "cacheReadInputTokens": usage.get("cache_read_input_tokens"),
+        "cacheWriteInputTokens": usage.get("cache_creation_input_tokens"),
+    }
+    if parsed["cacheReadInputTokens"] or parsed["cacheWriteInputTokens"]:
+        print(f"Prompt cache: read {parsed['cacheReadInputTokens'] or 0} tokens, "
+              f"write {parsed['cacheWriteInputTokens'] or 0} tokens")
+    return parsed
+
+
+def invoke_bedrock_model(
+    client,
+    processed_image_base64: str,
+    user_prompt: str,
+    system_prompt: str = None,
+    model_id: str = DEFAULT_MODEL_ID,
+    media_type: str = "image/png",
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    usage: Optional[Dict[str, Any]] = None,
+    examples: Optional[List[PromptExample]] = None,
+    cache_prompt: bool = False
+) -> str:
+    """
+    Bedrock LLMを呼び出して画像を解析
+
+    Args:
+        client: Bedrock Runtimeクライアント
+        processed_image_base64: 前処理済み画像のBase64文字列（Noneの場合はテキストのみ）
+        user_prompt: ユーザープロンプト
+        system_prompt: システムプロンプト（オプション）
+        model_id: 使用するモデルID
+        media_type: 画像のメディアタイプ（"image/png", "image/jpeg", "image/webp"）
+        max_tokens: 出力トークン数の上限
+        usage: トークン数の書き込み先（オプション、{"inputTokens": ..., "outputTokens": ...,
+            "cacheReadInputTokens": ..., "cacheWriteInputTokens": ...}）
+        examples: 対象画像の前に送る参考画像（オプション）
+        cache_prompt: システムプロンプトと参考画像をプロンプトキャッシュの対象にするかどうか
+
+    Returns:
+        LLMからのレスポンステキスト
+    """
     print(f"Calling Bedrock model: {model_id}")
-    print(f"System prompt: {system_prompt[:50] if system_prompt else 'None'}...")
-    print(f"User prompt: {user_prompt[:50]}...")
+    request_body = build_request_body(
+        processed_image_base64, user_prompt, system_prompt, media_type, max_tokens,
+        examples, cache_prompt
+    )
 
     # Bedrock APIを呼び出し
     response = client.invoke_model(
@@ -188,13 +575,675 @@ def invoke_bedrock_model(
     # レスポンスを解析
     response_body = json.loads(response["body"].read())
     llm_response = response_body["content"][0]["text"]
+    response_usage = parse_usage(response_body.get("usage", {}))
+    if usage is not None:
+        usage.update(response_usage)
 
     print(f"LLM response received: {llm_response[:100]}...")
 
     return llm_response
 
 
-def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+def invoke_bedrock_model_stream(
+    client,
+    processed_image_base64: str,
+    user_prompt: str,
+    system_prompt: str = None,
+    model_id: str = DEFAULT_MODEL_ID,
+    media_type: str = "image/png",
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    stop_pattern=None,
+    on_text: Optional[Callable[[str], None]] = None,
+    examples: Optional[List[PromptExample]] = None,
+    cache_prompt: bool = False,
+) -> StreamedResponse:
+    """
+    Bedrock LLMをストリーミングで呼び出して画像を解析
+
+    Args:
+        client: Bedrock Runtimeクライアント
+        processed_image_base64: 前処理済み画像のBase64文字列
+        user_prompt: ユーザープロンプト
+        system_prompt: システムプロンプト（オプション）
+        model_id: 使用するモデルID
+        media_type: 画像のメディアタイプ
+        max_tokens: 出力トークン数の上限
+        stop_pattern: 回答がこのパターンに一致した時点で受信を打ち切る（オプション）
+        on_text: テキストを受信するたびに呼び出す関数（オプション）
+        examples: 対象画像の前に送る参考画像（オプション）
+        cache_prompt: システムプロンプトと参考画像をプロンプトキャッシュの対象にするかどうか
+
+    Returns:
+        LLMの回答と最初のトークンまでの時間・全体の時間
+    """
+    print(f"Calling Bedrock model (stream): {model_id}")
+    request_body = build_request_body(
+        processed_image_base64, user_prompt, system_prompt, media_type, max_tokens,
+        examples, cache_prompt
+    )
+
+    start = time.perf_counter()
+    response = client.invoke_model_with_response_stream(
+        modelId=model_id,
+        body=json.dumps(request_body)
+    )
+    streamed = read_stream(response, start, stop_pattern=stop_pattern, on_text=on_text)
+
+    print(f"LLM response received: {streamed.text[:100]}... {streamed.to_dict()}")
+
+    return streamed
+
+
+def invoke_bedrock_with_retry(
+    client,
+    processed_image_base64: str,
+    user_prompt: str,
+    system_prompt: str = None,
+    max_retries: int = 3,
+    base_delay: float = 0.5,
+    media_type: str = "image/png",
+    stream: bool = False,
+    stop_pattern=None,
+    on_text: Optional[Callable[[str], None]] = None,
+    timing: Optional[Dict[str, Any]] = None,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    usage: Optional[Dict[str, Any]] = None,
+    examples: Optional[List[PromptExample]] = None,
+    cache_prompt: bool = False,
+) -> str:
+    """
+    スロットリング時に指数バックオフでリトライしながらBedrock LLMを呼び出す
+
+    Args:
+        client: Bedrock Runtimeクライアント
+        processed_image_base64: 前処理済み画像のBase64文字列（Noneの場合はテキストのみ）
+        user_prompt: ユーザープロンプト
+        system_prompt: システムプロンプト（オプション）
+        max_retries: 最大リトライ回数
+        base_delay: バックオフの基準待ち時間（秒）
+        media_type: 画像のメディアタイプ
+        stream: ストリーミングで呼び出すかどうか
+        stop_pattern: ストリーミング時、回答がこのパターンに一致した時点で受信を打ち切る
+        on_text: ストリーミング時、テキストを受信するたびに呼び出す関数
+        timing: 呼び出し時間の書き込み先（オプション、StreamedResponse.to_dict() の形式）
+        max_tokens: 出力トークン数の上限
+        usage: トークン数の加算先（オプション、{"inputTokens": ..., "outputTokens": ...,
+            "cacheReadInputTokens": ..., "cacheWriteInputTokens": ..., "calls": ...}。
+            複数回の呼び出しで同じ辞書を渡すと合計を記録する）
+        examples: 対象画像の前に送る参考画像（オプション）
+        cache_prompt: システムプロンプトと参考画像をプロンプトキャッシュの対象にするかどうか
+
+    Returns:
+        LLMからのレスポンステキスト
+    """
+    emitted = False
+    call_usage: Dict[str, Any] = {}
+
+    def add_usage() -> None:
+        if usage is None:
+            return
+        usage["calls"] = usage.get("calls", 0) + 1
+        for key in ("inputTokens", "outputTokens", "cacheReadInputTokens", "cacheWriteInputTokens"):
+            if call_usage.get(key) is not None:
+                usage[key] = usage.get(key, 0) + call_usage[key]
+
+    def emit(text: str) -> None:
+        nonlocal emitted
+        emitted = True
+        on_text(text)
+
+    for attempt in range(max_retries + 1):
+        start = time.perf_counter()
+        try:
+            if not stream:
+                llm_response = invoke_bedrock_model(
+                    client=client,
+                    processed_image_base64=processed_image_base64,
+                    user_prompt=user_prompt,
+                    system_prompt=system_prompt,
+                    media_type=media_type,
+                    max_tokens=max_tokens,
+                    usage=call_usage,
+                    examples=examples,
+                    cache_prompt=cache_prompt
+                )
+                if timing is not None:
+                    timing.update(stream=False, totalTime=round(time.perf_counter() - start, 3))
+                add_usage()
+                return llm_response
+
+            streamed = invoke_bedrock_model_stream(
+                client=client,
+                processed_image_base64=processed_image_base64,
+                user_prompt=user_prompt,
+                system_prompt=system_prompt,
+                media_type=media_type,
+                max_tokens=max_tokens,
+                stop_pattern=stop_pattern,
+                on_text=emit if on_text is not None else None,
+                examples=examples,
+                cache_prompt=cache_prompt,
+            )
+            if timing is not None:
+                timing.update(streamed.to_dict())
+            call_usage.update(parse_usage(streamed.usage))
+            add_usage()
+            return streamed.text
+        except Exception as e:
+            error_code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            # 送信済みのテキストがある場合はリトライすると重複するため送出する
+            if error_code not in RETRYABLE_ERROR_CODES or attempt >= max_retries or emitted:
+                raise
+
+            # Full Jitter: 0〜base_delay * 2^attempt 秒の範囲でランダムに待機
+            delay = random.uniform(0, base_delay * (2 ** attempt))
+            print(f"Bedrock throttled ({error_code}), retrying in {delay:.2f}s "
+                  f"(attempt {attempt + 1}/{max_retries})")
+            time.sleep(delay)
+
+
+def process_gauge_images(
+    bedrock,
+    images: List[np.ndarray],
+    user_prompt: str,
+    system_prompt: str = None,
+    preprocess_image: bool = True,
+    max_concurrency: int = None,
+    cache_stats: Optional[CacheStats] = None,
+    reading_mode: str = "llm",
+    calibration: Optional[GaugeCalibration] = None,
+    min_confidence: float = None,
+    camera_id: Optional[str] = None,
+    stream: Optional[bool] = None,
+    on_text: Optional[Callable[[int, str], None]] = None,
+    output_format: Optional[str] = None,
+    examples: Optional[List[PromptExample]] = None,
+    encoded_images: Optional[List[Optional[Tuple[str, str]]]] = None,
+    response_image: Optional[str] = None,
+    metrics: Metrics = NULL_METRICS,
+) -> List[Dict[str, Any]]:
+    """
+    複数画像のYOLO前処理とBedrock呼び出しをパイプライン実行
+
+    YOLO推論はメインスレッドでチャンク単位に行い、前処理済みの画像から順に
+    スレッドプールへBedrock呼び出しを投入する。これにより次のチャンクの
+    YOLO推論と先行画像のLLM呼び出しが重なり、LLM呼び出し同士も最大
+    max_concurrency件まで同時に実行される。
+
+    処理結果キャッシュが有効な場合は、前処理済み画像（"image"）とLLM応答
+    （"llm"）をそれぞれキャッシュから取得し、ヒットした処理は実行しない。
+
+    reading_mode が "local" / "auto" の場合は、針の角度と校正値から圧力値を
+    読み取る。"auto" では信頼度が min_confidence 未満の場合のみBedrockを呼び出す。
+
+    ゲージ中心は文字盤検出（DIAL_DETECTION）で求め、検出できない場合は
+    画像中心とする。camera_id を指定すると検出結果をカメラごとに再利用し、
+    針を検出した後の画像はゲージ領域だけを切り抜いてYOLOで推論する（ROI_TRACKING）。
+
+    stream が有効な場合はBedrockをストリーミングで呼び出し、回答に読み取り値が
+    現れた時点で受信を打ち切る（BEDROCK_STREAM_STOP_ON_READING）。
+
+    output_format が "json" の場合はLLMに読み取り値のJSONオブジェクトのみを
+    回答させ（出力トークン数の上限 BEDROCK_JSON_MAX_TOKENS）、解析した結果を
+    "llmReading" に入れる。解析できない場合は回答をJSONに変換するよう1回だけ
+    依頼し直す。
+
+    システムプロンプトと参考画像（examples）はすべての呼び出しで同じ内容のため、
+    PROMPT_CACHE が有効な場合はBedrockのプロンプトキャッシュの対象にする。
+
+    前処理済み画像のエンコードは、レスポンスに含める場合（response_image）や
+    Bedrockにそのまま送る場合など、必要になった時点で一度だけ行う。前処理しない
+    場合は encoded_images の入力画像のデータを再エンコードせずに使う。
+
+    Args:
+        bedrock: Bedrock Runtimeクライアント
+        images: 入力画像 (BGR) のリスト
+        user_prompt: ユーザープロンプト
+        system_prompt: システムプロンプト（オプション）
+        preprocess_image: YOLO前処理を行うかどうか
+        max_concurrency: Bedrockの同時呼び出し数（省略時は環境変数 BEDROCK_MAX_CONCURRENCY）
+        cache_stats: キャッシュのヒット・ミス数の記録先（オプション）
+        reading_mode: 読み取りモード ("llm", "local", "auto")
+        calibration: ゲージの校正値（"local" / "auto" の場合は必須）
+        min_confidence: "auto" でローカルの読み取りを採用する最小の信頼度
+            （省略時は環境変数 READING_MIN_CONFIDENCE）
+        camera_id: カメラID（オプション）
+        stream: Bedrockをストリーミングで呼び出すかどうか（省略時は環境変数 BEDROCK_STREAM）
+        on_text: LLMの回答テキストを受信するたびに (画像のインデックス, テキスト) で
+            呼び出す関数（オプション、複数のスレッドから呼び出される）
+        output_format: LLMの回答形式 ("text", "json")（省略時は環境変数 LLM_OUTPUT_FORMAT）
+        examples: 対象画像の前に送る参考画像（オプション、プロンプトテンプレートから指定）
+        encoded_images: 入力画像のエンコード済みの (Base64文字列, メディアタイプ)
+            （オプション、imagesと同じ順。メディアタイプが不明な画像はNone）
+        response_image: レスポンスに含める前処理済み画像 ("none", "thumbnail", "full")
+            （省略時は環境変数 RESPONSE_IMAGE）
+        metrics: 処理段階ごとの所要時間・マスク画素数・トークン数の記録先（オプション）
+
+    Returns:
+        入力順の結果リスト
+            [{"llmResponse": ..., "processedImage": ..., "yoloMessage": ...}, ...]
+        response_image が "none" の場合は "processedImage" を含まない
+        "local" / "auto" の場合は各結果に "reading" を含み、Bedrockを
+        呼び出さなかった場合の "llmResponse" はNone
+    """
+    if max_concurrency is None:
+        max_concurrency = int(os.environ.get("BEDROCK_MAX_CONCURRENCY", "4"))
+    if min_confidence is None:
+        min_confidence = float(os.environ.get("READING_MIN_CONFIDENCE", "0.6"))
+    max_retries = int(os.environ.get("BEDROCK_MAX_RETRIES", "3"))
+    base_delay = float(os.environ.get("BEDROCK_RETRY_BASE_DELAY", "0.5"))
+    if cache_stats is None:
+        cache_stats = CacheStats()
+    encode_options = EncodeOptions.from_env()
+    llm_image_options = LLMImageOptions.from_env()
+    if output_format is None:
+        output_format = os.environ.get("LLM_OUTPUT_FORMAT", "text")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"LLMの回答形式は{OUTPUT_FORMATS}のいずれかを指定してください: {output_format}")
+    structured = output_format == "json"
+    if structured:
+        llm_prompt = build_prompt(user_prompt)
+        max_tokens = int(os.environ.get("BEDROCK_JSON_MAX_TOKENS", str(DEFAULT_JSON_MAX_TOKENS)))
+    else:
+        llm_prompt = user_prompt
+        max_tokens = int(os.environ.get("BEDROCK_MAX_TOKENS", str(DEFAULT_MAX_TOKENS)))
+    if stream is None:
+        stream = os.environ.get("BEDROCK_STREAM", "false").lower() == "true"
+    stop_pattern = None
+    # JSONの回答は短いため打ち切らない（途中で打ち切ると解析できない）
+    if stream and not structured and \
+            os.environ.get("BEDROCK_STREAM_STOP_ON_READING", "true").lower() == "true":
+        stop_pattern = compile_stop_pattern(
+            os.environ.get("BEDROCK_STREAM_STOP_PATTERN", READING_PATTERN)
+        )
+    cache_prompt = os.environ.get("PROMPT_CACHE", "true").lower() == "true"
+    if response_image is None:
+        response_image = os.environ.get("RESPONSE_IMAGE", "full")
+    if response_image not in RESPONSE_IMAGES:
+        raise ValueError(f"レスポンスの画像は{RESPONSE_IMAGES}のいずれかを指定してください: {response_image}")
+    thumbnail_max_edge = int(os.environ.get("RESPONSE_THUMBNAIL_MAX_EDGE", "256"))
+    if reading_mode != "llm" and (calibration is None or not preprocess_image):
+        raise ValueError("ローカルでの読み取りには校正値とYOLO前処理が必要です")
+
+    # 前処理済み画像のキャッシュを検索
+    cache = initialize_cache()
+    image_keys: List[Optional[str]] = [None] * len(images)
+    llm_keys: List[Optional[str]] = [None] * len(images)
+    cached_images: List[Optional[Dict[str, Any]]] = [None] * len(images)
+    # 画像を含まないエントリを採用した時点で取得したLLM応答
+    # （後で取得し直すと、その間に削除された場合に画像もLLM応答も無くなるため）
+    cached_llm: List[Optional[bytes]] = [None] * len(images)
+    dials: List[Optional[DialGeometry]] = [None] * len(images)
+    if cache is not None:
+        settings = processor_settings() if preprocess_image else None
+        for i, image in enumerate(images):
+            image_hash = image_cache_key(image)
+            # ゲージ中心・切り抜く領域はカメラごとの文字盤検出・ゲージ領域の追跡の
+            # 結果で変わるため、カメラIDもキーに含める
+            image_keys[i] = make_key(
+                "image",
+                image=image_hash,
+                preprocess=settings,
+                encoding=asdict(encode_options),
+                camera_id=camera_id,
+            )
+            llm_keys[i] = make_key(
+                "llm",
+                image=image_hash,
+                preprocess=settings,
+                camera_id=camera_id,
+                encoding=asdict(encode_options),
+                llm_image=asdict(llm_image_options),
+                # 打ち切った回答は途中までのテキストのため別のキーにする
+                stop_pattern=stop_pattern.pattern if stop_pattern is not None else None,
+                max_tokens=max_tokens,
+                user_prompt=llm_prompt,
+                system_prompt=system_prompt,
+                examples=[example.digest for example in examples or []],
+                model_id=DEFAULT_MODEL_ID,
+            )
+
+            value = cache.get(image_keys[i])
+            if value is not None:
+                cached = json.loads(value)
+                # 画像をエンコードせずに保存したエントリは、画像が必要な場合
+                # （レスポンスに含める、またはLLM応答がキャッシュに無い）には使わない
+                if "processedImage" not in cached:
+                    if response_image != "none":
+                        value = None
+                    elif reading_mode != "local":
+                        cached_llm[i] = cache.get(llm_keys[i])
+                        if cached_llm[i] is None:
+                            value = None
+                if value is not None:
+                    cached_images[i] = cached
+            cache_stats.record("image", value is not None)
+
+    def invoke_llm(index: int, processed: EncodedImage) -> Tuple[str, Dict[str, Any]]:
+        # 戻り値: (LLMの回答, 結果に追加する項目)
+        fields: Dict[str, Any] = {}
+        if cache is not None:
+            value = cached_llm[index] if cached_llm[index] is not None else cache.get(llm_keys[index])
+            cache_stats.record("llm", value is not None)
+            if value is not None:
+                llm_response = value.decode("utf-8")
+                if on_text is not None:
+                    on_text(index, llm_response)
+                if structured:
+                    fields["llmReading"] = parse_structured_reading(llm_response).to_dict()
+                return llm_response, fields
+
+        # 文字盤の周囲に切り抜き・縮小してBedrockに送る画像を準備
+        # （エンコード済み、またはレスポンスに含めるためにエンコードする場合はその結果を使う）
+        with metrics.stage("encode"):
+            encoded = processed.get() if processed.is_encoded or response_image == "full" else None
+        with metrics.stage("llmImage"):
+            llm_image = prepare_llm_image(processed.image, dials[index], llm_image_options, encoded=encoded)
+        print(f"LLM image: {llm_image.to_dict()}")
+
+        # Bedrock LLMを呼び出し
+        print("Invoking Bedrock LLM...")
+        timing: Dict[str, Any] = {}
+        usage: Dict[str, Any] = {}
+        with metrics.stage("bedrock"):
+            llm_response = invoke_bedrock_with_retry(
+                client=bedrock,
+                processed_image_base64=llm_image.data_base64,
+                user_prompt=llm_prompt,
+                system_prompt=system_prompt,
+                max_retries=max_retries,
+                base_delay=base_delay,
+                media_type=llm_image.media_type,
+                stream=stream,
+                stop_pattern=stop_pattern,
+                on_text=(lambda text: on_text(index, text)) if on_text is not None else None,
+                timing=timing,
+                max_tokens=max_tokens,
+                usage=usage,
+                examples=examples,
+                cache_prompt=cache_prompt,
+            )
+        fields.update(llmImage=llm_image.to_dict(), llmTiming=timing, llmUsage=usage)
+        print(f"LLM usage: {usage}, timing: {timing}")
+
+        if structured:
+            try:
+                reading = parse_structured_reading(llm_response)
+            except ValueError as e:
+                # 回答をJSONに変換するよう1回だけ依頼し直す（画像は送らない）
+                print(f"Failed to parse LLM output ({e}), requesting repair...")
+                with metrics.stage("bedrock"):
+                    llm_response = invoke_bedrock_with_retry(
+                        client=bedrock,
+                        processed_image_base64=None,
+                        user_prompt=build_repair_prompt(llm_response, str(e)),
+                        max_retries=max_retries,
+                        base_delay=base_delay,
+                        max_tokens=max_tokens,
+                        usage=usage,
+                    )
+                try:
+                    reading = parse_structured_reading(llm_response)
+                except ValueError as e:
+                    # 解析できない回答はキャッシュしない
+                    print(f"Failed to parse repaired LLM output: {e}")
+                    fields.update(llmReading=None, llmReadingError=str(e))
+                    return llm_response, fields
+            fields["llmReading"] = reading.to_dict()
+
+        if cache is not None:
+            cache.put(llm_keys[index], llm_response.encode("utf-8"))
+        return llm_response, fields
+
+    def finish(
+        index: int,
+        processed_image: Optional[np.ndarray],
+        yolo_message: str,
+        needles: List[NeedleGeometry],
+        center: Optional[Tuple[int, int]],
+    ) -> Dict[str, Any]:
+        if processed_image is not None:
+            # 前処理しない場合は入力画像のデータをそのまま使う（再エンコードしない）
+            encoded = encoded_images[index] if not preprocess_image and encoded_images else None
+            processed = EncodedImage(processed_image, encode_options, encoded)
+        elif "processedImage" in cached_images[index]:
+            cached = cached_images[index]
+            processed = EncodedImage(None, encode_options, (cached["processedImage"], cached["mediaType"]))
+        else:
+            # 画像を含まないキャッシュエントリ（画像が不要な場合のみ使う）
+            processed = None
+
+        result = {
+            "llmResponse": None,
+            "yoloMessage": yolo_message
+        }
+
+        def call_llm() -> None:
+            result["llmResponse"], fields = invoke_llm(index, processed)
+            result.update(fields)
+            # キャッシュから取得した回答はトークンを使わない
+            usage = fields.get("llmUsage", {})
+            for key in ("calls", "inputTokens", "outputTokens", "cacheReadInputTokens", "cacheWriteInputTokens"):
+                metrics.add("bedrockCalls" if key == "calls" else key, usage.get(key))
+
+        def respond() -> Dict[str, Any]:
+            # レスポンスに前処理済み画像を含める
+            with metrics.stage("encode"):
+                if response_image == "full":
+                    result["processedImage"], result["processedImageMediaType"] = processed.get()
+                elif response_image == "thumbnail":
+                    result["processedImage"], result["processedImageMediaType"] = encode_thumbnail(
+                        processed.image, thumbnail_max_edge
+                    )
+
+            if processed_image is not None and cache is not None:
+                entry = {
+                    "yoloMessage": yolo_message,
+                    "needles": [needle.to_dict() for needle in needles],
+                    "center": center,
+                    "dial": dials[index].to_dict() if dials[index] is not None else None,
+                }
+                # キャッシュのためだけにはエンコードしない
+                if processed.is_encoded:
+                    entry["processedImage"], entry["mediaType"] = processed.get()
+                cache.put(image_keys[index], json.dumps(entry).encode("utf-8"))
+            return result
+
+        if reading_mode == "llm":
+            call_llm()
+            return respond()
+
+        # 針の角度と校正値から読み取り、信頼度が低い場合のみLLMで読み取る
+        reading = read_gauge(needles, center, calibration)
+        if reading is not None:
+            print(f"Local reading: {reading.value} {reading.unit} "
+                  f"(confidence: {reading.confidence:.2f})")
+        if reading_mode == "auto" and (reading is None or reading.confidence < min_confidence):
+            print("Low confidence, falling back to Bedrock LLM...")
+            call_llm()
+            # JSONで回答させた場合はLLMの読み取り値で置き換える
+            llm_reading = result.get("llmReading")
+            if reading is not None:
+                reading.source = "llm"
+                if llm_reading is not None:
+                    reading.value = llm_reading["value"]
+                    reading.unit = llm_reading["unit"]
+                    reading.confidence = llm_reading["confidence"]
+            elif llm_reading is not None:
+                # 針を検出できなかった場合は角度の無いLLMの読み取り値とする
+                reading = GaugeReading(
+                    value=llm_reading["value"],
+                    unit=llm_reading["unit"],
+                    angle=None,
+                    confidence=llm_reading["confidence"],
+                    source="llm",
+                )
+        result["reading"] = reading.to_dict() if reading is not None else None
+        return respond()
+
+    # キャッシュに無い画像のみ処理する
+    pending = [i for i in range(len(images)) if cached_images[i] is None]
+
+    # 文字盤を検出（YOLOのゲージ中心とBedrockに送る画像の切り抜きに使用）
+    if pending and (preprocess_image or llm_image_options.crop):
+        detector = initialize_dial_detector()
+        if detector is not None:
+            for i in pending:
+                with metrics.stage("dialDetection"):
+                    dials[i] = detector.detect(images[i], camera_id)
+                print(f"Dial detection: "
+                      f"{dials[i].to_dict() if dials[i] is not None else 'not found'}")
+
+    # 前処理の有無を判定
+    if not pending:
+        pending_results = iter(())
+    elif preprocess_image:
+        # プロセッサーを初期化（前処理する場合のみ。モデルをロードした場合は時間を計測）
+        if processor is None:
+            with metrics.stage("modelLoad"):
+                initialize_processor()
+        proc = initialize_processor()
+
+        # 文字盤を検出できない画像は画像中心を使用
+        centers = [dials[i].center if dials[i] is not None else None for i in pending]
+
+        # YOLO画像処理（triangle固定）
+        print("Processing image with YOLO...")
+        pending_results = (
+            (result.image, result.message, result.needles, result.center)
+            for result in proc.iter_analyze_batch(
+                [images[i] for i in pending],
+                centers=centers,
+                metrics=metrics,
+                stream_ids=[camera_id] * len(pending) if camera_id is not None else None,
+                tracker=initialize_roi_tracker(),
+            )
+        )
+    else:
+        # 前処理をスキップ
+        print("Skipping YOLO preprocessing...")
+        pending_results = ((images[i], "前処理をスキップしました", [], None) for i in pending)
+
+    def yolo_results():
+        # キャッシュヒットした画像と処理した画像を入力順に並べる
+        for i in range(len(images)):
+            cached = cached_images[i]
+            if cached is not None:
+                needles = [NeedleGeometry.from_dict(n) for n in cached.get("needles", [])]
+                center = tuple(cached["center"]) if cached.get("center") else None
+                if cached.get("dial"):
+                    dials[i] = DialGeometry.from_dict(cached["dial"])
+                yield i, None, cached["yoloMessage"], needles, center
+            else:
+                yield (i, *next(pending_results))
+
+    # 同時実行数1の場合は従来どおり逐次実行
+    if max_concurrency <= 1:
+        results = []
+        for index, processed_image, yolo_message, needles, center in yolo_results():
+            print(f"YOLO processing result: {yolo_message}")
+            results.append(finish(index, processed_image, yolo_message, needles, center))
+        return results
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = []
+        for index, processed_image, yolo_message, needles, center in yolo_results():
+            print(f"YOLO processing result: {yolo_message}")
+            futures.append(executor.submit(
+                finish, index, processed_image, yolo_message, needles, center
+            ))
+        return [future.result() for future in futures]
+
+
+def process_video(event: Dict[str, Any], metrics: Metrics = NULL_METRICS) -> Dict[str, Any]:
+    """
+    動画の文字盤に変化があったフレームのみYOLOで処理し、読み取り値の時系列を返す
+
+    動画オブジェクトを少しずつ /tmp に書き出し、1フレームずつ読み出して処理する
+    （動画全体をメモリに読み込まず、フレームは処理後に破棄するため、動画の長さに
+    よらずメモリ使用量は一定）。
+    読み取りは針の角度と校正値から行い、Bedrockは呼び出さない。
+
+    Args:
+        event: Lambdaイベント（"videoUri" と "calibration" または "gaugeType"）
+        metrics: 処理段階ごとの所要時間の記録先（オプション）
+
+    Returns:
+        Lambdaのレスポンス
+    """
+    try:
+        calibration = get_calibration(event)
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": f"入力パラメータ 'calibration' が不正です: {e}"})
+        }
+    if calibration is None:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({
+                "error": "'videoUri' には 'calibration' または 'gaugeType' の指定が必要です"
+            })
+        }
+
+    uri = event["videoUri"]
+    max_interval = event.get("motionMaxInterval", os.environ.get("MOTION_MAX_INTERVAL"))
+    gate = MotionGate(
+        threshold=float(event.get("motionThreshold", os.environ.get("MOTION_THRESHOLD", "0.01"))),
+        max_interval=float(max_interval) if max_interval else None,
+    )
+    stats = StreamStats()
+    try:
+        _, _, key = parse_uri(uri)
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(key)[1] or ".mp4") as video_file:
+            with metrics.stage("imageRead"):
+                initialize_storage().read_to_file(uri, video_file)
+                video_file.flush()
+
+            # フレームを読み出す前にモデルをロード（ロード時間をフレームの処理時間に含めない）
+            if processor is None:
+                with metrics.stage("modelLoad"):
+                    initialize_processor()
+            frames = iter_video_frames(
+                video_file.name,
+                stride=int(event.get("frameStride", 1)),
+                max_frames=event.get("maxFrames"),
+            )
+            with metrics.stage("video"):
+                readings = [
+                    sample.to_dict()
+                    for sample in iter_readings(
+                        frames,
+                        processor=initialize_processor(),
+                        calibration=calibration,
+                        gate=gate,
+                        dial_detector=initialize_dial_detector(),
+                        stream_id=event.get("cameraId", uri),
+                        stats=stats,
+                        tracker=initialize_roi_tracker(),
+                    )
+                ]
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": f"入力パラメータ 'videoUri' が不正です: {e}"})
+        }
+
+    print(f"Video: {stats.to_dict()}")
+    metrics.add("frames", stats.frames)
+    metrics.add("inferredFrames", stats.inferred)
+    metrics.add("skippedFrames", stats.skipped)
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"readings": readings, "videoStats": stats.to_dict()})
+    }
+
+
+def lambda_handler(
+    event: Dict[str, Any],
+    context: Any,
+    on_text: Optional[Callable[[int, str], None]] = None,
+) -> Dict[str, Any]:
     """
     Lambda関数ハンドラー（Bedrock直接呼び出し版）
 
@@ -202,98 +1251,298 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         event: Lambdaイベント
             {
                 "image": "base64エンコードされた画像",
+                "images": ["base64エンコードされた画像", ...]（"image"の代わりに複数枚を指定）,
+                "imageUri": "s3://bucket/key"（"image"の代わりに画像のオブジェクトを指定。
+                    ローカルファイルのパスも可。前処理済み画像もオブジェクトとして書き込む）,
+                "imageUris": ["s3://bucket/key", ...]（"imageUri"の代わりに複数枚を指定）,
+                "videoUri": "s3://bucket/camera.mp4"（"image"の代わりに動画を指定。文字盤に
+                    変化があったフレームのみ処理し、読み取り値の時系列を返す。"calibration"
+                    または "gaugeType" が必要。"frameStride"（フレームの間引き）、
+                    "maxFrames"、"motionThreshold"（デフォルト: 環境変数 MOTION_THRESHOLD）、
+                    "motionMaxInterval"（変化が無くても推論する間隔[秒]）を指定可能）,
+                "outputPrefix": "s3://bucket/processed/"（オプション、前処理済み画像の保存先。
+                    デフォルト: 環境変数 OUTPUT_PREFIX、無い場合は入力画像と同じ場所）,
                 "userPrompt": "ユーザープロンプト",
                 "systemPrompt": "システムプロンプト（オプション）",
-                "preprocessImage": true/false（オプション、デフォルト: true）
+                "preprocessImage": true/false（オプション、デフォルト: true）,
+                "cameraId": "カメラID（オプション、文字盤の検出結果をカメラごとに再利用）",
+                "readingMode": "llm" / "local" / "auto"（オプション、デフォルト: 環境変数 READING_MODE）,
+                "calibration": {"minAngle": ..., "maxAngle": ..., "minValue": ..., "maxValue": ...}
+                    （"local" / "auto" の場合、または "gaugeType" で校正値ファイルから選択）,
+                "gaugeType": "ゲージ種別（オプション、校正値の選択と、EXEMPLAR_DIR に定義が
+                    ある場合は同じ型式の参考画像をBedrockのリクエストに追加）",
+                "stream": true/false（オプション、Bedrockのストリーミング呼び出し。
+                    デフォルト: 環境変数 BEDROCK_STREAM）,
+                "outputFormat": "text" / "json"（オプション、LLMの回答形式。
+                    デフォルト: 環境変数 LLM_OUTPUT_FORMAT）,
+                "responseImage": "none" / "thumbnail" / "full"（オプション、レスポンスに含める
+                    前処理済み画像。デフォルト: 環境変数 RESPONSE_IMAGE）,
+                "promptName": "needle"（オプション、プロンプトテンプレート名。
+                    テンプレートのシステムプロンプトと参考画像を使う。
+                    デフォルト: 環境変数 PROMPT_NAME）,
+                "timings": true（オプション、処理段階ごとの所要時間をレスポンスに含める）,
+                "warmup": true（オプション、指定時はウォームアップのみ実行）
             }
         context: Lambda実行コンテキスト
+        on_text: LLMの回答テキストを受信するたびに呼び出す関数（stream_handler から指定。
+            指定時はストリーミングで呼び出す）
 
     Returns:
         {
             "statusCode": 200,
             "body": {
                 "llmResponse": "LLMからの回答テキスト",
-                "processedImage": "base64エンコードされた前処理済み画像",
-                "yoloMessage": "YOLO処理結果メッセージ"
+                "processedImage": "base64エンコードされた前処理済み画像"
+                    （responseImage が "thumbnail" の場合は縮小したJPEG、"none" の場合は含まない）,
+                "processedImageMediaType": "image/png"（IMAGE_FORMATの形式。前処理しない場合は入力画像の形式）,
+                "processedImageUri": "s3://bucket/key.processed.png"
+                    （"imageUri" 指定時は "processedImage" の代わりに返す）,
+                "llmImage": {"width": ..., "height": ..., "bytes": ..., "mediaType": ...,
+                             "estimatedTokens": ...}（Bedrockに送った画像。LLM呼び出し時）,
+                "llmTiming": {"stream": true, "timeToFirstToken": ..., "totalTime": ...,
+                              "stoppedEarly": ..., "stopReason": ...}（LLM呼び出し時）,
+                "llmUsage": {"inputTokens": ..., "outputTokens": ..., "cacheReadInputTokens": ...,
+                             "cacheWriteInputTokens": ..., "calls": ...}（LLM呼び出し時）,
+                "llmReading": {"value": ..., "unit": ..., "confidence": ...}
+                    （outputFormat が "json" の場合。解析できない場合はNoneで "llmReadingError" に理由）,
+                "yoloMessage": "YOLO処理結果メッセージ",
+                "reading": {"value": ..., "unit": ..., "angle": ..., "confidence": ...,
+                            "source": "local" / "llm"}（"local" / "auto" の場合）,
+                "cache": {"image": {"hits": 0, "misses": 1}, "llm": {...}}（キャッシュ有効時）,
+                "timings": {"stages": {"imageDecode": ..., "yoloInference": ..., "bedrock": ..., ...},
+                            "counts": {"maskPixels": ..., "inputTokens": ..., ...},
+                            "imageSizes": [[width, height], ...]}
+                    （"timings" 指定時。時間はミリ秒、複数画像の場合は合計）
             }
         }
+        "images"を指定した場合のbodyは入力順の結果リスト
+            {"results": [{"llmResponse": ..., "processedImage": ..., "yoloMessage": ...}, ...],
+             "cache": {...}}
+        "videoUri"を指定した場合のbodyは推論したフレームの読み取り値の時系列
+            {"readings": [{"frame": 0, "timestamp": 0.0, "inferred": true, "motionScore": ...,
+                           "reading": {...}, "message": "処理成功"}, ...],
+             "videoStats": {"frames": ..., "inferred": ..., "skipped": ..., "skipRatio": ...,
+                            "elapsed": ..., "fps": ..., "inferredFps": ..., "skippedFps": ...}}
     """
+    start_time = time.perf_counter()
+    # 処理段階ごとの計測（METRICS が無効でも "timings" 指定時は計測する）
+    metrics = create_metrics(
+        os.environ.get("METRICS", "true").lower() == "true" or bool(event.get("timings"))
+    )
     try:
         print("Lambda function started")
         print(f"Event keys: {event.keys()}")
 
-        # プロセッサーとBedrockクライアントを初期化（初回のみ）
-        bedrock = initialize_bedrock_client()
+        # ウォームアップ要求（スケジュール実行などで送る）
+        if event.get("warmup"):
+            warm_up()
+            return {
+                "statusCode": 200,
+                "body": json.dumps({"warmup": True})
+            }
 
         # 入力パラメータを取得
-        if "image" not in event:
+        input_keys = [
+            key for key in ("image", "images", "imageUri", "imageUris", "videoUri") if key in event
+        ]
+        if len(input_keys) != 1:
             return {
                 "statusCode": 400,
                 "body": json.dumps({
-                    "error": "入力パラメータ 'image' が必要です"
+                    "error": "入力パラメータ 'image', 'images', 'imageUri', 'imageUris', 'videoUri' の"
+                             "いずれか1つが必要です"
                 })
             }
 
-        if "userPrompt" not in event:
+        if "videoUri" in event:
+            response = process_video(event, metrics)
+            metrics.add_time("total", time.perf_counter() - start_time)
+            metrics.emit()
+            return response
+
+        for key in ("images", "imageUris"):
+            if key in event and not (isinstance(event[key], list) and event[key]):
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps({
+                        "error": f"入力パラメータ '{key}' には1件以上の画像リストを指定してください"
+                    })
+                }
+
+        reading_mode = event.get("readingMode", os.environ.get("READING_MODE", "llm"))
+        if reading_mode not in READING_MODES:
             return {
                 "statusCode": 400,
                 "body": json.dumps({
-                    "error": "入力パラメータ 'userPrompt' が必要です"
+                    "error": f"入力パラメータ 'readingMode' は{READING_MODES}のいずれかを指定してください"
                 })
             }
 
-        image_base64 = event["image"]
-        user_prompt = event["userPrompt"]
-        system_prompt = event.get("systemPrompt")  # オプション
-        preprocess_image = event.get("preprocessImage", True)  # オプション、デフォルト: True
+        calibration = None
+        if reading_mode != "llm":
+            try:
+                calibration = get_calibration(event)
+            except ValueError as e:
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps({"error": f"入力パラメータ 'calibration' が不正です: {e}"})
+                }
+            if calibration is None or not event.get("preprocessImage", True):
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps({
+                        "error": f"readingMode '{reading_mode}' には 'calibration' または"
+                                 " 'gaugeType' の指定とYOLO前処理が必要です"
+                    })
+                }
 
-        print(f"Preprocess image: {preprocess_image}")
+        output_format = event.get("outputFormat", os.environ.get("LLM_OUTPUT_FORMAT", "text"))
+        if output_format not in OUTPUT_FORMATS:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({
+                    "error": f"入力パラメータ 'outputFormat' は{OUTPUT_FORMATS}のいずれかを指定してください"
+                })
+            }
 
-        # Base64デコード
-        print("Decoding base64 image...")
-        image = decode_base64_image(image_base64)
-        print(f"Image shape: {image.shape}")
+        response_image = event.get("responseImage", os.environ.get("RESPONSE_IMAGE", "full"))
+        if response_image not in RESPONSE_IMAGES:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({
+                    "error": f"入力パラメータ 'responseImage' は{RESPONSE_IMAGES}のいずれかを指定してください"
+                })
+            }
 
-        # 前処理の有無を判定
-        if preprocess_image:
-            # プロセッサーを初期化（前処理する場合のみ）
-            proc = initialize_processor()
+        if "userPrompt" not in event and reading_mode != "local":
+            return {
+                "statusCode": 400,
+                "body": json.dumps({
+                    "error": "入力パラメータ 'userPrompt' が必要です"
+                })
+            }
 
-            # YOLO画像処理（triangle固定）
-            print("Processing image with YOLO...")
-            processed_image, yolo_message = proc.process_image(image)
-            print(f"YOLO processing result: {yolo_message}")
+        examples = []
+        prompt_name = event.get("promptName", os.environ.get("PROMPT_NAME"))
+        template = None
+        if prompt_name:
+            try:
+                template = initialize_prompt_registry().get(prompt_name)
+            except ValueError as e:
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps({"error": f"入力パラメータ 'promptName' が不正です: {e}"})
+                }
+            examples = template.examples
 
-            # 前処理済み画像をBase64エンコード
-            print("Encoding processed image to base64...")
-            processed_image_base64 = encode_image_to_base64(processed_image)
+        # ゲージ種別の参考画像（定義がある場合のみ）をテンプレートの参考画像の後に追加
+        gauge_type = event.get("gaugeType")
+        store = initialize_exemplar_store() if gauge_type and reading_mode != "local" else None
+        if store is not None:
+            exemplars = store.get(gauge_type)
+            if exemplars:
+                examples = list(examples) + exemplars
+                print(f"Exemplars for '{gauge_type}': {len(exemplars)}, store: {store.stats().to_dict()}")
+
+        is_batch = "images" in event or "imageUris" in event
+        # オブジェクト参照モード: 画像をURIで受け取り、前処理済み画像もURIで返す
+        image_uris = None
+        if "imageUri" in event or "imageUris" in event:
+            image_uris = event["imageUris"] if is_batch else [event["imageUri"]]
+        user_prompt = event.get("userPrompt", "")
+        # オプション、省略時はテンプレートのシステムプロンプト
+        system_prompt = event.get("systemPrompt", template.system if template else None)
+        preprocess_image = event.get("preprocessImage", True)  # オプション、デフォルト: True
+
+        print(f"Preprocess image: {preprocess_image}")
+        print(f"Reading mode: {reading_mode}")
+        # 前処理しない場合に入力画像のデータをそのまま使うための (Base64文字列, メディアタイプ)
+        encoded_images: List[Optional[Tuple[str, str]]] = []
+        images = []
+        if image_uris is not None:
+            # Base64を経由せずに読み込んだバイト列をそのままデコード
+            print(f"Reading images: {image_uris}")
+            storage = initialize_storage()
+            output_prefix = event.get("outputPrefix", os.environ.get("OUTPUT_PREFIX"))
+            if output_prefix:
+                # 書き込めない保存先はYOLO・Bedrockの処理前にエラーにする
+                try:
+                    storage.get(output_prefix)
+                except ValueError as e:
+                    return {
+                        "statusCode": 400,
+                        "body": json.dumps({"error": f"入力パラメータ 'outputPrefix' が不正です: {e}"})
+                    }
+            try:
+                for uri in image_uris:
+                    with metrics.stage("imageRead"):
+                        data = storage.read(uri)
+                    with metrics.stage("imageDecode"):
+                        images.append(decode_image(data))
+                    media_type = detect_media_type(data) if not preprocess_image else None
+                    encoded_images.append(
+                        (base64.b64encode(data).decode("utf-8"), media_type) if media_type else None
+                    )
+            except ValueError as e:
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps({"error": f"入力パラメータ 'imageUri' が不正です: {e}"})
+                }
         else:
-            # 前処理をスキップ
-            print("Skipping YOLO preprocessing...")
-            processed_image = image
-            yolo_message = "前処理をスキップしました"
+            images_base64 = event["images"] if is_batch else [event["image"]]
+            print("Decoding base64 image...")
+            for image_base64 in images_base64:
+                with metrics.stage("base64Decode"):
+                    data = base64.b64decode(image_base64)
+                with metrics.stage("imageDecode"):
+                    images.append(decode_image(data))
+                media_type = detect_media_type(data) if not preprocess_image else None
+                encoded_images.append((image_base64, media_type) if media_type else None)
+        print(f"Number of images: {len(images)}")
+        metrics.add("images", len(images))
+        for image in images:
+            print(f"Image shape: {image.shape}")
+            metrics.append("imageSizes", [image.shape[1], image.shape[0]])
 
-            # オリジナル画像をBase64エンコード
-            print("Encoding original image to base64...")
-            processed_image_base64 = encode_image_to_base64(processed_image)
+        # Bedrockクライアントを初期化（初回のみ。LLMを使わない場合は不要）
+        bedrock = initialize_bedrock_client() if reading_mode != "local" else None
 
-        # Bedrock LLMを呼び出し
-        print("Invoking Bedrock LLM...")
-        llm_response = invoke_bedrock_model(
-            client=bedrock,
-            processed_image_base64=processed_image_base64,
+        # YOLO前処理 + Bedrock LLM呼び出し
+        cache_stats = CacheStats()
+        results = process_gauge_images(
+            bedrock=bedrock,
+            images=images,
             user_prompt=user_prompt,
-            system_prompt=system_prompt
+            system_prompt=system_prompt,
+            preprocess_image=preprocess_image,
+            cache_stats=cache_stats,
+            reading_mode=reading_mode,
+            calibration=calibration,
+            camera_id=event.get("cameraId"),
+            stream=True if on_text is not None else event.get("stream"),
+            on_text=on_text,
+            output_format=output_format,
+            examples=examples,
+            encoded_images=encoded_images,
+            response_image=response_image,
+            metrics=metrics,
         )
+        if image_uris is not None:
+            with metrics.stage("imageWrite"):
+                write_processed_images(results, image_uris, output_prefix)
 
         # レスポンスを返す
+        body = {"results": results} if is_batch else dict(results[0])
+        if cache_stats.counts:
+            body["cache"] = cache_stats.to_dict()
+        print(f"Cache: {cache_stats.to_dict()}")
+        metrics.add_time("total", time.perf_counter() - start_time)
+        metrics.emit()
+        if event.get("timings"):
+            body["timings"] = metrics.to_dict()
         response = {
             "statusCode": 200,
-            "body": json.dumps({
-                "llmResponse": llm_response,
-                "processedImage": processed_image_base64,
-                "yoloMessage": yolo_message
-            })
+            "body": json.dumps(body)
         }
 
         print("Lambda function completed successfully")
@@ -303,6 +1552,9 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         print(f"Error occurred: {str(e)}")
         import traceback
         traceback.print_exc()
+        metrics.add("errors", 1)
+        metrics.add_time("total", time.perf_counter() - start_time)
+        metrics.emit()
 
         return {
             "statusCode": 500,
@@ -311,3 +1563,46 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 "type": type(e).__name__
             })
         }
+
+
+def stream_handler(event: Dict[str, Any], context: Any) -> Iterator[bytes]:
+    """
+    レスポンスストリーミング用ハンドラー
+
+    LLMの回答テキストを受信した順に返し、最後に lambda_handler と同じ
+    レスポンスを返す。1行に1つのJSON（NDJSON）を出力する。
+        {"type": "text", "index": 0, "text": "この圧力計の"}
+        {"type": "result", "statusCode": 200, "body": "..."}
+
+    Pythonのマネージドランタイムはレスポンスストリーミングに対応していないため、
+    Lambda Web Adapter などストリーミングに対応したランタイムから呼び出す。
+
+    Args:
+        event: Lambdaイベント（lambda_handler と同じ）
+        context: Lambda実行コンテキスト
+
+    Returns:
+        NDJSONの各行（バイト列）のイテレータ
+    """
+    events: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+
+    def on_text(index: int, text: str) -> None:
+        events.put({"type": "text", "index": index, "text": text})
+
+    def run() -> None:
+        try:
+            events.put({"type": "result", **lambda_handler(event, context, on_text=on_text)})
+        finally:
+            events.put(None)
+
+    threading.Thread(target=run, daemon=True).start()
+    while True:
+        item = events.get()
+        if item is None:
+            return
+        yield (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+# 初期化フェーズでのウォームアップ（プロビジョンドコンカレンシー向け）
+if os.environ.get("WARMUP_ON_INIT", "false").lower() == "true":
+    warm_up()
@@ -0,0 +1,199 @@
+"""
+Bedrockに送る画像の準備モジュール
+前処理済み画像を文字盤の周囲に切り抜き、長辺を指定サイズまで縮小してから
+エンコードし、送信サイズと画像トークン数を抑える
+
+設定は環境変数で変更できる。
+    LLM_IMAGE_MAX_EDGE:      長辺の最大サイズ（px、デフォルト: 768。0で縮小しない）
+    LLM_IMAGE_CROP:          文字盤の周囲に切り抜くかどうか（デフォルト: true）
+    LLM_IMAGE_MARGIN:        切り抜きの余白（文字盤の半径に対する比率、デフォルト: 0.15）
+    LLM_IMAGE_FORMAT:        auto / png / jpeg / webp（デフォルト: auto）
+    LLM_IMAGE_PNG_MAX_BYTES: auto でPNGを使う最大サイズ（超える場合はJPEG、デフォルト: 262144）
+    LLM_IMAGE_JPEG_QUALITY:  JPEGの品質（デフォルト: 90）
+"""
+import math
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from gauge_detector import DialGeometry
+from image_codec import EncodeOptions, encode_image_to_base64
+
+# Claudeが画像を縮小せずに扱う最大サイズ（これを超える画像はモデル側で縮小される）
+MODEL_MAX_EDGE = 1568
+MODEL_MAX_PIXELS = 1_150_000
+# 画像トークン数の目安: 幅 × 高さ / 750
+PIXELS_PER_TOKEN = 750
+
+
+@dataclass
+class LLMImageOptions:
+    """Bedrockに送る画像の準備設定"""
+
+    # 長辺の最大サイズ（0で縮小しない）
+    max_edge: int = 768
+    # 文字盤の周囲に切り抜くかどうか
+    crop: bool = True
+    # 切り抜きの余白（文字盤の半径に対する比率）
+    margin: float = 0.15
+    # 出力形式 ("auto", "png", "jpeg", "webp")
+    format: str = "auto"
+    # auto でPNGを使う最大サイズ（バイト）
+    png_max_bytes: int = 256 * 1024
+    # JPEGの品質
+    jpeg_quality: int = 90
+
+    @classmethod
+    def from_env(cls) -> "LLMImageOptions":
+        """環境変数から設定を作成"""
+        return cls(
+            max_edge=int(os.environ.get("LLM_IMAGE_MAX_EDGE", "768")),
+            crop=os.environ.get("LLM_IMAGE_CROP", "true").lower() == "true",
+            margin=float(os.environ.get("LLM_IMAGE_MARGIN", "0.15")),
+            format=os.environ.get("LLM_IMAGE_FORMAT", "auto"),
+            png_max_bytes=int(os.environ.get("LLM_IMAGE_PNG_MAX_BYTES", str(256 * 1024))),
+            jpeg_quality=int(os.environ.get("LLM_IMAGE_JPEG_QUALITY", "90")),
+        )
+
+
+@dataclass
+class PreparedImage:
+    """Bedrockに送る画像"""
+
+    # Base64エンコードされた画像
+    data_base64: str
+    # メディアタイプ
+    media_type: str
+    # 画像サイズ
+    width: int
+    height: int
+    # エンコード後のサイズ（バイト）
+    num_bytes: int
+
+    @property
+    def estimated_tokens(self) -> int:
+        """画像トークン数の目安（モデル側で縮小される場合は縮小後のサイズで計算）"""
+        return estimate_image_tokens(self.width, self.height)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """レスポンス・ログ用の辞書に変換"""
+        return {
+            "width": self.width,
+            "height": self.height,
+            "bytes": self.num_bytes,
+            "mediaType": self.media_type,
+            "estimatedTokens": self.estimated_tokens,
+        }
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """
+    画像トークン数の目安を求める
+
+    Args:
+        width: 画像の幅
+        height: 画像の高さ
+
+    Returns:
+        画像トークン数の目安
+    """
+    scale = min(
+        1.0,
+        MODEL_MAX_EDGE / max(width, height),
+        math.sqrt(MODEL_MAX_PIXELS / (width * height)),
+    )
+    return math.ceil((width * scale) * (height * scale) / PIXELS_PER_TOKEN)
+
+
+def gauge_crop_box(
+    image_shape: Tuple[int, int],
+    dial: DialGeometry,
+    margin: float,
+) -> Tuple[int, int, int, int]:
+    """
+    文字盤の周囲の切り抜き範囲を求める
+
+    Args:
+        image_shape: 画像の (高さ, 幅)
+        dial: 文字盤のジオメトリ
+        margin: 余白（文字盤の半径に対する比率）
+
+    Returns:
+        (x0, y0, x1, y1)
+    """
+    h, w = image_shape[:2]
+    half = dial.radius * (1.0 + margin)
+    x0 = max(0, int(math.floor(dial.center_x - half)))
+    y0 = max(0, int(math.floor(dial.center_y - half)))
+    x1 = min(w, int(math.ceil(dial.center_x + half)))
+    y1 = min(h, int(math.ceil(dial.center_y + half)))
+    return x0, y0, x1, y1
+
+
+def _base64_size(data_base64: str) -> int:
+    """Base64文字列のデコード後のサイズ"""
+    return len(data_base64) * 3 // 4 - data_base64[-2:].count("=")
+
+
+def prepare_llm_image(
+    image: np.ndarray,
+    dial: Optional[DialGeometry] = None,
+    options: LLMImageOptions = None,
+    encoded: Optional[Tuple[str, str]] = None,
+) -> PreparedImage:
+    """
+    Bedrockに送る画像を準備
+
+    Args:
+        image: 前処理済み画像 (BGR)
+        dial: 文字盤のジオメトリ（無い場合は切り抜かない）
+        options: 準備設定（省略時は環境変数から作成）
+        encoded: imageをエンコード済みの (Base64文字列, メディアタイプ)。
+            切り抜き・縮小をしない場合に形式が合えば再エンコードせずに使う
+
+    Returns:
+        Bedrockに送る画像
+    """
+    if options is None:
+        options = LLMImageOptions.from_env()
+
+    prepared = image
+    if options.crop and dial is not None:
+        x0, y0, x1, y1 = gauge_crop_box(image.shape, dial, options.margin)
+        if x1 > x0 and y1 > y0:
+            prepared = prepared[y0:y1, x0:x1]
+
+    h, w = prepared.shape[:2]
+    if options.max_edge > 0 and max(h, w) > options.max_edge:
+        scale = options.max_edge / max(h, w)
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        prepared = cv2.resize(prepared, size, interpolation=cv2.INTER_AREA)
+        h, w = prepared.shape[:2]
+
+    format = options.format
+    if prepared is image and encoded is not None:
+        data_base64, media_type = encoded
+        num_bytes = _base64_size(data_base64)
+        reusable = (
+            media_type != "image/png" or num_bytes <= options.png_max_bytes
+            if format == "auto"
+            else media_type == EncodeOptions(format=format).media_type
+        )
+        if reusable:
+            return PreparedImage(data_base64, media_type, w, h, num_bytes)
+
+    jpeg_options = EncodeOptions(format="jpeg", jpeg_quality=options.jpeg_quality)
+    if format == "auto":
+        # PNGが大きすぎる場合のみJPEGにする（小さい画像は可逆圧縮のまま送る）
+        data_base64, media_type = encode_image_to_base64(prepared, EncodeOptions(format="png"))
+        if _base64_size(data_base64) > options.png_max_bytes:
+            data_base64, media_type = encode_image_to_base64(prepared, jpeg_options)
+    elif format in ("jpeg", "jpg"):
+        data_base64, media_type = encode_image_to_base64(prepared, jpeg_options)
+    else:
+        data_base64, media_type = encode_image_to_base64(prepared, EncodeOptions(format=format))
+
+    return PreparedImage(data_base64, media_type, w, h, _base64_size(data_base64))
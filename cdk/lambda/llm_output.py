@@ -0,0 +1,132 @@
+"""
+LLMの構造化出力モジュール
+回答を {"value": 数値, "unit": "単位", "confidence": 0〜1} のJSONオブジェクトに
+限定し、出力トークン数（= Bedrockの応答時間）を抑える
+
+回答を解析できない場合は、回答をJSONに変換するよう1回だけ依頼し直す
+（画像を含まない短いリクエスト）。
+"""
+import json
+import math
+from dataclasses import dataclass
+from typing import Any, Dict
+
+# 出力形式
+#   text: 自由形式の回答（従来どおり）
+#   json: 読み取り値のJSONオブジェクトのみ
+OUTPUT_FORMATS = ("text", "json")
+
+# ユーザープロンプトの後に付ける回答形式の指示
+JSON_INSTRUCTION = (
+    "回答は次の形式のJSONオブジェクトのみを出力してください。説明文やコードブロックは不要です。\n"
+    '{"value": 読み取った数値, "unit": "単位", "confidence": 読み取りの確からしさ(0〜1の数値)}'
+)
+
+# 解析できなかった回答をJSONに変換するためのプロンプト（後ろに JSON_INSTRUCTION を付ける）
+REPAIR_PROMPT = (
+    "次の圧力計の読み取り結果を、指定の形式のJSONオブジェクトに変換してください。\n"
+    "解析できなかった理由: {error}\n\n"
+    "読み取り結果:\n{text}"
+)
+
+_DECODER = json.JSONDecoder()
+
+
+@dataclass
+class StructuredReading:
+    """LLMが回答した読み取り結果"""
+
+    # 読み取った値
+    value: float
+    # 単位
+    unit: str
+    # LLMの自己申告の確からしさ [0, 1]
+    confidence: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        """レスポンス用の辞書に変換"""
+        return {"value": self.value, "unit": self.unit, "confidence": self.confidence}
+
+
+def build_prompt(user_prompt: str) -> str:
+    """
+    JSONでの回答を指示するユーザープロンプトを作成
+
+    Args:
+        user_prompt: 元のユーザープロンプト
+
+    Returns:
+        回答形式の指示を付けたユーザープロンプト
+    """
+    return f"{user_prompt.rstrip()}\n\n{JSON_INSTRUCTION}" if user_prompt else JSON_INSTRUCTION
+
+
+def build_repair_prompt(text: str, error: str) -> str:
+    """
+    解析できなかった回答をJSONに変換するためのプロンプトを作成
+
+    Args:
+        text: 解析できなかった回答
+        error: 解析できなかった理由
+
+    Returns:
+        プロンプト
+    """
+    return build_prompt(REPAIR_PROMPT.format(error=error, text=text))
+
+
+def _number(data: Dict[str, Any], key: str) -> float:
+    value = data.get(key)
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            value = float(value)
+        except ValueError:
+            raise ValueError(f"'{key}' が数値ではありません: {value!r}")
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"'{key}' が数値ではありません: {value!r}")
+    if not math.isfinite(value):
+        raise ValueError(f"'{key}' が有限の数値ではありません: {value!r}")
+    return float(value)
+
+
+def parse_structured_reading(text: str) -> StructuredReading:
+    """
+    LLMの回答をJSONオブジェクトとして解析して検証
+
+    コードブロックや前後の文章が付いている場合は、JSONとして解析できる
+    最初の {...}（入れ子のオブジェクトを含む）を解析する。
+
+    Args:
+        text: LLMの回答
+
+    Returns:
+        読み取り結果
+
+    Raises:
+        ValueError: JSONとして解析できない、または値が不正な場合
+    """
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("JSONオブジェクトが見つかりません")
+    error = None
+    while start >= 0:
+        try:
+            data, _ = _DECODER.raw_decode(text, start)
+            break
+        except json.JSONDecodeError as e:
+            # 文章中の "{" の場合は次の "{" から解析し直す
+            error = error or e
+            start = text.find("{", start + 1)
+    else:
+        raise ValueError(f"JSONとして解析できません: {error.msg}")
+
+    value = _number(data, "value")
+    unit = data.get("unit")
+    if not isinstance(unit, str):
+        raise ValueError(f"'unit' が文字列ではありません: {unit!r}")
+    confidence = _number(data, "confidence")
+    if not 0.0 <= confidence <= 1.0:
+        raise ValueError(f"'confidence' が0〜1の範囲外です: {confidence}")
+
+    return StructuredReading(value=value, unit=unit.strip(), confidence=confidence)
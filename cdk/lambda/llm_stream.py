@@ -0,0 +1,160 @@
+"""
+Bedrockのストリーミング応答の読み取りモジュール
+invoke_model_with_response_stream のイベントストリームからテキストを順に
+取り出し、最初のトークンまでの時間と全体の時間を計測する
+
+回答に読み取り結果（「**約0.05 MPa**」「0.05 MPaを指しています」など）が
+現れた時点で受信を打ち切ることで、読み取り値の後に続く説明文の生成を待たずに
+応答を返せる。
+"""
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional, Pattern
+
+# 読み取り値とみなすパターン（読み取りの表現 + 数値 + 圧力の単位）
+#   - 数値の前に「約」「およそ」「結果:」「読み取り値:」または太字の「**」があるか、
+#     後に「を指して」「を示して」が続く場合のみ読み取り値とみなす
+#     （「最大1.0MPa」「0.1 MPa刻み」のような目盛りの説明で打ち切らないため）
+#   - 「0〜1 MPa」のような目盛りの範囲の記述は読み取り値とみなさない
+#   - 単位の後に1文字以上受信してから判定する（「0.5 bar」と「0.5 barg」などを区別するため）
+READING_PATTERN = (
+    r"(?P<prefix>(?:約|およそ|(?:読み取り値|結果)\s*(?:\*\*)?\s*[はが:：]\s*(?:\*\*)?|\*\*)\s*)?"
+    r"(?<![\d.〜~～\-–])(?P<value>\d+(?:\.\d+)?)(?!\s*[〜~～\-–]\s*\d)\s*"
+    r"(?P<unit>MPa|kPa|hPa|Pa|bar|psi|kgf/cm2|kgf/cm²|mmHg)"
+    r"(?(prefix)(?=[^A-Za-z0-9/²])|\s*(?:\*\*)?\s*[をに]?\s*(?:指して|示して))"
+)
+
+
+class StreamError(Exception):
+    """ストリームの途中で返されたエラー（throttlingException など）"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(f"{code}: {message}")
+        # ClientErrorと同じ形式でエラーコードを参照できるようにする
+        self.response = {"Error": {"Code": code, "Message": message}}
+
+
+@dataclass
+class StreamedResponse:
+    """ストリーミングで受信したLLMの回答"""
+
+    # 受信したテキスト（打ち切った場合はそれまでの部分）
+    text: str
+    # 呼び出しから最初のテキストを受信するまでの時間（秒）
+    time_to_first_token: Optional[float]
+    # 呼び出しから受信を終えるまでの時間（秒）
+    total_time: float
+    # 読み取り値が現れたため受信を打ち切ったかどうか
+    stopped_early: bool = False
+    # モデルの停止理由（"end_turn", "max_tokens" など。打ち切った場合はNone）
+    stop_reason: Optional[str] = None
+    # 応答の usage（message_start と message_delta の値をまとめたもの。
+    # 打ち切った場合は output_tokens を含まない）
+    usage: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """レスポンス・ログ用の辞書に変換"""
+        return {
+            "stream": True,
+            "timeToFirstToken": (
+                round(self.time_to_first_token, 3) if self.time_to_first_token is not None else None
+            ),
+            "totalTime": round(self.total_time, 3),
+            "stoppedEarly": self.stopped_early,
+            "stopReason": self.stop_reason,
+        }
+
+
+def compile_stop_pattern(pattern: Optional[str]) -> Optional[Pattern[str]]:
+    """
+    打ち切りのパターンをコンパイル
+
+    Args:
+        pattern: 正規表現（空文字列またはNoneの場合は打ち切らない）
+
+    Returns:
+        コンパイルしたパターン。打ち切らない場合はNone
+    """
+    return re.compile(pattern) if pattern else None
+
+
+def iter_stream_events(body) -> Iterator[Dict[str, Any]]:
+    """
+    イベントストリームからAnthropic Messages APIのイベントを取り出す
+
+    Args:
+        body: invoke_model_with_response_stream の応答の "body"
+
+    Returns:
+        {"type": "content_block_delta", ...} 形式のイベントのイテレータ
+    """
+    for event in body:
+        if "chunk" in event:
+            yield json.loads(event["chunk"]["bytes"])
+            continue
+        # throttlingException / modelStreamErrorException などのエラーイベント
+        for name, detail in event.items():
+            code = name[:1].upper() + name[1:]
+            raise StreamError(code, (detail or {}).get("message", ""))
+
+
+def read_stream(
+    response: Dict[str, Any],
+    start_time: float,
+    stop_pattern: Optional[Pattern[str]] = None,
+    on_text: Optional[Callable[[str], None]] = None,
+) -> StreamedResponse:
+    """
+    ストリーミング応答を受信
+
+    Args:
+        response: invoke_model_with_response_stream の応答
+        start_time: 呼び出しを開始した時刻（time.perf_counter()）
+        stop_pattern: 受信したテキストがこのパターンに一致した時点で打ち切る（オプション）
+        on_text: テキストを受信するたびに呼び出す関数（オプション）
+
+    Returns:
+        受信した回答
+    """
+    body = response["body"]
+    parts = []
+    time_to_first_token = None
+    stop_reason = None
+    stopped_early = False
+    usage: Dict[str, Any] = {}
+    try:
+        for event in iter_stream_events(body):
+            event_type = event.get("type")
+            if event_type == "content_block_delta" and event["delta"].get("type") == "text_delta":
+                text = event["delta"]["text"]
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - start_time
+                parts.append(text)
+                if on_text is not None:
+                    on_text(text)
+                if stop_pattern is not None and stop_pattern.search("".join(parts)):
+                    stopped_early = True
+                    break
+            elif event_type == "message_start":
+                usage.update(event.get("message", {}).get("usage", {}))
+                # message_start の output_tokens は途中の値のため使わない
+                usage.pop("output_tokens", None)
+            elif event_type == "message_delta":
+                stop_reason = event.get("delta", {}).get("stop_reason")
+                usage.update(event.get("usage", {}))
+    finally:
+        # 打ち切った場合は接続を閉じて残りの生成を受信しない
+        close = getattr(body, "close", None)
+        if close is not None:
+            close()
+
+    return StreamedResponse(
+        text="".join(parts),
+        time_to_first_token=time_to_first_token,
+        total_time=time.perf_counter() - start_time,
+        stopped_early=stopped_early,
+        stop_reason=stop_reason,
+        usage=usage,
+    )
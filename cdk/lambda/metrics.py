@@ -0,0 +1,177 @@
+"""
+処理段階ごとの計測モジュール
+Base64デコード・画像デコード・モデルロード・YOLO推論・マスク後処理・描画・
+エンコード・Bedrock呼び出しの所要時間と、画像サイズ・マスク画素数・
+Bedrockのトークン数を1回の呼び出しごとに集計する
+
+集計結果は CloudWatch Embedded Metric Format（EMF）のJSON 1行としてログに
+出力する（CloudWatch Logs がメトリクスとして取り込む）。複数画像・複数スレッドの
+値は名前ごとに合計する。
+
+無効な場合は NULL_METRICS（何もしない）を使い、計測のオーバーヘッドを無くす。
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+# CloudWatchのメトリクスの名前空間（環境変数 METRICS_NAMESPACE で変更可）
+DEFAULT_NAMESPACE = "PressureGaugeDetection"
+
+
+class Metrics:
+    """1回の呼び出しの計測結果"""
+
+    enabled = True
+
+    def __init__(self):
+        # 処理段階ごとの所要時間（ミリ秒）
+        self.stages: Dict[str, float] = {}
+        # 画素数・トークン数などの件数
+        self.counts: Dict[str, float] = {}
+        # メトリクスにしない値（画像サイズなど）
+        self.properties: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        with ブロックの所要時間を処理段階の時間に加算
+
+        Args:
+            name: 処理段階名（"yoloInference" など）
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """処理段階の時間（秒）を加算"""
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+
+    def add(self, name: str, value: Optional[float]) -> None:
+        """件数を加算（Noneは無視）"""
+        if value is None:
+            return
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def append(self, name: str, value: Any) -> None:
+        """リストのプロパティに値を追加"""
+        with self._lock:
+            self.properties.setdefault(name, []).append(value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """レスポンス用の辞書に変換（時間はミリ秒）"""
+        with self._lock:
+            return {
+                "stages": {name: round(value, 2) for name, value in self.stages.items()},
+                "counts": dict(self.counts),
+                **self.properties,
+            }
+
+    def to_emf(
+        self,
+        namespace: str = DEFAULT_NAMESPACE,
+        dimensions: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Embedded Metric Format のログに変換
+
+        Args:
+            namespace: メトリクスの名前空間
+            dimensions: ディメンション（{"FunctionName": ...} など）
+
+        Returns:
+            EMFのJSONオブジェクト
+        """
+        dimensions = dimensions or {}
+        with self._lock:
+            stages = {f"{name}Time": round(value, 3) for name, value in self.stages.items()}
+            counts = dict(self.counts)
+            properties = dict(self.properties)
+
+        definitions: List[Dict[str, str]] = (
+            [{"Name": name, "Unit": "Milliseconds"} for name in stages]
+            + [{"Name": name, "Unit": "Count"} for name in counts]
+        )
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": namespace,
+                    "Dimensions": [sorted(dimensions)],
+                    "Metrics": definitions,
+                }],
+            },
+            **dimensions,
+            **properties,
+            **stages,
+            **counts,
+        }
+
+    def emit(self, namespace: str = None, dimensions: Optional[Dict[str, str]] = None) -> None:
+        """
+        EMFのログを1行出力
+
+        Args:
+            namespace: メトリクスの名前空間（省略時は環境変数 METRICS_NAMESPACE）
+            dimensions: ディメンション（省略時は Lambda関数名）
+        """
+        if namespace is None:
+            namespace = os.environ.get("METRICS_NAMESPACE", DEFAULT_NAMESPACE)
+        if dimensions is None:
+            dimensions = {"FunctionName": os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")}
+        print(json.dumps(self.to_emf(namespace, dimensions), ensure_ascii=False))
+
+
+# 無効時の with ブロック（再入可能なため使い回す）
+_NULL_STAGE = nullcontext()
+
+
+class NullMetrics(Metrics):
+    """計測しない（無効時に使う）"""
+
+    enabled = False
+
+    def __init__(self):
+        pass
+
+    def stage(self, name: str):
+        return _NULL_STAGE
+
+    def add_time(self, name: str, seconds: float) -> None:
+        pass
+
+    def add(self, name: str, value: Optional[float]) -> None:
+        pass
+
+    def append(self, name: str, value: Any) -> None:
+        pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {}
+
+    def emit(self, namespace: str = None, dimensions: Optional[Dict[str, str]] = None) -> None:
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+def create_metrics(enabled: bool) -> Metrics:
+    """
+    計測結果の記録先を作成
+
+    Args:
+        enabled: 計測するかどうか
+
+    Returns:
+        Metrics（無効な場合は NULL_METRICS）
+    """
+    return Metrics() if enabled else NULL_METRICS
@@ -0,0 +1,331 @@
+"""
+圧力計針のジオメトリ解析モジュール
+セグメンテーションマスクから針の輪郭を1回だけ抽出し、
+輪郭点のみを使って先端・基部・角度を求める
+"""
+import math
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class NeedleGeometry:
+    """針のジオメトリ"""
+
+    # 針の先端座標（ゲージ中心から最も遠い輪郭点）
+    tip_x: int
+    tip_y: int
+    # 針の基部座標（ゲージ中心に最も近い輪郭点）
+    base_x: int
+    base_y: int
+    # 針の向き（度）。12時方向を0として時計回りに [0, 360)
+    angle: float
+    # マスクの画素数
+    area: int
+    # 輪郭点の主成分の標準偏差比（細長いほど大きい）
+    elongation: float
+    # 針の輪郭点 (N, 2) [x, y]
+    contour: np.ndarray
+    # YOLOの検出信頼度
+    score: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """輪郭点を除いた値を辞書に変換（キャッシュ・レスポンス用）"""
+        return {
+            "tip": [self.tip_x, self.tip_y],
+            "base": [self.base_x, self.base_y],
+            "angle": self.angle,
+            "area": self.area,
+            "elongation": self.elongation,
+            "score": self.score,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NeedleGeometry":
+        """to_dict() の辞書から復元（輪郭点は空）"""
+        return cls(
+            tip_x=data["tip"][0],
+            tip_y=data["tip"][1],
+            base_x=data["base"][0],
+            base_y=data["base"][1],
+            angle=data["angle"],
+            area=data["area"],
+            elongation=data["elongation"],
+            contour=np.empty((0, 2), dtype=np.int32),
+            score=data["score"],
+        )
+
+
+@dataclass
+class LetterboxTransform:
+    """
+    元画像とモデル出力マスク（レターボックス済み）の座標変換
+
+    マスク座標 = 画像座標 * gain + pad
+    """
+
+    gain: float
+    pad_x: float
+    pad_y: float
+
+    @classmethod
+    def from_shapes(
+        cls, image_shape: Tuple[int, int], mask_shape: Tuple[int, int]
+    ) -> "LetterboxTransform":
+        """
+        画像サイズとマスクサイズから変換を求める
+
+        Args:
+            image_shape: 元画像の (高さ, 幅)
+            mask_shape: マスクの (高さ, 幅)
+
+        Returns:
+            座標変換
+        """
+        h, w = image_shape[:2]
+        mh, mw = mask_shape[:2]
+        gain = min(mh / h, mw / w)
+        return cls(gain=gain, pad_x=(mw - w * gain) / 2, pad_y=(mh - h * gain) / 2)
+
+    def to_mask(self, x: float, y: float) -> Tuple[float, float]:
+        """画像座標をマスク座標に変換"""
+        return x * self.gain + self.pad_x, y * self.gain + self.pad_y
+
+    def to_image(self, x: float, y: float) -> Tuple[float, float]:
+        """マスク座標を画像座標に変換"""
+        return (x - self.pad_x) / self.gain, (y - self.pad_y) / self.gain
+
+    def pixel_to_mask(self, x: float, y: float) -> Tuple[float, float]:
+        """
+        画像の画素番号をマスクの画素番号に変換
+
+        画素の中心同士を対応させる（cv2.resize と同じ）。to_mask() は画素の
+        左上の角を基準にした座標のため、縮小率が大きいと半画素ずれる。
+        """
+        return (
+            (x + 0.5) * self.gain + self.pad_x - 0.5,
+            (y + 0.5) * self.gain + self.pad_y - 0.5,
+        )
+
+    def pixel_to_image(self, x: float, y: float) -> Tuple[float, float]:
+        """マスクの画素番号を画像の画素番号に変換（pixel_to_mask() の逆変換）"""
+        return (
+            (x + 0.5 - self.pad_x) / self.gain - 0.5,
+            (y + 0.5 - self.pad_y) / self.gain - 0.5,
+        )
+
+    def mask_to_image(self, mask: np.ndarray, image_shape: Tuple[int, int]) -> np.ndarray:
+        """
+        マスクのパディングを除去して画像サイズに拡大
+
+        Args:
+            mask: モデル出力マスク
+            image_shape: 元画像の (高さ, 幅)
+
+        Returns:
+            画像サイズのマスク
+        """
+        h, w = image_shape[:2]
+        mh, mw = mask.shape[:2]
+        top, left = int(self.pad_y), int(self.pad_x)
+        bottom, right = int(mh - self.pad_y), int(mw - self.pad_x)
+        return cv2.resize(mask[top:bottom, left:right], (w, h))
+
+    def mask_roi_to_image(
+        self,
+        mask: np.ndarray,
+        roi: Tuple[int, int, int, int],
+        image_shape: Tuple[int, int],
+    ) -> Tuple[int, int, np.ndarray]:
+        """
+        マスクの矩形領域だけを画像解像度に拡大
+
+        Args:
+            mask: モデル出力マスク
+            roi: マスク座標の矩形 (x, y, 幅, 高さ)
+            image_shape: 元画像の (高さ, 幅)
+
+        Returns:
+            (x0, y0, 拡大したマスク): 画像座標での左上位置と矩形領域のマスク
+        """
+        h, w = image_shape[:2]
+        rx, ry, rw, rh = roi
+        x0, y0 = self.to_image(rx - 1, ry - 1)
+        x1, y1 = self.to_image(rx + rw + 1, ry + rh + 1)
+        x0, y0 = max(0, int(math.floor(x0))), max(0, int(math.floor(y0)))
+        x1, y1 = min(w, int(math.ceil(x1))), min(h, int(math.ceil(y1)))
+
+        # 出力画素 (x, y) の中心に対応するマスク座標を参照（cv2.resizeと同じ画素中心合わせ）
+        matrix = np.array(
+            [
+                [self.gain, 0, (x0 + 0.5) * self.gain - 0.5 + self.pad_x],
+                [0, self.gain, (y0 + 0.5) * self.gain - 0.5 + self.pad_y],
+            ],
+            dtype=np.float64,
+        )
+        roi_mask = cv2.warpAffine(
+            mask,
+            matrix,
+            (max(0, x1 - x0), max(0, y1 - y0)),
+            flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+        )
+        return x0, y0, roi_mask
+
+
+def extract_needle_contour(binary: np.ndarray) -> Optional[np.ndarray]:
+    """
+    2値マスクから針の輪郭点を抽出
+
+    Args:
+        binary: 針の2値マスク (uint8, 0 or 1)
+
+    Returns:
+        輪郭点 (N, 2) [x, y]。針が無い場合はNone
+    """
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+
+    if len(contours) == 0:
+        return None
+
+    return np.concatenate(contours).reshape(-1, 2)
+
+
+def vector_to_angle(dx: float, dy: float) -> float:
+    """
+    画像座標系のベクトルを針の角度に変換
+
+    Args:
+        dx: x方向成分（右が正）
+        dy: y方向成分（下が正）
+
+    Returns:
+        12時方向を0として時計回りの角度（度） [0, 360)
+    """
+    return math.degrees(math.atan2(dx, -dy)) % 360.0
+
+
+def angle_difference(a: float, b: float) -> float:
+    """2つの角度（度）の差の絶対値 [0, 180]"""
+    return abs((a - b + 180.0) % 360.0 - 180.0)
+
+
+def analyze_needle(
+    mask: np.ndarray,
+    center_x: float,
+    center_y: float,
+    threshold: float = 0.5,
+) -> Optional[NeedleGeometry]:
+    """
+    マスクから針の先端・基部・角度を求める
+
+    先端と基部はマスクの画素のうちゲージ中心から最も遠い点・最も近い点とし、
+    角度は輪郭点の主成分分析で求めた針の軸を先端側に向けたものとする。
+    最も遠い点・近い点は輪郭上にあるため輪郭点だけから求めるが、ゲージ中心が
+    マスクの内側にある場合（針の軸がゲージ中心を覆う場合）は、最も近い画素は
+    中心の画素自身になるため基部とする。
+
+    Args:
+        mask: 針のセグメンテーションマスク
+        center_x: ゲージ中心のx座標
+        center_y: ゲージ中心のy座標
+        threshold: 2値化の閾値
+
+    Returns:
+        針のジオメトリ。針が無い場合はNone
+    """
+    binary = (mask > threshold).astype(np.uint8)
+    contour = extract_needle_contour(binary)
+    if contour is None:
+        return None
+
+    points = contour.astype(np.float64)
+    dist_sq = (points[:, 0] - center_x) ** 2 + (points[:, 1] - center_y) ** 2
+    tip_x, tip_y = contour[np.argmax(dist_sq)]
+    base_x, base_y = contour[np.argmin(dist_sq)]
+    # ゲージ中心がマスクの内側にある場合は中心の画素を基部とする
+    pixel_x, pixel_y = int(round(center_x)), int(round(center_y))
+    if 0 <= pixel_y < binary.shape[0] and 0 <= pixel_x < binary.shape[1] and binary[pixel_y, pixel_x]:
+        base_x, base_y = pixel_x, pixel_y
+
+    # 輪郭点の主成分分析で針の軸方向を求める
+    axis_x, axis_y = float(tip_x - base_x), float(tip_y - base_y)
+    elongation = 1.0
+    if len(points) >= 3:
+        eigenvalues, eigenvectors = np.linalg.eigh(np.cov(points, rowvar=False))
+        major_x, major_y = eigenvectors[:, 1]
+        # 軸の向きを基部→先端に揃える
+        if major_x * axis_x + major_y * axis_y < 0:
+            major_x, major_y = -major_x, -major_y
+        if eigenvalues[1] > 0:
+            axis_x, axis_y = float(major_x), float(major_y)
+            elongation = math.sqrt(eigenvalues[1] / max(eigenvalues[0], 1e-6))
+
+    # 輪郭が1点しかない場合などは中心→先端の向きを使う
+    if axis_x == 0 and axis_y == 0:
+        axis_x, axis_y = float(tip_x - center_x), float(tip_y - center_y)
+
+    return NeedleGeometry(
+        tip_x=int(tip_x),
+        tip_y=int(tip_y),
+        base_x=int(base_x),
+        base_y=int(base_y),
+        angle=vector_to_angle(axis_x, axis_y),
+        area=int(cv2.countNonZero(binary)),
+        elongation=float(elongation),
+        contour=contour,
+    )
+
+
+def map_geometry_to_image(
+    geometry: NeedleGeometry, transform: LetterboxTransform
+) -> NeedleGeometry:
+    """
+    マスク座標で求めたジオメトリを画像座標に変換
+
+    Args:
+        geometry: マスク座標の針のジオメトリ
+        transform: レターボックス変換
+
+    Returns:
+        画像座標の針のジオメトリ（角度と細長さは縦横等倍のため変わらない）
+    """
+    tip_x, tip_y = transform.pixel_to_image(geometry.tip_x, geometry.tip_y)
+    base_x, base_y = transform.pixel_to_image(geometry.base_x, geometry.base_y)
+    contour = np.empty_like(geometry.contour)
+    contour_x, contour_y = transform.pixel_to_image(geometry.contour[:, 0], geometry.contour[:, 1])
+    contour[:, 0] = np.round(contour_x)
+    contour[:, 1] = np.round(contour_y)
+
+    return replace(
+        geometry,
+        tip_x=int(round(tip_x)),
+        tip_y=int(round(tip_y)),
+        base_x=int(round(base_x)),
+        base_y=int(round(base_y)),
+        area=int(round(geometry.area / (transform.gain ** 2))),
+        contour=contour,
+    )
+
+
+def translate_geometry(geometry: NeedleGeometry, dx: int, dy: int) -> NeedleGeometry:
+    """
+    切り抜いた画像で求めたジオメトリを元画像の座標に平行移動
+
+    Args:
+        geometry: 切り抜いた画像の座標の針のジオメトリ
+        dx, dy: 切り抜いた領域の左上座標
+
+    Returns:
+        元画像の座標の針のジオメトリ（角度・面積・細長さは変わらない）
+    """
+    return replace(
+        geometry,
+        tip_x=geometry.tip_x + dx,
+        tip_y=geometry.tip_y + dy,
+        base_x=geometry.base_x + dx,
+        base_y=geometry.base_y + dy,
+        contour=geometry.contour + np.array([dx, dy], dtype=geometry.contour.dtype),
+    )
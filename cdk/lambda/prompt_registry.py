@@ -0,0 +1,151 @@
+"""
+プロンプトテンプレートのレジストリモジュール
+名前付きのシステムプロンプトと参考画像（few-shot）をディレクトリから読み込む
+
+テンプレートは次のいずれかの形式で置く。
+    <name>.txt:  システムプロンプトのみ
+    <name>.json: {"system": "..." または "systemFile": "needle.txt",
+                  "examples": [{"image": "examples/0001.png", "text": "参考画像の説明"}, ...]}
+                 image と systemFile はJSONファイルからの相対パス
+
+参考画像はBase64エンコードした状態で保持し、呼び出しごとに読み込み・
+エンコードしない。システムプロンプトと参考画像はすべての呼び出しで同じ
+内容のため、Bedrockのプロンプトキャッシュの対象にできる。
+"""
+import base64
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from image_codec import MEDIA_TYPES, normalize_format
+
+
+@dataclass
+class PromptExample:
+    """参考画像と説明"""
+
+    # Base64エンコードされた画像
+    image_base64: str
+    # メディアタイプ
+    media_type: str
+    # 画像の説明（読み取り値など）
+    text: str
+    # 内容のハッシュ（処理結果キャッシュのキーに使用）
+    digest: str = field(default="", compare=False)
+
+    def __post_init__(self):
+        if not self.digest:
+            content = f"{self.media_type}:{self.text}:{self.image_base64}"
+            self.digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class PromptTemplate:
+    """名前付きのプロンプトテンプレート"""
+
+    # テンプレート名
+    name: str
+    # システムプロンプト
+    system: str
+    # 参考画像（対象画像の前に送る）
+    examples: List[PromptExample] = field(default_factory=list)
+
+
+def load_example(base_dir: Path, entry: Dict[str, str]) -> PromptExample:
+    """
+    参考画像を読み込む
+
+    Args:
+        base_dir: 相対パスの基準ディレクトリ
+        entry: {"image": "画像ファイルのパス", "text": "画像の説明"}
+
+    Returns:
+        参考画像
+    """
+    path = base_dir / entry["image"]
+    format = normalize_format(path.suffix.lstrip("."))
+    return PromptExample(
+        image_base64=base64.b64encode(path.read_bytes()).decode("utf-8"),
+        media_type=MEDIA_TYPES[format],
+        text=entry.get("text", ""),
+    )
+
+
+def load_template(path: Path) -> PromptTemplate:
+    """
+    テンプレートファイルを読み込む
+
+    Args:
+        path: .txt または .json のテンプレートファイル
+
+    Returns:
+        プロンプトテンプレート
+    """
+    if path.suffix == ".txt":
+        return PromptTemplate(name=path.stem, system=path.read_text(encoding="utf-8").strip())
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if "systemFile" in data:
+        system = (path.parent / data["systemFile"]).read_text(encoding="utf-8").strip()
+    else:
+        system = data.get("system", "")
+    examples = [load_example(path.parent, entry) for entry in data.get("examples", [])]
+    return PromptTemplate(name=path.stem, system=system, examples=examples)
+
+
+class PromptRegistry:
+    """名前付きのプロンプトテンプレートの集合"""
+
+    def __init__(self, templates: Optional[Dict[str, PromptTemplate]] = None):
+        """
+        初期化
+
+        Args:
+            templates: テンプレート名をキーとしたテンプレート
+        """
+        self.templates = dict(templates or {})
+
+    @classmethod
+    def from_directory(cls, directory: str) -> "PromptRegistry":
+        """
+        ディレクトリ直下の .txt / .json をテンプレートとして読み込む
+
+        同じ名前の .txt と .json がある場合は .json を使う。
+
+        Args:
+            directory: テンプレートのディレクトリ（存在しない場合は空のレジストリ）
+
+        Returns:
+            レジストリ
+        """
+        templates = {}
+        root = Path(directory)
+        if root.is_dir():
+            for path in sorted(root.glob("*.txt")) + sorted(root.glob("*.json")):
+                templates[path.stem] = load_template(path)
+        return cls(templates)
+
+    def get(self, name: str) -> PromptTemplate:
+        """
+        テンプレートを取得
+
+        Args:
+            name: テンプレート名
+
+        Returns:
+            テンプレート
+
+        Raises:
+            ValueError: テンプレートが無い場合
+        """
+        if name not in self.templates:
+            raise ValueError(
+                f"プロンプトテンプレート '{name}' が見つかりません（{sorted(self.templates)}）"
+            )
+        return self.templates[name]
+
+    def names(self) -> List[str]:
+        """テンプレート名の一覧"""
+        return sorted(self.templates)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+YOLOモデルのINT8静的量子化スクリプト
+
+export_model.py でエクスポートしたFP32のONNXモデルを、圧力計画像で
+キャリブレーションしてINT8に量子化します（ONNX Runtimeの静的量子化）。
+量子化したモデルは evaluate_model.py で精度を確認してから使用してください。
+
+使用例:
+    python quantize_model.py best.onnx --calibration-dir ../../sample_images --output best_int8.onnx
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import cv2
+import numpy as np
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    CalibrationMethod,
+    QuantFormat,
+    QuantType,
+    quantize_static,
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from inference_backends import OnnxRuntimeBackend
+
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg")
+
+
+def list_images(image_dir: Path) -> List[Path]:
+    """
+    ディレクトリ内の画像ファイルを列挙
+
+    Args:
+        image_dir: 画像ディレクトリ
+
+    Returns:
+        画像ファイルパスのリスト（ファイル名順）
+    """
+    return sorted(p for p in image_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+
+
+class GaugeCalibrationDataReader(CalibrationDataReader):
+    """圧力計画像をモデル入力に変換して返すキャリブレーションデータリーダー"""
+
+    def __init__(self, backend: OnnxRuntimeBackend, image_paths: List[Path]):
+        """
+        初期化
+
+        Args:
+            backend: 入力名・入力サイズ取得用にロード済みのFP32モデル
+            image_paths: キャリブレーション画像のパス
+        """
+        self.backend = backend
+        self.image_paths = image_paths
+        self._iterator: Optional[Iterator[Dict[str, np.ndarray]]] = None
+
+    def _inputs(self) -> Iterator[Dict[str, np.ndarray]]:
+        """画像を1枚ずつレターボックスして入力テンソルにする"""
+        for path in self.image_paths:
+            image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if image is None:
+                print(f"[WARN] 画像を読み込めませんでした: {path}", file=sys.stderr)
+                continue
+            yield {self.backend.input_name: self.backend.preprocess([image])}
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        """次のキャリブレーション入力を返す（全件返した後はNone）"""
+        if self._iterator is None:
+            self._iterator = self._inputs()
+        return next(self._iterator, None)
+
+    def rewind(self) -> None:
+        """先頭に戻す"""
+        self._iterator = None
+
+
+def quantize_model(
+    model_path: Path,
+    calibration_dir: Path,
+    output: Path,
+    per_channel: bool = True,
+    exclude_nodes: List[str] = None,
+) -> Path:
+    """
+    ONNXモデルをINT8に静的量子化
+
+    Args:
+        model_path: FP32のONNXモデル
+        calibration_dir: キャリブレーション画像のディレクトリ
+        output: 出力先パス
+        per_channel: 重みをチャネルごとに量子化するかどうか
+        exclude_nodes: 量子化しないノード名（精度が落ちやすい出力ヘッドなど）
+
+    Returns:
+        量子化したモデルのパス
+    """
+    image_paths = list_images(calibration_dir)
+    if not image_paths:
+        raise FileNotFoundError(f"キャリブレーション画像が見つかりません: {calibration_dir}")
+
+    backend = OnnxRuntimeBackend(str(model_path))
+    backend.load()
+
+    # 量子化前にシェイプ推論とグラフ最適化を行う（推奨手順）
+    preprocessed = output.with_name(output.stem + "_preprocessed.onnx")
+    quant_pre_process(str(model_path), str(preprocessed))
+
+    try:
+        quantize_static(
+            model_input=str(preprocessed),
+            model_output=str(output),
+            calibration_data_reader=GaugeCalibrationDataReader(backend, image_paths),
+            quant_format=QuantFormat.QDQ,
+            per_channel=per_channel,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=exclude_nodes or [],
+        )
+    finally:
+        preprocessed.unlink(missing_ok=True)
+
+    print(f"[INFO] キャリブレーション画像: {len(image_paths)}枚")
+    return output
+
+
+def main() -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='YOLOモデルのINT8静的量子化スクリプト')
+    parser.add_argument('model', type=Path, help='FP32のONNXモデル (best.onnx)')
+    parser.add_argument(
+        '--calibration-dir',
+        type=Path,
+        required=True,
+        help='キャリブレーション画像のディレクトリ（例: ../../sample_images）'
+    )
+    parser.add_argument(
+        '--output',
+        type=Path,
+        default=None,
+        help='出力先パス（デフォルト: <モデル名>_int8.onnx）'
+    )
+    parser.add_argument(
+        '--per-tensor',
+        action='store_true',
+        help='重みをテンソル単位で量子化する（デフォルト: チャネル単位）'
+    )
+    parser.add_argument(
+        '--exclude-node',
+        action='append',
+        default=[],
+        help='量子化しないノード名（複数指定可）'
+    )
+
+    args = parser.parse_args()
+
+    if not args.model.exists():
+        print(f"[ERROR] モデルファイルが見つかりません: {args.model}", file=sys.stderr)
+        return 1
+
+    output = args.output or args.model.with_name(args.model.stem + '_int8.onnx')
+    quantized = quantize_model(
+        model_path=args.model,
+        calibration_dir=args.calibration_dir,
+        output=output,
+        per_channel=not args.per_tensor,
+        exclude_nodes=args.exclude_node,
+    )
+    print(f"[INFO] 量子化完了: {quantized}")
+    print(f"[INFO] 次のコマンドで精度を確認してください: "
+          f"python evaluate_model.py {args.model} {quantized} --image-dir {args.calibration_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
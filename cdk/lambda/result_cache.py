@@ -0,0 +1,260 @@
+"""
+処理結果キャッシュモジュール
+同じ（またはほぼ同じ）画像が繰り返し送られてくる場合に、YOLO前処理・
+画像エンコード・Bedrock呼び出しの結果を再利用する
+
+キーは画像内容のハッシュ（SHA-256、またはオプションで知覚ハッシュ）と
+処理設定から作り、値はバイト列で保存する。保存先は次から選択できる。
+    memory: プロセス内メモリ（ウォームなLambda実行環境で再利用）
+    disk:   ローカルディスク（/tmp など。共有ストレージへの置き換えも可能）
+"""
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+
+CACHE_BACKENDS = ("none", "memory", "disk")
+
+
+def content_hash(image: np.ndarray) -> str:
+    """
+    画像のバイト列が完全に一致する場合のみ同じになるハッシュ
+
+    Args:
+        image: 画像 (BGR)
+
+    Returns:
+        SHA-256の16進文字列
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{image.shape}:{image.dtype}".encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+def perceptual_hash(image: np.ndarray, hash_size: int = 16) -> str:
+    """
+    差分ハッシュ（dHash）: 圧縮ノイズ程度の違いしかない画像は同じ値になる
+
+    縮小したグレースケール画像で隣接画素の明暗を比較するため、針が
+    縮小後の1画素に満たないほどしか動いていない画像も同じ値になる。
+    hash_size を大きくするほど小さな違いを区別する。
+
+    Args:
+        image: 画像 (BGR)
+        hash_size: ハッシュの一辺の大きさ（ビット数は hash_size^2）
+
+    Returns:
+        ハッシュの16進文字列
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return f"{hash_size}:" + np.packbits(bits).tobytes().hex()
+
+
+def make_key(namespace: str, **parts: Any) -> str:
+    """
+    名前空間と構成要素からキャッシュキーを作成
+
+    Args:
+        namespace: キーの種類（"image", "llm" など）
+        **parts: キーに含める値（JSONにシリアライズ可能なもの）
+
+    Returns:
+        キャッシュキー
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return f"{namespace}-{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+@dataclass
+class CacheStats:
+    """1回の呼び出しでのキャッシュのヒット・ミス数（名前空間ごと）"""
+
+    counts: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, namespace: str, hit: bool) -> None:
+        """ヒットまたはミスを記録（複数スレッドから呼び出し可能）"""
+        with self._lock:
+            entry = self.counts.setdefault(namespace, {"hits": 0, "misses": 0})
+            entry["hits" if hit else "misses"] += 1
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        """レスポンス用の辞書に変換"""
+        with self._lock:
+            return {namespace: dict(entry) for namespace, entry in self.counts.items()}
+
+
+class CacheBackend:
+    """キャッシュの保存先の基底クラス（get / put を実装すれば共有キャッシュにも置き換え可能）"""
+
+    name = ""
+
+    def __init__(self, max_bytes: int):
+        """
+        初期化
+
+        Args:
+            max_bytes: 保存する値の合計サイズの上限（超えた場合は古いものから削除）
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # ヒット・ミス数と保存先の状態を保護するロック（get / put は複数スレッドから呼ばれる）
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        値を取得
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            保存された値。無い場合はNone
+        """
+        value = self._get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        """
+        値を保存
+
+        Args:
+            key: キャッシュキー
+            value: 保存する値（上限より大きい値は保存しない）
+        """
+        if len(value) <= self.max_bytes:
+            self._put(key, value)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def _put(self, key: str, value: bytes) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """プロセス内メモリのLRUキャッシュ"""
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int):
+        super().__init__(max_bytes)
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _put(self, key: str, value: bytes) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+class DiskCache(CacheBackend):
+    """
+    ディレクトリにキーごとのファイルとして保存するLRUキャッシュ
+
+    最終アクセス時刻としてファイルの更新時刻を使う。
+    """
+
+    name = "disk"
+
+    def __init__(self, max_bytes: int, directory: str = "/tmp/gauge-cache"):
+        super().__init__(max_bytes)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._size = sum(p.stat().st_size for p in self.directory.glob("*.bin"))
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.bin"
+
+    def _get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            value = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return value
+
+    def _put(self, key: str, value: bytes) -> None:
+        path = self._path(key)
+        # 書き込み途中のファイルを読まないよう一時ファイルから置き換える
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(value)
+        with self._lock:
+            if path.exists():
+                self._size -= path.stat().st_size
+            os.replace(tmp_path, path)
+            self._size += len(value)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """更新時刻の古いファイルから上限以下になるまで削除"""
+        files = []
+        for path in self.directory.glob("*.bin"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        self._size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files, key=lambda f: f[0]):
+            if self._size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= size
+
+
+def create_cache(
+    backend: str,
+    max_bytes: int,
+    directory: str = "/tmp/gauge-cache",
+) -> Optional[CacheBackend]:
+    """
+    キャッシュの保存先を作成
+
+    Args:
+        backend: 保存先名 ("none", "memory", "disk")
+        max_bytes: 保存する値の合計サイズの上限
+        directory: diskの保存先ディレクトリ
+
+    Returns:
+        キャッシュ。"none" の場合はNone
+    """
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryCache(max_bytes)
+    if backend == "disk":
+        return DiskCache(max_bytes, directory)
+    raise ValueError(f"キャッシュの保存先は{CACHE_BACKENDS}のいずれかを指定してください: {backend}")
@@ -0,0 +1,155 @@
+"""
+ゲージ領域（ROI）の追跡モジュール
+固定カメラではゲージが毎フレームほぼ同じ位置に写るため、針を検出できた
+画像からゲージ中心と針の長さで正方形の領域を求め、カメラ・動画のIDごとに
+保持する。2回目以降の画像はこの領域を切り抜いてYOLOで推論し、高解像度の
+画像全体の縮小とマスクの拡大を省略する。
+
+領域はモデルの入力サイズ（min_size）以上とし、小さな文字盤を拡大しない
+（レターボックスの縮小率が1以下になる）。針を見失った場合は領域を破棄し、
+呼び出し側が画像全体で推論し直す。
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from needle_geometry import NeedleGeometry
+
+# 領域 (x0, y0, x1, y1)（画像座標、x1・y1は含まない）
+Region = Tuple[int, int, int, int]
+
+
+def roi_from_needles(
+    needles: List[NeedleGeometry],
+    center: Tuple[int, int],
+    shape: Tuple[int, ...],
+    padding: float = 0.25,
+    min_size: int = 640,
+) -> Optional[Region]:
+    """
+    針のジオメトリから推論に使う領域を求める
+
+    針はゲージ中心の周りを回るため、中心から針の先端までの距離を半径とした
+    正方形に余白を加える。画像からはみ出す場合は画像内に収まるよう平行移動する。
+
+    Args:
+        needles: 画像座標の針のジオメトリ
+        center: ゲージ中心 (x, y)
+        shape: 画像の形状
+        padding: 半径に対する余白の割合
+        min_size: 領域の一辺の最小値（モデルの入力サイズ）
+
+    Returns:
+        領域。針が無い場合や、領域が画像全体になる場合はNone
+    """
+    if not needles:
+        return None
+
+    h, w = shape[:2]
+    cx, cy = center
+    radius = max(
+        max(abs(n.tip_x - cx), abs(n.tip_y - cy), abs(n.base_x - cx), abs(n.base_y - cy))
+        for n in needles
+    )
+    size = max(int(2 * radius * (1 + padding)), min_size)
+    if size >= w and size >= h:
+        return None
+
+    region_w, region_h = min(size, w), min(size, h)
+    x0 = min(max(0, int(cx - region_w / 2)), w - region_w)
+    y0 = min(max(0, int(cy - region_h / 2)), h - region_h)
+    return x0, y0, x0 + region_w, y0 + region_h
+
+
+class RoiTracker:
+    """カメラ・動画のIDごとに推論に使う領域を保持"""
+
+    def __init__(self, padding: float = 0.25, min_size: int = 640, max_streams: int = 256):
+        """
+        初期化
+
+        Args:
+            padding: 半径に対する余白の割合
+            min_size: 領域の一辺の最小値（モデルの入力サイズ）
+            max_streams: 領域を保持するカメラ・動画数の上限
+        """
+        self.padding = padding
+        self.min_size = min_size
+        self.max_streams = max_streams
+        self._regions: "OrderedDict[Tuple[str, Tuple[int, ...]], Region]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 領域で推論した回数と、針を見失って画像全体で推論し直した回数
+        self.hits = 0
+        self.fallbacks = 0
+
+    def get(self, stream_id: Optional[str], shape: Tuple[int, ...]) -> Optional[Region]:
+        """
+        推論に使う領域を取得
+
+        Args:
+            stream_id: カメラ・動画のID（Noneの場合は追跡しない）
+            shape: 画像の形状
+
+        Returns:
+            領域。保持していない場合はNone
+        """
+        if stream_id is None:
+            return None
+        key = (stream_id, shape[:2])
+        with self._lock:
+            region = self._regions.get(key)
+            if region is not None:
+                self._regions.move_to_end(key)
+            return region
+
+    def update(
+        self,
+        stream_id: Optional[str],
+        shape: Tuple[int, ...],
+        needles: List[NeedleGeometry],
+        center: Tuple[int, int],
+    ) -> Optional[Region]:
+        """
+        針を検出した結果から領域を更新（針が無い場合は破棄）
+
+        Args:
+            stream_id: カメラ・動画のID（Noneの場合は何もしない）
+            shape: 画像の形状
+            needles: 画像座標の針のジオメトリ
+            center: 画像座標のゲージ中心 (x, y)
+
+        Returns:
+            更新後の領域
+        """
+        if stream_id is None:
+            return None
+        region = roi_from_needles(needles, center, shape, self.padding, self.min_size)
+        key = (stream_id, shape[:2])
+        with self._lock:
+            if region is None:
+                self._regions.pop(key, None)
+                return None
+            self._regions[key] = region
+            self._regions.move_to_end(key)
+            while len(self._regions) > self.max_streams:
+                self._regions.popitem(last=False)
+        return region
+
+    def record(self, fallback: bool) -> None:
+        """領域で推論した結果（針を見失ったかどうか）を記録"""
+        with self._lock:
+            if fallback:
+                self.fallbacks += 1
+            else:
+                self.hits += 1
+
+    def forget(self, stream_id: str) -> None:
+        """カメラの領域を破棄（カメラの向きを変えた場合など）"""
+        with self._lock:
+            for key in [key for key in self._regions if key[0] == stream_id]:
+                del self._regions[key]
+
+    def to_dict(self) -> Dict[str, int]:
+        """ログ・ベンチマーク用の辞書に変換"""
+        with self._lock:
+            return {"streams": len(self._regions), "hits": self.hits, "fallbacks": self.fallbacks}
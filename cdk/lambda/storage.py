@@ -0,0 +1,274 @@
+"""
+画像オブジェクトのストレージモジュール
+入力画像・前処理済み画像をイベントにBase64で埋め込む代わりに、オブジェクトの
+参照（URI）でやり取りする
+
+URIの形式:
+    s3://<bucket>/<key>      S3オブジェクト
+    file:///path/to/image    ローカルファイル（スキームを省略したパスも可。相対パスは root からのパス）
+
+ローカルファイルは root ディレクトリ（環境変数 LOCAL_STORAGE_ROOT、デフォルト: /tmp）
+の配下のみ読み書きできる。/tmp にはキャッシュや他のリクエストの一時ファイルがあるため、
+デフォルトの保存先（STORAGE_BACKENDS）はS3のみとし、ローカルファイルはスクリプト・
+ローカル実行で明示的に有効にした場合（LOCAL_STORAGE_BACKENDS）のみ使う。保存先は
+ObjectStorage を継承して read / write を実装すれば追加できる。
+"""
+import os
+import shutil
+import threading
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Callable, Dict, Tuple
+from urllib.parse import urlparse
+
+STORAGE_SCHEMES = ("s3", "file")
+
+# read_to_file() で一度に読み書きするバイト数
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def parse_uri(uri: str) -> Tuple[str, str, str]:
+    """
+    URIをスキーム・バケット・キー（パス）に分解
+
+    Args:
+        uri: "s3://bucket/key", "file:///path" またはローカルパス
+
+    Returns:
+        (スキーム, バケット, キー)。ローカルファイルのバケットは空文字列
+
+    Raises:
+        ValueError: 対応していないURIの場合
+    """
+    parsed = urlparse(uri)
+    scheme = parsed.scheme or "file"
+    if scheme not in STORAGE_SCHEMES:
+        raise ValueError(f"URIのスキームは{STORAGE_SCHEMES}のいずれかを指定してください: {uri}")
+    if scheme == "s3":
+        key = parsed.path.lstrip("/")
+        if not parsed.netloc or not key:
+            raise ValueError(f"S3のURIは s3://<bucket>/<key> の形式で指定してください: {uri}")
+        return scheme, parsed.netloc, key
+    return scheme, "", parsed.path if parsed.scheme else uri
+
+
+def derive_output_uri(input_uri: str, extension: str, prefix: str = None) -> str:
+    """
+    入力画像のURIから前処理済み画像の保存先URIを作成
+
+    Args:
+        input_uri: 入力画像のURI
+        extension: 前処理済み画像の拡張子（"png" など）
+        prefix: 保存先のURIプレフィックス（"s3://bucket/processed/" など。
+            省略時は入力画像と同じ場所）
+
+    Returns:
+        "<prefix または入力画像の場所><入力画像のファイル名>.processed.<extension>"
+    """
+    _, _, key = parse_uri(input_uri)
+    name = f"{PurePosixPath(key).stem}.processed.{extension}"
+    if prefix:
+        return prefix + name if prefix.endswith("/") else f"{prefix}/{name}"
+    return input_uri[:len(input_uri) - len(PurePosixPath(key).name)] + name
+
+
+class ObjectStorage:
+    """保存先の基底クラス"""
+
+    scheme = ""
+
+    def __init__(self):
+        # 読み書きしたバイト数（ログ・ベンチマーク用）
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+
+    def read(self, uri: str) -> bytes:
+        """
+        オブジェクトを読み込む
+
+        Args:
+            uri: オブジェクトのURI
+
+        Returns:
+            オブジェクトのバイト列
+        """
+        _, bucket, key = parse_uri(uri)
+        data = self._read(bucket, key)
+        with self._lock:
+            self.bytes_read += len(data)
+        return data
+
+    def read_to_file(self, uri: str, fileobj: BinaryIO) -> int:
+        """
+        オブジェクトをファイルに少しずつ書き出す（オブジェクト全体をメモリに読み込まない）
+
+        Args:
+            uri: オブジェクトのURI
+            fileobj: 書き込み先のファイル（バイナリモード）
+
+        Returns:
+            書き込んだバイト数
+        """
+        _, bucket, key = parse_uri(uri)
+        start = fileobj.tell()
+        self._read_to_file(bucket, key, fileobj)
+        size = fileobj.tell() - start
+        with self._lock:
+            self.bytes_read += size
+        return size
+
+    def write(self, uri: str, data: bytes, content_type: str) -> None:
+        """
+        オブジェクトを書き込む
+
+        Args:
+            uri: オブジェクトのURI
+            data: 書き込むバイト列
+            content_type: メディアタイプ
+        """
+        _, bucket, key = parse_uri(uri)
+        self._write(bucket, key, data, content_type)
+        with self._lock:
+            self.bytes_written += len(data)
+
+    def _read(self, bucket: str, key: str) -> bytes:
+        raise NotImplementedError
+
+    def _read_to_file(self, bucket: str, key: str, fileobj: BinaryIO) -> None:
+        fileobj.write(self._read(bucket, key))
+
+    def _write(self, bucket: str, key: str, data: bytes, content_type: str) -> None:
+        raise NotImplementedError
+
+
+class LocalStorage(ObjectStorage):
+    """ローカルファイル（root ディレクトリの配下のみ）"""
+
+    scheme = "file"
+
+    def __init__(self, root: str = None):
+        """
+        初期化
+
+        Args:
+            root: 読み書きを許可するディレクトリ（省略時は環境変数 LOCAL_STORAGE_ROOT）
+        """
+        super().__init__()
+        self.root = Path(root or os.environ.get("LOCAL_STORAGE_ROOT", "/tmp")).resolve()
+
+    def _path(self, key: str) -> Path:
+        # 相対パスは root からのパスとし、".." やシンボリックリンクを解決した後の
+        # パスが root の配下にあるかを確認する
+        path = (self.root / key).resolve()
+        if path != self.root and self.root not in path.parents:
+            raise ValueError(f"{self.root} の外のファイルは読み書きできません: {key}")
+        return path
+
+    def _read(self, bucket: str, key: str) -> bytes:
+        return self._path(key).read_bytes()
+
+    def _read_to_file(self, bucket: str, key: str, fileobj: BinaryIO) -> None:
+        with open(self._path(key), "rb") as source:
+            shutil.copyfileobj(source, fileobj, COPY_CHUNK_SIZE)
+
+    def _write(self, bucket: str, key: str, data: bytes, content_type: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 書き込み途中のファイルを読まないよう一時ファイルから置き換える
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+
+class S3Storage(ObjectStorage):
+    """S3オブジェクト"""
+
+    scheme = "s3"
+
+    def __init__(self, client=None):
+        """
+        初期化
+
+        Args:
+            client: S3クライアント（省略時は初回の読み書き時に作成）
+        """
+        super().__init__()
+        self._client = client
+
+    @property
+    def client(self):
+        """S3クライアント"""
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("s3")
+        return self._client
+
+    def _read(self, bucket: str, key: str) -> bytes:
+        # Base64を経由せずにレスポンスのストリームからそのまま読み込む
+        return self.client.get_object(Bucket=bucket, Key=key)["Body"].read()
+
+    def _read_to_file(self, bucket: str, key: str, fileobj: BinaryIO) -> None:
+        # 分割してダウンロードし、受信したチャンクから順にファイルに書き込む
+        self.client.download_fileobj(bucket, key, fileobj)
+
+    def _write(self, bucket: str, key: str, data: bytes, content_type: str) -> None:
+        self.client.put_object(Bucket=bucket, Key=key, Body=data, ContentType=content_type)
+
+
+# デフォルトの保存先
+STORAGE_BACKENDS: Dict[str, Callable[[], ObjectStorage]] = {
+    "s3": S3Storage,
+}
+
+# 明示的に有効にした場合のみ使う保存先（ローカル実行・スクリプト用）
+LOCAL_STORAGE_BACKENDS: Dict[str, Callable[[], ObjectStorage]] = {
+    "file": LocalStorage,
+}
+
+
+class StorageRegistry:
+    """スキームごとの保存先（初回の利用時に作成し、クライアントを再利用する）"""
+
+    def __init__(self, backends: Dict[str, Callable[[], ObjectStorage]] = None):
+        """
+        初期化
+
+        Args:
+            backends: スキームをキーとした保存先の作成関数（省略時は STORAGE_BACKENDS）
+        """
+        self.backends = dict(backends if backends is not None else STORAGE_BACKENDS)
+        self._storages: Dict[str, ObjectStorage] = {}
+        self._lock = threading.Lock()
+
+    def get(self, uri: str) -> ObjectStorage:
+        """
+        URIの保存先を取得
+
+        Args:
+            uri: オブジェクトのURI
+
+        Returns:
+            保存先
+
+        Raises:
+            ValueError: スキームの保存先が有効でない場合
+        """
+        scheme, _, _ = parse_uri(uri)
+        if scheme not in self.backends:
+            raise ValueError(f"スキーム '{scheme}' のURIは使用できません: {uri}")
+        with self._lock:
+            if scheme not in self._storages:
+                self._storages[scheme] = self.backends[scheme]()
+            return self._storages[scheme]
+
+    def read(self, uri: str) -> bytes:
+        """URIのオブジェクトを読み込む"""
+        return self.get(uri).read(uri)
+
+    def read_to_file(self, uri: str, fileobj: BinaryIO) -> int:
+        """URIのオブジェクトをファイルに少しずつ書き出す"""
+        return self.get(uri).read_to_file(uri, fileobj)
+
+    def write(self, uri: str, data: bytes, content_type: str) -> None:
+        """URIにオブジェクトを書き込む"""
+        self.get(uri).write(uri, data, content_type)
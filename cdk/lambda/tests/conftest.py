@@ -0,0 +1,8 @@
+"""
+テスト共通設定
+Lambda関数のモジュール（cdk/lambda 直下）をインポートできるようにする
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
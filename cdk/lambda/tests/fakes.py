@@ -0,0 +1,115 @@
+"""
+テスト用のBedrock Runtimeクライアント・YOLOプロセッサーのフェイク
+（boto3・ultralytics を使わずに lambda_function の処理を検証する）
+"""
+import json
+import threading
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from yolo_processor import ProcessResult
+
+
+class FakeClientError(Exception):
+    """botocoreのClientErrorと同じ形式でエラーコードを参照できる例外"""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code, "Message": code}}
+
+
+class StreamFailure:
+    """ストリーミングでテキストを返した後にエラーイベントを返す応答"""
+
+    def __init__(self, text: str, code: str = "throttlingException"):
+        self.text = text
+        self.code = code
+
+
+# 応答: 回答テキスト、送出する例外、途中で失敗するストリーム、
+# またはリクエストボディから回答を返す関数
+Reply = Union[str, Exception, StreamFailure, Callable[[Dict[str, Any]], str]]
+
+
+def text_event(text: str) -> Dict[str, Any]:
+    """content_block_delta のイベント"""
+    chunk = {"type": "content_block_delta", "delta": {"type": "text_delta", "text": text}}
+    return {"chunk": {"bytes": json.dumps(chunk).encode("utf-8")}}
+
+
+class FakeBedrockClient:
+    """invoke_model / invoke_model_with_response_stream を実装した bedrock-runtime クライアントのフェイク"""
+
+    def __init__(self, replies: List[Reply], usage: Optional[Dict[str, Any]] = None):
+        """
+        初期化
+
+        Args:
+            replies: 呼び出しごとの応答（最後の応答は以降の呼び出しでも繰り返す）
+            usage: 応答の "usage"
+        """
+        self.replies = list(replies)
+        self.usage = usage if usage is not None else {"input_tokens": 10, "output_tokens": 5}
+        # 受け取ったリクエストボディ（呼び出し順）
+        self.requests: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def calls(self) -> int:
+        return len(self.requests)
+
+    def _reply(self, body: str) -> Tuple[Dict[str, Any], Union[str, StreamFailure]]:
+        request = json.loads(body)
+        with self._lock:
+            self.requests.append(request)
+            reply = self.replies[min(len(self.requests), len(self.replies)) - 1]
+        if isinstance(reply, Exception):
+            raise reply
+        return request, reply(request) if callable(reply) else reply
+
+    def invoke_model(self, modelId: str, body: str) -> Dict[str, Any]:
+        _, text = self._reply(body)
+        response = {"content": [{"type": "text", "text": text}], "usage": self.usage}
+        return {"body": BytesIO(json.dumps(response).encode("utf-8"))}
+
+    def invoke_model_with_response_stream(self, modelId: str, body: str) -> Dict[str, Any]:
+        _, reply = self._reply(body)
+        if isinstance(reply, StreamFailure):
+            events = [text_event(reply.text)] if reply.text else []
+            events.append({reply.code: {"message": reply.code}})
+        else:
+            start = {"type": "message_start", "message": {"usage": self.usage}}
+            delta = {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn"},
+                "usage": {"output_tokens": self.usage.get("output_tokens")},
+            }
+            events = [
+                {"chunk": {"bytes": json.dumps(start).encode("utf-8")}},
+                text_event(reply),
+                {"chunk": {"bytes": json.dumps(delta).encode("utf-8")}},
+            ]
+        return {"body": iter(events)}
+
+
+class FakeProcessor:
+    """iter_analyze_batch のみを実装したYOLOプロセッサーのフェイク"""
+
+    def __init__(self, needles_list: List[list]):
+        """
+        初期化
+
+        Args:
+            needles_list: 画像ごとに返す針のジオメトリのリスト
+        """
+        self.needles_list = needles_list
+
+    def iter_analyze_batch(self, images, centers=None, **kwargs):
+        for i, image in enumerate(images):
+            h, w = image.shape[:2]
+            yield ProcessResult(
+                image=image,
+                message="処理成功",
+                needles=self.needles_list[i],
+                center=(w // 2, h // 2),
+            )
@@ -0,0 +1,59 @@
+"""
+exemplar_store の参考画像の保持・上限のテスト
+"""
+import json
+import logging
+from pathlib import Path
+
+import pytest
+
+from exemplar_store import ExemplarStore
+from llm_image import LLMImageOptions
+
+SAMPLE_IMAGE = Path(__file__).resolve().parents[3] / "sample_images" / "0001.png"
+
+
+@pytest.fixture
+def directory(tmp_path):
+    for gauge_type in ("type-a", "type-b"):
+        entries = [{"image": str(SAMPLE_IMAGE), "text": "0.52 MPa"}]
+        (tmp_path / f"{gauge_type}.json").write_text(json.dumps({"examples": entries}), encoding="utf-8")
+    return tmp_path
+
+
+def make_store(directory, max_bytes):
+    return ExemplarStore(str(directory), max_bytes=max_bytes, options=LLMImageOptions(crop=False))
+
+
+def test_get_loads_once(directory):
+    store = make_store(directory, 8 * 1024 * 1024)
+
+    first = store.get("type-a")
+    assert len(first) == 1
+    assert first[0].text.endswith("0.52 MPa")
+    assert store.get("type-a") is first
+    assert store.stats().loads == 1
+
+
+def test_unknown_and_invalid_gauge_types_are_not_stored(directory):
+    store = make_store(directory, 8 * 1024 * 1024)
+
+    assert store.get("unknown") == []
+    assert store.get("../type-a") == []
+    assert store.stats().gauge_types == 0
+
+
+def test_oversized_gauge_type_warns_once(directory, caplog):
+    store = make_store(directory, 1)
+
+    with caplog.at_level(logging.WARNING, logger="exemplar_store"):
+        for _ in range(3):
+            assert len(store.get("type-a")) == 1
+        store.get("type-b")
+
+    warnings = [record.getMessage() for record in caplog.records]
+    assert len(warnings) == 2
+    assert "'type-a'" in warnings[0] and "'type-b'" in warnings[1]
+    stats = store.stats()
+    # 保持せずに毎回読み込み直す
+    assert (stats.loads, stats.oversized, stats.gauge_types) == (4, 4, 0)
@@ -0,0 +1,137 @@
+"""
+gauge_detector の文字盤検出のテスト
+"""
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+import gauge_detector
+from gauge_detector import DialDetector, detect_dial
+
+SAMPLE_DIR = Path(__file__).resolve().parents[3] / "sample_images"
+
+# 平行移動（画像サイズに対する比率）と切り抜き（残す比率, 位置）
+SHIFTS = [(-0.2, 0.0), (0.2, 0.0), (0.0, -0.15), (0.0, 0.15), (0.15, 0.1)]
+CROPS = [(0.7, "top-left"), (0.7, "top-right"), (0.7, "bottom-left"), (0.7, "bottom-right")]
+
+
+def make_dial(shape, center, radius):
+    """明るい文字盤・暗い外周・針の合成画像を作成"""
+    h, w = shape
+    image = np.full((h, w, 3), 90, np.uint8)
+    cv2.circle(image, center, radius, (235, 235, 235), -1)
+    cv2.circle(image, center, radius, (20, 20, 20), 6)
+    tip = (center[0] + int(radius * 0.7), center[1] - int(radius * 0.3))
+    cv2.line(image, center, tip, (0, 0, 200), 5)
+    return image
+
+
+def make_variants(image, center):
+    """平行移動・切り抜きした画像と、変形後の文字盤中心"""
+    h, w = image.shape[:2]
+    for fx, fy in SHIFTS:
+        dx, dy = int(w * fx), int(h * fy)
+        matrix = np.float32([[1, 0, dx], [0, 1, dy]])
+        shifted = cv2.warpAffine(image, matrix, (w, h), borderMode=cv2.BORDER_REPLICATE)
+        yield f"shift({fx:+.2f},{fy:+.2f})", shifted, (center[0] + dx, center[1] + dy)
+    for ratio, anchor in CROPS:
+        cw, ch = int(w * ratio), int(h * ratio)
+        x0 = 0 if "left" in anchor else w - cw
+        y0 = 0 if "top" in anchor else h - ch
+        yield f"crop({anchor})", image[y0:y0 + ch, x0:x0 + cw].copy(), (center[0] - x0, center[1] - y0)
+
+
+def assert_dial_near(dial, center, radius, tolerance):
+    assert dial is not None
+    assert np.hypot(dial.center_x - center[0], dial.center_y - center[1]) <= tolerance * radius
+    assert abs(dial.radius - radius) <= tolerance * radius
+
+
+@pytest.mark.parametrize("shape, center, radius", [
+    ((480, 640), (320, 240), 150),
+    ((720, 1280), (400, 300), 220),
+    ((800, 800), (560, 260), 180),
+])
+def test_detect_dial_synthetic(shape, center, radius):
+    assert_dial_near(detect_dial(make_dial(shape, center, radius)), center, radius, 0.05)
+
+
+def test_detect_dial_falls_back_to_hough_gradient(monkeypatch):
+    # 真円度の高い円が見つからない場合（HOUGH_GRADIENT_ALTがNoneを返す）
+    hough_circles = cv2.HoughCircles
+    methods = []
+
+    def fake_hough_circles(image, method, *args, **kwargs):
+        methods.append(method)
+        if method == cv2.HOUGH_GRADIENT_ALT:
+            return None
+        return hough_circles(image, method, *args, **kwargs)
+
+    monkeypatch.setattr(gauge_detector.cv2, "HoughCircles", fake_hough_circles)
+    dial = detect_dial(make_dial((480, 640), (320, 240), 150))
+
+    assert methods == [cv2.HOUGH_GRADIENT_ALT, cv2.HOUGH_GRADIENT]
+    assert_dial_near(dial, (320, 240), 150, 0.05)
+
+
+def test_detect_dial_without_dial():
+    assert detect_dial(np.full((240, 320, 3), 128, np.uint8)) is None
+
+
+@pytest.mark.parametrize("path", sorted(SAMPLE_DIR.glob("*.png")), ids=lambda p: p.name)
+def test_detect_dial_shifted_and_cropped_samples(path):
+    image = cv2.imread(str(path))
+    # 元画像での検出結果を正解とし、変形に合わせて移動させる
+    reference = detect_dial(image)
+    assert reference is not None
+
+    for name, variant, center in make_variants(image, (reference.center_x, reference.center_y)):
+        dial = detect_dial(variant)
+        assert dial is not None, name
+        error = np.hypot(dial.center_x - center[0], dial.center_y - center[1]) / reference.radius
+        assert error <= 0.1, f"{name}: 中心の誤差 {error:.1%}"
+        # 半径は文字盤の外周と縁のどちらの円を選ぶかで変わるため許容幅を広げる
+        assert abs(dial.radius - reference.radius) <= 0.2 * reference.radius, name
+
+
+def test_dial_detector_reuses_result_per_camera_and_shape(monkeypatch):
+    calls = []
+
+    def fake_detect_dial(image, max_side, detect_arc):
+        calls.append(image.shape[:2])
+        h, w = image.shape[:2]
+        return gauge_detector.DialGeometry(center_x=w / 2, center_y=h / 2, radius=min(h, w) / 3)
+
+    monkeypatch.setattr(gauge_detector, "detect_dial", fake_detect_dial)
+    detector = DialDetector()
+    small = np.zeros((240, 320, 3), np.uint8)
+    large = np.zeros((480, 640, 3), np.uint8)
+
+    first = detector.detect(small, "camera-1")
+    assert detector.detect(small, "camera-1") is first
+    assert len(calls) == 1
+
+    # 画像サイズ・カメラが異なる場合、カメラIDが無い場合は検出し直す
+    detector.detect(large, "camera-1")
+    detector.detect(small, "camera-2")
+    detector.detect(small)
+    detector.detect(small)
+    assert len(calls) == 5
+
+    detector.forget("camera-1")
+    detector.detect(small, "camera-1")
+    detector.detect(large, "camera-1")
+    assert len(calls) == 7
+
+
+def test_dial_detector_does_not_cache_missed_detection(monkeypatch):
+    results = [None, gauge_detector.DialGeometry(center_x=1, center_y=1, radius=1)]
+    monkeypatch.setattr(gauge_detector, "detect_dial", lambda *args: results.pop(0))
+    detector = DialDetector()
+    image = np.zeros((10, 10, 3), np.uint8)
+
+    assert detector.detect(image, "camera") is None
+    dial = detector.detect(image, "camera")
+    assert detector.detect(image, "camera") is dial
@@ -0,0 +1,141 @@
+"""
+gauge_reader の校正値の検証と角度→値の変換のテスト
+"""
+import json
+
+import numpy as np
+import pytest
+
+from gauge_reader import GaugeCalibration, load_calibrations, read_gauge
+from needle_geometry import NeedleGeometry
+
+# 7時半（225°）から時計回りに4時半（135°）まで、12時（0°）をまたぐ目盛り
+CROSSING = {"minAngle": 225, "maxAngle": 135, "minValue": 0, "maxValue": 1, "unit": "MPa"}
+
+
+def test_from_dict_defaults():
+    calibration = GaugeCalibration.from_dict(CROSSING)
+
+    assert calibration.sweep == 270.0
+    assert calibration.unit == "MPa"
+    assert calibration.tolerance == 5.0
+    assert calibration.scale is None
+
+
+@pytest.mark.parametrize("angle, expected", [
+    (225.0, 0.0),
+    (315.0, 1 / 3),
+    (0.0, 0.5),
+    (45.0, 2 / 3),
+    (135.0, 1.0),
+])
+def test_linear_scale_across_zero_degrees(angle, expected):
+    value, in_range = GaugeCalibration.from_dict(CROSSING).angle_to_value(angle)
+
+    assert value == pytest.approx(expected)
+    assert in_range
+
+
+@pytest.mark.parametrize("angle, expected, in_range", [
+    # 最大値の端から5°（tolerance以内）、10°
+    (140.0, 1.0, True),
+    (145.0, 1.0, False),
+    # 最小値の端から5°、10°
+    (220.0, 0.0, True),
+    (215.0, 0.0, False),
+    # 目盛りの無い領域の中央より最大値側・最小値側
+    (179.0, 1.0, False),
+    (181.0, 0.0, False),
+])
+def test_outside_sweep_clamps_to_nearest_end(angle, expected, in_range):
+    value, actual_in_range = GaugeCalibration.from_dict(CROSSING).angle_to_value(angle)
+
+    assert value == pytest.approx(expected)
+    assert actual_in_range is in_range
+
+
+def test_nonlinear_scale_interpolates_between_points():
+    calibration = GaugeCalibration.from_dict(
+        {**CROSSING, "scale": [[225, 0], [315, 0.1], [45, 0.5], [135, 1.0]]}
+    )
+
+    assert calibration.angle_to_value(270.0)[0] == pytest.approx(0.05)
+    assert calibration.angle_to_value(0.0)[0] == pytest.approx(0.3)
+    assert calibration.angle_to_value(90.0)[0] == pytest.approx(0.75)
+    assert calibration.angle_to_value(140.0) == (pytest.approx(1.0), True)
+
+
+def test_full_circle_sweep():
+    calibration = GaugeCalibration.from_dict({**CROSSING, "minAngle": 0, "maxAngle": 0})
+
+    assert calibration.sweep == 360.0
+    assert calibration.angle_to_value(90.0)[0] == pytest.approx(0.25)
+
+
+@pytest.mark.parametrize("data", [
+    ["minAngle", 225],
+    {"maxAngle": 135, "minValue": 0, "maxValue": 1},
+    {**CROSSING, "minValue": True},
+    {**CROSSING, "maxValue": float("nan")},
+    {**CROSSING, "maxAngle": float("inf")},
+    {**CROSSING, "minAngle": "225"},
+    {**CROSSING, "unit": 1},
+    {**CROSSING, "tolerance": -1},
+    {**CROSSING, "scale": [[225, 0]]},
+    {**CROSSING, "scale": {"225": 0, "135": 1}},
+    {**CROSSING, "scale": [[225, 0], [135]]},
+    {**CROSSING, "scale": [[225, 0], [135, "1"]]},
+    # 値が単調でない
+    {**CROSSING, "scale": [[225, 0], [0, 0.8], [135, 0.5]]},
+    # 角度が最小値の角度から時計回りの順でない
+    {**CROSSING, "scale": [[225, 0], [45, 0.5], [0, 0.6], [135, 1.0]]},
+    {**CROSSING, "scale": [[225, 0], [225, 0.5], [135, 1.0]]},
+    # 角度が目盛りの範囲外（目盛りの無い領域）
+    {**CROSSING, "scale": [[225, 0], [180, 1.0]]},
+])
+def test_from_dict_rejects_invalid_calibration(data):
+    with pytest.raises(ValueError):
+        GaugeCalibration.from_dict(data)
+
+
+def test_load_calibrations(tmp_path):
+    path = tmp_path / "calibrations.json"
+    path.write_text(json.dumps({
+        "standard-1mpa": CROSSING,
+        "low-pressure": {**CROSSING, "maxValue": 0.1, "scale": [[225, 0], [0, 0.02], [135, 0.1]]},
+    }), encoding="utf-8")
+
+    calibrations = load_calibrations(str(path))
+
+    assert set(calibrations) == {"standard-1mpa", "low-pressure"}
+    assert calibrations["low-pressure"].scale == [(225.0, 0.0), (0.0, 0.02), (135.0, 0.1)]
+
+
+def test_load_calibrations_rejects_invalid_entry(tmp_path):
+    path = tmp_path / "calibrations.json"
+    path.write_text(json.dumps({"broken": {**CROSSING, "minValue": None}}), encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        load_calibrations(str(path))
+
+
+def make_needle(angle, tip):
+    return NeedleGeometry(
+        tip_x=tip[0], tip_y=tip[1], base_x=50, base_y=50, angle=angle, area=100,
+        elongation=8.0, contour=np.zeros((1, 2), np.int32), score=0.9,
+    )
+
+
+def test_read_gauge_confidence_is_zero_outside_tolerance():
+    calibration = GaugeCalibration.from_dict(CROSSING)
+
+    # 3時（90°）を指す針、ゲージ中心 (50, 50)
+    reading = read_gauge([make_needle(90.0, (100, 50))], (50, 50), calibration)
+    assert reading.value == pytest.approx(5 / 6)
+    assert reading.confidence == pytest.approx(0.9)
+
+    # 6時（180°）は目盛りの無い領域
+    reading = read_gauge([make_needle(180.0, (50, 100))], (50, 50), calibration)
+    assert reading.confidence == 0.0
+
+    assert read_gauge([], (50, 50), calibration) is None
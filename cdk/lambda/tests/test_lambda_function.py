@@ -0,0 +1,343 @@
+"""
+lambda_function のBedrock呼び出し・読み取りモードのテスト
+"""
+import base64
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+import lambda_function
+from fakes import FakeBedrockClient, FakeClientError, FakeProcessor, StreamFailure
+from gauge_reader import GaugeCalibration
+from needle_geometry import NeedleGeometry
+from prompt_registry import PromptExample
+
+CALIBRATION = GaugeCalibration(min_angle=225, max_angle=135, min_value=0.0, max_value=1.0, unit="MPa")
+
+LLM_JSON = '{"value": 0.72, "unit": "MPa", "confidence": 0.9}'
+
+
+@pytest.fixture(autouse=True)
+def offline_environment(monkeypatch):
+    """キャッシュ・文字盤検出・ゲージ領域の追跡を無効にし、リトライで待機しない"""
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    monkeypatch.setenv("DIAL_DETECTION", "none")
+    monkeypatch.setenv("ROI_TRACKING", "false")
+    monkeypatch.setenv("BEDROCK_RETRY_BASE_DELAY", "0")
+    monkeypatch.setattr(lambda_function, "result_cache", None)
+    monkeypatch.setattr(lambda_function, "dial_detector", None)
+    monkeypatch.setattr(lambda_function, "roi_tracker", None)
+
+
+def make_needle(angle, elongation, score=0.9):
+    return NeedleGeometry(
+        tip_x=0, tip_y=0, base_x=0, base_y=0, angle=angle, area=100,
+        elongation=elongation, contour=np.zeros((1, 2), np.int32), score=score,
+    )
+
+
+def run_auto(monkeypatch, needles, reply=LLM_JSON):
+    monkeypatch.setattr(lambda_function, "processor", FakeProcessor([needles]))
+    client = FakeBedrockClient([reply])
+    results = lambda_function.process_gauge_images(
+        client,
+        [np.zeros((64, 64, 3), np.uint8)],
+        "圧力計を読み取ってください",
+        reading_mode="auto",
+        calibration=CALIBRATION,
+        min_confidence=0.6,
+        output_format="json",
+        response_image="none",
+    )
+    return client, results[0]
+
+
+def test_auto_without_needle_uses_llm_reading(monkeypatch):
+    client, result = run_auto(monkeypatch, [])
+
+    assert client.calls == 1
+    assert result["llmReading"] == {"value": 0.72, "unit": "MPa", "confidence": 0.9}
+    assert result["reading"] == {
+        "value": 0.72, "unit": "MPa", "angle": None, "confidence": 0.9, "source": "llm",
+    }
+
+
+def test_auto_low_confidence_needle_uses_llm_reading(monkeypatch):
+    # 細長くないマスクは信頼度0になる
+    client, result = run_auto(monkeypatch, [make_needle(angle=0.0, elongation=1.0)])
+
+    assert client.calls == 1
+    assert result["reading"] == {
+        "value": 0.72, "unit": "MPa", "angle": 0.0, "confidence": 0.9, "source": "llm",
+    }
+
+
+def test_auto_without_needle_and_unparsable_llm_reading(monkeypatch):
+    client, result = run_auto(monkeypatch, [], reply="読み取れません")
+
+    # 回答の変換を1回だけ依頼し直す
+    assert client.calls == 2
+    assert result["llmReading"] is None
+    assert result["reading"] is None
+
+
+def run_json(replies):
+    client = FakeBedrockClient(replies)
+    results = lambda_function.process_gauge_images(
+        client,
+        [np.zeros((64, 64, 3), np.uint8)],
+        "圧力計を読み取ってください",
+        preprocess_image=False,
+        output_format="json",
+        response_image="none",
+    )
+    return client, results[0]
+
+
+def test_json_output_parses_wrapped_response():
+    client, result = run_json([f"```json\n{LLM_JSON}\n```"])
+
+    assert client.calls == 1
+    assert result["llmReading"] == {"value": 0.72, "unit": "MPa", "confidence": 0.9}
+    assert result["llmUsage"]["calls"] == 1
+
+
+def test_json_output_repairs_once_without_image():
+    client, result = run_json(["約0.72 MPaを指しています。", LLM_JSON])
+
+    assert client.calls == 2
+    repair = client.requests[1]["messages"][0]["content"]
+    assert [block["type"] for block in repair] == ["text"]
+    assert "約0.72 MPaを指しています。" in repair[0]["text"]
+    assert result["llmResponse"] == LLM_JSON
+    assert result["llmReading"] == {"value": 0.72, "unit": "MPa", "confidence": 0.9}
+    assert result["llmUsage"]["calls"] == 2
+
+
+def test_json_output_repair_fails_again():
+    client, result = run_json(["約0.72 MPaを指しています。", '{"value": "約0.72", "unit": "MPa"}'])
+
+    # 2回目も解析できない場合は依頼し直さない
+    assert client.calls == 2
+    assert result["llmReading"] is None
+    assert "'value'" in result["llmReadingError"]
+    assert result["llmResponse"] == '{"value": "約0.72", "unit": "MPa"}'
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """リトライの待ち時間を記録し、実際には待機しない"""
+    delays = []
+    monkeypatch.setattr(lambda_function.time, "sleep", delays.append)
+    return delays
+
+
+def invoke(client, **kwargs):
+    usage = {}
+    text = lambda_function.invoke_bedrock_with_retry(
+        client, "aW1hZ2U=", "読み取ってください", usage=usage, **kwargs
+    )
+    return text, usage
+
+
+def test_retry_on_throttling_until_success(sleeps):
+    client = FakeBedrockClient([
+        FakeClientError("ThrottlingException"),
+        FakeClientError("ServiceUnavailableException"),
+        "約0.5 MPa",
+    ])
+
+    text, usage = invoke(client, max_retries=3, base_delay=0.5)
+
+    assert text == "約0.5 MPa"
+    assert client.calls == 3
+    assert usage["calls"] == 1
+    # Full Jitter: 0〜base_delay * 2^attempt 秒
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.5
+    assert 0 <= sleeps[1] <= 1.0
+
+
+def test_full_jitter_bounds(monkeypatch, sleeps):
+    bounds = []
+    monkeypatch.setattr(lambda_function.random, "uniform", lambda a, b: bounds.append((a, b)) or b)
+    client = FakeBedrockClient([FakeClientError("ThrottlingException")])
+
+    with pytest.raises(FakeClientError):
+        invoke(client, max_retries=4, base_delay=0.25)
+
+    assert client.calls == 5
+    assert bounds == [(0, 0.25), (0, 0.5), (0, 1.0), (0, 2.0)]
+    assert sleeps == [0.25, 0.5, 1.0, 2.0]
+
+
+def test_no_retry_on_other_errors(sleeps):
+    client = FakeBedrockClient([FakeClientError("ValidationException"), "約0.5 MPa"])
+
+    with pytest.raises(FakeClientError):
+        invoke(client)
+
+    assert client.calls == 1
+    assert sleeps == []
+
+
+def test_stream_retries_throttling_before_text(sleeps):
+    client = FakeBedrockClient([StreamFailure(""), "約0.5 MPa"])
+    received = []
+
+    text, usage = invoke(client, stream=True, on_text=received.append)
+
+    assert text == "約0.5 MPa"
+    assert client.calls == 2
+    assert received == ["約0.5 MPa"]
+    assert usage["inputTokens"] == 10
+
+
+def test_stream_does_not_retry_after_text_was_emitted(sleeps):
+    client = FakeBedrockClient([StreamFailure("この圧力計は"), "約0.5 MPa"])
+    received = []
+
+    with pytest.raises(Exception) as excinfo:
+        invoke(client, stream=True, on_text=received.append)
+
+    # リトライすると送信済みのテキストが重複するため送出する
+    assert excinfo.value.response["Error"]["Code"] == "ThrottlingException"
+    assert client.calls == 1
+    assert received == ["この圧力計は"]
+    assert sleeps == []
+
+
+def test_concurrent_results_keep_input_order(monkeypatch, sleeps):
+    monkeypatch.setenv("BEDROCK_MAX_RETRIES", "5")
+    attempts = {}
+    lock = threading.Lock()
+
+    def reply(request):
+        # 送られた画像の明るさから入力の順番を求める
+        data = request["messages"][0]["content"][0]["source"]["data"]
+        image = cv2.imdecode(np.frombuffer(base64.b64decode(data), np.uint8), cv2.IMREAD_GRAYSCALE)
+        index = int(round(image.mean() / 20))
+        with lock:
+            attempts[index] = attempts.get(index, 0) + 1
+            attempt = attempts[index]
+        # 偶数番目の画像は1回スロットリングし、先の画像ほど遅く応答する
+        if index % 2 == 0 and attempt == 1:
+            raise FakeClientError("ThrottlingException")
+        # （time.sleep はリトライの待ち時間の記録に置き換えているため使わない）
+        threading.Event().wait((8 - index) * 0.005)
+        return f"image {index}"
+
+    client = FakeBedrockClient([reply])
+    images = [np.full((32, 32, 3), i * 20, np.uint8) for i in range(8)]
+
+    results = lambda_function.process_gauge_images(
+        client, images, "読み取ってください",
+        preprocess_image=False, max_concurrency=4, response_image="none",
+    )
+
+    assert [result["llmResponse"] for result in results] == [f"image {i}" for i in range(8)]
+    assert client.calls == 12
+    assert attempts == {i: 2 if i % 2 == 0 else 1 for i in range(8)}
+    assert len(sleeps) == 4
+
+
+EXAMPLES = [
+    PromptExample(image_base64="ZXhhbXBsZTE=", media_type="image/jpeg", text="0.2 MPaを指しています"),
+    PromptExample(image_base64="ZXhhbXBsZTI=", media_type="image/png", text="0.8 MPaを指しています"),
+]
+
+
+def cache_points(body):
+    """cache_control を付けたブロックの (場所, 種類) のリスト"""
+    points = [("system", block["type"]) for block in body.get("system", []) if isinstance(block, dict)
+              and "cache_control" in block]
+    points += [
+        (f"content[{i}]", block["type"])
+        for i, block in enumerate(body["messages"][0]["content"])
+        if "cache_control" in block
+    ]
+    return points
+
+
+def test_request_body_cache_points_after_system_and_examples():
+    body = lambda_function.build_request_body(
+        "aW1hZ2U=", "読み取ってください", "あなたは圧力計の読み取り担当です",
+        media_type="image/jpeg", max_tokens=100, examples=EXAMPLES, cache_prompt=True,
+    )
+
+    content = body["messages"][0]["content"]
+    assert [block["type"] for block in content] == ["image", "text", "image", "text", "image", "text"]
+    # 呼び出しごとに変わらない先頭部分（システムプロンプト・最後の参考画像の説明）のみ
+    assert cache_points(body) == [("system", "text"), ("content[3]", "text")]
+    assert body["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert content[4]["source"] == {"type": "base64", "media_type": "image/jpeg", "data": "aW1hZ2U="}
+    assert body["max_tokens"] == 100
+
+
+def test_request_body_cache_point_on_example_image_without_text():
+    examples = [PromptExample(image_base64="ZXhhbXBsZTE=", media_type="image/jpeg", text="")]
+
+    body = lambda_function.build_request_body("aW1hZ2U=", "読み取ってください", examples=examples, cache_prompt=True)
+
+    assert cache_points(body) == [("content[0]", "image")]
+    assert "system" not in body
+
+
+@pytest.mark.parametrize("examples, system_prompt", [(None, None), (None, "システム"), (EXAMPLES, None)])
+def test_request_body_without_cache_prompt(examples, system_prompt):
+    body = lambda_function.build_request_body(
+        "aW1hZ2U=", "読み取ってください", system_prompt, examples=examples, cache_prompt=False,
+    )
+
+    assert cache_points(body) == []
+    if system_prompt:
+        assert body["system"] == system_prompt
+
+
+def test_request_body_does_not_cache_target_image():
+    # 参考画像もシステムプロンプトも無い場合は対象画像・プロンプトをキャッシュしない
+    body = lambda_function.build_request_body("aW1hZ2U=", "読み取ってください", cache_prompt=True)
+
+    assert cache_points(body) == []
+
+
+def test_parse_usage_with_prompt_cache():
+    recorded = {
+        "input_tokens": 812,
+        "output_tokens": 24,
+        "cache_read_input_tokens": 3104,
+        "cache_creation_input_tokens": 0,
+    }
+
+    assert lambda_function.parse_usage(recorded) == {
+        "inputTokens": 812,
+        "outputTokens": 24,
+        "cacheReadInputTokens": 3104,
+        "cacheWriteInputTokens": 0,
+    }
+    assert lambda_function.parse_usage({"input_tokens": 5, "output_tokens": 1}) == {
+        "inputTokens": 5, "outputTokens": 1, "cacheReadInputTokens": None, "cacheWriteInputTokens": None,
+    }
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_usage_from_response_is_added_per_call(stream):
+    client = FakeBedrockClient(["約0.5 MPa"], usage={
+        "input_tokens": 812, "output_tokens": 24,
+        "cache_read_input_tokens": 3104, "cache_creation_input_tokens": 0,
+    })
+    usage = {}
+
+    for _ in range(2):
+        lambda_function.invoke_bedrock_with_retry(
+            client, "aW1hZ2U=", "読み取ってください", "システム",
+            stream=stream, usage=usage, examples=EXAMPLES, cache_prompt=True,
+        )
+
+    assert cache_points(client.requests[0]) == [("system", "text"), ("content[3]", "text")]
+    assert usage == {
+        "calls": 2, "inputTokens": 1624, "outputTokens": 48,
+        "cacheReadInputTokens": 6208, "cacheWriteInputTokens": 0,
+    }
@@ -0,0 +1,65 @@
+"""
+llm_output のLLMの回答（JSON）の解析のテスト
+"""
+import pytest
+
+from llm_output import JSON_INSTRUCTION, build_prompt, build_repair_prompt, parse_structured_reading
+
+
+@pytest.mark.parametrize("text", [
+    '{"value": 0.52, "unit": "MPa", "confidence": 0.9}',
+    '```json\n{"value": 0.52, "unit": "MPa", "confidence": 0.9}\n```',
+    '読み取り結果は次のとおりです。\n{"value": 0.52, "unit": " MPa ", "confidence": 0.9}\n以上です。',
+    # 文章中の "{" や、値が文字列の数値
+    '目盛り{0〜1 MPa}を確認しました。{"value": "0.52", "unit": "MPa", "confidence": "0.9"}',
+    # 余分な項目（入れ子のオブジェクトを含む）は無視する
+    '{"value": 0.52, "unit": "MPa", "confidence": 0.9, "note": "針", "range": {"min": 0, "max": 1}}',
+])
+def test_parse_wrapped_and_extra_keys(text):
+    reading = parse_structured_reading(text)
+
+    assert reading.to_dict() == {"value": 0.52, "unit": "MPa", "confidence": 0.9}
+
+
+def test_parse_integer_and_boundary_confidence():
+    reading = parse_structured_reading('{"value": 1, "unit": "bar", "confidence": 0}')
+
+    assert reading.value == 1.0
+    assert isinstance(reading.value, float)
+    assert reading.confidence == 0.0
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "約0.52 MPaを指しています。",
+    '{"value": 0.52, "unit": "MPa", "confidence": 0.9',
+    "{'value': 0.52, 'unit': 'MPa', 'confidence': 0.9}",
+    # 項目が無い
+    '{"unit": "MPa", "confidence": 0.9}',
+    '{"value": 0.52, "confidence": 0.9}',
+    '{"value": 0.52, "unit": "MPa"}',
+    # 値が数値でない・有限でない
+    '{"value": "約0.52", "unit": "MPa", "confidence": 0.9}',
+    '{"value": null, "unit": "MPa", "confidence": 0.9}',
+    '{"value": true, "unit": "MPa", "confidence": 0.9}',
+    '{"value": [0.52], "unit": "MPa", "confidence": 0.9}',
+    '{"value": NaN, "unit": "MPa", "confidence": 0.9}',
+    '{"value": "Infinity", "unit": "MPa", "confidence": 0.9}',
+    # 単位が文字列でない、信頼度が範囲外
+    '{"value": 0.52, "unit": 1, "confidence": 0.9}',
+    '{"value": 0.52, "unit": "MPa", "confidence": 1.5}',
+    '{"value": 0.52, "unit": "MPa", "confidence": -0.1}',
+])
+def test_parse_rejects_malformed_response(text):
+    with pytest.raises(ValueError):
+        parse_structured_reading(text)
+
+
+def test_build_prompts():
+    assert build_prompt("読み取ってください\n") == f"読み取ってください\n\n{JSON_INSTRUCTION}"
+    assert build_prompt("") == JSON_INSTRUCTION
+
+    prompt = build_repair_prompt("約0.52 MPa", "JSONオブジェクトが見つかりません")
+    assert "約0.52 MPa" in prompt
+    assert "JSONオブジェクトが見つかりません" in prompt
+    assert prompt.endswith(JSON_INSTRUCTION)
@@ -0,0 +1,52 @@
+"""
+llm_stream の読み取り値による打ち切りのテスト
+"""
+import json
+
+import pytest
+
+from llm_stream import READING_PATTERN, compile_stop_pattern, read_stream
+
+
+@pytest.mark.parametrize("text", [
+    "この圧力計の針は **約0.05 MPa** を指しています。",
+    "**結果:**\n0.52 MPa\n",
+    "針は0.45 MPaを指しています",
+    "読み取り値: 0.3 bar。",
+    "**0.4 MPa**",
+])
+def test_reading_pattern_matches_readings(text):
+    assert compile_stop_pattern(READING_PATTERN).search(text)
+
+
+@pytest.mark.parametrize("text", [
+    "最大1.0MPaのゲージで、",
+    "目盛りは0.1 MPa刻みです。",
+    "1小目盛り = 0.02 MPa）",
+    "測定範囲は0〜1.0 MPaです。",
+    "**結果:**\nX.XX MPa",
+    # 単位の後の文字を受信するまでは判定しない
+    "約0.5 bar",
+    "約0.5 barg ",
+])
+def test_reading_pattern_ignores_scale_descriptions(text):
+    assert not compile_stop_pattern(READING_PATTERN).search(text)
+
+
+def make_response(chunks):
+    """テキストの断片からストリーミング応答を作成"""
+    events = [
+        {"chunk": {"bytes": json.dumps(
+            {"type": "content_block_delta", "delta": {"type": "text_delta", "text": chunk}}
+        ).encode()}}
+        for chunk in chunks
+    ]
+    return {"body": iter(events)}
+
+
+def test_read_stream_does_not_stop_on_scale_description():
+    chunks = ["このゲージは最大1.0MPaで、", "目盛りは0.02 MPa刻みです。", "針は **約0.46 MPa**", " を指しています。", "補足"]
+    result = read_stream(make_response(chunks), 0.0, compile_stop_pattern(READING_PATTERN))
+
+    assert result.stopped_early
+    assert result.text.endswith("針は **約0.46 MPa**")
@@ -0,0 +1,100 @@
+"""
+needle_geometry の針の先端・基部の検出のテスト
+"""
+import math
+
+import cv2
+import numpy as np
+import pytest
+
+from needle_geometry import analyze_needle, translate_geometry
+
+
+def legacy_detect_needle_tip(mask, center_x, center_y):
+    """輪郭を使う前の全画素から先端・基部を求める処理（比較用）"""
+    needle_points = np.argwhere(mask > 0.5)
+    distances = np.sqrt(
+        (needle_points[:, 1] - center_x) ** 2 + (needle_points[:, 0] - center_y) ** 2
+    )
+    tip_y, tip_x = needle_points[np.argmax(distances)]
+    base_y, base_x = needle_points[np.argmin(distances)]
+    return int(tip_x), int(tip_y), int(base_x), int(base_y)
+
+
+def make_needle_mask(seed, hub):
+    """ゲージ中心の周りを回る針のマスクを作成（hub が真の場合は中心の軸も覆う）"""
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((320, 320), dtype=np.float32)
+    center_x, center_y = rng.uniform(140, 180, size=2)
+    angle = rng.uniform(0, 2 * math.pi)
+    start = 0.0 if hub else rng.uniform(15, 40)
+    length = rng.uniform(80, 130)
+    points = [
+        (int(round(center_x + r * math.sin(angle))), int(round(center_y - r * math.cos(angle))))
+        for r in (start, start + length)
+    ]
+    cv2.line(mask, points[0], points[1], 1.0, int(rng.integers(3, 9)))
+    if hub:
+        cv2.circle(mask, (int(round(center_x)), int(round(center_y))), int(rng.integers(6, 14)), 1.0, -1)
+    return mask, center_x, center_y
+
+
+def distance(x, y, center_x, center_y):
+    return math.hypot(x - center_x, y - center_y)
+
+
+@pytest.mark.parametrize("hub", [False, True])
+@pytest.mark.parametrize("seed", range(20))
+def test_tip_and_base_match_legacy_pixel_search(seed, hub):
+    mask, center_x, center_y = make_needle_mask(seed, hub)
+    tip_x, tip_y, base_x, base_y = legacy_detect_needle_tip(mask, center_x, center_y)
+
+    geometry = analyze_needle(mask, center_x, center_y)
+
+    # 距離が等しい画素が複数ある場合はどちらを選んでもよいため距離で比較する
+    assert distance(geometry.tip_x, geometry.tip_y, center_x, center_y) == pytest.approx(
+        distance(tip_x, tip_y, center_x, center_y)
+    )
+    assert distance(geometry.base_x, geometry.base_y, center_x, center_y) == pytest.approx(
+        distance(base_x, base_y, center_x, center_y)
+    )
+
+
+def test_base_is_center_pixel_when_needle_covers_center():
+    mask, center_x, center_y = make_needle_mask(0, hub=True)
+
+    geometry = analyze_needle(mask, center_x, center_y)
+
+    assert (geometry.base_x, geometry.base_y) == (int(round(center_x)), int(round(center_y)))
+
+
+def test_translate_geometry_moves_points_only():
+    mask, center_x, center_y = make_needle_mask(3, hub=False)
+    geometry = analyze_needle(mask, center_x, center_y)
+    geometry.score = 0.8
+
+    moved = translate_geometry(geometry, 100, 40)
+
+    assert (moved.tip_x, moved.tip_y) == (geometry.tip_x + 100, geometry.tip_y + 40)
+    assert (moved.base_x, moved.base_y) == (geometry.base_x + 100, geometry.base_y + 40)
+    np.testing.assert_array_equal(moved.contour, geometry.contour + [100, 40])
+    assert moved.contour.dtype == geometry.contour.dtype
+    assert (moved.angle, moved.area, moved.elongation, moved.score) == (
+        geometry.angle, geometry.area, geometry.elongation, geometry.score
+    )
+    # 元のジオメトリは変更しない
+    assert moved.contour is not geometry.contour
+
+
+def test_translated_crop_matches_full_image():
+    mask, center_x, center_y = make_needle_mask(5, hub=False)
+    x0, y0 = 40, 25
+    cropped = analyze_needle(mask[y0:, x0:], center_x - x0, center_y - y0)
+    full = analyze_needle(mask, center_x, center_y)
+
+    moved = translate_geometry(cropped, x0, y0)
+
+    assert (moved.tip_x, moved.tip_y, moved.base_x, moved.base_y) == (
+        full.tip_x, full.tip_y, full.base_x, full.base_y
+    )
+    assert moved.angle == pytest.approx(full.angle)
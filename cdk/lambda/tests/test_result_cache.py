@@ -0,0 +1,123 @@
+"""
+result_cache の保存先（サイズ上限付きLRU）のテスト
+"""
+import os
+import threading
+
+import pytest
+
+from result_cache import DiskCache, MemoryCache, create_cache, make_key
+
+
+@pytest.fixture(params=["memory", "disk"])
+def cache(request, tmp_path):
+    return create_cache(request.param, 100, str(tmp_path / "cache"))
+
+
+def set_mtime(cache, key, mtime):
+    """ディスクキャッシュの最終アクセス時刻（ファイルの更新時刻）を設定"""
+    if isinstance(cache, DiskCache):
+        os.utime(cache._path(key), (mtime, mtime))
+
+
+def test_get_put_and_counters(cache):
+    assert cache.get("a") is None
+    cache.put("a", b"x" * 10)
+
+    assert cache.get("a") == b"x" * 10
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used(cache):
+    cache.put("a", b"a" * 40)
+    set_mtime(cache, "a", 1)
+    cache.put("b", b"b" * 40)
+    set_mtime(cache, "b", 2)
+    # a を参照すると b が最も古くなる
+    assert cache.get("a") is not None
+    set_mtime(cache, "a", 3)
+
+    cache.put("c", b"c" * 40)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"a" * 40
+    assert cache.get("c") == b"c" * 40
+
+
+def test_overwrite_does_not_count_twice(cache):
+    for _ in range(5):
+        cache.put("a", b"a" * 60)
+    cache.put("b", b"b" * 40)
+
+    assert cache.get("a") == b"a" * 60
+    assert cache.get("b") == b"b" * 40
+
+
+def test_value_larger_than_limit_is_not_stored(cache):
+    cache.put("a", b"a" * 40)
+    cache.put("large", b"x" * 101)
+
+    assert cache.get("large") is None
+    assert cache.get("a") == b"a" * 40
+
+
+def test_counters_are_thread_safe(cache):
+    cache.put("a", b"a")
+
+    def worker():
+        for i in range(500):
+            cache.get("a" if i % 2 else "missing")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert (cache.hits, cache.misses) == (2000, 2000)
+
+
+def test_memory_cache_size_accounting():
+    cache = MemoryCache(100)
+    for i in range(10):
+        cache.put(f"k{i}", b"x" * 30)
+
+    assert list(cache._entries) == ["k7", "k8", "k9"]
+    assert cache._size == 90
+
+
+def test_disk_cache_removes_evicted_files(tmp_path):
+    cache = DiskCache(100, str(tmp_path))
+    for i in range(5):
+        cache.put(f"k{i}", b"x" * 30)
+        os.utime(cache._path(f"k{i}"), (i, i))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["k2.bin", "k3.bin", "k4.bin"]
+    assert cache._size == 90
+
+
+def test_disk_cache_counts_existing_files(tmp_path):
+    first = DiskCache(100, str(tmp_path))
+    first.put("old", b"o" * 60)
+    os.utime(first._path("old"), (1, 1))
+
+    # 別の実行環境（または再起動後）で同じディレクトリを使う
+    second = DiskCache(100, str(tmp_path))
+    assert second._size == 60
+    second.put("new", b"n" * 60)
+
+    assert second.get("old") is None
+    assert second.get("new") == b"n" * 60
+    assert [p.name for p in tmp_path.iterdir()] == ["new.bin"]
+
+
+def test_create_cache():
+    assert create_cache("none", 100) is None
+    with pytest.raises(ValueError):
+        create_cache("redis", 100)
+
+
+def test_make_key_is_order_insensitive():
+    assert make_key("llm", a=1, b={"x": [1, 2]}) == make_key("llm", b={"x": [1, 2]}, a=1)
+    assert make_key("llm", a=1) != make_key("image", a=1)
+    assert make_key("llm", a=1) != make_key("llm", a=2)
@@ -0,0 +1,113 @@
+"""
+roi_tracker のゲージ領域の計算と追跡のテスト
+"""
+import numpy as np
+import pytest
+
+from needle_geometry import NeedleGeometry
+from roi_tracker import RoiTracker, roi_from_needles
+
+SHAPE = (1080, 1920, 3)
+
+
+def make_needle(tip, base):
+    return NeedleGeometry(
+        tip_x=tip[0], tip_y=tip[1], base_x=base[0], base_y=base[1], angle=0.0, area=100,
+        elongation=8.0, contour=np.zeros((1, 2), np.int32), score=0.9,
+    )
+
+
+def test_region_is_square_around_center_with_padding():
+    # 中心 (960, 540) から先端まで 400px → 一辺 2 * 400 * 1.25 = 1000px
+    region = roi_from_needles([make_needle((960, 140), (960, 560))], (960, 540), SHAPE)
+
+    assert region == (460, 40, 1460, 1040)
+
+
+def test_region_uses_farthest_point_of_all_needles():
+    needles = [make_needle((960, 340), (960, 540)), make_needle((1360, 540), (960, 540))]
+
+    x0, y0, x1, y1 = roi_from_needles(needles, (960, 540), SHAPE)
+
+    assert (x1 - x0, y1 - y0) == (1000, 1000)
+
+
+def test_small_needle_uses_min_size():
+    region = roi_from_needles([make_needle((1000, 540), (960, 540))], (960, 540), SHAPE, min_size=640)
+
+    assert region == (640, 220, 1280, 860)
+
+
+@pytest.mark.parametrize("center, expected", [
+    # 画像からはみ出す場合は画像内に平行移動する（大きさは変えない）
+    ((1850, 540), (1920 - 640, 220, 1920, 860)),
+    ((60, 40), (0, 0, 640, 640)),
+    ((1900, 1070), (1280, 440, 1920, 1080)),
+])
+def test_region_is_clamped_at_image_border(center, expected):
+    cx, cy = center
+    needle = make_needle((cx + 20, cy), (cx, cy))
+
+    assert roi_from_needles([needle], center, SHAPE, min_size=640) == expected
+
+
+def test_region_shorter_than_min_size_in_one_dimension():
+    # 縦が min_size より小さい画像は縦方向に画像全体を使う
+    region = roi_from_needles([make_needle((1000, 200), (960, 200))], (960, 200), (400, 1920, 3))
+
+    assert region == (640, 0, 1280, 400)
+
+
+def test_region_covering_whole_image_is_none():
+    assert roi_from_needles([make_needle((1760, 540), (960, 540))], (960, 540), SHAPE) is None
+    assert roi_from_needles([make_needle((330, 240), (320, 240))], (320, 240), (480, 640, 3)) is None
+    assert roi_from_needles([], (960, 540), SHAPE) is None
+
+
+def test_tracker_keeps_region_per_stream_and_shape():
+    tracker = RoiTracker()
+    needles = [make_needle((1000, 540), (960, 540))]
+
+    region = tracker.update("camera-1", SHAPE, needles, (960, 540))
+
+    assert tracker.get("camera-1", SHAPE) == region
+    assert tracker.get("camera-1", (720, 1280, 3)) is None
+    assert tracker.get("camera-2", SHAPE) is None
+    assert tracker.get(None, SHAPE) is None
+    assert tracker.update(None, SHAPE, needles, (960, 540)) is None
+
+
+def test_tracker_drops_region_when_needle_is_lost():
+    tracker = RoiTracker()
+    tracker.update("camera-1", SHAPE, [make_needle((1000, 540), (960, 540))], (960, 540))
+
+    assert tracker.update("camera-1", SHAPE, [], (960, 540)) is None
+    assert tracker.get("camera-1", SHAPE) is None
+
+
+def test_tracker_evicts_least_recently_used_stream():
+    tracker = RoiTracker(max_streams=2)
+    needles = [make_needle((1000, 540), (960, 540))]
+    for stream_id in ("a", "b"):
+        tracker.update(stream_id, SHAPE, needles, (960, 540))
+    tracker.get("a", SHAPE)
+
+    tracker.update("c", SHAPE, needles, (960, 540))
+
+    assert tracker.get("b", SHAPE) is None
+    assert tracker.get("a", SHAPE) is not None
+    assert tracker.to_dict()["streams"] == 2
+
+
+def test_tracker_forget_and_record():
+    tracker = RoiTracker()
+    needles = [make_needle((1000, 540), (960, 540))]
+    tracker.update("camera-1", SHAPE, needles, (960, 540))
+    tracker.update("camera-1", (720, 1280, 3), needles, (960, 540))
+    tracker.update("camera-2", SHAPE, needles, (960, 540))
+
+    tracker.forget("camera-1")
+    tracker.record(fallback=False)
+    tracker.record(fallback=True)
+
+    assert tracker.to_dict() == {"streams": 1, "hits": 1, "fallbacks": 1}
@@ -0,0 +1,133 @@
+"""
+storage のローカルファイルの保存先とURIの扱いのテスト
+"""
+import io
+
+import pytest
+
+import lambda_function
+from storage import LocalStorage, StorageRegistry, derive_output_uri, parse_uri
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorage(str(tmp_path / "root"))
+
+
+def test_write_read_round_trip(storage):
+    uri = f"file://{storage.root}/images/0001.png"
+
+    storage.write(uri, b"\x89PNG data", "image/png")
+
+    assert storage.read(uri) == b"\x89PNG data"
+    assert (storage.root / "images" / "0001.png").read_bytes() == b"\x89PNG data"
+    # 一時ファイルを残さない
+    assert [p.name for p in (storage.root / "images").iterdir()] == ["0001.png"]
+    assert (storage.bytes_written, storage.bytes_read) == (9, 9)
+
+
+def test_read_to_file(storage):
+    data = bytes(range(256)) * 1000
+    storage.write(str(storage.root / "video.mp4"), data, "video/mp4")
+    fileobj = io.BytesIO(b"header")
+    fileobj.seek(0, io.SEEK_END)
+
+    size = storage.read_to_file(str(storage.root / "video.mp4"), fileobj)
+
+    assert size == len(data)
+    assert fileobj.getvalue() == b"header" + data
+
+
+def test_relative_key_is_under_root(storage, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage.write("images/0001.png", b"data", "image/png")
+
+    assert (storage.root / "images" / "0001.png").read_bytes() == b"data"
+    assert not (tmp_path / "images").exists()
+
+
+@pytest.mark.parametrize("key", [
+    "../outside.png",
+    "images/../../outside.png",
+    "/etc/passwd",
+    "/tmp/../etc/passwd",
+])
+def test_rejects_paths_outside_root(storage, key):
+    with pytest.raises(ValueError):
+        storage.read(key)
+    with pytest.raises(ValueError):
+        storage.write(key, b"data", "image/png")
+
+
+def test_rejects_root_prefix_sibling(storage):
+    # "/root" に対する "/root-other" のような前方一致のパスも配下とみなさない
+    sibling = storage.root.parent / f"{storage.root.name}-other" / "image.png"
+    with pytest.raises(ValueError):
+        storage.write(str(sibling), b"data", "image/png")
+    assert not sibling.exists()
+
+
+def test_rejects_symlink_outside_root(storage, tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "secret.txt").write_bytes(b"secret")
+    storage.root.mkdir(parents=True)
+    (storage.root / "link").symlink_to(outside)
+
+    with pytest.raises(ValueError):
+        storage.read(str(storage.root / "link" / "secret.txt"))
+
+
+@pytest.mark.parametrize("input_uri, prefix, expected", [
+    ("s3://bucket/images/0001.png", None, "s3://bucket/images/0001.processed.png"),
+    ("s3://bucket/images/0001.jpg", "s3://out/processed/", "s3://out/processed/0001.processed.png"),
+    ("s3://bucket/images/0001.jpg", "s3://out/processed", "s3://out/processed/0001.processed.png"),
+    ("file:///tmp/images/0001.png", None, "file:///tmp/images/0001.processed.png"),
+    ("/tmp/images/0001.png", None, "/tmp/images/0001.processed.png"),
+    ("/tmp/images/0001.png", "/tmp/out/", "/tmp/out/0001.processed.png"),
+])
+def test_derive_output_uri(input_uri, prefix, expected):
+    assert derive_output_uri(input_uri, "png", prefix) == expected
+
+
+@pytest.mark.parametrize("uri", ["http://example.com/a.png", "s3://bucket", "s3:///key"])
+def test_parse_uri_rejects_invalid_uri(uri):
+    with pytest.raises(ValueError):
+        parse_uri(uri)
+
+
+def test_local_storage_is_refused_unless_enabled(monkeypatch, tmp_path):
+    monkeypatch.delenv("LOCAL_STORAGE", raising=False)
+    monkeypatch.setattr(lambda_function, "object_storage", None)
+
+    registry = lambda_function.initialize_storage()
+
+    with pytest.raises(ValueError):
+        registry.get(f"file://{tmp_path}/0001.png")
+    with pytest.raises(ValueError):
+        registry.read(str(tmp_path / "0001.png"))
+    assert registry.get("s3://bucket/0001.png").scheme == "s3"
+
+
+def test_local_storage_is_available_when_enabled(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOCAL_STORAGE", "true")
+    monkeypatch.setenv("LOCAL_STORAGE_ROOT", str(tmp_path))
+    monkeypatch.setattr(lambda_function, "object_storage", None)
+
+    registry = lambda_function.initialize_storage()
+    registry.write(f"file://{tmp_path}/0001.png", b"data", "image/png")
+
+    assert registry.read(str(tmp_path / "0001.png")) == b"data"
+
+
+def test_registry_reuses_storage():
+    created = []
+
+    def backend():
+        created.append(LocalStorage("/tmp"))
+        return created[-1]
+
+    registry = StorageRegistry({"file": backend})
+
+    assert registry.get("/tmp/a.png") is registry.get("file:///tmp/b.png")
+    assert len(created) == 1
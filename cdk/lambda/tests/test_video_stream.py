@@ -0,0 +1,161 @@
+"""
+video_stream の変化の判定（MotionGate）とフレームの省略のテスト
+"""
+import math
+
+import cv2
+import numpy as np
+import pytest
+
+from gauge_reader import GaugeCalibration
+from needle_geometry import NeedleGeometry
+from video_stream import MotionGate, StreamStats, dial_region, iter_readings, iter_video_frames
+from yolo_processor import ProcessResult
+
+CALIBRATION = GaugeCalibration(min_angle=225, max_angle=135, min_value=0.0, max_value=1.0, unit="MPa")
+SHAPE = (240, 320)
+CENTER = (160, 120)
+
+
+def make_frame(angle, noise=0, seed=0):
+    """angle（度、12時方向から時計回り）を指す針の文字盤のフレーム"""
+    image = np.full((*SHAPE, 3), 80, np.uint8)
+    cv2.circle(image, CENTER, 100, (235, 235, 235), -1)
+    tip = (
+        int(round(CENTER[0] + 85 * math.sin(math.radians(angle)))),
+        int(round(CENTER[1] - 85 * math.cos(math.radians(angle)))),
+    )
+    cv2.line(image, CENTER, tip, (30, 30, 30), 6)
+    if noise:
+        rng = np.random.default_rng(seed)
+        image = np.clip(image + rng.integers(-noise, noise + 1, image.shape), 0, 255).astype(np.uint8)
+    return image
+
+
+class AngleProcessor:
+    """推論したフレームごとに、angles の順に針の角度を返すYOLOプロセッサーのフェイク"""
+
+    def __init__(self, angles):
+        self.angles = list(angles)
+        self.calls = 0
+
+    def analyze_image(self, image, center=None, stream_id=None, tracker=None):
+        angle = self.angles[self.calls]
+        self.calls += 1
+        needle = NeedleGeometry(
+            tip_x=int(CENTER[0] + 85 * math.sin(math.radians(angle))),
+            tip_y=int(CENTER[1] - 85 * math.cos(math.radians(angle))),
+            base_x=CENTER[0], base_y=CENTER[1], angle=angle, area=500,
+            elongation=10.0, contour=np.zeros((1, 2), np.int32), score=0.9,
+        )
+        return ProcessResult(image=image, message="処理成功", needles=[needle], center=CENTER)
+
+
+def frames_of(images, fps=10.0):
+    return iter_video_frames(images, fps=fps)
+
+
+def test_gate_skips_static_frames_and_detects_moved_needle():
+    gate = MotionGate(threshold=0.01)
+    region = (0, 0, SHAPE[1], SHAPE[0])
+
+    first = gate.check(make_frame(0), region)
+    static = gate.check(make_frame(0), region)
+    moved = gate.check(make_frame(60), region)
+    after_move = gate.check(make_frame(60), region)
+
+    assert first == (True, 1.0)
+    assert static == (False, 0.0)
+    assert moved[0] and moved[1] > 0.01
+    assert after_move == (False, 0.0)
+
+
+def test_gate_ignores_small_brightness_noise():
+    gate = MotionGate(threshold=0.01, pixel_threshold=25)
+    region = (0, 0, SHAPE[1], SHAPE[0])
+    gate.check(make_frame(0), region)
+
+    for seed in range(5):
+        inferred, score = gate.check(make_frame(0, noise=10, seed=seed), region)
+        assert not inferred
+        assert score <= 0.01
+
+
+def test_gate_compares_with_last_inferred_frame():
+    # 少しずつ動く場合も、最後に推論したフレームからの変化が閾値を超えた時点で推論する
+    gate = MotionGate(threshold=0.01)
+    region = (0, 0, SHAPE[1], SHAPE[0])
+    decisions = [gate.check(make_frame(angle), region)[0] for angle in np.arange(0, 30, 0.5)]
+
+    assert decisions[0]
+    assert 1 < sum(decisions) < len(decisions) / 2
+
+
+def test_gate_max_interval_and_reset():
+    gate = MotionGate(threshold=0.01, max_interval=1.0)
+    region = (0, 0, SHAPE[1], SHAPE[0])
+    image = make_frame(0)
+
+    decisions = [gate.check(image, region, t)[0] for t in (0.0, 0.5, 0.9, 1.0, 1.5, 2.1)]
+    assert decisions == [True, False, False, True, False, True]
+
+    gate.reset()
+    assert gate.check(image, region, 2.2) == (True, 1.0)
+
+
+def test_iter_readings_skips_static_frames():
+    # 0°で5フレーム静止 → 90°に動いて4フレーム静止
+    images = [make_frame(0)] * 5 + [make_frame(90)] * 4
+    processor = AngleProcessor([0.0, 90.0])
+    stats = StreamStats()
+
+    samples = list(iter_readings(frames_of(images), processor, CALIBRATION, stats=stats))
+
+    assert [sample.frame_index for sample in samples] == [0, 5]
+    assert [sample.timestamp for sample in samples] == [0.0, 0.5]
+    assert [sample.reading.value for sample in samples] == [pytest.approx(0.5), pytest.approx(5 / 6)]
+    assert processor.calls == 2
+    assert (stats.frames, stats.inferred, stats.skipped) == (9, 2, 7)
+    assert stats.to_dict()["skipRatio"] == pytest.approx(7 / 9, abs=1e-3)
+
+
+def test_iter_readings_emit_skipped_repeats_last_reading():
+    images = [make_frame(0)] * 3 + [make_frame(90)] * 2
+    processor = AngleProcessor([0.0, 90.0])
+
+    samples = list(iter_readings(frames_of(images), processor, CALIBRATION, emit_skipped=True))
+
+    assert [sample.inferred for sample in samples] == [True, False, False, True, False]
+    assert [sample.reading.value for sample in samples] == [
+        pytest.approx(v) for v in (0.5, 0.5, 0.5, 5 / 6, 5 / 6)
+    ]
+    assert samples[1].message is None
+
+
+def test_iter_readings_without_processor_only_gates():
+    images = [make_frame(0)] * 3 + [make_frame(90)]
+    stats = StreamStats()
+
+    samples = list(iter_readings(frames_of(images), stats=stats))
+
+    assert [(sample.frame_index, sample.reading) for sample in samples] == [(0, None), (3, None)]
+    assert (stats.inferred, stats.skipped) == (2, 2)
+
+
+def test_iter_video_frames_stride_and_max_frames():
+    images = [np.full((4, 4, 3), i, np.uint8) for i in range(10)]
+
+    frames = list(iter_video_frames(images, stride=3, max_frames=3, fps=5.0))
+
+    assert [frame.index for frame in frames] == [0, 3, 6]
+    assert [frame.timestamp for frame in frames] == [0.0, 0.6, 1.2]
+    assert int(frames[1].image[0, 0, 0]) == 3
+    with pytest.raises(ValueError):
+        list(iter_video_frames(images, stride=0))
+
+
+def test_dial_region_is_clamped_to_image():
+    from gauge_detector import DialGeometry
+
+    assert dial_region(None, (240, 320, 3)) == (0, 0, 320, 240)
+    assert dial_region(DialGeometry(center_x=300, center_y=20, radius=50), (240, 320, 3)) == (250, 0, 320, 71)
@@ -0,0 +1,212 @@
+"""
+yolo_processor の描画・マスク処理のテスト
+"""
+import cv2
+import numpy as np
+import pytest
+
+from inference_backends import Detections
+from needle_geometry import angle_difference
+from roi_tracker import RoiTracker
+from yolo_processor import YOLOProcessor
+
+
+def legacy_apply_gradient(image, mask, tip_x, tip_y, base_x, base_y):
+    """ベクトル化する前の1画素ずつのグラデーション処理（比較用）"""
+    result = image.copy()
+    needle_points = np.argwhere(mask > 0.5)
+    for point in needle_points:
+        y, x = point
+
+        dist_from_base = np.sqrt((x - base_x) ** 2 + (y - base_y) ** 2)
+        total_length = np.sqrt((tip_x - base_x) ** 2 + (tip_y - base_y) ** 2)
+
+        if total_length > 0:
+            ratio = min(1.0, dist_from_base / total_length)
+        else:
+            ratio = 0.0
+
+        b = int(0)
+        g = int(255 * ratio)
+        r = int(100 + 155 * ratio)
+
+        result[y, x] = [b, g, r]
+    return result
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_apply_gradient_and_arrow_matches_legacy_loop(seed):
+    rng = np.random.default_rng(seed)
+    h, w = rng.integers(20, 120, size=2)
+    image = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    # 0/1 のマスクと、0〜1の連続値のマスク（閾値0.5の境界を含む）
+    mask = rng.random((h, w)).astype(np.float32)
+    if seed % 2 == 0:
+        mask = (mask > 0.7).astype(np.float32)
+    center_x, center_y = (int(v) for v in rng.integers(0, [w, h]))
+    tip_x, tip_y = (int(v) for v in rng.integers(0, [w, h]))
+    # 基部と先端が同じ点（長さ0）の場合も含める
+    base_x, base_y = (tip_x, tip_y) if seed % 5 == 0 else (int(v) for v in rng.integers(0, [w, h]))
+
+    processor = YOLOProcessor()
+    actual = processor.apply_gradient_and_arrow(
+        image, mask, center_x, center_y, tip_x, tip_y, base_x, base_y
+    )
+    expected = processor._draw_arrow(
+        legacy_apply_gradient(image, mask, tip_x, tip_y, base_x, base_y),
+        center_x, center_y, tip_x, tip_y,
+    )
+
+    assert actual.dtype == expected.dtype
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_apply_gradient_and_arrow_empty_mask_returns_copy():
+    image = np.full((10, 10, 3), 7, dtype=np.uint8)
+    result = YOLOProcessor().apply_gradient_and_arrow(
+        image, np.zeros((10, 10), np.float32), 5, 5, 8, 8, 5, 5
+    )
+    np.testing.assert_array_equal(result, image)
+    assert result is not image
+
+
+def make_letterboxed_needle(seed, image_shape=(1080, 1920), mask_shape=(160, 160)):
+    """モデル出力の解像度（レターボックス済み）で針のマスクを作成"""
+    from needle_geometry import LetterboxTransform
+
+    rng = np.random.default_rng(seed)
+    h, w = image_shape
+    transform = LetterboxTransform.from_shapes(image_shape, mask_shape)
+    center_x = w // 2 + int(rng.integers(-200, 200))
+    center_y = h // 2 + int(rng.integers(-100, 100))
+    angle = rng.uniform(0, 2 * np.pi)
+    length = rng.uniform(200, 400)
+    start = transform.to_mask(center_x, center_y)
+    end = transform.to_mask(center_x + length * np.sin(angle), center_y - length * np.cos(angle))
+
+    mask = np.zeros(mask_shape, np.float32)
+    cv2.line(mask, tuple(int(round(v)) for v in start), tuple(int(round(v)) for v in end), 1.0, 2)
+    # モデル出力と同じく境界が0〜1の連続値になるようにぼかす
+    mask = cv2.GaussianBlur(mask, (3, 3), 0)
+    return mask, transform, (center_x, center_y)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_native_mask_tip_matches_full_resolution(seed):
+    mask, transform, center = make_letterboxed_needle(seed)
+    image = np.random.default_rng(seed).integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    detections = Detections(masks=mask[None], scores=np.array([0.9], np.float32))
+
+    full = YOLOProcessor(mask_resolution="full")._render_result(image, detections, center)
+    native = YOLOProcessor(mask_resolution="native")._render_result(image, detections, center)
+
+    assert len(full.needles) == len(native.needles) == 1
+    a, b = full.needles[0], native.needles[0]
+    # 先端の差はマスクの1.5画素（画像座標では 1.5 / gain 画素）以内
+    assert np.hypot(a.tip_x - b.tip_x, a.tip_y - b.tip_y) <= 1.5 / transform.gain
+    assert angle_difference(a.angle, b.angle) < 0.5
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_overlay_pixels_match_between_mask_resolutions(seed):
+    mask, transform, center = make_letterboxed_needle(seed)
+    processor = YOLOProcessor()
+
+    painted = []
+    for analyze in (processor._analyze_full_mask, processor._analyze_native_mask):
+        output = np.zeros((1080, 1920, 3), np.uint8)
+        analyze(output, mask, transform, *center)
+        painted.append(output.any(axis=2))
+
+    # 同じ閾値で2値化するため、補間の丸めによる境界の画素以外は一致する
+    assert painted[0].sum() > 0
+    assert (painted[0] ^ painted[1]).sum() <= 0.01 * painted[0].sum()
+
+
+class DarkPixelModel:
+    """入力画像の暗い画素をそのまま針のマスクとして返す推論バックエンドのフェイク"""
+
+    def __init__(self):
+        self.input_shapes = []
+
+    def predict(self, inputs, conf, iou):
+        self.input_shapes.append([image.shape for image in inputs])
+        detections = []
+        for image in inputs:
+            mask = (cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) < 60).astype(np.float32)
+            if mask.any():
+                detections.append(Detections(masks=mask[None], scores=np.array([0.9], np.float32)))
+            else:
+                detections.append(Detections(masks=None, scores=np.zeros(0, np.float32)))
+        return detections
+
+
+def make_gauge_frame(needle=True):
+    image = np.full((480, 640, 3), 220, np.uint8)
+    if needle:
+        cv2.line(image, (400, 300), (450, 250), (30, 30, 30), 5)
+    return image
+
+
+@pytest.fixture
+def roi_processor():
+    processor = YOLOProcessor()
+    processor.model = DarkPixelModel()
+    return processor
+
+
+def test_roi_inference_matches_full_frame_coordinates(roi_processor):
+    tracker = RoiTracker(min_size=100)
+    image = make_gauge_frame()
+    kwargs = dict(center=(400, 300), stream_id="camera-1", tracker=tracker)
+
+    first = roi_processor.analyze_image(image, **kwargs)
+    region = tracker.get("camera-1", image.shape)
+    second = roi_processor.analyze_image(image, **kwargs)
+
+    # 1枚目は画像全体、2枚目は追跡した領域を切り抜いて推論する
+    x0, y0, x1, y1 = region
+    assert roi_processor.model.input_shapes == [[image.shape], [(y1 - y0, x1 - x0, 3)]]
+    assert (x1 - x0, y1 - y0) != (640, 480)
+    assert tracker.to_dict() == {"streams": 1, "hits": 1, "fallbacks": 0}
+
+    # 針の座標とゲージ中心は元画像の座標に戻す
+    a, b = first.needles[0], second.needles[0]
+    assert (b.tip_x, b.tip_y, b.base_x, b.base_y) == (a.tip_x, a.tip_y, a.base_x, a.base_y)
+    assert b.angle == pytest.approx(a.angle)
+    assert second.center == first.center == (400, 300)
+    assert second.image.shape == image.shape
+    np.testing.assert_array_equal(second.image[:y0], image[:y0])
+
+
+def test_roi_falls_back_to_full_frame_when_needle_is_lost(roi_processor):
+    tracker = RoiTracker(min_size=100)
+    kwargs = dict(center=(400, 300), stream_id="camera-1", tracker=tracker)
+    roi_processor.analyze_image(make_gauge_frame(), **kwargs)
+    region = tracker.get("camera-1", (480, 640, 3))
+
+    # 領域の外に針が移動した画像
+    moved = make_gauge_frame(needle=False)
+    cv2.line(moved, (100, 100), (150, 150), (30, 30, 30), 5)
+    result = roi_processor.analyze_image(moved, **kwargs)
+
+    x0, y0, x1, y1 = region
+    assert roi_processor.model.input_shapes[1:] == [[(y1 - y0, x1 - x0, 3)], [moved.shape]]
+    assert tracker.fallbacks == 1
+    assert len(result.needles) == 1
+    assert max(result.needles[0].tip_x, result.needles[0].tip_y) <= 150
+    # 画像全体の結果で領域を更新する（中心から遠い針のため領域は画像全体になり破棄される）
+    assert tracker.get("camera-1", moved.shape) is None
+
+
+def test_roi_is_dropped_when_needle_is_not_found(roi_processor):
+    tracker = RoiTracker(min_size=100)
+    kwargs = dict(center=(400, 300), stream_id="camera-1", tracker=tracker)
+    roi_processor.analyze_image(make_gauge_frame(), **kwargs)
+
+    result = roi_processor.analyze_image(make_gauge_frame(needle=False), **kwargs)
+
+    assert len(roi_processor.model.input_shapes) == 3
+    assert result.needles == []
+    assert tracker.fallbacks == 1
+    assert tracker.get("camera-1", (480, 640, 3)) is None
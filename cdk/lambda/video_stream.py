@@ -0,0 +1,327 @@
+"""
+動画・フレーム列の読み取りモジュール
+カメラの録画ファイル（またはフレームのイテレータ）から1フレームずつ読み出し、
+文字盤の領域に変化があったフレームだけYOLOで処理して読み取り値の時系列を返す
+
+変化の判定（MotionGate）は、文字盤の領域を縮小したグレースケール画像で、
+最後に推論したフレームから一定以上明るさが変わった画素の割合を求める。
+針が動かない間のフレームはYOLO推論・読み取りを行わない。
+
+フレームは1枚ずつ読み出して処理後に破棄するジェネレーターのため、動画の長さに
+よらずメモリ使用量は一定（保持するのは比較用の縮小画像と直前の読み取り値のみ）。
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from gauge_detector import DialDetector, DialGeometry
+from gauge_reader import GaugeCalibration, GaugeReading, read_gauge
+from roi_tracker import RoiTracker
+
+
+@dataclass
+class VideoFrame:
+    """動画の1フレーム"""
+
+    # 動画の先頭からのフレーム番号
+    index: int
+    # 動画の先頭からの時刻（秒。不明な場合はNone）
+    timestamp: Optional[float]
+    # 画像 (BGR)
+    image: np.ndarray
+
+
+def iter_video_frames(
+    source: Union[str, int, Iterable[np.ndarray]],
+    stride: int = 1,
+    max_frames: Optional[int] = None,
+    fps: Optional[float] = None,
+) -> Iterator[VideoFrame]:
+    """
+    動画ファイル・カメラ・フレームのイテレータから1フレームずつ読み出す
+
+    Args:
+        source: 動画ファイルのパス、カメラ番号（cv2.VideoCapture に渡す）、
+            または画像 (BGR) のイテレータ
+        stride: stride フレームごとに1フレームを返す（間のフレームはデコードしない）
+        max_frames: 返すフレーム数の上限（オプション）
+        fps: フレームレート（時刻の計算に使用。省略時は動画の値）
+
+    Yields:
+        フレーム
+    """
+    if stride < 1:
+        raise ValueError(f"strideは1以上を指定してください: {stride}")
+
+    if not isinstance(source, (str, int)):
+        count = 0
+        for index, image in enumerate(source):
+            if index % stride:
+                continue
+            yield VideoFrame(index, index / fps if fps else None, image)
+            count += 1
+            if max_frames is not None and count >= max_frames:
+                return
+        return
+
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"動画を開けません: {source}")
+    try:
+        fps = fps or capture.get(cv2.CAP_PROP_FPS) or None
+        index = 0
+        count = 0
+        while max_frames is None or count < max_frames:
+            # 間引くフレームはデコードせずに読み飛ばす
+            if index % stride:
+                if not capture.grab():
+                    return
+                index += 1
+                continue
+            ok, image = capture.read()
+            if not ok:
+                return
+            yield VideoFrame(index, index / fps if fps else None, image)
+            index += 1
+            count += 1
+    finally:
+        capture.release()
+
+
+def dial_region(dial: Optional[DialGeometry], shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+    """
+    変化を判定する領域（文字盤の外接矩形。文字盤が無い場合は画像全体）
+
+    Args:
+        dial: 文字盤のジオメトリ
+        shape: 画像の形状
+
+    Returns:
+        (x0, y0, x1, y1)
+    """
+    h, w = shape[:2]
+    if dial is None:
+        return 0, 0, w, h
+    x0 = max(0, int(dial.center_x - dial.radius))
+    y0 = max(0, int(dial.center_y - dial.radius))
+    x1 = min(w, int(dial.center_x + dial.radius) + 1)
+    y1 = min(h, int(dial.center_y + dial.radius) + 1)
+    if x1 <= x0 or y1 <= y0:
+        return 0, 0, w, h
+    return x0, y0, x1, y1
+
+
+class MotionGate:
+    """最後に推論したフレームとの差分から、推論が必要かどうかを判定"""
+
+    def __init__(
+        self,
+        threshold: float = 0.01,
+        size: int = 64,
+        pixel_threshold: int = 25,
+        max_interval: Optional[float] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            threshold: 変化した画素の割合がこの値を超えたら推論する
+            size: 判定に使う縮小画像の一辺（画素）
+            pixel_threshold: 明るさがこの値（0〜255）を超えて変わった画素を変化とみなす
+                （照明のちらつき・圧縮ノイズを無視するため）
+            max_interval: 変化が無くても、前回の推論からこの秒数が経過したら推論する（オプション）
+        """
+        self.threshold = threshold
+        self.size = size
+        self.pixel_threshold = pixel_threshold
+        self.max_interval = max_interval
+        self._reference: Optional[np.ndarray] = None
+        self._reference_time: Optional[float] = None
+
+    def _thumbnail(self, image: np.ndarray, region: Tuple[int, int, int, int]) -> np.ndarray:
+        x0, y0, x1, y1 = region
+        roi = image[y0:y1, x0:x1]
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if roi.ndim == 3 else roi
+        small = cv2.resize(gray, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def score(self, image: np.ndarray, region: Tuple[int, int, int, int]) -> Tuple[float, np.ndarray]:
+        """
+        最後に推論したフレームから変化した画素の割合
+
+        Args:
+            image: フレーム (BGR)
+            region: 判定する領域 (x0, y0, x1, y1)
+
+        Returns:
+            (変化した画素の割合（比較対象が無い場合は1.0）, 縮小画像)
+        """
+        thumbnail = self._thumbnail(image, region)
+        if self._reference is None:
+            return 1.0, thumbnail
+        diff = cv2.absdiff(thumbnail, self._reference)
+        return float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size, thumbnail
+
+    def check(
+        self,
+        image: np.ndarray,
+        region: Tuple[int, int, int, int],
+        timestamp: Optional[float] = None,
+    ) -> Tuple[bool, float]:
+        """
+        推論が必要かどうかを判定（必要な場合はこのフレームを比較対象にする）
+
+        Args:
+            image: フレーム (BGR)
+            region: 判定する領域 (x0, y0, x1, y1)
+            timestamp: フレームの時刻（秒、max_interval の判定に使用）
+
+        Returns:
+            (推論が必要かどうか, 変化した画素の割合)
+        """
+        score, thumbnail = self.score(image, region)
+        expired = (
+            self.max_interval is not None and timestamp is not None
+            and self._reference_time is not None
+            and timestamp - self._reference_time >= self.max_interval
+        )
+        if score > self.threshold or expired:
+            self._reference = thumbnail
+            self._reference_time = timestamp
+            return True, score
+        return False, score
+
+    def reset(self) -> None:
+        """比較対象を破棄（次のフレームは必ず推論する）"""
+        self._reference = None
+        self._reference_time = None
+
+
+@dataclass
+class ReadingSample:
+    """読み取り値の時系列の1点"""
+
+    # フレーム番号と時刻（秒）
+    frame_index: int
+    timestamp: Optional[float]
+    # このフレームで推論したかどうか（Falseの場合は直前の読み取り値）
+    inferred: bool
+    # 最後に推論したフレームから変化した画素の割合
+    motion_score: float
+    # 読み取り結果（針が無い、または校正値が無い場合はNone）
+    reading: Optional[GaugeReading] = None
+    # YOLOの処理結果メッセージ（推論した場合）
+    message: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """レスポンス用の辞書に変換"""
+        return {
+            "frame": self.frame_index,
+            "timestamp": round(self.timestamp, 3) if self.timestamp is not None else None,
+            "inferred": self.inferred,
+            "motionScore": round(self.motion_score, 4),
+            "reading": self.reading.to_dict() if self.reading is not None else None,
+            "message": self.message,
+        }
+
+
+@dataclass
+class StreamStats:
+    """フレームの処理状況"""
+
+    # 読み出したフレーム数と、推論した・省略したフレーム数
+    frames: int = 0
+    inferred: int = 0
+    skipped: int = 0
+    # 全体の処理時間と、推論したフレーム・省略したフレームの処理時間の合計（秒）
+    elapsed: float = 0.0
+    inferred_time: float = 0.0
+    skipped_time: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """レスポンス・ログ用の辞書に変換"""
+        return {
+            "frames": self.frames,
+            "inferred": self.inferred,
+            "skipped": self.skipped,
+            "skipRatio": round(self.skipped / self.frames, 3) if self.frames else None,
+            "elapsed": round(self.elapsed, 3),
+            "fps": round(self.frames / self.elapsed, 2) if self.elapsed > 0 else None,
+            "inferredFps": round(self.inferred / self.inferred_time, 2) if self.inferred_time > 0 else None,
+            "skippedFps": round(self.skipped / self.skipped_time, 2) if self.skipped_time > 0 else None,
+        }
+
+
+def iter_readings(
+    frames: Iterable[VideoFrame],
+    processor=None,
+    calibration: Optional[GaugeCalibration] = None,
+    gate: Optional[MotionGate] = None,
+    dial_detector: Optional[DialDetector] = None,
+    stream_id: Optional[str] = None,
+    stats: Optional[StreamStats] = None,
+    emit_skipped: bool = False,
+    tracker: Optional[RoiTracker] = None,
+) -> Iterator[ReadingSample]:
+    """
+    フレームの文字盤の領域に変化があった場合のみYOLOで処理し、読み取り値を返す
+
+    Args:
+        frames: フレームのイテレータ（iter_video_frames() など）
+        processor: YOLOProcessor（Noneの場合は変化の判定のみ行う）
+        calibration: ゲージの校正値（Noneの場合は読み取り値を返さない）
+        gate: 変化の判定（省略時はデフォルト設定の MotionGate）
+        dial_detector: 文字盤の検出器（省略時は検出せずに画像全体で判定し、画像中心を使う）
+        stream_id: カメラ・動画のID（文字盤の検出結果・ゲージ領域の再利用に使用）
+        stats: 処理状況の記録先（オプション）
+        emit_skipped: 推論を省略したフレームも直前の読み取り値で返すかどうか
+        tracker: ゲージ領域の追跡（オプション。針を検出した後のフレームは領域だけを推論）
+
+    Yields:
+        読み取り値（emit_skipped がFalseの場合は推論したフレームのみ）
+    """
+    if gate is None:
+        gate = MotionGate()
+    if stats is None:
+        stats = StreamStats()
+
+    dial: Optional[DialGeometry] = None
+    dial_checked = False
+    last: Optional[ReadingSample] = None
+    start = time.perf_counter()
+    for frame in frames:
+        frame_start = time.perf_counter()
+        if not dial_checked and dial_detector is not None:
+            dial = dial_detector.detect(frame.image, stream_id)
+            dial_checked = True
+
+        inferred, score = gate.check(frame.image, dial_region(dial, frame.image.shape), frame.timestamp)
+        stats.frames += 1
+        if inferred:
+            reading = None
+            message = None
+            if processor is not None:
+                result = processor.analyze_image(
+                    frame.image, dial.center if dial is not None else None, stream_id, tracker
+                )
+                message = result.message
+                if calibration is not None:
+                    reading = read_gauge(result.needles, result.center, calibration)
+            last = ReadingSample(frame.index, frame.timestamp, True, score, reading, message)
+            stats.inferred += 1
+            stats.inferred_time += time.perf_counter() - frame_start
+            stats.elapsed = time.perf_counter() - start
+            yield last
+        else:
+            stats.skipped += 1
+            stats.skipped_time += time.perf_counter() - frame_start
+            stats.elapsed = time.perf_counter() - start
+            if emit_skipped:
+                yield ReadingSample(
+                    frame.index, frame.timestamp, False, score,
+                    last.reading if last is not None else None,
+                )
+    stats.elapsed = time.perf_counter() - start
@@ -2,10 +2,41 @@
 YOLO圧力計針セグメンテーション処理モジュール
 Lambda環境用にリファクタリング
 """
+from dataclasses import dataclass, field
+
 import cv2
 import numpy as np
-from ultralytics import YOLO
-from typing import Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
+
+from inference_backends import Detections, create_backend
+from metrics import NULL_METRICS, Metrics
+from needle_geometry import (
+    LetterboxTransform,
+    NeedleGeometry,
+    analyze_needle,
+    map_geometry_to_image,
+    translate_geometry,
+)
+from roi_tracker import Region, RoiTracker
+
+# マスクの処理解像度
+#   full:   マスクを画像サイズに拡大してから解析・描画
+#   native: モデル出力の解像度のまま解析し、描画時のみ針の矩形領域を拡大
+MASK_RESOLUTIONS = ("full", "native")
+
+
+@dataclass
+class ProcessResult:
+    """YOLOProcessorの処理結果"""
+
+    # 処理済み画像 (BGR)
+    image: np.ndarray
+    # 処理結果メッセージ
+    message: str
+    # 検出した針のジオメトリ
+    needles: List[NeedleGeometry] = field(default_factory=list)
+    # 解析に使ったゲージ中心 (x, y)
+    center: Optional[Tuple[int, int]] = None
 
 
 class YOLOProcessor:
@@ -14,28 +45,45 @@ class YOLOProcessor:
     def __init__(
         self,
         model_path: str = "/opt/ml/model/best.pt",
+        backend: str = "torch",
         conf_threshold: float = 0.65,
         iou_threshold: float = 0.5,
         color: Tuple[int, int, int] = (0, 0, 200),
+        max_batch_size: int = 16,
+        mask_resolution: str = "full",
+        mask_threshold: float = 0.5,
     ):
         """
         初期化
 
         Args:
             model_path: YOLOモデルファイルパス
+            backend: 推論バックエンド ("torch", "onnx", "openvino")
             conf_threshold: 信頼度閾値
             iou_threshold: IOU閾値
             color: オーバーレイ色 (BGR)
+            max_batch_size: process_batch()で1回の推論にまとめる最大枚数
+            mask_resolution: マスクの処理解像度 ("full" or "native")
+            mask_threshold: マスクを針の画素とみなす閾値（解析・描画とも、どちらの解像度でも共通）
         """
+        if mask_resolution not in MASK_RESOLUTIONS:
+            raise ValueError(f"mask_resolutionは{MASK_RESOLUTIONS}のいずれかを指定してください: {mask_resolution}")
+
         self.model_path = model_path
+        self.backend = backend
         self.conf_threshold = conf_threshold
         self.iou_threshold = iou_threshold
         self.color = color
+        self.max_batch_size = max_batch_size
+        self.mask_resolution = mask_resolution
+        self.mask_threshold = mask_threshold
         self.model = None
 
     def load_model(self) -> None:
-        """YOLOモデルをロード"""
-        self.model = YOLO(self.model_path)
+        """YOLOモデルを選択したバックエンドでロード"""
+        model = create_backend(self.backend, self.model_path)
+        model.load()
+        self.model = model
 
     def overlay(
         self,
@@ -43,18 +91,64 @@ class YOLOProcessor:
         mask: np.ndarray,
         color: tuple,
         alpha: float,
-        resize: tuple = None,
+        inplace: bool = False,
     ) -> np.ndarray:
-        """マスクを画像に重ねる"""
-        colored_mask = np.expand_dims(mask, 0).repeat(3, axis=0)
-        colored_mask = np.moveaxis(colored_mask, 0, -1)
-        masked = np.ma.MaskedArray(image, mask=colored_mask, fill_value=color)
-        image_overlay = masked.filled()
-        if resize is not None:
-            image = cv2.resize(image.transpose(1, 2, 0), resize)
-            image_overlay = cv2.resize(image_overlay.transpose(1, 2, 0), resize)
-        image_combined = cv2.addWeighted(image, 1 - alpha, image_overlay, alpha, 0)
-        return image_combined
+        """
+        マスクを画像に重ねる
+
+        合成はマスクの外接矩形内のマスク画素のみに対して行い、それ以外の
+        画素は元の値のまま残す。
+
+        Args:
+            image: 元画像 (BGR)
+            mask: 針のマスク（0以外の画素を塗りつぶす）
+            color: オーバーレイ色 (BGR)
+            alpha: オーバーレイ色の重み
+            inplace: Trueの場合はimageを直接書き換える
+
+        Returns:
+            合成済み画像
+        """
+        result = image if inplace else image.copy()
+
+        mask_bool = mask != 0
+        rows = np.flatnonzero(mask_bool.any(axis=1))
+        if len(rows) == 0:
+            return result
+        cols = np.flatnonzero(mask_bool.any(axis=0))
+
+        y0, y1 = rows[0], rows[-1] + 1
+        x0, x1 = cols[0], cols[-1] + 1
+        self._blend_roi(result, mask_bool[y0:y1, x0:x1], x0, y0, color, alpha)
+        return result
+
+    def _blend_roi(
+        self,
+        image: np.ndarray,
+        roi_mask: np.ndarray,
+        x0: int,
+        y0: int,
+        color: tuple,
+        alpha: float,
+    ) -> None:
+        """
+        矩形領域内のマスク画素にオーバーレイ色をその場で合成（内部ヘルパー関数）
+
+        Args:
+            image: 書き込み先の画像 (BGR)
+            roi_mask: 矩形領域と同じサイズのboolマスク
+            x0, y0: 矩形領域の左上座標
+            color: オーバーレイ色 (BGR)
+            alpha: オーバーレイ色の重み
+        """
+        h, w = roi_mask.shape
+        roi = image[y0:y0 + h, x0:x0 + w]
+
+        # マスク画素だけを取り出してcv2.addWeightedと同じ丸めで合成
+        pixels = roi[roi_mask]
+        fill = np.empty_like(pixels)
+        fill[:] = color
+        roi[roi_mask] = cv2.addWeighted(pixels, 1 - alpha, fill, alpha, 0)
 
     def detect_needle_tip(
         self, mask: np.ndarray, center_x: int, center_y: int
@@ -70,26 +164,12 @@ class YOLOProcessor:
         Returns:
             (tip_x, tip_y, base_x, base_y): 先端座標と基部座標
         """
-        # マスクから針の座標を取得
-        needle_points = np.argwhere(mask > 0.5)
+        geometry = analyze_needle(mask, center_x, center_y)
 
-        if len(needle_points) == 0:
+        if geometry is None:
             return None, None, None, None
 
-        # 各点から中心までの距離を計算
-        distances = np.sqrt(
-            (needle_points[:, 1] - center_x) ** 2
-            + (needle_points[:, 0] - center_y) ** 2
-        )
-
-        # 最も遠い点を先端、最も近い点を基部とする
-        max_idx = np.argmax(distances)
-        min_idx = np.argmin(distances)
-
-        tip_y, tip_x = needle_points[max_idx]
-        base_y, base_x = needle_points[min_idx]
-
-        return int(tip_x), int(tip_y), int(base_x), int(base_y)
+        return geometry.tip_x, geometry.tip_y, geometry.base_x, geometry.base_y
 
     def apply_gradient_and_arrow(
         self,
@@ -118,34 +198,34 @@ class YOLOProcessor:
         result = image.copy()
 
         # 針の領域の座標を取得
-        needle_points = np.argwhere(mask > 0.5)
+        ys, xs = np.nonzero(mask > 0.5)
 
-        if len(needle_points) == 0:
+        if len(ys) == 0:
             return result
 
-        # 各ピクセルに対してグラデーションを適用
-        for point in needle_points:
-            y, x = point
-
-            # 基部から先端への距離の割合を計算 (0.0 = 基部, 1.0 = 先端)
-            dist_from_base = np.sqrt((x - base_x) ** 2 + (y - base_y) ** 2)
-            total_length = np.sqrt((tip_x - base_x) ** 2 + (tip_y - base_y) ** 2)
-
-            if total_length > 0:
-                ratio = min(1.0, dist_from_base / total_length)
-            else:
-                ratio = 0.0
+        # 基部から先端への距離の割合を一括で計算 (0.0 = 基部, 1.0 = 先端)
+        total_length = np.sqrt((tip_x - base_x) ** 2 + (tip_y - base_y) ** 2)
+        if total_length > 0:
+            dist_from_base = np.sqrt(
+                (xs.astype(np.int64) - base_x) ** 2
+                + (ys.astype(np.int64) - base_y) ** 2
+            )
+            ratio = np.minimum(1.0, dist_from_base / total_length)
+        else:
+            ratio = np.zeros(len(ys), dtype=np.float64)
 
-            # グラデーション: 基部=暗い赤 (0, 0, 100), 先端=明るい黄色 (0, 255, 255)
-            # BGRフォーマット
-            b = int(0)
-            g = int(255 * ratio)
-            r = int(100 + 155 * ratio)
+        # グラデーション: 基部=暗い赤 (0, 0, 100), 先端=明るい黄色 (0, 255, 255)
+        # BGRフォーマット（int()と同じく小数点以下を切り捨て）
+        colors = np.zeros((len(ys), 3), dtype=result.dtype)
+        colors[:, 1] = (255 * ratio).astype(np.int64)
+        colors[:, 2] = (100 + 155 * ratio).astype(np.int64)
 
-            result[y, x] = [b, g, r]
+        result[ys, xs] = colors
 
         # 先端に矢印マーカーを追加
-        result = self._draw_arrow(result, center_x, center_y, tip_x, tip_y)
+        result = self._draw_arrow(
+            result, center_x, center_y, tip_x, tip_y, inplace=True
+        )
 
         return result
 
@@ -170,9 +250,7 @@ class YOLOProcessor:
         Returns:
             処理済み画像
         """
-        result = image.copy()
-        result = self._draw_arrow(result, center_x, center_y, tip_x, tip_y)
-        return result
+        return self._draw_arrow(image, center_x, center_y, tip_x, tip_y)
 
     def apply_red_triangle_marker(
         self,
@@ -182,6 +260,7 @@ class YOLOProcessor:
         center_y: int,
         tip_x: int,
         tip_y: int,
+        inplace: bool = False,
     ) -> np.ndarray:
         """
         針の先端に赤色の小さな三角形マーカーを描画（針は赤色のまま）
@@ -191,11 +270,12 @@ class YOLOProcessor:
             mask: 針のマスク
             center_x, center_y: ゲージ中心
             tip_x, tip_y: 針の先端座標
+            inplace: Trueの場合はimageを直接書き換える
 
         Returns:
             処理済み画像
         """
-        result = image.copy()
+        result = image if inplace else image.copy()
 
         # 針の方向ベクトルを計算
         dx = tip_x - center_x
@@ -256,6 +336,7 @@ class YOLOProcessor:
         center_y: int,
         tip_x: int,
         tip_y: int,
+        inplace: bool = False,
     ) -> np.ndarray:
         """
         矢印を描画（内部ヘルパー関数）
@@ -264,11 +345,12 @@ class YOLOProcessor:
             image: 画像
             center_x, center_y: ゲージ中心
             tip_x, tip_y: 針の先端座標
+            inplace: Trueの場合はimageを直接書き換える
 
         Returns:
             矢印描画済み画像
         """
-        result = image.copy()
+        result = image if inplace else image.copy()
 
         # 針の方向ベクトルを計算
         dx = tip_x - center_x
@@ -328,46 +410,343 @@ class YOLOProcessor:
         Returns:
             (処理済み画像, メッセージ)
         """
+        result = self.analyze_image(image)
+        return result.image, result.message
+
+    def analyze_image(
+        self,
+        image: np.ndarray,
+        center: Optional[Tuple[int, int]] = None,
+        stream_id: Optional[str] = None,
+        tracker: Optional[RoiTracker] = None,
+    ) -> "ProcessResult":
+        """
+        画像を処理し、描画結果と針のジオメトリを返す（triangle固定）
+
+        Args:
+            image: 入力画像 (BGR)
+            center: ゲージ中心 (x, y)（省略時は画像中心）
+            stream_id: カメラ・動画のID（trackerの領域の検索に使用）
+            tracker: ゲージ領域の追跡（オプション、iter_analyze_batch() を参照）
+
+        Returns:
+            処理結果
+        """
         if self.model is None:
             raise RuntimeError("モデルが読み込まれていません。load_model()を先に実行してください。")
 
-        h, w, _ = image.shape
-
-        # ゲージ中心を画像中心と仮定
-        center_x = w // 2
-        center_y = h // 2
+        if tracker is not None:
+            return next(self.iter_analyze_batch(
+                [image], centers=[center], stream_ids=[stream_id], tracker=tracker
+            ))
 
         # YOLOでセグメンテーション
-        results = self.model(
-            image, conf=self.conf_threshold, iou=self.iou_threshold
+        detections = self.model.predict(
+            [image], conf=self.conf_threshold, iou=self.iou_threshold
         )
-        result = results[0]
+
+        return self._render_result(image, detections[0], center)
+
+    def process_batch(
+        self, images: List[np.ndarray], max_batch_size: Optional[int] = None
+    ) -> List[Tuple[np.ndarray, str]]:
+        """
+        複数画像をまとめて処理（triangle固定）
+
+        サイズの異なる画像もそのまま渡せる。max_batch_size枚ずつ1回の
+        推論呼び出しにまとめ、結果は入力と同じ順序で返す。
+
+        Args:
+            images: 入力画像 (BGR) のリスト
+            max_batch_size: 1回の推論で処理する最大枚数（省略時はself.max_batch_size）
+
+        Returns:
+            [(処理済み画像, メッセージ), ...]
+        """
+        return [
+            (result.image, result.message)
+            for result in self.iter_analyze_batch(images, max_batch_size)
+        ]
+
+    def iter_analyze_batch(
+        self,
+        images: List[np.ndarray],
+        max_batch_size: Optional[int] = None,
+        centers: Optional[List[Optional[Tuple[int, int]]]] = None,
+        metrics: Metrics = NULL_METRICS,
+        stream_ids: Optional[List[Optional[str]]] = None,
+        tracker: Optional[RoiTracker] = None,
+    ) -> Iterator["ProcessResult"]:
+        """
+        複数画像をまとめて処理し、処理結果を1枚ずつ返すジェネレーター
+
+        チャンク単位で推論し、結果を入力順に1枚ずつyieldする。呼び出し側は
+        先に返ってきた画像の後続処理（LLM呼び出しなど）を、次のチャンクの
+        推論と並行して進められる。
+
+        tracker を指定した場合、同じカメラ・動画で前回針を検出した画像は
+        ゲージ領域だけを切り抜いて推論する（結果の座標は元画像の座標）。
+        領域で針を見失った場合はその画像だけ画像全体で推論し直す。
+
+        Args:
+            images: 入力画像 (BGR) のリスト
+            max_batch_size: 1回の推論で処理する最大枚数（省略時はself.max_batch_size）
+            centers: 画像ごとのゲージ中心 (x, y)（省略時やNoneの画像は画像中心）
+            metrics: 推論・マスク後処理・描画の所要時間とマスク画素数の記録先（オプション）
+            stream_ids: 画像ごとのカメラ・動画のID（省略時やNoneの画像は追跡しない）
+            tracker: ゲージ領域の追跡（オプション）
+
+        Yields:
+            処理結果
+        """
+        if self.model is None:
+            raise RuntimeError("モデルが読み込まれていません。load_model()を先に実行してください。")
+
+        batch_size = max_batch_size or self.max_batch_size
+        if batch_size < 1:
+            raise ValueError(f"max_batch_sizeは1以上を指定してください: {batch_size}")
+
+        if centers is None:
+            centers = [None] * len(images)
+        if stream_ids is None or tracker is None:
+            stream_ids = [None] * len(images)
+
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            chunk_centers = centers[start:start + batch_size]
+            chunk_ids = stream_ids[start:start + batch_size]
+
+            # 領域を追跡している画像は切り抜いて推論
+            regions = [
+                tracker.get(stream_id, image.shape) if stream_id is not None else None
+                for image, stream_id in zip(chunk, chunk_ids)
+            ]
+            inputs = [
+                image if region is None else image[region[1]:region[3], region[0]:region[2]]
+                for image, region in zip(chunk, regions)
+            ]
+
+            # YOLOでセグメンテーション（チャンク単位で1回の推論）
+            with metrics.stage("yoloInference"):
+                detections = self.model.predict(
+                    inputs, conf=self.conf_threshold, iou=self.iou_threshold
+                )
+
+            for image, detection, center, region, stream_id in zip(
+                chunk, detections, chunk_centers, regions, chunk_ids
+            ):
+                if region is None:
+                    result = self._render_result(image, detection, center, metrics)
+                else:
+                    result = self._render_region_result(image, region, detection, center, metrics)
+                    tracker.record(fallback=not result.needles)
+                    metrics.add("roiInferences", 1)
+                    if not result.needles:
+                        # 針を見失った場合は画像全体で推論し直す
+                        metrics.add("roiFallbacks", 1)
+                        with metrics.stage("yoloInference"):
+                            detection = self.model.predict(
+                                [image], conf=self.conf_threshold, iou=self.iou_threshold
+                            )[0]
+                        result = self._render_result(image, detection, center, metrics)
+                if stream_id is not None:
+                    tracker.update(stream_id, image.shape, result.needles, result.center)
+                yield result
+
+    def _render_region_result(
+        self,
+        image: np.ndarray,
+        region: Region,
+        detections: Detections,
+        center: Optional[Tuple[int, int]] = None,
+        metrics: Metrics = NULL_METRICS,
+    ) -> "ProcessResult":
+        """
+        切り抜いた領域の推論結果を描画し、元画像の座標の処理結果にする（内部ヘルパー関数）
+
+        Args:
+            image: 入力画像 (BGR)
+            region: 推論した領域 (x0, y0, x1, y1)
+            detections: 切り抜いた画像の推論結果
+            center: ゲージ中心 (x, y)（元画像の座標。省略時は元画像の中心）
+            metrics: マスク後処理・描画の所要時間とマスク画素数の記録先
+
+        Returns:
+            処理結果（針の座標とゲージ中心は元画像の座標）
+        """
+        h, w = image.shape[:2]
+        x0, y0, x1, y1 = region
+        if center is not None:
+            center_x, center_y = int(center[0]), int(center[1])
+        else:
+            center_x, center_y = w // 2, h // 2
+
+        # 元画像のコピーの領域に直接描画する
         output_image = image.copy()
+        cropped = self._render_result(
+            image[y0:y1, x0:x1],
+            detections,
+            (center_x - x0, center_y - y0),
+            metrics,
+            output_image=output_image[y0:y1, x0:x1],
+        )
 
-        if result.masks is None:
-            return output_image, "針が検出されませんでした"
+        return ProcessResult(
+            output_image,
+            cropped.message,
+            [translate_geometry(needle, x0, y0) for needle in cropped.needles],
+            (center_x, center_y),
+        )
+
+    def _render_result(
+        self,
+        image: np.ndarray,
+        detections: Detections,
+        center: Optional[Tuple[int, int]] = None,
+        metrics: Metrics = NULL_METRICS,
+        output_image: Optional[np.ndarray] = None,
+    ) -> "ProcessResult":
+        """
+        1枚分の推論結果からマスクを後処理して描画（内部ヘルパー関数）
+
+        Args:
+            image: 入力画像 (BGR)
+            detections: 推論結果
+            center: ゲージ中心 (x, y)（省略時は画像中心）
+            metrics: マスク後処理・描画の所要時間とマスク画素数の記録先
+            output_image: 描画先（imageと同じサイズ。省略時はimageのコピー）
 
-        for r in results:
-            boxes = r.boxes
+        Returns:
+            処理結果
+        """
+        h, w, _ = image.shape
+
+        # ゲージ中心が指定されていない場合は画像中心と仮定
+        if center is not None:
+            center_x, center_y = int(center[0]), int(center[1])
+        else:
+            center_x = w // 2
+            center_y = h // 2
 
-        for i, (seg, box) in enumerate(zip(result.masks.data.cpu().numpy(), boxes)):
-            seg = cv2.resize(seg, (w, h))
+        if output_image is None:
+            output_image = image.copy()
+        needles = []
 
-            # 針の先端と基部を検出
-            tip_x, tip_y, base_x, base_y = self.detect_needle_tip(
-                seg, center_x, center_y
+        if detections.masks is None:
+            return ProcessResult(
+                output_image, "針が検出されませんでした", needles, (center_x, center_y)
             )
 
-            if tip_x is not None:
-                # 通常の赤色オーバーレイ
-                output_image = self.overlay(output_image, seg, self.color, 0.5)
-                # 赤色の小さな三角形マーカーを適用
-                output_image = self.apply_red_triangle_marker(
-                    output_image, seg, center_x, center_y, tip_x, tip_y
+        masks = detections.masks
+        transform = LetterboxTransform.from_shapes((h, w), masks.shape[1:])
+
+        for i, (seg, score) in enumerate(zip(masks, detections.scores)):
+            if metrics.enabled:
+                # モデル出力の解像度での画素数（mask_resolution によらず同じ基準）
+                metrics.add("maskPixels", int(np.count_nonzero(seg > self.mask_threshold)))
+
+            # 針の輪郭から先端・基部・角度を検出し、赤色オーバーレイを出力画像に直接合成
+            if self.mask_resolution == "native":
+                geometry = self._analyze_native_mask(
+                    output_image, seg, transform, center_x, center_y, metrics
                 )
             else:
-                # フォールバック: 通常の赤色オーバーレイ
-                output_image = self.overlay(output_image, seg, self.color, 0.5)
-                return output_image, f"警告: 針の先端を検出できませんでした（画像{i+1}）"
+                geometry = self._analyze_full_mask(
+                    output_image, seg, transform, center_x, center_y, metrics
+                )
+
+            if geometry is not None:
+                geometry.score = float(score)
+                needles.append(geometry)
+                # 赤色の小さな三角形マーカーを適用
+                with metrics.stage("render"):
+                    self.apply_red_triangle_marker(
+                        output_image, None, center_x, center_y,
+                        geometry.tip_x, geometry.tip_y,
+                        inplace=True,
+                    )
+            else:
+                return ProcessResult(
+                    output_image,
+                    f"警告: 針の先端を検出できませんでした（画像{i+1}）",
+                    needles,
+                    (center_x, center_y),
+                )
+
+        return ProcessResult(output_image, "処理成功", needles, (center_x, center_y))
+
+    def _analyze_full_mask(
+        self,
+        output_image: np.ndarray,
+        seg: np.ndarray,
+        transform: LetterboxTransform,
+        center_x: int,
+        center_y: int,
+        metrics: Metrics = NULL_METRICS,
+    ) -> Optional[NeedleGeometry]:
+        """
+        マスクを画像サイズに拡大して解析・描画（内部ヘルパー関数）
+
+        Args:
+            output_image: 描画先の画像 (BGR)
+            seg: モデル出力マスク
+            transform: レターボックス変換
+            center_x, center_y: ゲージ中心（画像座標）
+            metrics: マスク後処理・描画の所要時間の記録先
+
+        Returns:
+            画像座標の針のジオメトリ。先端を検出できない場合はNone
+        """
+        with metrics.stage("maskPostprocess"):
+            h, w = output_image.shape[:2]
+            seg = transform.mask_to_image(seg, (h, w))
+
+            geometry = analyze_needle(seg, center_x, center_y, self.mask_threshold)
+
+        # 通常の赤色オーバーレイ（先端を検出できない場合もマスクは描画する）
+        # native と同じ閾値で2値化し、どちらの解像度でも同じ画素を針として描画する
+        with metrics.stage("render"):
+            self.overlay(output_image, seg > self.mask_threshold, self.color, 0.5, inplace=True)
+
+        return geometry
+
+    def _analyze_native_mask(
+        self,
+        output_image: np.ndarray,
+        seg: np.ndarray,
+        transform: LetterboxTransform,
+        center_x: int,
+        center_y: int,
+        metrics: Metrics = NULL_METRICS,
+    ) -> Optional[NeedleGeometry]:
+        """
+        モデル出力の解像度のままマスクを解析し、針の矩形領域だけを拡大して描画（内部ヘルパー関数）
+
+        Args:
+            output_image: 描画先の画像 (BGR)
+            seg: モデル出力マスク
+            transform: レターボックス変換
+            center_x, center_y: ゲージ中心（画像座標）
+            metrics: マスク後処理・描画の所要時間の記録先
+
+        Returns:
+            画像座標の針のジオメトリ。先端を検出できない場合はNone
+        """
+        with metrics.stage("maskPostprocess"):
+            mask_center_x, mask_center_y = transform.pixel_to_mask(center_x, center_y)
+            geometry = analyze_needle(seg, mask_center_x, mask_center_y, self.mask_threshold)
+
+        if geometry is None:
+            return None
+
+        # 針の外接矩形だけを画像解像度に拡大して赤色オーバーレイ
+        with metrics.stage("render"):
+            x0, y0, roi_mask = transform.mask_roi_to_image(
+                seg, cv2.boundingRect(geometry.contour), output_image.shape
+            )
+            if roi_mask.size > 0:
+                self._blend_roi(
+                    output_image, roi_mask > self.mask_threshold, x0, y0, self.color, 0.5
+                )
 
-        return output_image, "処理成功"
+        return map_geometry_to_image(geometry, transform)
@@ -2,6 +2,7 @@ import * as cdk from 'aws-cdk-lib';
 import * as lambda from 'aws-cdk-lib/aws-lambda';
 import * as ecr from 'aws-cdk-lib/aws-ecr';
 import * as iam from 'aws-cdk-lib/aws-iam';
+import * as s3 from 'aws-cdk-lib/aws-s3';
 import { Construct } from 'constructs';
 import { DockerImageCode, DockerImageFunction } from 'aws-cdk-lib/aws-lambda';
 import * as path from 'path';
@@ -19,6 +20,32 @@ export class CdkStack extends cdk.Stack {
       autoDeleteImages: true, // 開発環境用
     });
 
+    // ========================================
+    // 画像バケットの作成（imageUri で画像を受け渡すオブジェクト参照モード用）
+    // ========================================
+    const imageBucket = new s3.Bucket(this, 'GaugeImageBucket', {
+      blockPublicAccess: s3.BlockPublicAccess.BLOCK_ALL,
+      encryption: s3.BucketEncryption.S3_MANAGED,
+      enforceSSL: true,
+      lifecycleRules: [{ expiration: cdk.Duration.days(7) }], // 入力画像・前処理済み画像は7日で削除
+      removalPolicy: cdk.RemovalPolicy.DESTROY, // 開発環境用
+      autoDeleteObjects: true, // 開発環境用
+    });
+
+    // ========================================
+    // 推論バックエンドの選択（cdk deploy -c modelBackend=onnx など）
+    // ========================================
+    const modelBackend: string = this.node.tryGetContext('modelBackend') ?? 'torch';
+    const modelPaths: Record<string, string> = {
+      torch: '/opt/ml/model/best.pt',
+      onnx: '/opt/ml/model/best.onnx',
+      openvino: '/opt/ml/model/best_openvino_model',
+    };
+    const modelPath = modelPaths[modelBackend];
+    if (modelPath === undefined) {
+      throw new Error(`Unsupported modelBackend: ${modelBackend}`);
+    }
+
     // ========================================
     // Lambda関数の作成（コンテナイメージ）
     // ========================================
@@ -29,13 +56,38 @@ export class CdkStack extends cdk.Stack {
         file: 'Dockerfile',
         // ビルド時のプラットフォームを指定
         platform: cdk.aws_ecr_assets.Platform.LINUX_AMD64,
+        // 推論バックエンドに応じてモデルをエクスポート
+        buildArgs: {
+          MODEL_BACKEND: modelBackend,
+          MODEL_PATH: modelPath,
+        },
       }),
       memorySize: 3008, // 3GB
       timeout: cdk.Duration.seconds(120), // 120秒
       environment: {
-        MODEL_PATH: '/opt/ml/model/best.pt',
+        MODEL_BACKEND: modelBackend,
+        MODEL_PATH: modelPath,
         CONF_THRESHOLD: '0.65',
         IOU_THRESHOLD: '0.5',
+        MAX_BATCH_SIZE: '16',
+        MASK_RESOLUTION: 'full',
+        BEDROCK_MAX_CONCURRENCY: '4',
+        BEDROCK_STREAM: 'false',  // trueでストリーミング呼び出し（読み取り値が現れた時点で打ち切る）
+        LLM_OUTPUT_FORMAT: 'text',  // jsonで読み取り値のJSONのみを回答させる（出力トークン数を削減）
+        PROMPT_CACHE: 'true',  // システムプロンプトと参考画像をBedrockのプロンプトキャッシュの対象にする
+        DIAL_DETECTION: 'hough',  // 文字盤中心の検出（none で画像中心を使用）
+        READING_MODE: 'llm',  // local / auto で針の角度と校正値から読み取る
+        READING_MIN_CONFIDENCE: '0.6',
+        IMAGE_FORMAT: 'png',  // 前処理済み画像の形式（png / jpeg / webp）
+        PNG_COMPRESSION: '3',
+        RESPONSE_IMAGE: 'full',  // none で読み取り結果のみ、thumbnail で縮小画像を返す（エンコードを省略）
+        LLM_IMAGE_MAX_EDGE: '768',  // Bedrockに送る画像の長辺（文字盤の周囲に切り抜いてから縮小）
+        LLM_IMAGE_FORMAT: 'auto',  // PNGが LLM_IMAGE_PNG_MAX_BYTES を超える場合はJPEGで送る
+        CACHE_BACKEND: 'memory',  // 同一画像・プロンプトの処理結果をキャッシュ（none で無効）
+        ROI_TRACKING: 'true',  // cameraId ごとにゲージ領域を記憶し、次の画像は領域を切り抜いて推論
+        MOTION_THRESHOLD: '0.01',  // videoUri: 文字盤の画素がこの割合以上変化したフレームのみYOLOで処理
+        METRICS: 'true',  // 処理段階ごとの所要時間をEMF形式でログに出力（CloudWatchメトリクス）
+        WARMUP_ON_INIT: 'false',  // trueで初期化フェーズにモデルのロードとダミー推論を実行
         BEDROCK_REGION: 'us-east-1',  // Bedrock呼び出しリージョンを明示的に指定
       },
       description: 'Pressure gauge needle detection using YOLO segmentation',
@@ -58,6 +110,11 @@ export class CdkStack extends cdk.Stack {
       ],
     }));
 
+    // ========================================
+    // Lambda関数に画像バケットの読み書き権限を追加
+    // ========================================
+    imageBucket.grantReadWrite(gaugeDetectionFunction);
+
     // ========================================
     // スタック出力
     // ========================================
@@ -71,6 +128,11 @@ export class CdkStack extends cdk.Stack {
       description: 'Lambda Function Name',
     });
 
+    new cdk.CfnOutput(this, 'ImageBucketName', {
+      value: imageBucket.bucketName,
+      description: 'Image Bucket Name (test.py --s3-bucket)',
+    });
+
     new cdk.CfnOutput(this, 'LambdaFunctionArn', {
       value: gaugeDetectionFunction.functionArn,
       description: 'Lambda Function ARN',
@@ -0,0 +1,1287 @@
+#!/usr/bin/env python3
+"""
+圧力計メーター読み取りシステム ベンチマークスクリプト
+
+Lambda関数のコード（cdk/lambda）をローカルで直接呼び出し、処理時間などを
+計測します。Bedrockの呼び出しは fake_bedrock.py のフェイクで置き換えるため、
+AWSに接続せずに実行できます。
+
+実行には cdk/lambda/requirements.txt の依存パッケージが必要です。
+"""
+import argparse
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+LAMBDA_DIR = SCRIPT_DIR.parent / 'cdk' / 'lambda'
+sys.path.insert(0, str(LAMBDA_DIR))
+
+from fake_bedrock import FakeBedrockRuntimeClient  # noqa: E402
+
+
+def load_sample_images(image_dir: Path, count: int = None) -> List[np.ndarray]:
+    """
+    サンプル画像を読み込む
+
+    Args:
+        image_dir: 画像ディレクトリ
+        count: 読み込む枚数（不足分は先頭から繰り返す。省略時は全件）
+
+    Returns:
+        OpenCV形式の画像 (BGR) のリスト
+    """
+    paths = sorted(p for p in image_dir.iterdir() if p.suffix.lower() in ('.png', '.jpg', '.jpeg'))
+    if not paths:
+        raise FileNotFoundError(f"画像が見つかりません: {image_dir}")
+    images = [cv2.imread(str(p), cv2.IMREAD_COLOR) for p in paths]
+    if count is None:
+        return images
+    return [images[i % len(images)] for i in range(count)]
+
+
+RESOLUTIONS = {
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+    '4K': (3840, 2160),
+}
+
+
+def make_synthetic_frame(width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ベンチマーク用の合成画像と針マスクを作成
+
+    Args:
+        width: 画像の幅
+        height: 画像の高さ
+
+    Returns:
+        (画像 (BGR), 針マスク (float32, 0 or 1))
+    """
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    mask = np.zeros((height, width), dtype=np.float32)
+    center = (width // 2, height // 2)
+    tip = (int(width * 0.7), int(height * 0.25))
+    cv2.line(mask, center, tip, 1.0, thickness=max(3, height // 60))
+    return image, mask
+
+
+def bench_render(args: argparse.Namespace) -> None:
+    """針オーバーレイ + 三角形マーカー描画の処理時間とピークメモリを計測"""
+    from yolo_processor import YOLOProcessor
+
+    processor = YOLOProcessor()
+
+    for name, (width, height) in RESOLUTIONS.items():
+        image, mask = make_synthetic_frame(width, height)
+        center_x, center_y = width // 2, height // 2
+
+        def render() -> np.ndarray:
+            output_image = image.copy()
+            tip_x, tip_y, _, _ = processor.detect_needle_tip(mask, center_x, center_y)
+            processor.overlay(output_image, mask, processor.color, 0.5, inplace=True)
+            processor.apply_red_triangle_marker(
+                output_image, mask, center_x, center_y, tip_x, tip_y, inplace=True
+            )
+            return output_image
+
+        render()  # ウォームアップ
+
+        tracemalloc.start()
+        render()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            render()
+        elapsed = (time.perf_counter() - start) / args.repeat
+
+        frame_mb = image.nbytes / 1024 / 1024
+        print(f"[RESULT] {name:>5} ({width}x{height}): {elapsed * 1000:8.2f} ms/frame, "
+              f"peak {peak / 1024 / 1024:7.1f} MB (frame {frame_mb:.1f} MB)")
+
+
+# 文字盤検出の評価用に作る画像の変形（平行移動: 画像サイズに対する比率 / 切り抜き: 残す比率と位置）
+DIAL_SHIFTS = [(-0.2, 0.0), (0.2, 0.0), (0.0, -0.15), (0.0, 0.15), (0.15, 0.1)]
+DIAL_CROPS = [(0.7, 'top-left'), (0.7, 'top-right'), (0.7, 'bottom-left'), (0.7, 'bottom-right')]
+
+
+def make_dial_variants(
+    image: np.ndarray, center: Tuple[float, float]
+) -> List[Tuple[str, np.ndarray, Tuple[float, float]]]:
+    """
+    文字盤が画像中心から外れた評価用画像を作成
+
+    Args:
+        image: 元画像 (BGR)
+        center: 元画像での文字盤中心 (x, y)
+
+    Returns:
+        [(変形名, 画像, 変形後の文字盤中心), ...]
+    """
+    h, w = image.shape[:2]
+    variants = []
+    for fx, fy in DIAL_SHIFTS:
+        dx, dy = int(w * fx), int(h * fy)
+        matrix = np.float32([[1, 0, dx], [0, 1, dy]])
+        shifted = cv2.warpAffine(image, matrix, (w, h), borderMode=cv2.BORDER_REPLICATE)
+        variants.append((f"shift({fx:+.2f},{fy:+.2f})", shifted, (center[0] + dx, center[1] + dy)))
+    for ratio, anchor in DIAL_CROPS:
+        cw, ch = int(w * ratio), int(h * ratio)
+        x0 = 0 if 'left' in anchor else w - cw
+        y0 = 0 if 'top' in anchor else h - ch
+        cropped = image[y0:y0 + ch, x0:x0 + cw].copy()
+        variants.append((f"crop({anchor})", cropped, (center[0] - x0, center[1] - y0)))
+    return variants
+
+
+def bench_dial(args: argparse.Namespace) -> None:
+    """平行移動・切り抜きした画像での文字盤中心の検出精度と検出時間を計測"""
+    from gauge_detector import DialDetector, detect_dial
+
+    images = load_sample_images(args.image_dir)
+    if args.save_dir is not None:
+        args.save_dir.mkdir(parents=True, exist_ok=True)
+
+    errors, baseline_errors, times, missed, total = [], [], [], 0, 0
+    for index, image in enumerate(images):
+        # 元画像での検出結果を正解とし、変形に合わせて移動させる
+        reference = detect_dial(image, args.max_side)
+        if reference is None:
+            print(f"[WARN] 元画像で文字盤を検出できませんでした（画像{index + 1}）")
+            continue
+
+        for name, variant, (ref_x, ref_y) in make_dial_variants(image, (reference.center_x, reference.center_y)):
+            total += 1
+            if args.save_dir is not None:
+                safe_name = name.replace('(', '_').replace(')', '').replace(',', '_')
+                cv2.imwrite(str(args.save_dir / f"{index + 1:04d}_{safe_name}.png"), variant)
+
+            start = time.perf_counter()
+            dial = detect_dial(variant, args.max_side)
+            times.append(time.perf_counter() - start)
+
+            h, w = variant.shape[:2]
+            baseline_errors.append(np.hypot(w / 2 - ref_x, h / 2 - ref_y) / reference.radius)
+            if dial is None:
+                missed += 1
+                continue
+            errors.append(np.hypot(dial.center_x - ref_x, dial.center_y - ref_y) / reference.radius)
+
+    # カメラIDごとのキャッシュを使った場合（2回目以降は検出を省略）
+    detector = DialDetector(max_side=args.max_side)
+    detector.detect(images[0], 'camera')
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        detector.detect(images[0], 'camera')
+    cached_time = (time.perf_counter() - start) / args.repeat
+
+    print(f"[INFO] 評価画像: {total}枚（元画像{len(images)}枚 × 平行移動{len(DIAL_SHIFTS)} + 切り抜き{len(DIAL_CROPS)}）")
+    print(f"[RESULT] 検出率: {(total - missed) / max(1, total) * 100:.1f}%")
+    if errors:
+        print(f"[RESULT] 中心の誤差（半径比）: mean {np.mean(errors) * 100:.1f}%, "
+              f"p95 {np.percentile(errors, 95) * 100:.1f}%, max {np.max(errors) * 100:.1f}%")
+    print(f"[RESULT] 画像中心を使った場合の誤差（半径比）: mean {np.mean(baseline_errors) * 100:.1f}%, "
+          f"p95 {np.percentile(baseline_errors, 95) * 100:.1f}%")
+    print(f"[RESULT] 検出時間: mean {np.mean(times) * 1000:.2f} ms, p95 {np.percentile(times, 95) * 1000:.2f} ms "
+          f"(縮小画像の長辺 {args.max_side}px)")
+    print(f"[RESULT] カメラIDのキャッシュヒット時: {cached_time * 1e6:.1f} us")
+
+
+def legacy_decode(data: bytes) -> np.ndarray:
+    """PILを経由する従来のデコード処理（比較用）"""
+    from io import BytesIO
+    from PIL import Image
+
+    image_rgb = np.array(Image.open(BytesIO(data)))
+    if image_rgb.ndim == 2:
+        return cv2.cvtColor(image_rgb, cv2.COLOR_GRAY2BGR)
+    if image_rgb.shape[2] == 4:
+        return cv2.cvtColor(image_rgb, cv2.COLOR_RGBA2BGR)
+    return cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
+
+
+def legacy_encode(image: np.ndarray) -> bytes:
+    """PILを経由する従来のPNGエンコード処理（比較用）"""
+    from io import BytesIO
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)).save(buffer, format='PNG')
+    buffer.seek(0)
+    return buffer.read()
+
+
+def bench_codec(args: argparse.Namespace) -> None:
+    """従来のPIL経由の処理とOpenCVの処理で、形式ごとのエンコード・デコード時間と出力サイズを比較"""
+    from image_codec import EncodeOptions, decode_image, encode_image
+
+    frames = {'sample': load_sample_images(args.image_dir)}
+    for name, (width, height) in RESOLUTIONS.items():
+        if name in args.resolutions:
+            # 合成画像は乱数ノイズで圧縮が効かないため、サンプル画像を拡大して使う
+            frames[name] = [cv2.resize(frames['sample'][0], (width, height))]
+
+    codecs = [('PIL png (legacy)', None)]
+    for level in (1, 3, 6):
+        codecs.append((f'cv2 png level={level}', EncodeOptions(format='png', png_compression=level)))
+    codecs.append((f'cv2 jpeg q={args.quality}', EncodeOptions(format='jpeg', jpeg_quality=args.quality)))
+    codecs.append((f'cv2 webp q={args.quality}', EncodeOptions(format='webp', webp_quality=args.quality)))
+
+    def timed(func, *func_args) -> Tuple[float, object]:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            value = func(*func_args)
+        return (time.perf_counter() - start) / args.repeat, value
+
+    for frame_name, images in frames.items():
+        h, w = images[0].shape[:2]
+        print(f"[INFO] {frame_name} ({len(images)}枚, {w}x{h})")
+        print(f"  {'codec':<22} {'encode[ms]':>10} {'decode[ms]':>10} {'legacy dec[ms]':>14} {'size[KB]':>9}")
+        for codec_name, options in codecs:
+            encode_times, decode_times, legacy_times, sizes = [], [], [], []
+            for image in images:
+                if options is None:
+                    elapsed, data = timed(legacy_encode, image)
+                else:
+                    elapsed, (data, _) = timed(encode_image, image, options)
+                encode_times.append(elapsed)
+                sizes.append(len(data))
+                decode_times.append(timed(decode_image, data)[0])
+                legacy_times.append(timed(legacy_decode, data)[0])
+            print(f"  {codec_name:<22} {np.mean(encode_times) * 1000:>10.2f} "
+                  f"{np.mean(decode_times) * 1000:>10.2f} {np.mean(legacy_times) * 1000:>14.2f} "
+                  f"{np.mean(sizes) / 1024:>9.1f}")
+        print()
+
+
+def bench_llm_image(args: argparse.Namespace) -> None:
+    """Bedrockに送る画像のサイズ・推定トークン数・準備時間を、全体をPNGで送る従来の処理と比較"""
+    from gauge_detector import detect_dial
+    from image_codec import EncodeOptions, encode_image_to_base64
+    from llm_image import LLMImageOptions, estimate_image_tokens, prepare_llm_image
+
+    frames = {'sample': load_sample_images(args.image_dir)}
+    for name, (width, height) in RESOLUTIONS.items():
+        if name in args.resolutions:
+            frames[name] = [cv2.resize(image, (width, height)) for image in frames['sample']]
+
+    options = LLMImageOptions(
+        max_edge=args.max_edge,
+        margin=args.margin,
+        format=args.format,
+        png_max_bytes=args.png_max_bytes,
+    )
+    legacy_options = EncodeOptions(format='png')
+
+    def timed(func, *func_args) -> Tuple[float, object]:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            value = func(*func_args)
+        return (time.perf_counter() - start) / args.repeat, value
+
+    print(f"[INFO] max_edge={options.max_edge}, margin={options.margin}, format={options.format}")
+    print(f"  {'frames':<8} {'method':<10} {'encode[ms]':>10} {'size[KB]':>9} {'tokens':>7} {'crop':>6}")
+    for frame_name, images in frames.items():
+        dials = [detect_dial(image) for image in images]
+        rows = {'before': ([], [], []), 'after': ([], [], [])}
+        media_types = set()
+        for image, dial in zip(images, dials):
+            h, w = image.shape[:2]
+            elapsed, (data, _) = timed(encode_image_to_base64, image, legacy_options)
+            rows['before'][0].append(elapsed)
+            rows['before'][1].append(len(data) * 3 / 4)
+            rows['before'][2].append(estimate_image_tokens(w, h))
+
+            elapsed, prepared = timed(prepare_llm_image, image, dial, options)
+            rows['after'][0].append(elapsed)
+            rows['after'][1].append(prepared.num_bytes)
+            rows['after'][2].append(prepared.estimated_tokens)
+            media_types.add(prepared.media_type)
+
+        cropped = f"{sum(d is not None for d in dials)}/{len(dials)}"
+        for method, (times, sizes, tokens) in rows.items():
+            print(f"  {frame_name:<8} {method:<10} {np.mean(times) * 1000:>10.2f} "
+                  f"{np.mean(sizes) / 1024:>9.1f} {np.mean(tokens):>7.0f} "
+                  f"{cropped if method == 'after' else '-':>6}")
+        before, after = np.mean(rows['before'][1]), np.mean(rows['after'][1])
+        print(f"  {frame_name:<8} {'ratio':<10} {'':>10} {after / before:>9.2f} "
+              f"{np.mean(rows['after'][2]) / np.mean(rows['before'][2]):>7.2f} "
+              f"{','.join(sorted(media_types)):>6}")
+
+
+def bench_backend_worker(args: argparse.Namespace) -> None:
+    """1つのバックエンドでサンプル画像を推論し、結果をJSONで出力（backendsから子プロセスとして起動）"""
+    from yolo_processor import YOLOProcessor
+
+    images = load_sample_images(args.image_dir)
+
+    start = time.perf_counter()
+    processor = YOLOProcessor(model_path=args.model, backend=args.backend)
+    processor.load_model()
+    load_time = time.perf_counter() - start
+
+    processor.process_image(images[0])  # ウォームアップ
+
+    latencies = []
+    for _ in range(args.repeat):
+        for image in images:
+            start = time.perf_counter()
+            processor.process_image(image)
+            latencies.append(time.perf_counter() - start)
+
+    print(json.dumps({
+        'backend': args.backend,
+        'load_s': load_time,
+        'mean_ms': float(np.mean(latencies)) * 1000,
+        'p50_ms': float(np.percentile(latencies, 50)) * 1000,
+        'p95_ms': float(np.percentile(latencies, 95)) * 1000,
+        # Linuxでは ru_maxrss の単位はKB
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def bench_backends(args: argparse.Namespace) -> None:
+    """推論バックエンドごとにレイテンシとRSSを比較（バックエンドごとに別プロセスで計測）"""
+    models = {
+        'torch': args.torch_model,
+        'onnx': args.onnx_model,
+        'openvino': args.openvino_model,
+    }
+
+    print(f"{'backend':<10} {'load[s]':>8} {'mean[ms]':>9} {'p50[ms]':>8} {'p95[ms]':>8} {'RSS[MB]':>8}")
+    for backend, model in models.items():
+        if model is None:
+            continue
+        command = [
+            sys.executable, str(Path(__file__).resolve()),
+            '--image-dir', str(args.image_dir),
+            'backend-worker', '--backend', backend, '--model', str(model),
+            '--repeat', str(args.repeat),
+        ]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{backend:<10} {result['load_s']:>8.2f} {result['mean_ms']:>9.1f} "
+              f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['max_rss_mb']:>8.0f}")
+
+
+# コールドスタートで読み込まれると遅い重量級モジュール
+HEAVY_MODULES = ('boto3', 'PIL', 'torch', 'ultralytics', 'onnxruntime', 'openvino', 'matplotlib')
+
+STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import lambda_function
+import_s = time.perf_counter() - start
+warmup_s = None
+if {warmup}:
+    start = time.perf_counter()
+    lambda_function.warm_up()
+    warmup_s = time.perf_counter() - start
+print(json.dumps({{
+    'import_s': import_s,
+    'warmup_s': warmup_s,
+    'heavy_modules': [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """
+    -X importtime の出力を解析
+
+    Args:
+        stderr: -X importtime を指定したPythonの標準エラー出力
+
+    Returns:
+        [(モジュール名, 自身の時間[us], 累積時間[us]), ...]
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def bench_startup(args: argparse.Namespace) -> None:
+    """lambda_function のインポート時間（-X importtime）とウォームアップ時間を計測"""
+    probe = STARTUP_PROBE.format(warmup=args.warmup, heavy=HEAVY_MODULES)
+    env = dict(os.environ, PYTHONPATH=str(LAMBDA_DIR), WARMUP_ON_INIT='false')
+
+    runs = []
+    for _ in range(args.repeat):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', probe],
+            cwd=LAMBDA_DIR, env=env, check=True, capture_output=True, text=True,
+        )
+        runs.append((json.loads(completed.stdout.strip().splitlines()[-1]),
+                     parse_importtime(completed.stderr)))
+
+    # 最後の実行のインポート内訳（トップレベルのパッケージ単位で累積時間順）
+    result, entries = runs[-1]
+    packages = {}
+    for name, _, cumulative_us in entries:
+        top = name.split('.')[0]
+        if name == top:
+            packages[top] = max(packages.get(top, 0), cumulative_us)
+
+    print(f"[INFO] 上位{args.top}件のインポート（累積時間）:")
+    for name, cumulative_us in sorted(packages.items(), key=lambda x: -x[1])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    print()
+
+    import_times = [run['import_s'] for run, _ in runs]
+    print(f"[RESULT] import lambda_function: median {np.median(import_times) * 1000:.1f} ms "
+          f"(min {min(import_times) * 1000:.1f} ms, {args.repeat} runs)")
+    print(f"[RESULT] 読み込まれた重量級モジュール: {', '.join(result['heavy_modules']) or 'なし'}")
+    if args.warmup:
+        warmup_times = [run['warmup_s'] for run, _ in runs]
+        print(f"[RESULT] warm_up(): median {np.median(warmup_times):.2f} s")
+
+
+def bench_bedrock_fanout(args: argparse.Namespace) -> None:
+    """逐次実行と並列実行でBedrock呼び出しを含む処理時間を比較"""
+    import lambda_function
+
+    images = load_sample_images(args.image_dir, args.images)
+    os.environ['BEDROCK_RETRY_BASE_DELAY'] = str(args.retry_base_delay)
+    # 2回目の計測（と繰り返した同じ画像）が処理結果キャッシュにヒットしないよう無効にする
+    os.environ['CACHE_BACKEND'] = 'none'
+    lambda_function.result_cache = None
+
+    print(f"[INFO] 画像枚数: {len(images)}")
+    print(f"[INFO] フェイクBedrock: latency={args.latency}s, jitter={args.jitter}s, "
+          f"throttle_rate={args.throttle_rate}")
+    print()
+
+    timings = {}
+    for concurrency in (1, args.concurrency):
+        client = FakeBedrockRuntimeClient(
+            latency=args.latency,
+            jitter=args.jitter,
+            throttle_rate=args.throttle_rate,
+            seed=0,
+        )
+        start = time.perf_counter()
+        lambda_function.process_gauge_images(
+            bedrock=client,
+            images=images,
+            user_prompt='この圧力計を読み取ってください。',
+            preprocess_image=args.preprocess,
+            max_concurrency=concurrency,
+        )
+        elapsed = time.perf_counter() - start
+        timings[concurrency] = elapsed
+        print(f"[RESULT] concurrency={concurrency:>2}: {elapsed:.2f}s "
+              f"(calls={client.calls}, throttled={client.throttled})")
+
+    print(f"[RESULT] speedup: {timings[1] / timings[args.concurrency]:.2f}x")
+
+
+# ストリーミングの計測に使う回答（読み取り値の後に説明が続く）
+STREAM_RESPONSE_TEXT = (
+    "この圧力計は0〜1 MPaの範囲で、針は **約0.52 MPa** を指しています。\n\n"
+    "読み取りの根拠:\n"
+    "- 目盛りは0 MPaから1 MPaまで0.1 MPa刻みで、0.02 MPaごとに細かい目盛りがあります。\n"
+    "- 針の先端は0.5 MPaの目盛りをわずかに過ぎ、次の細かい目盛りの手前にあります。\n"
+    "- 針の根元と先端を結ぶ線から角度を読み取ると、約0.52 MPaに相当します。\n\n"
+    "注意: 画像の解像度と視差により、±0.01 MPa程度の誤差が含まれる可能性があります。"
+)
+
+
+def bench_stream(args: argparse.Namespace) -> None:
+    """Bedrockの通常呼び出し・ストリーミング・読み取り値での打ち切りの応答時間を比較"""
+    import lambda_function
+    from llm_stream import READING_PATTERN, compile_stop_pattern
+    from image_codec import encode_image_to_base64
+
+    image_base64, media_type = encode_image_to_base64(load_sample_images(args.image_dir, 1)[0])
+    client = FakeBedrockRuntimeClient(
+        latency=args.latency,
+        response_text=STREAM_RESPONSE_TEXT,
+        chunk_size=args.chunk_size,
+        token_interval=args.token_interval,
+    )
+
+    print(f"[INFO] フェイクBedrock: latency={args.latency}s, chunk_size={args.chunk_size}, "
+          f"token_interval={args.token_interval}s, 回答 {len(STREAM_RESPONSE_TEXT)}文字")
+    print(f"  {'mode':<12} {'TTFT[s]':>8} {'total[s]':>9} {'chars':>6}  response")
+
+    modes = [
+        ('invoke', False, None),
+        ('stream', True, None),
+        ('stream-stop', True, compile_stop_pattern(READING_PATTERN)),
+    ]
+    for name, stream, stop_pattern in modes:
+        first_tokens, totals = [], []
+        for _ in range(args.repeat):
+            timing = {}
+            text = lambda_function.invoke_bedrock_with_retry(
+                client=client,
+                processed_image_base64=image_base64,
+                user_prompt='この圧力計を読み取ってください。',
+                media_type=media_type,
+                stream=stream,
+                stop_pattern=stop_pattern,
+                timing=timing,
+            )
+            first_tokens.append(timing.get('timeToFirstToken') or timing['totalTime'])
+            totals.append(timing['totalTime'])
+        snippet = text.replace('\n', ' ')
+        snippet = snippet if len(snippet) <= 40 else snippet[:40] + '...'
+        print(f"  {name:<12} {np.mean(first_tokens):>8.3f} {np.mean(totals):>9.3f} "
+              f"{len(text):>6}  {snippet}")
+
+    stopped = client.streams[-1]
+    print(f"[RESULT] 打ち切り時に受信したイベント: {stopped.delivered}/{len(stopped.chunks)}")
+
+
+# 構造化出力の計測でフェイクが返すJSONの回答
+STRUCTURED_RESPONSE_TEXT = '{"value": 0.52, "unit": "MPa", "confidence": 0.8}'
+
+
+def bench_structured(args: argparse.Namespace) -> None:
+    """自由形式のプロンプトとJSONでの回答の出力トークン数・応答時間を比較"""
+    import random
+    import lambda_function
+    from llm_output import JSON_INSTRUCTION
+
+    os.environ['CACHE_BACKEND'] = 'none'
+    images = load_sample_images(args.image_dir, args.images)
+    user_prompt = args.user_prompt.read_text(encoding='utf-8').strip()
+    system_prompts = {p.name: p.read_text(encoding='utf-8').strip() for p in args.system_prompts}
+
+    if args.bedrock:
+        client = lambda_function.initialize_bedrock_client()
+        print("[INFO] Bedrockを呼び出して計測します（料金が発生します）")
+    else:
+        rng = random.Random(0)
+
+        def respond(request):
+            prompt = request['messages'][-1]['content'][-1]['text']
+            if JSON_INSTRUCTION not in prompt:
+                return STREAM_RESPONSE_TEXT
+            # 修正の依頼（画像なし）には必ずJSONで回答する
+            if len(request['messages'][-1]['content']) == 1 or rng.random() >= args.malformed_rate:
+                return STRUCTURED_RESPONSE_TEXT
+            return '読み取り値は約0.52 MPaです。'
+
+        client = FakeBedrockRuntimeClient(
+            latency=args.latency,
+            response_text=respond,
+            chunk_size=args.chunk_size,
+            token_interval=args.token_interval,
+        )
+        print(f"[INFO] フェイクBedrock: latency={args.latency}s, token_interval={args.token_interval}s, "
+              f"JSONの不正率={args.malformed_rate}")
+
+    print(f"[INFO] 画像枚数: {len(images)}, ユーザープロンプト: {args.user_prompt.name}")
+    print(f"  {'system prompt':<24} {'format':<6} {'out tokens':>10} {'in tokens':>10} "
+          f"{'latency[s]':>10} {'parsed':>7} {'repairs':>7}")
+    for name, system_prompt in system_prompts.items():
+        for output_format in ('text', 'json'):
+            start = time.perf_counter()
+            results = lambda_function.process_gauge_images(
+                bedrock=client,
+                images=images,
+                user_prompt=user_prompt,
+                system_prompt=system_prompt or None,
+                preprocess_image=False,
+                max_concurrency=1,
+                output_format=output_format,
+            )
+            elapsed = (time.perf_counter() - start) / len(images)
+            usages = [r['llmUsage'] for r in results]
+            parsed = sum(r.get('llmReading') is not None for r in results)
+            print(f"  {name:<24} {output_format:<6} "
+                  f"{np.mean([u.get('outputTokens', 0) for u in usages]):>10.1f} "
+                  f"{np.mean([u.get('inputTokens', 0) for u in usages]):>10.1f} "
+                  f"{elapsed:>10.3f} "
+                  f"{f'{parsed}/{len(results)}' if output_format == 'json' else '-':>7} "
+                  f"{sum(u['calls'] - 1 for u in usages):>7}")
+
+
+def bench_prompt_cache(args: argparse.Namespace) -> None:
+    """プロンプトキャッシュの有無で入力トークン数（読み込み・書き込みを含む）を比較"""
+    import lambda_function
+    from image_codec import encode_image_to_base64
+    from prompt_registry import PromptExample, PromptRegistry
+
+    os.environ['CACHE_BACKEND'] = 'none'
+    template = PromptRegistry.from_directory(str(args.prompt_dir)).get(args.prompt_name)
+    # サンプル画像の先頭を参考画像として使う
+    examples = list(template.examples)
+    for i, image in enumerate(load_sample_images(args.image_dir, args.examples)):
+        image_base64, media_type = encode_image_to_base64(image)
+        examples.append(PromptExample(
+            image_base64=image_base64,
+            media_type=media_type,
+            text=f"参考画像{i + 1}",
+        ))
+    images = load_sample_images(args.image_dir, args.images)
+    user_prompt = args.user_prompt.read_text(encoding='utf-8').strip()
+
+    if args.bedrock:
+        client = lambda_function.initialize_bedrock_client()
+        print("[INFO] Bedrockを呼び出して計測します（料金が発生します）")
+    else:
+        client = None
+    print(f"[INFO] テンプレート: {template.name}, 参考画像: {len(examples)}枚, 画像枚数: {len(images)}")
+    print("[INFO] 実効入力トークン = 入力 + 1.25 x 書き込み + 0.1 x 読み込み")
+    print(f"  {'cache':<6} {'input':>8} {'read':>8} {'write':>8} {'effective':>10} {'latency[s]':>10}")
+    for cache_prompt in ('false', 'true'):
+        os.environ['PROMPT_CACHE'] = cache_prompt
+        if not args.bedrock:
+            # キャッシュ済みの先頭部分を持ち越さないよう計測ごとに作り直す
+            client = FakeBedrockRuntimeClient(latency=args.latency)
+        start = time.perf_counter()
+        results = lambda_function.process_gauge_images(
+            bedrock=client,
+            images=images,
+            user_prompt=user_prompt,
+            system_prompt=template.system,
+            preprocess_image=False,
+            # 1件目でキャッシュを書き込み、2件目以降で読み込む
+            max_concurrency=1,
+            examples=examples,
+        )
+        elapsed = (time.perf_counter() - start) / len(images)
+        totals = {
+            key: sum(r['llmUsage'].get(key) or 0 for r in results)
+            for key in ('inputTokens', 'cacheReadInputTokens', 'cacheWriteInputTokens')
+        }
+        effective = (totals['inputTokens'] + 1.25 * totals['cacheWriteInputTokens']
+                     + 0.1 * totals['cacheReadInputTokens'])
+        print(f"  {cache_prompt:<6} {totals['inputTokens']:>8} {totals['cacheReadInputTokens']:>8} "
+              f"{totals['cacheWriteInputTokens']:>8} {effective:>10.0f} {elapsed:>10.3f}")
+
+
+def bench_exemplars(args: argparse.Namespace) -> None:
+    """参考画像を呼び出しごとに準備する場合とストアから取得する場合の時間を比較"""
+    import tempfile
+    from exemplar_store import ExemplarStore
+
+    paths = sorted(p for p in args.image_dir.iterdir() if p.suffix.lower() in ('.png', '.jpg', '.jpeg'))
+    with tempfile.TemporaryDirectory() as directory:
+        # サンプル画像を先頭から per_type 枚ずつのゲージ種別として定義
+        gauge_types = []
+        for i in range(args.gauge_types):
+            entries = [
+                {'image': str(paths[(i * args.per_type + j) % len(paths)]), 'text': '0.52 MPa'}
+                for j in range(args.per_type)
+            ]
+            gauge_types.append(f'type-{i}')
+            (Path(directory) / f'type-{i}.json').write_text(json.dumps({'examples': entries}))
+
+        print(f"[INFO] ゲージ種別: {len(gauge_types)}, 参考画像: {args.per_type}枚/種別, "
+              f"上限: {args.max_bytes} bytes")
+        print(f"  {'mode':<10} {'per call[ms]':>12} {'loads':>6} {'evictions':>9} {'oversized':>9} "
+              f"{'bytes':>10}")
+        for mode, max_bytes in (('uncached', 0), ('store', args.max_bytes)):
+            store = ExemplarStore(directory, max_bytes=max_bytes, max_per_type=args.per_type)
+            start = time.perf_counter()
+            for i in range(args.repeat):
+                store.get(gauge_types[i % len(gauge_types)])
+            elapsed = (time.perf_counter() - start) / args.repeat
+            stats = store.stats()
+            print(f"  {mode:<10} {elapsed * 1000:>12.2f} {stats.loads:>6} {stats.evictions:>9} "
+                  f"{stats.oversized:>9} {stats.bytes:>10}")
+
+
+def bench_object_ref(args: argparse.Namespace) -> None:
+    """Base64埋め込みとオブジェクト参照での転送バイト数とハンドラーの処理時間を比較"""
+    import tempfile
+    import lambda_function
+    from storage import LocalStorage, StorageRegistry
+
+    os.environ['CACHE_BACKEND'] = 'none'
+    lambda_function.bedrock_client = FakeBedrockRuntimeClient(latency=0.0)
+    paths = sorted(p for p in args.image_dir.iterdir() if p.suffix.lower() in ('.png', '.jpg', '.jpeg'))
+    width, height = RESOLUTIONS[args.resolution]
+
+    with tempfile.TemporaryDirectory() as directory:
+        # サンプル画像を計測する解像度に拡大して保存
+        inputs = []
+        for i in range(args.images):
+            image = cv2.resize(cv2.imread(str(paths[i % len(paths)])), (width, height))
+            path = Path(directory) / f'{i:04d}.png'
+            cv2.imwrite(str(path), image)
+            inputs.append(path)
+        storage = LocalStorage(directory)
+        lambda_function.object_storage = StorageRegistry({'file': lambda: storage})
+
+        print(f"[INFO] 画像: {len(inputs)}枚 ({args.resolution}), 前処理: {args.preprocess}")
+        print(f"  {'mode':<8} {'request':>10} {'response':>10} {'read':>10} {'written':>10} "
+              f"{'total[KB]':>10} {'handler[ms]':>11}")
+        for mode in ('base64', 'object'):
+            moved = {'request': 0, 'response': 0, 'read': 0, 'written': 0}
+            durations = []
+            for repeat in range(args.repeat):
+                for path in inputs:
+                    event = {'userPrompt': 'x', 'preprocessImage': args.preprocess}
+                    if mode == 'base64':
+                        event['image'] = base64.b64encode(path.read_bytes()).decode('utf-8')
+                    else:
+                        event['imageUri'] = str(path)
+                    storage.bytes_read = storage.bytes_written = 0
+                    payload = json.dumps(event)
+                    start = time.perf_counter()
+                    response = lambda_function.lambda_handler(json.loads(payload), None)
+                    durations.append(time.perf_counter() - start)
+                    if repeat == 0:
+                        moved['request'] += len(payload)
+                        moved['response'] += len(json.dumps(response))
+                        moved['read'] += storage.bytes_read
+                        moved['written'] += storage.bytes_written
+            kb = {key: value / 1024 / len(inputs) for key, value in moved.items()}
+            print(f"  {mode:<8} {kb['request']:>10.1f} {kb['response']:>10.1f} {kb['read']:>10.1f} "
+                  f"{kb['written']:>10.1f} {sum(kb.values()):>10.1f} "
+                  f"{np.median(durations) * 1000:>11.1f}")
+    print("[INFO] バイト数は画像1枚あたり（KB）。read / written はオブジェクトの読み書き")
+
+
+def bench_response_image(args: argparse.Namespace) -> None:
+    """レスポンスに含める画像ごとの1リクエストあたりのCPU時間を比較"""
+    import lambda_function
+    from image_codec import decode_image, detect_media_type
+
+    os.environ['CACHE_BACKEND'] = 'none'
+    client = FakeBedrockRuntimeClient(latency=0.0)
+    paths = sorted(p for p in args.image_dir.iterdir() if p.suffix.lower() in ('.png', '.jpg', '.jpeg'))
+    inputs = []
+    for path in paths:
+        data = path.read_bytes()
+        media_type = detect_media_type(data)
+        encoded = (base64.b64encode(data).decode('utf-8'), media_type) if media_type else None
+        inputs.append((decode_image(data), encoded))
+
+    # baseline: 従来の処理（前処理済み画像を毎回エンコードしてレスポンスに含める）
+    modes = [('baseline', 'full', False), ('full', 'full', True),
+             ('thumbnail', 'thumbnail', True), ('none', 'none', True)]
+    print(f"[INFO] サンプル画像: {len(inputs)}枚, 前処理: {args.preprocess}, 繰り返し: {args.repeat}")
+    print(f"  {'mode':<10} {'cpu[ms]':>8} {'saved[ms]':>10} {'response[KB]':>13}")
+    baseline = None
+    for name, response_image, forward in modes:
+        cpu_times = []
+        response_bytes = 0
+        for _ in range(args.repeat):
+            for image, encoded in inputs:
+                start = time.process_time()
+                results = lambda_function.process_gauge_images(
+                    bedrock=client,
+                    images=[image],
+                    user_prompt='x',
+                    preprocess_image=args.preprocess,
+                    max_concurrency=1,
+                    encoded_images=[encoded] if forward else None,
+                    response_image=response_image,
+                )
+                cpu_times.append(time.process_time() - start)
+                response_bytes += len(results[0].get('processedImage') or '')
+        cpu = np.mean(cpu_times) * 1000
+        baseline = cpu if baseline is None else baseline
+        print(f"  {name:<10} {cpu:>8.1f} {baseline - cpu:>10.1f} "
+              f"{response_bytes / len(cpu_times) / 1024:>13.1f}")
+
+
+def write_synthetic_video(
+    path: Path, width: int, height: int, frames: int, fps: float, moving: float
+) -> None:
+    """
+    針が一部の区間だけ動く合成動画を作成
+
+    Args:
+        path: 保存先（.mp4）
+        width: 動画の幅
+        height: 動画の高さ
+        frames: フレーム数
+        fps: フレームレート
+        moving: 針が動いている区間の割合（0〜1）
+    """
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"動画を作成できません: {path}")
+    center = (width // 2, height // 2)
+    radius = min(width, height) // 3
+    # 10区間に分け、先頭から moving の割合の区間で針を動かす（残りは静止）
+    segment = max(1, frames // 10)
+    moving_segments = int(round(moving * 10))
+    angle = 225.0
+    try:
+        for index in range(frames):
+            if (index // segment) % 10 < moving_segments:
+                angle = (angle + 1.5) % 360
+            frame = np.full((height, width, 3), 200, dtype=np.uint8)
+            cv2.circle(frame, center, radius, (40, 40, 40), thickness=max(2, radius // 40))
+            tip = (int(center[0] + radius * 0.9 * np.sin(np.radians(angle))),
+                   int(center[1] - radius * 0.9 * np.cos(np.radians(angle))))
+            cv2.line(frame, center, tip, (0, 0, 200), thickness=max(3, radius // 30))
+            # センサーノイズ（変化の判定で無視されるべき変化）
+            noise = rng.integers(-6, 7, frame.shape, dtype=np.int16)
+            writer.write(np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8))
+    finally:
+        writer.release()
+
+
+def bench_video(args: argparse.Namespace) -> None:
+    """動画の全フレームを処理した場合と、変化したフレームのみ処理した場合のフレームレートを比較"""
+    import tempfile
+
+    from gauge_detector import DialDetector
+    from video_stream import MotionGate, StreamStats, iter_readings, iter_video_frames
+
+    processor = None
+    if args.preprocess:
+        import lambda_function
+        processor = lambda_function.initialize_processor()
+
+    width, height = RESOLUTIONS[args.resolution]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'synthetic.mp4'
+        write_synthetic_video(path, width, height, args.frames, args.fps, args.moving)
+        print(f"[INFO] 合成動画: {args.resolution}, {args.frames}フレーム, 針が動く区間 {args.moving * 100:.0f}%, "
+              f"前処理: {args.preprocess}")
+        print(f"  {'mode':<10} {'inferred':>9} {'skipped':>8} {'skip[%]':>8} {'fps':>8} {'elapsed[s]':>11}")
+        # threshold=-1 は全フレームで推論（変化の判定なし）
+        for name, threshold in (('all', -1.0), ('gated', args.threshold)):
+            stats = StreamStats()
+            for _ in iter_readings(
+                iter_video_frames(str(path), stride=args.stride),
+                processor=processor,
+                gate=MotionGate(threshold=threshold),
+                dial_detector=DialDetector(),
+                stream_id='benchmark',
+                stats=stats,
+            ):
+                pass
+            result = stats.to_dict()
+            print(f"  {name:<10} {stats.inferred:>9} {stats.skipped:>8} "
+                  f"{(result['skipRatio'] or 0) * 100:>8.1f} {result['fps'] or 0:>8.1f} {stats.elapsed:>11.2f}")
+
+
+def make_needle_frame(
+    width: int, height: int, angle: Optional[float]
+) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    文字盤が画像の左上寄りに写った合成画像を作成
+
+    Args:
+        width: 画像の幅
+        height: 画像の高さ
+        angle: 針の角度（度、12時方向を0として時計回り。Noneの場合は針を描かない）
+
+    Returns:
+        (画像 (BGR), ゲージ中心 (x, y))
+    """
+    image = np.full((height, width, 3), 180, dtype=np.uint8)
+    center = (int(width * 0.35), int(height * 0.4))
+    radius = height // 5
+    cv2.circle(image, center, radius, (250, 250, 250), thickness=-1)
+    cv2.circle(image, center, radius, (40, 40, 40), thickness=max(2, radius // 40))
+    if angle is not None:
+        tip = (int(center[0] + radius * 0.85 * np.sin(np.radians(angle))),
+               int(center[1] - radius * 0.85 * np.cos(np.radians(angle))))
+        cv2.line(image, center, tip, (0, 0, 220), thickness=max(3, radius // 12))
+    return image, center
+
+
+class SyntheticNeedleBackend:
+    """
+    赤い針を色で抽出する、YOLOモデルの代わりの推論バックエンド
+
+    レターボックス・入力テンソルの作成とマスクの解像度（入力サイズの1/4）は
+    エクスポート済みモデルのバックエンドと同じため、画像サイズに応じて変わる
+    前処理・後処理の時間を、モデルが無い環境でも計測できる（ネットワークの
+    推論時間は入力サイズが一定のため含めない）。
+    """
+
+    def __init__(self, imgsz: int = 640):
+        from inference_backends import ExportedModelBackend
+
+        self.backend = ExportedModelBackend('synthetic', imgsz)
+
+    def predict(self, images: List[np.ndarray], conf: float, iou: float) -> list:
+        from inference_backends import Detections
+
+        in_h, in_w = self.backend.input_size
+        self.backend.preprocess(images)
+        detections = []
+        for image in images:
+            boxed = cv2.resize(self.backend.letterbox(image), (in_w // 4, in_h // 4),
+                               interpolation=cv2.INTER_AREA)
+            b, g, r = cv2.split(boxed.astype(np.int16))
+            mask = ((r - np.maximum(g, b)) > 60).astype(np.float32)
+            if mask.any():
+                detections.append(Detections(masks=mask[None], scores=np.array([0.9], np.float32)))
+            else:
+                detections.append(Detections(masks=None, scores=np.zeros(0, np.float32)))
+        return detections
+
+
+def bench_roi(args: argparse.Namespace) -> None:
+    """固定カメラの連続フレームで、画像全体の推論とゲージ領域の推論のレイテンシを比較"""
+    from roi_tracker import RoiTracker
+    from yolo_processor import YOLOProcessor
+
+    if args.preprocess:
+        import lambda_function
+        processor = lambda_function.initialize_processor()
+        model_name = os.environ.get('MODEL_PATH', '/opt/ml/model/best.pt')
+    else:
+        processor = YOLOProcessor(mask_resolution=args.mask_resolution)
+        processor.model = SyntheticNeedleBackend(args.min_size)
+        model_name = 'synthetic（前処理・後処理のみ）'
+
+    print(f"[INFO] モデル: {model_name}, フレーム: {args.frames}, "
+          f"針を隠すフレーム: {args.lost_every}フレームごと, 領域の最小サイズ: {args.min_size}")
+    print(f"  {'resolution':<18} {'full[ms]':>9} {'roi[ms]':>9} {'speedup':>8} "
+          f"{'hits':>5} {'fallbacks':>10} {'angle diff':>11} {'tip diff[px]':>13}")
+    for name in args.resolutions:
+        width, height = RESOLUTIONS[name]
+        tracker = RoiTracker(padding=args.padding, min_size=args.min_size)
+        full_times, roi_times, angle_diffs, tip_diffs = [], [], [], []
+        for index in range(args.frames + 1):
+            hidden = args.lost_every and index % args.lost_every == args.lost_every - 1
+            image, center = make_needle_frame(width, height, None if hidden else (225 + index * 2) % 360)
+
+            start = time.perf_counter()
+            full = processor.analyze_image(image, center)
+            full_time = time.perf_counter() - start
+            start = time.perf_counter()
+            tracked = processor.analyze_image(image, center, 'benchmark', tracker)
+            roi_time = time.perf_counter() - start
+            # 先頭のフレームは領域が無い（画像全体で推論する）ためウォームアップとして除く
+            if index == 0:
+                continue
+            full_times.append(full_time)
+            roi_times.append(roi_time)
+            if full.needles and tracked.needles:
+                a, b = full.needles[0], tracked.needles[0]
+                angle_diffs.append(abs((a.angle - b.angle + 180) % 360 - 180))
+                tip_diffs.append(np.hypot(a.tip_x - b.tip_x, a.tip_y - b.tip_y))
+
+        stats = tracker.to_dict()
+        full_ms, roi_ms = np.mean(full_times) * 1000, np.mean(roi_times) * 1000
+        print(f"  {f'{name} ({width}x{height})':<18} {full_ms:>9.2f} {roi_ms:>9.2f} {full_ms / roi_ms:>7.2f}x "
+              f"{stats['hits']:>5} {stats['fallbacks']:>10} "
+              f"{np.mean(angle_diffs) if angle_diffs else float('nan'):>10.2f}° "
+              f"{np.mean(tip_diffs) if tip_diffs else float('nan'):>13.1f}")
+
+
+def main() -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(
+        description='圧力計メーター読み取りシステム ベンチマークスクリプト'
+    )
+    parser.add_argument(
+        '--image-dir',
+        type=Path,
+        default=SCRIPT_DIR.parent / 'sample_images',
+        help='サンプル画像ディレクトリ（デフォルト: ../sample_images）'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    fanout = subparsers.add_parser(
+        'bedrock-fanout',
+        help='Bedrock呼び出しの逐次実行と並列実行の処理時間を比較'
+    )
+    fanout.add_argument('--images', type=int, default=16, help='処理する画像枚数（デフォルト: 16）')
+    fanout.add_argument('--concurrency', type=int, default=4, help='並列実行数（デフォルト: 4）')
+    fanout.add_argument('--latency', type=float, default=1.0, help='Bedrock応答の待ち時間（秒）')
+    fanout.add_argument('--jitter', type=float, default=0.2, help='待ち時間の揺らぎ（秒）')
+    fanout.add_argument('--throttle-rate', type=float, default=0.1, help='スロットリングの発生確率')
+    fanout.add_argument('--retry-base-delay', type=float, default=0.1, help='リトライの基準待ち時間（秒）')
+    fanout.add_argument(
+        '--preprocess',
+        action='store_true',
+        help='YOLO前処理も実行する（環境変数 MODEL_PATH のモデルを使用）'
+    )
+    fanout.set_defaults(func=bench_bedrock_fanout)
+
+    stream = subparsers.add_parser(
+        'stream',
+        help='Bedrockの通常呼び出し・ストリーミング・読み取り値での打ち切りの応答時間を比較'
+    )
+    stream.add_argument('--repeat', type=int, default=3, help='計測の繰り返し回数（デフォルト: 3）')
+    stream.add_argument('--latency', type=float, default=0.8, help='最初のトークンまでの待ち時間（秒）')
+    stream.add_argument('--chunk-size', type=int, default=4, help='1イベントの文字数（デフォルト: 4）')
+    stream.add_argument(
+        '--token-interval',
+        type=float,
+        default=0.03,
+        help='1イベントの生成時間（秒、デフォルト: 0.03）'
+    )
+    stream.set_defaults(func=bench_stream)
+
+    structured = subparsers.add_parser(
+        'structured',
+        help='自由形式のプロンプトとJSONでの回答の出力トークン数・応答時間を比較'
+    )
+    structured.add_argument('--images', type=int, default=4, help='処理する画像枚数（デフォルト: 4）')
+    structured.add_argument(
+        '--user-prompt',
+        type=Path,
+        default=SCRIPT_DIR / 'user_prompt.txt',
+        help='ユーザープロンプトファイル（デフォルト: ./user_prompt.txt）'
+    )
+    structured.add_argument(
+        '--system-prompts',
+        type=Path,
+        nargs='+',
+        default=sorted(SCRIPT_DIR.glob('system_prompt*.txt')),
+        help='比較するシステムプロンプトファイル（デフォルト: ./system_prompt*.txt）'
+    )
+    structured.add_argument(
+        '--bedrock',
+        action='store_true',
+        help='フェイクではなくBedrockを呼び出して計測する（環境変数 BEDROCK_REGION、料金が発生）'
+    )
+    structured.add_argument('--latency', type=float, default=0.8, help='フェイク: 最初のトークンまでの待ち時間（秒）')
+    structured.add_argument('--chunk-size', type=int, default=2, help='フェイク: 1トークンの文字数（デフォルト: 2）')
+    structured.add_argument('--token-interval', type=float, default=0.02, help='フェイク: 1トークンの生成時間（秒）')
+    structured.add_argument(
+        '--malformed-rate',
+        type=float,
+        default=0.25,
+        help='フェイク: JSONで回答しない確率（修正の依頼の計測用、デフォルト: 0.25）'
+    )
+    structured.set_defaults(func=bench_structured)
+
+    prompt_cache = subparsers.add_parser(
+        'prompt-cache',
+        help='システムプロンプトと参考画像のプロンプトキャッシュの有無で入力トークン数を比較'
+    )
+    prompt_cache.add_argument('--images', type=int, default=8, help='処理する画像枚数（デフォルト: 8）')
+    prompt_cache.add_argument('--examples', type=int, default=2, help='参考画像の枚数（デフォルト: 2）')
+    prompt_cache.add_argument(
+        '--prompt-dir',
+        type=Path,
+        default=LAMBDA_DIR / 'prompts',
+        help='プロンプトテンプレートのディレクトリ（デフォルト: ../cdk/lambda/prompts）'
+    )
+    prompt_cache.add_argument('--prompt-name', default='needle', help='テンプレート名（デフォルト: needle）')
+    prompt_cache.add_argument(
+        '--user-prompt',
+        type=Path,
+        default=SCRIPT_DIR / 'user_prompt.txt',
+        help='ユーザープロンプトファイル（デフォルト: ./user_prompt.txt）'
+    )
+    prompt_cache.add_argument(
+        '--bedrock',
+        action='store_true',
+        help='フェイクではなくBedrockを呼び出して計測する（環境変数 BEDROCK_REGION、料金が発生）'
+    )
+    prompt_cache.add_argument('--latency', type=float, default=0.0, help='フェイク: 応答の待ち時間（秒）')
+    prompt_cache.set_defaults(func=bench_prompt_cache)
+
+    exemplars = subparsers.add_parser(
+        'exemplars',
+        help='参考画像を呼び出しごとに準備する場合とストアから取得する場合の時間・メモリを比較'
+    )
+    exemplars.add_argument('--repeat', type=int, default=20, help='取得の回数（デフォルト: 20）')
+    exemplars.add_argument('--gauge-types', type=int, default=2, help='ゲージ種別の数（デフォルト: 2）')
+    exemplars.add_argument('--per-type', type=int, default=2, help='種別ごとの参考画像の枚数（デフォルト: 2）')
+    exemplars.add_argument(
+        '--max-bytes',
+        type=int,
+        default=8 * 1024 * 1024,
+        help='ストアの上限（バイト、デフォルト: 8388608）'
+    )
+    exemplars.set_defaults(func=bench_exemplars)
+
+    object_ref = subparsers.add_parser(
+        'object-ref',
+        help='画像のBase64埋め込みとオブジェクト参照での転送バイト数・ハンドラーの処理時間を比較'
+    )
+    object_ref.add_argument('--images', type=int, default=4, help='処理する画像枚数（デフォルト: 4）')
+    object_ref.add_argument('--repeat', type=int, default=3, help='計測の繰り返し回数（デフォルト: 3）')
+    object_ref.add_argument(
+        '--resolution',
+        default='1080p',
+        choices=list(RESOLUTIONS),
+        help='サンプル画像を拡大して計測する解像度（デフォルト: 1080p）'
+    )
+    object_ref.add_argument(
+        '--preprocess',
+        action='store_true',
+        help='YOLO前処理も実行する（環境変数 MODEL_PATH のモデルを使用）'
+    )
+    object_ref.set_defaults(func=bench_object_ref)
+
+    response_image = subparsers.add_parser(
+        'response-image',
+        help='レスポンスに含める前処理済み画像（none / thumbnail / full）ごとのCPU時間を比較'
+    )
+    response_image.add_argument('--repeat', type=int, default=3, help='サンプル画像を処理する周回数（デフォルト: 3）')
+    response_image.add_argument(
+        '--preprocess',
+        action='store_true',
+        help='YOLO前処理も実行する（環境変数 MODEL_PATH のモデルを使用）'
+    )
+    response_image.set_defaults(func=bench_response_image)
+
+    render = subparsers.add_parser(
+        'render',
+        help='720p/1080p/4Kでの針描画の処理時間とピークメモリを計測'
+    )
+    render.add_argument('--repeat', type=int, default=10, help='計測の繰り返し回数（デフォルト: 10）')
+    render.set_defaults(func=bench_render)
+
+    backends = subparsers.add_parser(
+        'backends',
+        help='推論バックエンド（torch / onnx / openvino）ごとのレイテンシとRSSを比較'
+    )
+    backends.add_argument('--torch-model', type=Path, default=None, help='PyTorchモデル (best.pt)')
+    backends.add_argument('--onnx-model', type=Path, default=None, help='ONNXモデル (best.onnx)')
+    backends.add_argument('--openvino-model', type=Path, default=None, help='OpenVINOモデルのディレクトリ')
+    backends.add_argument('--repeat', type=int, default=3, help='サンプル画像を処理する周回数（デフォルト: 3）')
+    backends.set_defaults(func=bench_backends)
+
+    dial = subparsers.add_parser(
+        'dial',
+        help='平行移動・切り抜きしたサンプル画像で文字盤中心の検出精度と検出時間を計測'
+    )
+    dial.add_argument('--max-side', type=int, default=320, help='ハフ変換を行う縮小画像の長辺（デフォルト: 320）')
+    dial.add_argument('--repeat', type=int, default=1000, help='キャッシュヒット時の計測回数（デフォルト: 1000）')
+    dial.add_argument('--save-dir', type=Path, default=None, help='評価用画像の保存先（オプション）')
+    dial.set_defaults(func=bench_dial)
+
+    codec = subparsers.add_parser(
+        'codec',
+        help='画像の形式ごとのエンコード・デコード時間と出力サイズを比較（従来のPIL経由の処理との比較）'
+    )
+    codec.add_argument('--repeat', type=int, default=5, help='計測の繰り返し回数（デフォルト: 5）')
+    codec.add_argument('--quality', type=int, default=90, help='JPEG / WebPの品質（デフォルト: 90）')
+    codec.add_argument(
+        '--resolutions',
+        nargs='*',
+        default=['1080p', '4K'],
+        choices=list(RESOLUTIONS),
+        help='サンプル画像を拡大して計測する解像度（デフォルト: 1080p 4K）'
+    )
+    codec.set_defaults(func=bench_codec)
+
+    llm_image = subparsers.add_parser(
+        'llm-image',
+        help='Bedrockに送る画像の切り抜き・縮小前後のサイズ・推定トークン数・準備時間を比較'
+    )
+    llm_image.add_argument('--repeat', type=int, default=5, help='計測の繰り返し回数（デフォルト: 5）')
+    llm_image.add_argument('--max-edge', type=int, default=768, help='長辺の最大サイズ（デフォルト: 768）')
+    llm_image.add_argument('--margin', type=float, default=0.15, help='切り抜きの余白（デフォルト: 0.15）')
+    llm_image.add_argument(
+        '--format',
+        default='auto',
+        choices=['auto', 'png', 'jpeg', 'webp'],
+        help='出力形式（デフォルト: auto）'
+    )
+    llm_image.add_argument(
+        '--png-max-bytes',
+        type=int,
+        default=256 * 1024,
+        help='auto でPNGを使う最大サイズ（デフォルト: 262144）'
+    )
+    llm_image.add_argument(
+        '--resolutions',
+        nargs='*',
+        default=['1080p', '4K'],
+        choices=list(RESOLUTIONS),
+        help='サンプル画像を拡大して計測する解像度（デフォルト: 1080p 4K）'
+    )
+    llm_image.set_defaults(func=bench_llm_image)
+
+    startup = subparsers.add_parser(
+        'startup',
+        help='lambda_function のインポート時間（-X importtime）とウォームアップ時間を計測'
+    )
+    startup.add_argument('--repeat', type=int, default=5, help='計測の繰り返し回数（デフォルト: 5）')
+    startup.add_argument('--top', type=int, default=15, help='表示するモジュール数（デフォルト: 15）')
+    startup.add_argument(
+        '--warmup',
+        action='store_true',
+        help='warm_up()（モデルのロード + ダミー推論）の時間も計測する（環境変数 MODEL_PATH のモデルを使用）'
+    )
+    startup.set_defaults(func=bench_startup)
+
+    video = subparsers.add_parser(
+        'video',
+        help='合成動画で全フレームの処理と変化したフレームのみの処理のフレームレートを比較'
+    )
+    video.add_argument('--frames', type=int, default=300, help='フレーム数（デフォルト: 300）')
+    video.add_argument('--fps', type=float, default=30.0, help='フレームレート（デフォルト: 30）')
+    video.add_argument(
+        '--resolution',
+        default='1080p',
+        choices=list(RESOLUTIONS),
+        help='動画の解像度（デフォルト: 1080p）'
+    )
+    video.add_argument('--moving', type=float, default=0.2, help='針が動いている区間の割合（デフォルト: 0.2）')
+    video.add_argument('--threshold', type=float, default=0.01, help='推論する変化の割合（デフォルト: 0.01）')
+    video.add_argument('--stride', type=int, default=1, help='フレームの間引き（デフォルト: 1）')
+    video.add_argument(
+        '--preprocess',
+        action='store_true',
+        help='YOLO前処理も実行する（環境変数 MODEL_PATH のモデルを使用）'
+    )
+    video.set_defaults(func=bench_video)
+
+    roi = subparsers.add_parser(
+        'roi',
+        help='固定カメラの連続フレームで画像全体の推論とゲージ領域の推論のレイテンシを比較'
+    )
+    roi.add_argument('--frames', type=int, default=30, help='計測するフレーム数（デフォルト: 30）')
+    roi.add_argument(
+        '--resolutions',
+        nargs='*',
+        default=['1080p', '4K'],
+        choices=list(RESOLUTIONS),
+        help='計測する解像度（デフォルト: 1080p 4K）'
+    )
+    roi.add_argument('--padding', type=float, default=0.25, help='領域の余白の割合（デフォルト: 0.25）')
+    roi.add_argument('--min-size', type=int, default=640, help='領域の最小サイズ（デフォルト: 640）')
+    roi.add_argument(
+        '--lost-every',
+        type=int,
+        default=10,
+        help='このフレーム数ごとに針を隠し、見失った場合の画像全体での再推論を含める（0で無効、デフォルト: 10）'
+    )
+    roi.add_argument(
+        '--mask-resolution',
+        default='full',
+        choices=['full', 'native'],
+        help='マスクの処理解像度（合成モデルの場合。デフォルト: full）'
+    )
+    roi.add_argument(
+        '--preprocess',
+        action='store_true',
+        help='合成モデルの代わりにYOLOモデルで推論する（環境変数 MODEL_PATH のモデルを使用）'
+    )
+    roi.set_defaults(func=bench_roi)
+
+    worker = subparsers.add_parser('backend-worker', help=argparse.SUPPRESS)
+    worker.add_argument('--backend', required=True)
+    worker.add_argument('--model', required=True)
+    worker.add_argument('--repeat', type=int, default=3)
+    worker.set_defaults(func=bench_backend_worker)
+
+    args = parser.parse_args()
+    args.func(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+オフライン検証用のBedrock Runtimeクライアントのフェイク
+
+boto3の bedrock-runtime クライアントと同じインターフェースで応答を返します。
+応答までの待ち時間やスロットリングエラーを注入できるため、AWSに接続せずに
+Lambda関数の並列実行・リトライ処理を検証できます。
+
+invoke_model_with_response_stream では回答を chunk_size 文字ずつの
+content_block_delta イベントに分割し、token_interval 秒間隔で返します。
+1イベントを出力トークン1つとして数え、max_tokens を超える部分は返しません。
+
+プロンプトキャッシュ: cache_control を付けたブロックまでの内容をキャッシュポイント
+として記録し、同じ内容の先頭部分を再度受け取った場合は cache_read_input_tokens、
+初めての場合は cache_creation_input_tokens として返します（Bedrockと同様に、
+cache_min_tokens 未満の先頭部分はキャッシュしません）。
+
+待ち時間の分布（latency_distribution）:
+    uniform:     latency + 一様乱数(0〜jitter)
+    lognormal:   中央値 latency、対数の標準偏差 jitter の対数正規分布（裾の重い応答時間）
+    exponential: 平均 latency の指数分布
+
+max_in_flight を指定すると、同時に処理中の呼び出しがその数を超えた時点で
+ThrottlingException を返します（in_flight に multiprocessing.Value を渡すと
+複数プロセスで同じ上限を共有できます）。
+"""
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from botocore.exceptions import ClientError
+
+
+DEFAULT_RESPONSE_TEXT = "この圧力計の針は **約0.05 MPa** を指しています。"
+
+LATENCY_DISTRIBUTIONS = ("uniform", "lognormal", "exponential")
+
+
+def throttling_error(operation_name: str) -> ClientError:
+    """Bedrockと同じ形式のThrottlingException"""
+    return ClientError(
+        {
+            "Error": {
+                "Code": "ThrottlingException",
+                "Message": "Too many requests, please wait before trying again.",
+            },
+            "ResponseMetadata": {"HTTPStatusCode": 429},
+        },
+        operation_name,
+    )
+
+
+class FakeBedrockRuntimeClient:
+    """bedrock-runtime クライアントのフェイク"""
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        jitter: float = 0.0,
+        throttle_rate: float = 0.0,
+        response_text: Union[str, Callable[[Dict[str, Any]], str]] = DEFAULT_RESPONSE_TEXT,
+        seed: int = None,
+        chunk_size: int = 4,
+        token_interval: float = 0.0,
+        cache_min_tokens: int = 1024,
+        latency_distribution: str = "uniform",
+        max_in_flight: Optional[int] = None,
+        in_flight=None,
+    ):
+        """
+        初期化
+
+        Args:
+            latency: 1回の呼び出しにかかる平均待ち時間（秒）
+            jitter: 待ち時間に加える一様乱数の幅（秒）
+            throttle_rate: ThrottlingExceptionを返す確率 (0.0〜1.0)
+            response_text: LLMの回答として返すテキスト（リクエストボディを受け取って
+                回答を返す関数も指定可能）
+            seed: 乱数シード
+            chunk_size: ストリーミング時に1イベントで返す文字数
+            token_interval: 1イベント（chunk_size文字）の生成にかかる時間（秒）。
+                invoke_model では全イベント分の時間を待ってから返す
+            cache_min_tokens: プロンプトキャッシュの対象になる先頭部分の最小トークン数
+            latency_distribution: 待ち時間の分布 ("uniform", "lognormal", "exponential")
+            max_in_flight: 同時に処理できる呼び出し数（超えた場合はThrottlingException。
+                省略時は制限しない）
+            in_flight: 処理中の呼び出し数の共有カウンター（multiprocessing.Value("i")。
+                省略時はこのクライアント内で数える）
+        """
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"latency_distributionは{LATENCY_DISTRIBUTIONS}のいずれかを指定してください: "
+                f"{latency_distribution}"
+            )
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.response_text = response_text
+        self.chunk_size = chunk_size
+        self.token_interval = token_interval
+        self.cache_min_tokens = cache_min_tokens
+        self.latency_distribution = latency_distribution
+        self.max_in_flight = max_in_flight
+        self._in_flight = in_flight
+        self._local_in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+        # invoke_model_with_response_stream で返したストリーム
+        self.streams: List[FakeEventStream] = []
+        # キャッシュ済みの先頭部分のハッシュ
+        self._prompt_cache: Set[str] = set()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sleep(self) -> None:
+        """注入した待ち時間だけ待機"""
+        with self._lock:
+            if self.latency_distribution == "lognormal":
+                delay = self.latency * math.exp(self._random.gauss(0, self.jitter))
+            elif self.latency_distribution == "exponential":
+                delay = self._random.expovariate(1 / self.latency) if self.latency > 0 else 0.0
+            else:
+                delay = self.latency + self._random.uniform(0, self.jitter)
+        time.sleep(max(0.0, delay))
+
+    def _enter(self, operation_name: str) -> None:
+        """処理中の呼び出し数を増やす（max_in_flight を超える場合はThrottlingException）"""
+        if self.max_in_flight is None:
+            return
+        if self._in_flight is not None:
+            with self._in_flight.get_lock():
+                self._in_flight.value += 1
+                count = self._in_flight.value
+        else:
+            with self._lock:
+                self._local_in_flight += 1
+                count = self._local_in_flight
+        if count > self.max_in_flight:
+            self._exit()
+            with self._lock:
+                self.calls += 1
+                self.throttled += 1
+            raise throttling_error(operation_name)
+
+    def _exit(self) -> None:
+        """処理中の呼び出し数を減らす"""
+        if self.max_in_flight is None:
+            return
+        if self._in_flight is not None:
+            with self._in_flight.get_lock():
+                self._in_flight.value -= 1
+        else:
+            with self._lock:
+                self._local_in_flight -= 1
+
+    def _maybe_throttle(self, operation_name: str) -> None:
+        """throttle_rateの確率でThrottlingExceptionを送出"""
+        with self._lock:
+            self.calls += 1
+            throttle = self._random.random() < self.throttle_rate
+            if throttle:
+                self.throttled += 1
+        if throttle:
+            raise throttling_error(operation_name)
+
+    def _input_usage(self, request: Dict[str, Any]) -> Dict[str, int]:
+        """
+        入力トークン数とプロンプトキャッシュの読み込み・書き込みトークン数を計算
+
+        入力トークン数の目安: 画像1枚1500トークン + テキスト2文字で1トークン
+
+        Returns:
+            {"input_tokens": ..., "cache_read_input_tokens": ..., "cache_creation_input_tokens": ...}
+            （input_tokens はキャッシュを読み書きした部分を含まない）
+        """
+        system = request.get("system") or []
+        if isinstance(system, str):
+            system = [{"type": "text", "text": system}]
+        blocks = list(system)
+        for message in request.get("messages", []):
+            blocks.extend(message["content"])
+
+        total = 0
+        digest = hashlib.sha256()
+        # キャッシュポイントごとの (先頭部分のハッシュ, 先頭部分のトークン数)
+        checkpoints: List[Tuple[str, int]] = []
+        for block in blocks:
+            total += 1500 if block["type"] == "image" else len(block.get("text", "")) // 2
+            content = {key: value for key, value in block.items() if key != "cache_control"}
+            digest.update(json.dumps(content, sort_keys=True).encode("utf-8"))
+            if "cache_control" in block and total >= self.cache_min_tokens:
+                checkpoints.append((digest.hexdigest(), total))
+
+        read = write = 0
+        if checkpoints:
+            with self._lock:
+                # 最も長くキャッシュ済みの先頭部分を読み込み、最後のキャッシュポイントまでを書き込む
+                read = max(
+                    (tokens for key, tokens in checkpoints if key in self._prompt_cache), default=0
+                )
+                write = checkpoints[-1][1] - read
+                self._prompt_cache.update(key for key, _ in checkpoints)
+        return {
+            "input_tokens": total - read - write,
+            "cache_read_input_tokens": read,
+            "cache_creation_input_tokens": write,
+        }
+
+    def _generate(self, body: str) -> Tuple[List[str], str, Dict[str, int]]:
+        """
+        リクエストに対する回答をストリーミングのイベント単位に分割
+
+        Returns:
+            (イベントごとのテキスト, 停止理由, 入力トークン数の usage)
+        """
+        request = json.loads(body)
+        text = self.response_text(request) if callable(self.response_text) else self.response_text
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        stop_reason = "end_turn"
+        if len(chunks) > request.get("max_tokens", len(chunks)):
+            chunks = chunks[:request["max_tokens"]]
+            stop_reason = "max_tokens"
+
+        return chunks, stop_reason, self._input_usage(request)
+
+    def invoke_model(self, modelId: str, body: str, **kwargs) -> Dict[str, Any]:
+        """bedrock-runtime InvokeModel 相当の応答を返す"""
+        self._enter("InvokeModel")
+        try:
+            self._sleep()
+            self._maybe_throttle("InvokeModel")
+            chunks, stop_reason, usage = self._generate(body)
+            time.sleep(self.token_interval * len(chunks))
+        finally:
+            self._exit()
+
+        response_body = {
+            "id": "msg_fake",
+            "type": "message",
+            "role": "assistant",
+            "model": modelId,
+            "content": [{"type": "text", "text": "".join(chunks)}],
+            "stop_reason": stop_reason,
+            "usage": {**usage, "output_tokens": len(chunks)},
+        }
+        return {
+            "body": BytesIO(json.dumps(response_body).encode("utf-8")),
+            "contentType": "application/json",
+        }
+
+    def invoke_model_with_response_stream(self, modelId: str, body: str, **kwargs) -> Dict[str, Any]:
+        """bedrock-runtime InvokeModelWithResponseStream 相当の応答を返す"""
+        # ストリームは最初のイベントを返すまでを処理中として数える
+        self._enter("InvokeModelWithResponseStream")
+        try:
+            self._sleep()
+        finally:
+            self._exit()
+        self._maybe_throttle("InvokeModelWithResponseStream")
+        chunks, stop_reason, usage = self._generate(body)
+        stream = FakeEventStream(modelId, chunks, self.token_interval, stop_reason, usage)
+        with self._lock:
+            self.streams.append(stream)
+        return {"body": stream, "contentType": "application/json"}
+
+
+class FakeEventStream:
+    """botocoreのEventStream相当のイテレータ（close() 後はイベントを返さない）"""
+
+    def __init__(
+        self,
+        model_id: str,
+        chunks: List[str],
+        token_interval: float,
+        stop_reason: str = "end_turn",
+        usage: Optional[Dict[str, int]] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            model_id: モデルID
+            chunks: content_block_delta で返すテキストのリスト
+            token_interval: イベントの間隔（秒）
+            stop_reason: message_delta で返す停止理由
+            usage: message_start で返す入力トークン数の usage
+        """
+        self.model_id = model_id
+        self.chunks = chunks
+        self.token_interval = token_interval
+        self.stop_reason = stop_reason
+        self.usage = usage if usage is not None else {"input_tokens": 1500}
+        # 返したテキストのイベント数と、close() されたかどうか
+        self.delivered = 0
+        self.closed = False
+
+    def _event(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {"chunk": {"bytes": json.dumps(payload).encode("utf-8")}}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        yield self._event({
+            "type": "message_start",
+            "message": {
+                "id": "msg_fake",
+                "type": "message",
+                "role": "assistant",
+                "model": self.model_id,
+                "content": [],
+                "usage": {**self.usage, "output_tokens": 1},
+            },
+        })
+        yield self._event({
+            "type": "content_block_start",
+            "index": 0,
+            "content_block": {"type": "text", "text": ""},
+        })
+        for text in self.chunks:
+            if self.closed:
+                return
+            time.sleep(self.token_interval)
+            self.delivered += 1
+            yield self._event({
+                "type": "content_block_delta",
+                "index": 0,
+                "delta": {"type": "text_delta", "text": text},
+            })
+        yield self._event({"type": "content_block_stop", "index": 0})
+        yield self._event({
+            "type": "message_delta",
+            "delta": {"stop_reason": self.stop_reason, "stop_sequence": None},
+            "usage": {"output_tokens": len(self.chunks)},
+        })
+        yield self._event({"type": "message_stop"})
+
+    def close(self) -> None:
+        """接続を閉じる"""
+        self.closed = True
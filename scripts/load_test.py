@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+"""
+圧力計メーター読み取りシステム 負荷試験スクリプト
+
+Lambda関数のコード（cdk/lambda）をローカルの複数プロセスで実行し、同時実行時の
+スループット・レイテンシ・メモリ使用量を計測します。デプロイ前に cdk-stack.ts の
+memorySize と同時実行数をデータから決めるために使います。
+
+Lambdaの実行モデルを次のように再現します。
+    - 1プロセスを1つの実行環境（コンテナ）とし、1度に1リクエストだけ処理する
+    - 空いているコンテナが無い場合は新しいプロセスを起動する（コールドスタート。
+      起動から lambda_function のインポート完了までの時間がレイテンシに含まれる）
+    - コンテナ数が --max-containers に達している場合はリクエストを拒否する
+      （TooManyRequestsException）
+    - --idle-timeout 秒以上使われていないコンテナは破棄する
+
+Bedrockの呼び出しは fake_bedrock.py のフェイクで置き換えます（待ち時間の分布・
+スロットリングを指定可能。--bedrock-max-in-flight は全プロセスで共有）。
+
+負荷のかけ方:
+    open:   --rate 件/秒のポアソン到着（応答を待たずに送る。過負荷時の振る舞いを見る）
+    closed: --concurrency 人の利用者が応答を受け取るたびに次を送る（最大スループットを見る）
+
+実行には cdk/lambda/requirements.txt の依存パッケージが必要です。
+"""
+import argparse
+import base64
+import json
+import math
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+LAMBDA_DIR = SCRIPT_DIR.parent / 'cdk' / 'lambda'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+# Lambdaの memorySize の刻み（MB）と、ピークRSSに対する余裕
+MEMORY_STEP_MB = 64
+MEMORY_HEADROOM = 1.25
+
+
+def current_rss_mb() -> float:
+    """現在のRSS（MB、Linux以外ではピークRSS）"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """ピークRSS（MB。Linuxでは ru_maxrss の単位はKB）"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def container_main(conn, env: Dict[str, str], bedrock_options: Dict[str, Any], in_flight) -> None:
+    """
+    コンテナ（子プロセス）の処理
+
+    初期化（lambda_function のインポート）を終えたら準備完了を通知し、
+    イベントを1件ずつ受け取って lambda_handler を呼び出す。Noneを受け取ったら終了する。
+
+    Args:
+        conn: 親プロセスとの接続
+        env: 追加する環境変数
+        bedrock_options: FakeBedrockRuntimeClient の引数
+        in_flight: Bedrockの処理中の呼び出し数の共有カウンター
+    """
+    start = time.perf_counter()
+    os.environ.update(env)
+    sys.path.insert(0, str(LAMBDA_DIR))
+    sys.path.insert(0, str(SCRIPT_DIR))
+    # Lambda関数のログは捨てる（計測結果だけを親プロセスに返す）
+    devnull = open(os.devnull, 'w')
+    with redirect_stdout(devnull):
+        import lambda_function
+        from fake_bedrock import FakeBedrockRuntimeClient
+
+        lambda_function.bedrock_client = FakeBedrockRuntimeClient(**bedrock_options, in_flight=in_flight)
+    conn.send({'init': time.perf_counter() - start, 'rss_mb': current_rss_mb()})
+
+    while True:
+        event = conn.recv()
+        if event is None:
+            return
+        start = time.perf_counter()
+        with redirect_stdout(devnull):
+            response = lambda_function.lambda_handler(event, None)
+        duration = time.perf_counter() - start
+        error_type = None
+        if response.get('statusCode') != 200:
+            error_type = json.loads(response.get('body', '{}')).get('type', f"HTTP{response.get('statusCode')}")
+        conn.send({
+            'duration': duration,
+            'statusCode': response.get('statusCode'),
+            'errorType': error_type,
+            'rss_mb': current_rss_mb(),
+            'peak_rss_mb': peak_rss_mb(),
+        })
+
+
+class Container:
+    """1つの実行環境（子プロセス）"""
+
+    def __init__(self, ctx, env: Dict[str, str], bedrock_options: Dict[str, Any], in_flight):
+        """
+        子プロセスを起動し、初期化が終わるまで待つ（コールドスタート）
+
+        Args:
+            ctx: multiprocessing のコンテキスト
+            env: 追加する環境変数
+            bedrock_options: FakeBedrockRuntimeClient の引数
+            in_flight: Bedrockの処理中の呼び出し数の共有カウンター
+        """
+        start = time.perf_counter()
+        self._conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=container_main, args=(child_conn, env, bedrock_options, in_flight), daemon=True
+        )
+        self.process.start()
+        ready = self._conn.recv()
+        # プロセスの起動からインポート完了まで（Lambdaの初期化フェーズに相当）
+        self.init_time = time.perf_counter() - start
+        self.import_time = ready['init']
+        self.requests = 0
+        self.rss_mb = ready['rss_mb']
+        self.peak_rss_mb = ready['rss_mb']
+        self.last_used = time.monotonic()
+
+    def invoke(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        イベントを処理させる
+
+        Args:
+            event: Lambdaイベント
+
+        Returns:
+            {"duration": ..., "statusCode": ..., "errorType": ..., "rss_mb": ..., "peak_rss_mb": ...}
+        """
+        self._conn.send(event)
+        result = self._conn.recv()
+        self.requests += 1
+        self.rss_mb = result['rss_mb']
+        self.peak_rss_mb = max(self.peak_rss_mb, result['peak_rss_mb'])
+        return result
+
+    def stop(self) -> None:
+        """子プロセスを終了"""
+        try:
+            self._conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class ContainerPool:
+    """実行環境のプール（空いているコンテナが無い場合は上限まで新しく起動）"""
+
+    def __init__(
+        self,
+        max_containers: int,
+        idle_timeout: float,
+        env: Dict[str, str],
+        bedrock_options: Dict[str, Any],
+    ):
+        """
+        初期化
+
+        Args:
+            max_containers: コンテナ数の上限（Lambdaの同時実行数に相当）
+            idle_timeout: この秒数以上使われていないコンテナを破棄する（0以下の場合は破棄しない）
+            env: コンテナに追加する環境変数
+            bedrock_options: FakeBedrockRuntimeClient の引数
+        """
+        # 子プロセスに親の状態を引き継がないよう spawn で起動する（コールドスタートを再現）
+        self._ctx = multiprocessing.get_context('spawn')
+        self.max_containers = max_containers
+        self.idle_timeout = idle_timeout
+        self.env = env
+        self.bedrock_options = bedrock_options
+        self.in_flight = self._ctx.Value('i', 0)
+        # 起動したすべてのコンテナ（統計用）
+        self.containers: List[Container] = []
+        self.recycled = 0
+        self.peak_busy = 0
+        self._idle: List[Container] = []
+        self._count = 0
+        self._busy = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Optional[Tuple[Container, bool]]:
+        """
+        コンテナを取得
+
+        Returns:
+            (コンテナ, コールドスタートかどうか)。上限に達している場合はNone
+        """
+        with self._lock:
+            expired = []
+            if self.idle_timeout > 0:
+                now = time.monotonic()
+                expired = [c for c in self._idle if now - c.last_used > self.idle_timeout]
+                self._idle = [c for c in self._idle if c not in expired]
+                self._count -= len(expired)
+                self.recycled += len(expired)
+            if self._idle:
+                # Lambdaと同様に直前に使われたコンテナを優先する
+                container = self._idle.pop()
+            elif self._count < self.max_containers:
+                container = None
+                self._count += 1
+            else:
+                return None
+            self._busy += 1
+            self.peak_busy = max(self.peak_busy, self._busy)
+        for c in expired:
+            c.stop()
+        if container is not None:
+            return container, False
+
+        # 新しいコンテナを起動（コールドスタート）
+        try:
+            container = Container(self._ctx, self.env, self.bedrock_options, self.in_flight)
+        except Exception:
+            with self._lock:
+                self._count -= 1
+                self._busy -= 1
+            raise
+        with self._lock:
+            self.containers.append(container)
+        return container, True
+
+    def release(self, container: Container, healthy: bool = True) -> None:
+        """
+        コンテナを返却
+
+        Args:
+            container: コンテナ
+            healthy: Falseの場合は再利用せずに破棄する
+        """
+        container.last_used = time.monotonic()
+        with self._lock:
+            self._busy -= 1
+            if healthy:
+                self._idle.append(container)
+            else:
+                self._count -= 1
+        if not healthy:
+            container.stop()
+
+    def close(self) -> None:
+        """すべてのコンテナを終了"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for container in idle:
+            container.stop()
+
+
+def run_request(pool: ContainerPool, event: Dict[str, Any], arrival: float) -> Dict[str, Any]:
+    """
+    1件のリクエストを処理
+
+    Args:
+        pool: コンテナのプール
+        event: Lambdaイベント
+        arrival: リクエストの到着時刻（time.perf_counter()）
+
+    Returns:
+        {"ok": ..., "cold": ..., "latency": ..., "duration": ..., "errorType": ...}
+    """
+    acquired = pool.acquire()
+    if acquired is None:
+        return {'ok': False, 'cold': False, 'latency': time.perf_counter() - arrival,
+                'errorType': 'TooManyRequestsException'}
+    container, cold = acquired
+    healthy = True
+    try:
+        result = container.invoke(event)
+    except (EOFError, OSError) as e:
+        # コンテナが異常終了した場合は破棄する
+        healthy = False
+        result = {'statusCode': None, 'errorType': type(e).__name__, 'duration': None}
+    finally:
+        pool.release(container, healthy)
+    return {
+        'ok': result['statusCode'] == 200,
+        'cold': cold,
+        'latency': time.perf_counter() - arrival,
+        'duration': result['duration'],
+        'errorType': result['errorType'],
+    }
+
+
+def run_open_loop(
+    pool: ContainerPool, events: List[Dict[str, Any]], rate: float, duration: float, seed: int = None
+) -> List[Dict[str, Any]]:
+    """
+    ポアソン到着で負荷をかける（応答を待たずに次のリクエストを送る）
+
+    Args:
+        pool: コンテナのプール
+        events: 順に送るイベント（繰り返し使う）
+        rate: 平均到着率（件/秒）
+        duration: 負荷をかける時間（秒）
+        seed: 到着間隔の乱数シード
+
+    Returns:
+        リクエストごとの結果
+    """
+    rng = random.Random(seed)
+    futures = []
+    start = time.perf_counter()
+    next_arrival = start
+    # 拒否されるリクエストはすぐ終わるため、コンテナ数より少し多いスレッドで足りる
+    with ThreadPoolExecutor(max_workers=pool.max_containers + 8) as executor:
+        i = 0
+        while True:
+            next_arrival += rng.expovariate(rate)
+            if next_arrival - start >= duration:
+                break
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(run_request, pool, events[i % len(events)], next_arrival))
+            i += 1
+        return [future.result() for future in futures]
+
+
+def run_closed_loop(
+    pool: ContainerPool, events: List[Dict[str, Any]], concurrency: int, duration: float,
+    think_time: float = 0.0,
+) -> List[Dict[str, Any]]:
+    """
+    一定数の利用者が応答を受け取るたびに次のリクエストを送る
+
+    Args:
+        pool: コンテナのプール
+        events: 順に送るイベント（繰り返し使う）
+        concurrency: 利用者数
+        duration: 負荷をかける時間（秒）
+        think_time: 応答を受け取ってから次を送るまでの時間（秒）
+
+    Returns:
+        リクエストごとの結果
+    """
+    records: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    counter = iter(range(sys.maxsize))
+    deadline = time.perf_counter() + duration
+
+    def user() -> None:
+        while time.perf_counter() < deadline:
+            with lock:
+                i = next(counter)
+            record = run_request(pool, events[i % len(events)], time.perf_counter())
+            with lock:
+                records.append(record)
+            if think_time > 0:
+                time.sleep(think_time)
+
+    threads = [threading.Thread(target=user) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records
+
+
+def latency_stats(latencies: List[float]) -> Dict[str, Optional[float]]:
+    """レイテンシの統計（ミリ秒）"""
+    if not latencies:
+        return {'count': 0, 'p50': None, 'p90': None, 'p99': None, 'max': None}
+    values = np.array(latencies) * 1000
+    return {
+        'count': len(latencies),
+        'p50': float(np.percentile(values, 50)),
+        'p90': float(np.percentile(values, 90)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+    }
+
+
+def summarize(records: List[Dict[str, Any]], pool: ContainerPool, wall_time: float) -> Dict[str, Any]:
+    """
+    負荷試験の結果を集計
+
+    Args:
+        records: リクエストごとの結果
+        pool: コンテナのプール
+        wall_time: 負荷をかけた時間（秒）
+
+    Returns:
+        集計結果
+    """
+    ok = [r for r in records if r['ok']]
+    errors: Dict[str, int] = {}
+    for r in records:
+        if not r['ok']:
+            errors[r['errorType']] = errors.get(r['errorType'], 0) + 1
+    served = [r for r in records if r['errorType'] != 'TooManyRequestsException']
+    cold = [r for r in served if r['cold']]
+    containers = pool.containers
+    peak_rss = max((c.peak_rss_mb for c in containers), default=0.0)
+    return {
+        'requests': len(records),
+        'succeeded': len(ok),
+        'errors': errors,
+        'wallTime': wall_time,
+        'throughput': len(ok) / wall_time if wall_time > 0 else None,
+        'latency': latency_stats([r['latency'] for r in ok]),
+        'warmLatency': latency_stats([r['latency'] for r in ok if not r['cold']]),
+        'coldLatency': latency_stats([r['latency'] for r in ok if r['cold']]),
+        'coldStarts': len(cold),
+        'coldStartShare': len(cold) / len(served) if served else None,
+        'containers': {
+            'started': len(containers),
+            'peakBusy': pool.peak_busy,
+            'recycled': pool.recycled,
+            'initTime': [c.init_time for c in containers],
+            'importTime': [c.import_time for c in containers],
+        },
+        'processes': [
+            {'pid': c.process.pid, 'requests': c.requests, 'initTime': c.init_time,
+             'rssMb': c.rss_mb, 'peakRssMb': c.peak_rss_mb}
+            for c in containers
+        ],
+        'suggestedMemorySize': int(math.ceil(peak_rss * MEMORY_HEADROOM / MEMORY_STEP_MB) * MEMORY_STEP_MB),
+    }
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    """集計結果を表示"""
+    def row(name: str, stats: Dict[str, Optional[float]]) -> None:
+        if not stats['count']:
+            print(f"  {name:<6} {0:>6}")
+            return
+        print(f"  {name:<6} {stats['count']:>6} {stats['p50']:>9.0f} {stats['p90']:>9.0f} "
+              f"{stats['p99']:>9.0f} {stats['max']:>9.0f}")
+
+    print(f"[RESULT] リクエスト: {summary['requests']} 件（成功 {summary['succeeded']} 件）")
+    if summary['errors']:
+        print("[RESULT] エラー: " + ", ".join(f"{k}: {v}" for k, v in sorted(summary['errors'].items())))
+    print(f"[RESULT] スループット: {summary['throughput']:.2f} 件/秒（{summary['wallTime']:.1f}s）")
+    print()
+    print(f"  {'':<6} {'count':>6} {'p50[ms]':>9} {'p90[ms]':>9} {'p99[ms]':>9} {'max[ms]':>9}")
+    row('all', summary['latency'])
+    row('warm', summary['warmLatency'])
+    row('cold', summary['coldLatency'])
+    print()
+
+    containers = summary['containers']
+    share = summary['coldStartShare']
+    print(f"[RESULT] コールドスタート: {summary['coldStarts']} 件"
+          + (f"（{share * 100:.1f}%）" if share is not None else "")
+          + (f"、初期化 平均 {np.mean(containers['initTime']):.2f}s"
+             f"（うちインポート {np.mean(containers['importTime']):.2f}s）" if containers['initTime'] else ""))
+    print(f"[RESULT] コンテナ: 起動 {containers['started']}、同時実行のピーク {containers['peakBusy']}、"
+          f"アイドルで破棄 {containers['recycled']}")
+    print()
+    print(f"  {'pid':>8} {'requests':>9} {'init[s]':>8} {'RSS[MB]':>8} {'peak[MB]':>9}")
+    for p in summary['processes']:
+        print(f"  {p['pid']:>8} {p['requests']:>9} {p['initTime']:>8.2f} {p['rssMb']:>8.0f} {p['peakRssMb']:>9.0f}")
+    print()
+    print(f"[RESULT] memorySize の目安: {summary['suggestedMemorySize']} MB"
+          f"（ピークRSS × {MEMORY_HEADROOM}。LambdaのCPU割り当ては memorySize に比例するため、"
+          f"レイテンシも合わせて確認してください）")
+    print(f"[RESULT] 同時実行数の目安: {containers['peakBusy']}（この負荷での同時実行のピーク）")
+
+
+def load_events(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """サンプル画像からLambdaイベントを作成"""
+    paths = sorted(p for p in args.image_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if not paths:
+        raise FileNotFoundError(f"画像が見つかりません: {args.image_dir}")
+    user_prompt = args.user_prompt.read_text(encoding='utf-8').strip()
+    system_prompt = args.system_prompt.read_text(encoding='utf-8').strip()
+    events = []
+    for path in paths:
+        event = {
+            'image': base64.b64encode(path.read_bytes()).decode('utf-8'),
+            'userPrompt': user_prompt,
+            'systemPrompt': system_prompt,
+            'preprocessImage': not args.no_preprocess,
+        }
+        if args.response_image is not None:
+            event['responseImage'] = args.response_image
+        events.append(event)
+    return events
+
+
+def main() -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='圧力計メーター読み取りシステム 負荷試験スクリプト')
+    parser.add_argument('--mode', choices=['open', 'closed'], default='closed',
+                        help='open: 一定の到着率で送る / closed: 一定数の利用者が応答ごとに送る（デフォルト: closed）')
+    parser.add_argument('--rate', type=float, default=5.0, help='open の平均到着率（件/秒、デフォルト: 5）')
+    parser.add_argument('--concurrency', type=int, default=4, help='closed の利用者数（デフォルト: 4）')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='closed で応答を受け取ってから次を送るまでの時間（秒、デフォルト: 0）')
+    parser.add_argument('--duration', type=float, default=30.0, help='負荷をかける時間（秒、デフォルト: 30）')
+    parser.add_argument('--max-containers', type=int, default=10,
+                        help='コンテナ数の上限（Lambdaの同時実行数に相当、デフォルト: 10）')
+    parser.add_argument('--idle-timeout', type=float, default=0.0,
+                        help='この秒数以上使われていないコンテナを破棄する（デフォルト: 0 = 破棄しない）')
+    parser.add_argument('--image-dir', type=Path, default=SCRIPT_DIR.parent / 'sample_images',
+                        help='サンプル画像のディレクトリ（デフォルト: ../sample_images）')
+    parser.add_argument('--user-prompt', type=Path, default=SCRIPT_DIR / 'user_prompt.txt')
+    parser.add_argument('--system-prompt', type=Path, default=SCRIPT_DIR / 'system_prompt.txt')
+    parser.add_argument('--no-preprocess', action='store_true', help='YOLO前処理をスキップする')
+    parser.add_argument('--response-image', choices=['none', 'thumbnail', 'full'], default=None,
+                        help='レスポンスに含める前処理済み画像（デフォルト: 環境変数 RESPONSE_IMAGE）')
+    parser.add_argument('--cache', action='store_true',
+                        help='処理結果キャッシュを有効にする（デフォルト: 同じ画像を繰り返し送るため無効）')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='コンテナに設定する環境変数（複数指定可）')
+    parser.add_argument('--bedrock-latency', type=float, default=1.0,
+                        help='フェイクのBedrock応答の待ち時間（秒、分布の中央値または平均、デフォルト: 1.0）')
+    parser.add_argument('--bedrock-jitter', type=float, default=0.3,
+                        help='待ち時間のばらつき（uniform: 幅[秒] / lognormal: 対数の標準偏差、デフォルト: 0.3）')
+    parser.add_argument('--latency-distribution', choices=['uniform', 'lognormal', 'exponential'],
+                        default='lognormal', help='待ち時間の分布（デフォルト: lognormal）')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='ThrottlingExceptionを返す確率（デフォルト: 0）')
+    parser.add_argument('--bedrock-max-in-flight', type=int, default=None,
+                        help='Bedrockの同時呼び出し数の上限（全コンテナで共有。超えた分はスロットリング）')
+    parser.add_argument('--seed', type=int, default=None, help='乱数シード')
+    parser.add_argument('--output', type=Path, default=None, help='集計結果を書き出すJSONファイル')
+    args = parser.parse_args()
+
+    env = {'CACHE_BACKEND': 'memory' if args.cache else 'none'}
+    for item in args.env:
+        key, _, value = item.partition('=')
+        env[key] = value
+    bedrock_options = {
+        'latency': args.bedrock_latency,
+        'jitter': args.bedrock_jitter,
+        'latency_distribution': args.latency_distribution,
+        'throttle_rate': args.throttle_rate,
+        'max_in_flight': args.bedrock_max_in_flight,
+        'seed': args.seed,
+    }
+    events = load_events(args)
+
+    load = (f"open {args.rate:g} 件/秒" if args.mode == 'open'
+            else f"closed {args.concurrency} 利用者" + (f"（思考時間 {args.think_time:g}s）" if args.think_time else ""))
+    print(f"[INFO] 負荷: {load}、{args.duration:g}s、コンテナ上限 {args.max_containers}"
+          + (f"、アイドル {args.idle_timeout:g}s で破棄" if args.idle_timeout > 0 else ""))
+    print(f"[INFO] Bedrock（フェイク）: {args.latency_distribution} {args.bedrock_latency:g}s "
+          f"± {args.bedrock_jitter:g}、スロットリング確率 {args.throttle_rate:g}"
+          + (f"、同時呼び出し上限 {args.bedrock_max_in_flight}" if args.bedrock_max_in_flight else ""))
+    print(f"[INFO] 画像: {len(events)} 枚、前処理: {'なし' if args.no_preprocess else 'あり'}")
+    print()
+
+    pool = ContainerPool(args.max_containers, args.idle_timeout, env, bedrock_options)
+    try:
+        start = time.perf_counter()
+        if args.mode == 'open':
+            records = run_open_loop(pool, events, args.rate, args.duration, args.seed)
+        else:
+            records = run_closed_loop(pool, events, args.concurrency, args.duration, args.think_time)
+        wall_time = time.perf_counter() - start
+    finally:
+        pool.close()
+
+    summary = summarize(records, pool, wall_time)
+    print_summary(summary)
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"[INFO] 集計結果: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
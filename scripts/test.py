@@ -3,17 +3,37 @@
 圧力計メーター読み取りシステム動作確認スクリプト
 
 Lambda関数を呼び出して、YOLO前処理 + Bedrock LLM解析を実行します。
+
+画像を1枚指定した場合は結果を詳しく表示します。ディレクトリ・globパターン・
+複数の画像を指定した場合はバッチ実行となり、1つのクライアントを共有する
+ワーカープールから（オプションでレート制限して）呼び出し、完了した順に
+結果をJSONLファイルへ書き出して、スループットとレイテンシの分布を表示します。
+
+--fake を指定すると、デプロイしたLambda関数の代わりにプロセス内で
+lambda_handler をフェイクのBedrockクライアントで呼び出します（AWSに接続しない）。
 """
 import argparse
 import base64
+import contextlib
+import glob
 import json
+import math
+import os
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+SCRIPT_DIR = Path(__file__).resolve().parent
+LAMBDA_DIR = SCRIPT_DIR.parent / 'cdk' / 'lambda'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
 
 def load_image_as_base64(image_path: Path) -> str:
     """
@@ -43,6 +63,39 @@ def save_base64_image(base64_string: str, output_path: Path) -> None:
         f.write(image_data)
 
 
+def upload_image_to_s3(image_path: Path, bucket: str, region: str, client=None) -> str:
+    """
+    画像ファイルをS3にアップロードする（base64エンコードせずにファイルから直接送る）
+
+    Args:
+        image_path: 画像ファイルパス
+        bucket: S3バケット名
+        region: AWSリージョン
+        client: S3クライアント（省略時は作成）
+
+    Returns:
+        アップロードした画像のURI（s3://bucket/inputs/<ファイル名>）
+    """
+    key = f'inputs/{image_path.name}'
+    if client is None:
+        client = boto3.client('s3', region_name=region)
+    client.upload_file(str(image_path), bucket, key)
+    return f's3://{bucket}/{key}'
+
+
+def download_s3_image(uri: str, output_path: Path, region: str) -> None:
+    """
+    S3の画像を保存
+
+    Args:
+        uri: 画像のURI（s3://bucket/key）
+        output_path: 保存先パス
+        region: AWSリージョン
+    """
+    bucket, key = uri[len('s3://'):].split('/', 1)
+    boto3.client('s3', region_name=region).download_file(bucket, key, str(output_path))
+
+
 def load_prompt_file(prompt_path: Path) -> str:
     """
     プロンプトファイルを読み込む
@@ -57,57 +110,207 @@ def load_prompt_file(prompt_path: Path) -> str:
         return f.read().strip()
 
 
+class LambdaInvoker:
+    """デプロイしたLambda関数を呼び出す（接続プール付きのクライアントを共有）"""
+
+    def __init__(self, function_name: str, region: str, max_connections: int = 10):
+        """
+        初期化
+
+        Args:
+            function_name: Lambda関数名
+            region: AWSリージョン
+            max_connections: 接続プールのサイズ（同時呼び出し数以上にする）
+        """
+        self.function_name = function_name
+        self.client = boto3.client(
+            'lambda',
+            region_name=region,
+            config=Config(
+                max_pool_connections=max_connections,
+                # Lambda関数のタイムアウト（120秒）より長く待つ
+                read_timeout=180,
+                retries={'mode': 'standard'},
+            ),
+        )
+
+    def invoke(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Lambda関数を呼び出す
+
+        Args:
+            payload: イベント
+
+        Returns:
+            Lambda関数の戻り値（{"statusCode": ..., "body": ...}）
+        """
+        response = self.client.invoke(
+            FunctionName=self.function_name,
+            InvocationType='RequestResponse',
+            Payload=json.dumps(payload)
+        )
+        response_payload = json.loads(response['Payload'].read())
+        if 'FunctionError' in response:
+            raise RuntimeError(f"Lambda function error: {response_payload}")
+        return response_payload
+
+
+class LocalInvoker:
+    """プロセス内で lambda_handler をフェイクのBedrockクライアントで呼び出す（オフライン）"""
+
+    def __init__(self, latency: float = 1.0, jitter: float = 0.0, throttle_rate: float = 0.0):
+        """
+        初期化
+
+        実行には cdk/lambda/requirements.txt の依存パッケージが必要です。
+
+        Args:
+            latency: フェイクのBedrock応答の待ち時間（秒）
+            jitter: 待ち時間の揺らぎ（秒）
+            throttle_rate: フェイクがスロットリングを返す確率
+        """
+        sys.path.insert(0, str(LAMBDA_DIR))
+        import lambda_function
+        from fake_bedrock import FakeBedrockRuntimeClient
+
+        self.lambda_function = lambda_function
+        lambda_function.bedrock_client = FakeBedrockRuntimeClient(
+            latency=latency, jitter=jitter, throttle_rate=throttle_rate
+        )
+
+    def invoke(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """lambda_handler を呼び出す（イベントはJSONを経由してデプロイ時と同じ形にする）"""
+        return self.lambda_function.lambda_handler(json.loads(json.dumps(payload)), None)
+
+
+def build_payload(
+    image_base64: Optional[str],
+    user_prompt: str,
+    system_prompt: str,
+    preprocess_image: bool = True,
+    reading_mode: str = 'llm',
+    calibration: Optional[Dict[str, Any]] = None,
+    gauge_type: Optional[str] = None,
+    camera_id: Optional[str] = None,
+    stream: bool = False,
+    output_format: str = 'text',
+    prompt_name: Optional[str] = None,
+    image_uri: Optional[str] = None,
+    response_image: str = 'full',
+    timings: bool = False
+) -> Dict[str, Any]:
+    """
+    Lambda呼び出しのペイロードを構築
+
+    引数は invoke_lambda_function() と同じ。
+
+    Returns:
+        ペイロード
+    """
+    payload = {
+        'userPrompt': user_prompt,
+        'systemPrompt': system_prompt,
+        'preprocessImage': preprocess_image,
+        'readingMode': reading_mode
+    }
+    if image_uri is not None:
+        payload['imageUri'] = image_uri
+    else:
+        payload['image'] = image_base64
+    if calibration is not None:
+        payload['calibration'] = calibration
+    if gauge_type is not None:
+        payload['gaugeType'] = gauge_type
+    if camera_id is not None:
+        payload['cameraId'] = camera_id
+    if stream:
+        payload['stream'] = True
+    if output_format != 'text':
+        payload['outputFormat'] = output_format
+    if response_image != 'full':
+        payload['responseImage'] = response_image
+    if prompt_name is not None:
+        payload['promptName'] = prompt_name
+        del payload['systemPrompt']
+    if timings:
+        payload['timings'] = True
+    return payload
+
+
 def invoke_lambda_function(
     function_name: str,
-    image_base64: str,
+    image_base64: Optional[str],
     user_prompt: str,
     system_prompt: str,
     preprocess_image: bool = True,
-    region: str = 'us-east-1'
+    region: str = 'us-east-1',
+    reading_mode: str = 'llm',
+    calibration: Optional[Dict[str, Any]] = None,
+    gauge_type: Optional[str] = None,
+    camera_id: Optional[str] = None,
+    stream: bool = False,
+    output_format: str = 'text',
+    prompt_name: Optional[str] = None,
+    image_uri: Optional[str] = None,
+    response_image: str = 'full',
+    timings: bool = False,
+    invoker=None
 ) -> Dict[str, Any]:
     """
     Lambda関数を呼び出して画像を解析
 
     Args:
         function_name: Lambda関数名
-        image_base64: base64エンコードされた画像
+        image_base64: base64エンコードされた画像（image_uri を指定する場合はNone）
         user_prompt: ユーザープロンプト
         system_prompt: システムプロンプト
         preprocess_image: 画像を前処理するかどうか（デフォルト: True）
         region: AWSリージョン
+        reading_mode: 読み取りモード（llm / local / auto）
+        calibration: ゲージの校正値（オプション）
+        gauge_type: 校正値ファイルから選ぶゲージ種別（オプション）
+        camera_id: カメラID（オプション、文字盤の検出結果をカメラごとに再利用）
+        stream: Bedrockをストリーミングで呼び出し、読み取り値が現れた時点で打ち切るかどうか
+        output_format: LLMの回答形式（text / json）
+        prompt_name: Lambda関数に同梱したプロンプトテンプレート名（オプション、
+            指定時は system_prompt を送らずテンプレートのシステムプロンプトと参考画像を使う）
+        image_uri: 画像のURI（オプション、s3://bucket/key。指定時は画像を埋め込まず、
+            前処理済み画像もURIで受け取る）
+        response_image: レスポンスに含める前処理済み画像（none / thumbnail / full）
+        timings: 処理段階ごとの所要時間をレスポンスに含めるかどうか
+        invoker: 呼び出し方法（LambdaInvoker / LocalInvoker。省略時はデプロイした関数）
 
     Returns:
         Lambda関数からのレスポンス
     """
-    client = boto3.client('lambda', region_name=region)
+    if invoker is None:
+        invoker = LambdaInvoker(function_name, region)
 
-    print(f"[INFO] Lambda関数を呼び出し中...")
+    print("[INFO] Lambda関数を呼び出し中...")
     print(f"[INFO] Function Name: {function_name}")
     print(f"[INFO] Region: {region}")
     print(f"[INFO] Preprocess Image: {preprocess_image}")
+    print(f"[INFO] Reading Mode: {reading_mode}")
+    if prompt_name is not None:
+        print(f"[INFO] Prompt Template: {prompt_name}")
     print(f"[INFO] System Prompt: {system_prompt[:50]}..." if len(system_prompt) > 50 else f"[INFO] System Prompt: {system_prompt}")
     print(f"[INFO] User Prompt: {user_prompt[:50]}..." if len(user_prompt) > 50 else f"[INFO] User Prompt: {user_prompt}")
-    print(f"[INFO] Image Size: {len(image_base64)} characters (base64)")
+    if image_uri is not None:
+        print(f"[INFO] Image URI: {image_uri}")
+    else:
+        print(f"[INFO] Image Size: {len(image_base64)} characters (base64)")
     print()
 
     # Lambda呼び出しペイロードを構築
-    payload = {
-        'image': image_base64,
-        'userPrompt': user_prompt,
-        'systemPrompt': system_prompt,
-        'preprocessImage': preprocess_image
-    }
+    payload = build_payload(
+        image_base64, user_prompt, system_prompt, preprocess_image, reading_mode, calibration,
+        gauge_type, camera_id, stream, output_format, prompt_name, image_uri, response_image,
+        timings
+    )
 
     try:
         # Lambda関数を呼び出し
-        response = client.invoke(
-            FunctionName=function_name,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(payload)
-        )
-
-        # レスポンスを解析
-        response_payload = json.loads(response['Payload'].read())
+        response_payload = invoker.invoke(payload)
 
         # エラーチェック
         if response_payload.get('statusCode') != 200:
@@ -119,8 +322,17 @@ def invoke_lambda_function(
 
         return {
             'llm_response': body['llmResponse'],
-            'processed_image': body['processedImage'],
-            'yolo_message': body['yoloMessage']
+            'processed_image': body.get('processedImage'),
+            'processed_image_uri': body.get('processedImageUri'),
+            'processed_image_media_type': body.get('processedImageMediaType', 'image/png'),
+            'yolo_message': body['yoloMessage'],
+            'reading': body.get('reading'),
+            'llm_image': body.get('llmImage'),
+            'llm_timing': body.get('llmTiming'),
+            'llm_usage': body.get('llmUsage'),
+            'llm_reading': body.get('llmReading'),
+            'llm_reading_error': body.get('llmReadingError'),
+            'timings': body.get('timings')
         }
 
     except ClientError as e:
@@ -131,15 +343,262 @@ def invoke_lambda_function(
         raise
 
 
+def expand_image_paths(patterns: List[str]) -> List[Path]:
+    """
+    画像ファイル・ディレクトリ・globパターンを画像ファイルのリストに展開
+
+    Args:
+        patterns: 画像ファイル・ディレクトリ・globパターン（例: "../sample_images/*.png"）
+
+    Returns:
+        画像ファイルのパスのリスト（パターンごとにファイル名順、重複は除く）
+    """
+    paths = []
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            matches = [p for p in path.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS]
+        elif glob.has_magic(pattern):
+            matches = [Path(p) for p in glob.glob(pattern, recursive=True)]
+        else:
+            matches = [path]
+        paths.extend(sorted(matches))
+    return list(dict.fromkeys(paths))
+
+
+class RateLimiter:
+    """呼び出しの開始間隔を一定以上に保つ（スレッドセーフ）"""
+
+    def __init__(self, rate: float):
+        """
+        初期化
+
+        Args:
+            rate: 1秒あたりの最大呼び出し数（0以下の場合は制限しない）
+        """
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """次の呼び出しを開始できるまで待つ"""
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next, now)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    パーセンタイル（nearest-rank法）
+
+    Args:
+        values: 値のリスト
+        q: パーセンタイル（0〜100）
+
+    Returns:
+        パーセンタイル値（値が無い場合はNone）
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def run_batch(
+    image_paths: List[Path],
+    invoker,
+    payload_options: Dict[str, Any],
+    results_path: Path,
+    workers: int = 4,
+    rate: float = 0.0,
+    s3_bucket: Optional[str] = None,
+    region: str = 'us-east-1',
+) -> Dict[str, Any]:
+    """
+    画像をワーカープールで並列に解析し、結果をJSONLファイルに書き出す
+
+    投入中の呼び出しは workers 件までに抑え、完了した順に1行ずつ書き出す
+    （途中で中断しても完了した結果は残る）。
+
+    Args:
+        image_paths: 画像ファイルのパスのリスト
+        invoker: 呼び出し方法（LambdaInvoker / LocalInvoker、スレッド間で共有する）
+        payload_options: 画像以外のペイロードの引数（build_payload() の引数）
+        results_path: 結果のJSONLファイル
+        workers: 同時に呼び出す数
+        rate: 1秒あたりの最大呼び出し数（0の場合は制限しない）
+        s3_bucket: 画像をアップロードしてURIで渡すS3バケット（オプション）
+        region: AWSリージョン
+
+    Returns:
+        集計結果（件数・エラー数・スループット・レイテンシのパーセンタイル）
+    """
+    limiter = RateLimiter(rate)
+    s3_client = boto3.client('s3', region_name=region) if s3_bucket is not None else None
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    completed = 0
+
+    def run_one(image_path: Path) -> Dict[str, Any]:
+        record = {'image': str(image_path), 'ok': False}
+        try:
+            if s3_client is not None:
+                image_base64 = None
+                image_uri = upload_image_to_s3(image_path, s3_bucket, region, s3_client)
+            else:
+                image_base64 = load_image_as_base64(image_path)
+                image_uri = None
+            payload = build_payload(image_base64, image_uri=image_uri, **payload_options)
+            limiter.acquire()
+            start = time.perf_counter()
+            response_payload = invoker.invoke(payload)
+            record['latency'] = round(time.perf_counter() - start, 4)
+            record['statusCode'] = response_payload.get('statusCode')
+            body = json.loads(response_payload.get('body', '{}'))
+            if record['statusCode'] != 200:
+                record['error'] = body.get('error', body)
+                record['errorType'] = f"HTTP{record['statusCode']}"
+                return record
+            record['ok'] = True
+            for key in ('llmResponse', 'reading', 'llmReading', 'llmUsage', 'llmTiming',
+                        'processedImageUri', 'yoloMessage', 'timings'):
+                if body.get(key) is not None:
+                    record[key] = body[key]
+        except ClientError as e:
+            record['error'] = str(e)
+            record['errorType'] = e.response.get('Error', {}).get('Code', 'ClientError')
+        except Exception as e:
+            record['error'] = str(e)
+            record['errorType'] = type(e).__name__
+        return record
+
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+    start_time = time.perf_counter()
+    with open(results_path, 'w', encoding='utf-8') as results_file, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        queue = iter(image_paths)
+        while True:
+            # 投入中の呼び出しを workers 件までに抑える（画像を一度に読み込まない）
+            for image_path in queue:
+                pending.add(executor.submit(run_one, image_path))
+                if len(pending) >= workers:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                results_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                results_file.flush()
+                completed += 1
+                if record['ok']:
+                    latencies.append(record['latency'])
+                else:
+                    errors[record['errorType']] = errors.get(record['errorType'], 0) + 1
+                status = f"{record['latency']:.2f}s" if record['ok'] else f"ERROR {record['errorType']}"
+                print(f"[{completed}/{len(image_paths)}] {record['image']}: {status}", file=sys.stderr)
+    wall_time = time.perf_counter() - start_time
+
+    return {
+        'count': len(image_paths),
+        'succeeded': len(latencies),
+        'errors': errors,
+        'wallTime': round(wall_time, 3),
+        'throughput': round(len(image_paths) / wall_time, 3) if wall_time > 0 else None,
+        'latency': {
+            f'p{q}': (round(percentile(latencies, q), 4) if latencies else None)
+            for q in (50, 95, 99)
+        },
+    }
+
+
+def run_batch_main(args: argparse.Namespace, image_paths: List[Path]) -> int:
+    """
+    バッチ実行
+
+    Args:
+        args: コマンドライン引数
+        image_paths: 画像ファイルのパスのリスト
+
+    Returns:
+        終了コード（エラーが1件でもあれば1）
+    """
+    calibration = None
+    if args.calibration is not None:
+        with open(args.calibration, 'r', encoding='utf-8') as f:
+            calibration = json.load(f)
+    payload_options = {
+        'user_prompt': load_prompt_file(args.user_prompt),
+        'system_prompt': load_prompt_file(args.system_prompt),
+        'preprocess_image': not args.no_preprocess,
+        'reading_mode': args.reading_mode,
+        'calibration': calibration,
+        'gauge_type': args.gauge_type,
+        'camera_id': args.camera_id,
+        'stream': args.stream,
+        'output_format': args.output_format,
+        'prompt_name': args.prompt_name,
+        'response_image': args.response_image,
+        'timings': args.timings,
+    }
+
+    print("=" * 80)
+    print("圧力計メーター読み取りシステム バッチ実行")
+    print("=" * 80)
+    print(f"[INFO] 入力画像: {len(image_paths)} 枚")
+    print(f"[INFO] 呼び出し先: {'フェイク（プロセス内）' if args.fake else args.function_name}")
+    print(f"[INFO] 同時呼び出し数: {args.workers}"
+          + (f", 最大 {args.rate:g} 回/秒" if args.rate > 0 else ""))
+    print(f"[INFO] 結果ファイル: {args.results}")
+    print()
+
+    if args.fake:
+        invoker = LocalInvoker(latency=args.fake_latency, jitter=args.fake_latency * 0.2)
+        # Lambda関数のログで進捗表示が埋もれないよう、呼び出し中の標準出力を捨てる
+        quiet = open(os.devnull, 'w')
+    else:
+        invoker = LambdaInvoker(args.function_name, args.region, max_connections=args.workers)
+        quiet = None
+
+    with quiet if quiet is not None else contextlib.nullcontext(), \
+            contextlib.redirect_stdout(quiet) if quiet is not None else contextlib.nullcontext():
+        summary = run_batch(
+            image_paths, invoker, payload_options, args.results,
+            workers=args.workers, rate=args.rate, s3_bucket=args.s3_bucket, region=args.region
+        )
+
+    latency = summary['latency']
+    print()
+    print("=" * 80)
+    print("バッチ実行結果")
+    print("=" * 80)
+    print(f"[件数] 成功: {summary['succeeded']} / {summary['count']}")
+    if summary['errors']:
+        print("[エラー] " + ", ".join(f"{name}: {count}" for name, count in sorted(summary['errors'].items())))
+    print(f"[スループット] {summary['throughput']} 枚/秒（全体: {summary['wallTime']:.2f}s）")
+    if latency['p50'] is not None:
+        print(f"[レイテンシ] p50: {latency['p50']:.3f}s, p95: {latency['p95']:.3f}s, p99: {latency['p99']:.3f}s")
+    print(f"[INFO] 結果ファイル: {args.results}")
+    return 1 if summary['errors'] else 0
+
+
 def main() -> int:
     """メイン処理"""
     parser = argparse.ArgumentParser(
         description='圧力計メーター読み取りシステム動作確認スクリプト'
     )
     parser.add_argument(
-        'image_path',
-        type=Path,
-        help='テスト対象の画像ファイルパス（例: ../sample_images/0001.png）'
+        'images',
+        nargs='+',
+        help='テスト対象の画像ファイル・ディレクトリ・globパターン'
+             '（例: ../sample_images/0001.png、複数・ディレクトリ・パターンの場合はバッチ実行）'
     )
     parser.add_argument(
         '--function-name',
@@ -176,12 +635,112 @@ def main() -> int:
         action='store_true',
         help='画像の前処理をスキップする（デフォルト: 前処理あり）'
     )
+    parser.add_argument(
+        '--reading-mode',
+        choices=['llm', 'local', 'auto'],
+        default='llm',
+        help='読み取りモード（llm: LLMで読み取り / local: 針の角度から読み取り / '
+             'auto: 信頼度が低い場合のみLLM、デフォルト: llm）'
+    )
+    parser.add_argument(
+        '--calibration',
+        type=Path,
+        default=None,
+        help='ゲージの校正値ファイル（JSON、local / auto で使用）'
+    )
+    parser.add_argument(
+        '--gauge-type',
+        type=str,
+        default=None,
+        help='Lambda関数の校正値ファイルから選ぶゲージ種別（--calibrationの代わりに指定）'
+    )
+    parser.add_argument(
+        '--camera-id',
+        type=str,
+        default=None,
+        help='カメラID（文字盤の検出結果をカメラごとに再利用）'
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Bedrockをストリーミングで呼び出し、読み取り値が現れた時点で受信を打ち切る'
+    )
+    parser.add_argument(
+        '--output-format',
+        choices=['text', 'json'],
+        default='text',
+        help='LLMの回答形式（text: 自由形式 / json: 読み取り値のJSONのみ、デフォルト: text）'
+    )
+    parser.add_argument(
+        '--response-image',
+        choices=['none', 'thumbnail', 'full'],
+        default=None,
+        help='レスポンスに含める前処理済み画像（none: 読み取り結果のみ / thumbnail: 縮小画像 / full、'
+             'デフォルト: 画像1枚の場合は full、バッチ実行の場合は none）'
+    )
+    parser.add_argument(
+        '--s3-bucket',
+        type=str,
+        default=None,
+        help='画像をS3バケットにアップロードしてURIで渡す（前処理済み画像もS3から取得）'
+    )
+    parser.add_argument(
+        '--prompt-name',
+        type=str,
+        default=None,
+        help='Lambda関数に同梱したプロンプトテンプレート名（指定時は --system-prompt の代わりに使用）'
+    )
+    parser.add_argument(
+        '--timings',
+        action='store_true',
+        help='処理段階ごとの所要時間をレスポンスに含めて表示する（バッチ実行では結果ファイルに記録）'
+    )
+    parser.add_argument(
+        '--results',
+        type=Path,
+        default=Path(__file__).parent / 'output' / 'results.jsonl',
+        help='バッチ実行の結果を書き出すJSONLファイル（デフォルト: ./output/results.jsonl）'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=4,
+        help='バッチ実行で同時に呼び出す数（デフォルト: 4）'
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=0.0,
+        help='バッチ実行の1秒あたりの最大呼び出し数（デフォルト: 0 = 制限なし）'
+    )
+    parser.add_argument(
+        '--fake',
+        action='store_true',
+        help='デプロイしたLambda関数の代わりに、プロセス内でフェイクのBedrockクライアントを使って実行する'
+    )
+    parser.add_argument(
+        '--fake-latency',
+        type=float,
+        default=1.0,
+        help='--fake のBedrock応答の待ち時間（秒、デフォルト: 1.0）'
+    )
 
     args = parser.parse_args()
 
+    image_paths = expand_image_paths(args.images)
+    batch = len(image_paths) != 1 or any(
+        Path(pattern).is_dir() or glob.has_magic(pattern) for pattern in args.images
+    )
+    if args.response_image is None:
+        args.response_image = 'none' if batch else 'full'
+
     # 画像ファイルの存在確認
-    if not args.image_path.exists():
-        print(f"[ERROR] 画像ファイルが見つかりません: {args.image_path}", file=sys.stderr)
+    if not image_paths:
+        print(f"[ERROR] 画像ファイルが見つかりません: {' '.join(args.images)}", file=sys.stderr)
+        return 1
+    missing = [path for path in image_paths if not path.exists()]
+    if missing:
+        print(f"[ERROR] 画像ファイルが見つかりません: {missing[0]}", file=sys.stderr)
         return 1
 
     # プロンプトファイルの存在確認
@@ -193,6 +752,10 @@ def main() -> int:
         print(f"[ERROR] システムプロンプトファイルが見つかりません: {args.system_prompt}", file=sys.stderr)
         return 1
 
+    if batch:
+        return run_batch_main(args, image_paths)
+    args.image_path = image_paths[0]
+
     # 出力ディレクトリの作成
     args.output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -207,10 +770,18 @@ def main() -> int:
     print()
 
     try:
-        # 画像を読み込み
-        print("[INFO] 画像を読み込み中...")
-        image_base64 = load_image_as_base64(args.image_path)
-        print(f"[INFO] 読み込み完了（base64サイズ: {len(image_base64)} characters）")
+        image_base64 = None
+        image_uri = None
+        if args.s3_bucket is not None:
+            # 画像をS3にアップロード（base64エンコードしない）
+            print(f"[INFO] 画像をS3にアップロード中: {args.s3_bucket}")
+            image_uri = upload_image_to_s3(args.image_path, args.s3_bucket, args.region)
+            print(f"[INFO] アップロード完了: {image_uri}")
+        else:
+            # 画像を読み込み
+            print("[INFO] 画像を読み込み中...")
+            image_base64 = load_image_as_base64(args.image_path)
+            print(f"[INFO] 読み込み完了（base64サイズ: {len(image_base64)} characters）")
         print()
 
         # プロンプトファイルを読み込み
@@ -221,6 +792,11 @@ def main() -> int:
         print(f"[INFO] システムプロンプト読み込み完了（{len(system_prompt)} characters）")
         print()
 
+        calibration = None
+        if args.calibration is not None:
+            with open(args.calibration, 'r', encoding='utf-8') as f:
+                calibration = json.load(f)
+
         # Lambda関数を呼び出し
         result = invoke_lambda_function(
             function_name=args.function_name,
@@ -228,7 +804,18 @@ def main() -> int:
             user_prompt=user_prompt,
             system_prompt=system_prompt,
             preprocess_image=not args.no_preprocess,  # --no-preprocessが指定されていない場合はTrue
-            region=args.region
+            region=args.region,
+            reading_mode=args.reading_mode,
+            calibration=calibration,
+            gauge_type=args.gauge_type,
+            camera_id=args.camera_id,
+            stream=args.stream,
+            output_format=args.output_format,
+            prompt_name=args.prompt_name,
+            image_uri=image_uri,
+            response_image=args.response_image,
+            timings=args.timings,
+            invoker=LocalInvoker(latency=args.fake_latency) if args.fake else None
         )
 
         print()
@@ -241,20 +828,72 @@ def main() -> int:
         print(f"[YOLO処理] {result['yolo_message']}")
         print()
 
-        # LLMレスポンス
-        print("[LLM解析結果]")
-        print("-" * 80)
-        print(result['llm_response'])
-        print("-" * 80)
-        print()
+        # ローカルの読み取り結果
+        reading = result['reading']
+        if reading is not None:
+            print(f"[読み取り結果] {reading['value']:.4g} {reading['unit']} "
+                  f"(角度: {reading['angle']}°, 信頼度: {reading['confidence']}, {reading['source']})")
+            print()
 
-        # 前処理済み画像を保存
-        output_filename = args.image_path.stem + '_processed.png'
-        output_path = args.output_dir / output_filename
-        print(f"[INFO] 前処理済み画像を保存中: {output_path}")
-        save_base64_image(result['processed_image'], output_path)
-        print(f"[INFO] 保存完了")
-        print()
+        # LLMレスポンス
+        if result['llm_response'] is not None:
+            llm_image = result['llm_image']
+            if llm_image is not None:
+                print(f"[Bedrock送信画像] {llm_image['width']}x{llm_image['height']} "
+                      f"{llm_image['mediaType']}, {llm_image['bytes'] / 1024:.1f} KB, "
+                      f"推定 {llm_image['estimatedTokens']} トークン")
+                print()
+            llm_timing = result['llm_timing']
+            if llm_timing is not None:
+                first_token = llm_timing.get('timeToFirstToken')
+                print(f"[Bedrock応答時間] 全体: {llm_timing['totalTime']:.2f}s"
+                      + (f", 最初のトークン: {first_token:.2f}s" if first_token is not None else "")
+                      + (" （読み取り値で打ち切り）" if llm_timing.get('stoppedEarly') else ""))
+                print()
+            llm_usage = result['llm_usage']
+            if llm_usage is not None:
+                print(f"[Bedrockトークン数] 入力: {llm_usage.get('inputTokens')}, "
+                      f"出力: {llm_usage.get('outputTokens')}, 呼び出し: {llm_usage.get('calls')}回")
+                if llm_usage.get('cacheReadInputTokens') or llm_usage.get('cacheWriteInputTokens'):
+                    print(f"[プロンプトキャッシュ] 読み込み: {llm_usage.get('cacheReadInputTokens') or 0}, "
+                          f"書き込み: {llm_usage.get('cacheWriteInputTokens') or 0} トークン")
+                print()
+            llm_reading = result['llm_reading']
+            if llm_reading is not None:
+                print(f"[LLM読み取り結果] {llm_reading['value']:.4g} {llm_reading['unit']} "
+                      f"(確からしさ: {llm_reading['confidence']})")
+                print()
+            elif result['llm_reading_error'] is not None:
+                print(f"[WARN] LLMの回答を解析できませんでした: {result['llm_reading_error']}")
+                print()
+            print("[LLM解析結果]")
+            print("-" * 80)
+            print(result['llm_response'])
+            print("-" * 80)
+            print()
+
+        # 処理段階ごとの所要時間（--timings 指定時）
+        timings = result['timings']
+        if timings is not None:
+            print("[処理時間] " + ", ".join(
+                f"{name}: {value:.1f}ms" for name, value in timings['stages'].items()
+            ))
+            print()
+
+        # 前処理済み画像を保存（--response-image none の場合は返されない）
+        if result['processed_image'] is not None or result['processed_image_uri'] is not None:
+            extension = {'image/jpeg': '.jpg', 'image/webp': '.webp'}.get(
+                result['processed_image_media_type'], '.png'
+            )
+            suffix = '_thumbnail' if args.response_image == 'thumbnail' else '_processed'
+            output_path = args.output_dir / (args.image_path.stem + suffix + extension)
+            print(f"[INFO] 前処理済み画像を保存中: {output_path}")
+            if result['processed_image_uri'] is not None:
+                download_s3_image(result['processed_image_uri'], output_path, args.region)
+            else:
+                save_base64_image(result['processed_image'], output_path)
+            print("[INFO] 保存完了")
+            print()
 
         print("=" * 80)
         print("[SUCCESS] テストが完了しました")